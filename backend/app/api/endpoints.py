@@ -1,135 +1,722 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, Query
-from typing import Optional
+from fastapi import APIRouter, File, UploadFile, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
+from operator import attrgetter
+import asyncio
+import time
 import pandas as pd
 
-from app.schema_inference.infer import ColumnTypeInferer
-from app.services.leak_detection import detect_data_leaks
-from app.services.evaluate_class_balance import evaluate_class_balance
-from app.services.detect_problematic_columns import detect_problem_columns
+from app.core.executor import get_executor
+from app.core.jobs import get_job_manager
+from app.core.metrics import record_dataset, span
+from app.api.responses import FastJSONResponse, binary_matrix_response, binary_media_type, encode_matrix
+from app.services.dataset_cache import DatasetEntry, get_registry
+from app.services.leak_detection import detect_data_leaks_from_stats
+from app.services.evaluate_class_balance import evaluate_class_balance_from_stats
+from app.services.bias_detector import fairness_metrics_from_entry
+from app.services.report_generator import REPORT_TAIL, default_sections, error_section, render_section, report_head
+from app.services.outlier_analysis import METHODS as OUTLIER_METHODS, detect_outliers_from_entry
+from app.services.detect_problematic_columns import detect_problem_columns_from_stats
+from app.services.dataset_profile import ANALYSES, DatasetProfile, run_analyses, validate_analyses
+from app.utils.file_utils import UnsupportedFormatError, parse_row_filter, read_head
 
 router = APIRouter()
 
+# Errores de lectura/parseo del CSV que se devuelven como 400
+CSV_ERRORS = (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError)
+
+DATASET_ID_DESCRIPTION = "Id returned by POST /datasets, instead of uploading the file again"
+FILE_DESCRIPTION = "CSV (plain, gzip or zstd), Parquet or Feather/Arrow IPC file containing the dataset"
+ROW_FILTER_DESCRIPTION = (
+    'Uploads only: JSON list of [column, operator, value] conditions, e.g. [["age", ">=", 18]], '
+    "applied while reading (operators: ==, !=, <, <=, >, >=, in, not in)"
+)
+MI_METHOD_DESCRIPTION = (
+    "'knn': sklearn estimators on numeric features and all rows; "
+    "'binned': fast histogram MI on a stratified subsample, also for categorical features, with confidence intervals"
+)
+MI_MAX_ERROR_DESCRIPTION = "Half-width of the MI confidence intervals the subsample is sized for (binned method)"
+TIMEOUT_DESCRIPTION = "Seconds after which each analysis step is abandoned (capped by the server limit)"
+FORMAT_DESCRIPTION = "'nested': {column: {column: value}}; 'compact': columns plus a flat row-major array of values"
+LAYOUT_DESCRIPTION = "Compact format only: 'upper' sends just the upper triangle (with the diagonal) of symmetric matrices"
+PRECISION_DESCRIPTION = "Compact and binary formats: float32 halves the binary size"
+MATRIX_DESCRIPTION = "Matrix returned by the binary formats (Accept: application/x-npy or application/vnd.apache.arrow.stream)"
+
+
+def step_timeout(timeout: Optional[float]) -> Optional[float]:
+    """Timeout pedido por el cliente, sin superar el del servidor."""
+    limit = get_executor().timeout
+    if timeout is None:
+        return limit
+    return timeout if limit is None else min(timeout, limit)
+
+
+def with_headers(result: Response, response: Response) -> Response:
+    """Copia a ``result`` las cabeceras puestas en ``response`` (FastAPI no lo hace si se devuelve una Response)."""
+    for name, value in response.headers.items():
+        if name != "content-length":
+            result.headers[name] = value
+    return result
+
+
+async def register_upload(
+    file: UploadFile,
+    timeout: Optional[float] = None,
+    columns: Optional[List[str]] = None,
+    row_filter: Optional[str] = None,
+):
+    """
+    Registra el fichero subido leyendo solo ``columns`` y las filas que
+    cumplen ``row_filter`` (JSON). Devuelve la entrada y si es nueva.
+    """
+    try:
+        conditions = parse_row_filter(row_filter)
+        return await get_executor().run(
+            get_registry().register, file.file, columns, conditions,
+            heavy=True, local_only=True, timeout=step_timeout(timeout),
+        )
+    except UnsupportedFormatError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except CSV_ERRORS as e:
+        raise HTTPException(status_code=400, detail=f"Invalid CSV file: {e}")
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid file: {e}")
+
+
+async def resolve_dataset(
+    file: Optional[UploadFile],
+    dataset_id: Optional[str],
+    response: Optional[Response] = None,
+    timeout: Optional[float] = None,
+    row_filter: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+) -> DatasetEntry:
+    """
+    Dataset cacheado a partir del fichero subido (se registra por hash de
+    contenido si es nuevo) o de un ``dataset_id`` previo. Añade la cabecera
+    ``X-Dataset-Id`` para que el cliente pueda reutilizarlo.
+
+    De un fichero subido se leen solo ``columns`` (las que necesita el
+    análisis; todas si es None) y las filas que cumplen ``row_filter``.
+    """
+    registry = get_registry()
+    executor = get_executor()
+    if file is not None:
+        entry, _ = await register_upload(file, timeout, columns, row_filter)
+    elif dataset_id:
+        if row_filter:
+            raise HTTPException(status_code=400, detail="row_filter applies to uploaded files, not to a dataset_id")
+        try:
+            entry = await executor.run(registry.get, dataset_id, local_only=True)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Dataset '{dataset_id}' not found")
+    else:
+        raise HTTPException(status_code=400, detail="Provide either a file or a dataset_id")
+    if response is not None:
+        response.headers["X-Dataset-Id"] = entry.dataset_id
+    record_dataset(entry.meta["n_rows"], len(entry.columns))
+    return entry
+
+
+async def load_stats(entry: DatasetEntry):
+    """Estadísticas del dataset (se cargan de disco la primera vez)."""
+    return await get_executor().run(attrgetter("stats"), entry, local_only=True)
+
+
+def dataset_info(entry: DatasetEntry) -> dict:
+    meta = entry.meta
+    return {
+        "dataset_id": entry.dataset_id,
+        "columns": meta["columns"],
+        "n_rows": meta["n_rows"],
+        "dtypes": meta["dtypes"],
+    }
+
+
+@router.post("/datasets", summary="Upload a dataset once and get an id to reuse it")
+async def upload_dataset(
+    response: Response,
+    file: UploadFile = File(..., description=FILE_DESCRIPTION),
+    columns: Optional[List[str]] = Query(None, description="Read and cache only these columns"),
+    row_filter: Optional[str] = Query(None, description=ROW_FILTER_DESCRIPTION),
+    timeout: Optional[float] = Query(None, gt=0, description=TIMEOUT_DESCRIPTION),
+):
+    """
+    Registra el fichero en la caché por hash de contenido. Si ya estaba, no
+    se vuelve a parsear (``cached`` = True). Con ``columns`` o ``row_filter``
+    se cachea solo esa parte, con un id propio.
+    """
+    entry, created = await register_upload(file, timeout, columns, row_filter)
+    response.headers["X-Dataset-Id"] = entry.dataset_id
+    record_dataset(entry.meta["n_rows"], len(entry.columns))
+    return {**dataset_info(entry), "cached": not created}
+
+
+@router.get("/datasets/{dataset_id}", summary="Metadata of a cached dataset")
+async def get_dataset(dataset_id: str):
+    entry = await resolve_dataset(None, dataset_id)
+    return dataset_info(entry)
+
+
+@router.post("/datasets/{dataset_id}/partitions", summary="Append a partition to a cached dataset")
+async def append_partition(
+    dataset_id: str,
+    response: Response,
+    file: UploadFile = File(..., description=FILE_DESCRIPTION),
+    timeout: Optional[float] = Query(None, gt=0, description=TIMEOUT_DESCRIPTION),
+):
+    """
+    Añade las filas del CSV al final del dataset sin volver a leer las
+    anteriores: solo se perfila la partición y sus estadísticas se combinan
+    con las ya calculadas. Devuelve el id del dataset resultante.
+    """
+    try:
+        entry, created = await get_executor().run(
+            get_registry().append, dataset_id, file.file,
+            heavy=True, local_only=True, timeout=step_timeout(timeout),
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Dataset '{dataset_id}' not found")
+    except UnsupportedFormatError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except CSV_ERRORS as e:
+        raise HTTPException(status_code=400, detail=f"Invalid CSV file: {e}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers["X-Dataset-Id"] = entry.dataset_id
+    record_dataset(entry.meta["n_rows"], len(entry.columns))
+    return {**dataset_info(entry), "partitions": len(entry.partitions), "cached": not created}
+
+
 @router.post("/analyze")
-async def analyze_dataset(file: UploadFile = File(...)):
-    df = pd.read_csv(file.file)
+async def analyze_dataset(
+    file: Optional[UploadFile] = File(None, description=FILE_DESCRIPTION),
+    dataset_id: Optional[str] = Query(None, description=DATASET_ID_DESCRIPTION),
+):
+    if file is not None:
+        try:
+            df = await get_executor().run(read_head, file.file, 3, local_only=True)
+        except UnsupportedFormatError as e:
+            raise HTTPException(status_code=415, detail=str(e))
+    else:
+        entry = await resolve_dataset(None, dataset_id)
+        df = await get_executor().run(entry.load_frame, None, 3, local_only=True)
     preview = df.head(3).to_dict(orient="records")
     columns = df.columns.tolist()
     return {"columns": columns, "preview": preview}
 
 @router.post("/schema/infer")
-async def infer_schema(file: UploadFile = File(...)):
+async def infer_schema(
+    response: Response,
+    file: Optional[UploadFile] = File(None, description=FILE_DESCRIPTION),
+    dataset_id: Optional[str] = Query(None, description=DATASET_ID_DESCRIPTION),
+    row_filter: Optional[str] = Query(None, description=ROW_FILTER_DESCRIPTION),
+    timeout: Optional[float] = Query(None, gt=0, description=TIMEOUT_DESCRIPTION),
+):
     """
-    Recibe un CSV subido y devuelve un dict {columna: tipo} según schema_inference.
+    Recibe un CSV subido (o un dataset_id) y devuelve un dict {columna: tipo}
+    según schema_inference y, en ``date_formats``, el formato ``strftime``
+    detectado de las columnas de fecha (reutilizable por el cargador). La inferencia se hace sobre la muestra de filas
+    acumulada (el fichero completo si no supera INGEST_SAMPLE_ROWS) y se
+    guarda en caché junto al dataset.
     """
-    try:
-        df = pd.read_csv(file.file)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error leyendo CSV: {e}")
-
-    inferer = ColumnTypeInferer()
-    tipos = {
-        col: inferer.infer(df[col]).value
-        for col in df.columns
-    }
-    return {"schema": tipos}
+    entry = await resolve_dataset(file, dataset_id, response, timeout, row_filter)
+    profile = DatasetProfile(await load_stats(entry), memo=entry.memo)
+    inferred = await get_executor().run(attrgetter("inferred_schema"), profile, timeout=step_timeout(timeout))
+    return inferred
 
 @router.post("/correlation")
 async def correlation_analysis(
-    file: UploadFile = File(...),
-    target: str | None = None
+    request: Request,
+    response: Response,
+    file: Optional[UploadFile] = File(None, description=FILE_DESCRIPTION),
+    dataset_id: Optional[str] = Query(None, description=DATASET_ID_DESCRIPTION),
+    row_filter: Optional[str] = Query(None, description=ROW_FILTER_DESCRIPTION),
+    target: str | None = None,
+    timeout: Optional[float] = Query(None, gt=0, description=TIMEOUT_DESCRIPTION),
+    format: Literal["nested", "compact"] = Query("nested", description=FORMAT_DESCRIPTION),
+    layout: Literal["full", "upper"] = Query("full", description=LAYOUT_DESCRIPTION),
+    precision: Literal["float64", "float32"] = Query("float64", description=PRECISION_DESCRIPTION),
+    matrix: Literal["numeric", "categorical"] = Query("numeric", description=MATRIX_DESCRIPTION),
 ) -> dict:
     """
     Devuelve:
       - numeric_corr: matriz Pearson de todas las numéricas.
       - pearson_target: correlaciones vs. target (si se proporciona).
       - categorical_corr: matriz Cramér’s V de categóricas.
+    Con format=compact cada matriz es {columns, layout, dtype, values} con
+    los valores en un array plano; con Accept: application/x-npy o
+    application/vnd.apache.arrow.stream se devuelve solo la matriz
+    ``matrix`` en binario.
     """
-    import pandas as pd
-    from app.services.correlation_service import (
-        compute_numeric_correlation,
-        compute_pearson_with_target,
-        compute_categorical_correlation,
-    )
+    entry = await resolve_dataset(file, dataset_id, response, timeout, row_filter)
+    stats = await load_stats(entry)
+    profile = DatasetProfile(stats, memo=entry.memo, store=entry)
+    binary = binary_media_type(request.headers.get("accept"))
+    compact = format == "compact"
 
-    try:
-        df = pd.read_csv(file.file)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"CSV inválido: {e}")
+    def encode(df: pd.DataFrame, square: bool = True):
+        if compact:
+            return encode_matrix(df, layout if square else "full", precision)
+        return df.round(3).to_dict(orient="dict" if square else "index")
+
+    async def categorical() -> pd.DataFrame:
+        # Cramér's V recorre todos los pares: se cachea
+        return await get_executor().run(
+            profile.categorical_correlation, heavy=True, timeout=step_timeout(timeout)
+        )
+
+    async def numeric() -> pd.DataFrame:
+        # De los co-momentos o, si no se acumularon, del almacén de columnas
+        with span("numeric_corr"):
+            return await get_executor().run(
+                profile.numeric_correlation, heavy=True, timeout=step_timeout(timeout)
+            )
+
+    if binary:
+        corr = await (categorical() if matrix == "categorical" else numeric())
+        with span("serialize"):
+            return with_headers(binary_matrix_response(corr, binary, precision), response)
 
     resp: dict = {}
     # Pearson general
-    num_corr = compute_numeric_correlation(df)
-    resp["numeric_corr"] = num_corr.round(3).to_dict()
+    resp["numeric_corr"] = encode(await numeric())
 
     # Pearson vs. target (opcional)
     if target:
         try:
-            pt = compute_pearson_with_target(df, target)
-            resp["pearson_target"] = pt.round(3).to_dict(orient="index")
+            with span("pearson_target"):
+                pt = await get_executor().run(
+                    profile.pearson_target, target, heavy=True, timeout=step_timeout(timeout)
+                )
+                resp["pearson_target"] = encode(pt, square=False)
         except KeyError as e:
             raise HTTPException(status_code=400, detail=str(e))
 
     # Categóricas
-    cat_corr = compute_categorical_correlation(df)
-    resp["categorical_corr"] = cat_corr.round(3).to_dict()
+    resp["categorical_corr"] = encode(await categorical())
 
+    if compact:
+        # Los arrays de numpy van directos a orjson, sin validar como dict
+        return with_headers(FastJSONResponse(resp), response)
     return resp
 
 @router.post("/detect-data-leaks", summary="Detect data leaks in a dataset")
 async def detect_data_leaks_endpoint(
-    file: UploadFile = File(..., description="CSV file containing the dataset"),
+    response: Response,
+    file: Optional[UploadFile] = File(None, description=FILE_DESCRIPTION),
+    dataset_id: Optional[str] = Query(None, description=DATASET_ID_DESCRIPTION),
+    row_filter: Optional[str] = Query(None, description=ROW_FILTER_DESCRIPTION),
     target_col: str = Query(..., description="Name of the target column to check against"),
     corr_threshold: float = Query(0.95, ge=0.0, le=1.0, description="Threshold for Pearson correlation"),
     mi_threshold: float = Query(0.5, ge=0.0, description="Threshold for mutual information score"),
-    discrete_target: Optional[bool] = Query(False, description="Whether the target is discrete (classification)")
+    mi_method: Literal["knn", "binned"] = Query("knn", description=MI_METHOD_DESCRIPTION),
+    mi_max_error: float = Query(0.02, gt=0.0, description=MI_MAX_ERROR_DESCRIPTION),
+    discrete_target: Optional[bool] = Query(False, description="Whether the target is discrete (classification)"),
+    timeout: Optional[float] = Query(None, gt=0, description=TIMEOUT_DESCRIPTION),
 ):
     """
-    Accepts a CSV upload and parameters, returns detected data leaks:
+    Accepts a CSV upload (or a cached dataset_id) and parameters, returns
+    detected data leaks:
     - identical features
     - high-correlation features
     - high mutual information features
+    Mutual information scores are cached per target, so changing the
+    thresholds only re-filters them.
+    With mi_method=binned each MI leak also carries its confidence interval
+    and whether the whole interval is above mi_threshold.
     """
-    try:
-        df = pd.read_csv(file.file)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Invalid CSV file: {e}")
-
-    if target_col not in df.columns:
+    entry = await resolve_dataset(file, dataset_id, response, timeout, row_filter)
+    if target_col not in entry.columns:
         raise HTTPException(status_code=400, detail=f"Target column '{target_col}' not found in dataset")
-
-    result = detect_data_leaks(
-        df,
+    stats = await load_stats(entry)
+    profile = DatasetProfile(stats, memo=entry.memo, store=entry)
+    try:
+        mi_scores = await get_executor().run(
+            profile.mi_scores,
+            target_col,
+            bool(discrete_target),
+            None,
+            mi_method,
+            mi_max_error,
+            heavy=True,
+            timeout=step_timeout(timeout),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Cannot compute mutual information: {e}")
+    target_correlations = await get_executor().run(
+        profile.target_correlations, target_col, heavy=True, timeout=step_timeout(timeout)
+    )
+    result = await get_executor().run(
+        detect_data_leaks_from_stats,
+        stats,
         target_col,
         corr_threshold=corr_threshold,
         mi_threshold=mi_threshold,
-        discrete_target=discrete_target
+        discrete_target=discrete_target,
+        mi_scores=mi_scores,
+        target_correlations=target_correlations,
+        timeout=step_timeout(timeout)
     )
     return result
 
 @router.post("/evaluate-class-balance", summary="Evaluate class balance for a discrete target column")
 async def evaluate_class_balance_endpoint(
-    file: UploadFile = File(..., description="CSV file containing the dataset"),
+    response: Response,
+    file: Optional[UploadFile] = File(None, description=FILE_DESCRIPTION),
+    dataset_id: Optional[str] = Query(None, description=DATASET_ID_DESCRIPTION),
+    row_filter: Optional[str] = Query(None, description=ROW_FILTER_DESCRIPTION),
     target_col: str = Query(..., description="Name of the discrete target column"),
-    imbalance_threshold: float = Query(0.1, ge=0.0, le=1.0, description="Max allowed deviation from uniform distribution to consider balanced")
+    imbalance_threshold: float = Query(0.1, ge=0.0, le=1.0, description="Max allowed deviation from uniform distribution to consider balanced"),
+    timeout: Optional[float] = Query(None, gt=0, description=TIMEOUT_DESCRIPTION),
 ):
-    try:
-        df = pd.read_csv(file.file)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Invalid CSV file: {e}")
-    if target_col not in df.columns:
+    # De un fichero subido basta con leer el target
+    entry = await resolve_dataset(file, dataset_id, response, timeout, row_filter, columns=[target_col])
+    stats = await load_stats(entry)
+    if target_col not in stats.columns:
         raise HTTPException(status_code=400, detail=f"Target column '{target_col}' not found in dataset")
-    result = evaluate_class_balance(df, target_col, imbalance_threshold)
+    try:
+        with span("class_balance"):
+            result = evaluate_class_balance_from_stats(stats, target_col, imbalance_threshold)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return result
+
+@router.post("/detect-bias", summary="Fairness metrics across sensitive attributes and their intersections")
+async def detect_bias_endpoint(
+    response: Response,
+    file: Optional[UploadFile] = File(None, description=FILE_DESCRIPTION),
+    dataset_id: Optional[str] = Query(None, description=DATASET_ID_DESCRIPTION),
+    row_filter: Optional[str] = Query(None, description=ROW_FILTER_DESCRIPTION),
+    sensitive_cols: List[str] = Query(..., description="Sensitive attribute columns (e.g. gender, age band, country)"),
+    target_col: str = Query(..., description="Name of the discrete target column"),
+    prediction_col: Optional[str] = Query(None, description="Column with model predictions, for predicted parity and equal opportunity"),
+    positive_class: Optional[str] = Query(None, description="Favourable target class (defaults to the minority class)"),
+    max_order: int = Query(2, ge=1, le=3, description="Largest number of attributes intersected"),
+    min_group_size: int = Query(1, ge=1, description="Groups with fewer rows are reported but left out of the gaps"),
+    imbalance_threshold: float = Query(0.1, ge=0.0, le=1.0, description="Max allowed deviation from uniform distribution to consider balanced"),
+    n_bootstrap: int = Query(0, ge=0, le=5000, description="Bootstrap resamples for confidence intervals (0 = none)"),
+    confidence: float = Query(0.95, gt=0.0, lt=1.0, description="Confidence level of the bootstrap intervals"),
+    timeout: Optional[float] = Query(None, gt=0, description=TIMEOUT_DESCRIPTION),
+) -> dict:
+    """
+    Demographic parity, equal opportunity (with prediction_col) and class
+    balance for every group of each sensitive attribute and of their
+    intersections, computed over all the rows of the dataset.
+    """
+    involved = list(dict.fromkeys([*sensitive_cols, target_col] + ([prediction_col] if prediction_col else [])))
+    entry = await resolve_dataset(file, dataset_id, response, timeout, row_filter, columns=involved)
+    try:
+        result = await get_executor().run(
+            fairness_metrics_from_entry,
+            entry,
+            sensitive_cols,
+            target_col,
+            prediction_col,
+            positive_class=positive_class,
+            max_order=max_order,
+            min_group_size=min_group_size,
+            imbalance_threshold=imbalance_threshold,
+            n_bootstrap=n_bootstrap,
+            confidence=confidence,
+            heavy=True,
+            timeout=step_timeout(timeout),
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return result
+
+@router.post("/detect-outliers", summary="Detect outlier rows and per-column outlier rates")
+async def detect_outliers_endpoint(
+    response: Response,
+    file: Optional[UploadFile] = File(None, description=FILE_DESCRIPTION),
+    dataset_id: Optional[str] = Query(None, description=DATASET_ID_DESCRIPTION),
+    row_filter: Optional[str] = Query(None, description=ROW_FILTER_DESCRIPTION),
+    columns: Optional[List[str]] = Query(None, description="Columns to analyse (defaults to the inferred integer and float columns)"),
+    method: Literal[OUTLIER_METHODS] = Query("isolation_forest", description="Row-level detector: univariate, isolation_forest or dbscan (on a bounded sample)"),
+    univariate: Literal["iqr", "mad"] = Query("iqr", description="Per-column fences: IQR (Tukey) or median absolute deviation"),
+    k: Optional[float] = Query(None, gt=0, description="Fence multiplier (defaults: 1.5 for IQR, 3.5 for MAD)"),
+    top_k: int = Query(20, ge=0, le=1000, description="Most anomalous rows returned"),
+    eps: Optional[float] = Query(None, gt=0, description="DBSCAN radius in robust-scaled units (estimated if omitted)"),
+    min_samples: int = Query(5, ge=2, description="DBSCAN core point neighbours"),
+    timeout: Optional[float] = Query(None, gt=0, description=TIMEOUT_DESCRIPTION),
+) -> dict:
+    """
+    Univariate IQR/MAD fences with the outlier rate of each column, plus
+    the share of outlier rows and the top_k most anomalous rows according
+    to method. Every row is scored, in chunks bounded in memory.
+    """
+    entry = await resolve_dataset(file, dataset_id, response, timeout, row_filter, columns=columns)
+    stats = await load_stats(entry)
+    profile = DatasetProfile(stats, memo=entry.memo)
+    schema = await get_executor().run(attrgetter("schema"), profile, timeout=step_timeout(timeout))
+    # With the process backend the chunks are read here and scored in the
+    # executor's processes, which keep the fitted model between chunks
+    pool = get_executor().process_pool()
+    try:
+        result = await get_executor().run(
+            detect_outliers_from_entry,
+            entry,
+            schema,
+            columns,
+            method=method,
+            univariate=univariate,
+            k=k,
+            top_k=top_k,
+            eps=eps,
+            min_samples=min_samples,
+            n_jobs=get_executor().max_workers if pool is not None else 1,
+            pool=pool,
+            heavy=True,
+            local_only=pool is not None,
+            timeout=step_timeout(timeout),
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return result
+
+@router.post("/feature-importance", summary="Baseline model feature importance (SHAP) within a time budget")
+async def feature_importance_endpoint(
+    response: Response,
+    file: Optional[UploadFile] = File(None, description=FILE_DESCRIPTION),
+    dataset_id: Optional[str] = Query(None, description=DATASET_ID_DESCRIPTION),
+    row_filter: Optional[str] = Query(None, description=ROW_FILTER_DESCRIPTION),
+    target_col: str = Query(..., description="Name of the target column"),
+    discrete_target: bool = Query(False, description="Whether the target is discrete (classification)"),
+    group_cols: Optional[List[str]] = Query(None, description="Columns whose most frequent groups get their own importance"),
+    time_budget: float = Query(10.0, gt=0, le=600, description="Seconds for fitting and explaining; sets how many rows are explained"),
+    method: Literal["auto", "tree_shap", "saabas"] = Query("auto", description="'tree_shap' needs the shap package; 'auto' falls back to Saabas path attributions"),
+    timeout: Optional[float] = Query(None, gt=0, description=TIMEOUT_DESCRIPTION),
+) -> dict:
+    """
+    Fits a random forest on a stratified sample and returns the mean
+    |contribution| of every feature, globally and per group of group_cols.
+    The model and contributions are cached per dataset and target.
+    """
+    entry = await resolve_dataset(file, dataset_id, response, timeout, row_filter)
+    stats = await load_stats(entry)
+    profile = DatasetProfile(stats, memo=entry.memo)
+    try:
+        result = await get_executor().run(
+            profile.feature_importance,
+            target_col,
+            discrete_target,
+            group_cols,
+            time_budget=time_budget,
+            method=method,
+            heavy=True,
+            timeout=step_timeout(timeout),
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return result
 
 @router.post("/detect-problem-columns", summary="Identify problematic columns in a dataset")
 async def detect_problem_columns_endpoint(
-    file: UploadFile = File(..., description="CSV file containing the dataset"),
-    corr_threshold: float = Query(0.95, ge=0.0, le=1.0, description="Threshold for feature-feature correlation")
+    response: Response,
+    file: Optional[UploadFile] = File(None, description=FILE_DESCRIPTION),
+    dataset_id: Optional[str] = Query(None, description=DATASET_ID_DESCRIPTION),
+    row_filter: Optional[str] = Query(None, description=ROW_FILTER_DESCRIPTION),
+    corr_threshold: float = Query(0.95, ge=0.0, le=1.0, description="Threshold for feature-feature correlation"),
+    timeout: Optional[float] = Query(None, gt=0, description=TIMEOUT_DESCRIPTION),
 ):
-    try:
-        df = pd.read_csv(file.file)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Invalid CSV file: {e}")
-    result = detect_problem_columns(df, corr_threshold)
+    entry = await resolve_dataset(file, dataset_id, response, timeout, row_filter)
+    profile = DatasetProfile(await load_stats(entry), memo=entry.memo, store=entry)
+    pair_corr = await get_executor().run(
+        profile.feature_pair_correlations, corr_threshold, heavy=True, timeout=step_timeout(timeout)
+    )
+    result = await get_executor().run(
+        detect_problem_columns_from_stats,
+        profile.stats,
+        corr_threshold,
+        pair_corr=pair_corr,
+        timeout=step_timeout(timeout),
+    )
     return result
 
+@router.post("/analysis", summary="Run several analyses over a single parse of the dataset")
+async def combined_analysis_endpoint(
+    response: Response,
+    file: Optional[UploadFile] = File(None, description=FILE_DESCRIPTION),
+    dataset_id: Optional[str] = Query(None, description=DATASET_ID_DESCRIPTION),
+    row_filter: Optional[str] = Query(None, description=ROW_FILTER_DESCRIPTION),
+    analyses: List[str] = Query(list(ANALYSES), description="Analyses to run: " + ", ".join(ANALYSES)),
+    target_col: Optional[str] = Query(None, description="Target column (required for leaks and class_balance)"),
+    corr_threshold: float = Query(0.95, ge=0.0, le=1.0, description="Threshold for Pearson correlation"),
+    mi_threshold: float = Query(0.5, ge=0.0, description="Threshold for mutual information score"),
+    mi_method: Literal["knn", "binned"] = Query("knn", description=MI_METHOD_DESCRIPTION),
+    mi_max_error: float = Query(0.02, gt=0.0, description=MI_MAX_ERROR_DESCRIPTION),
+    discrete_target: bool = Query(False, description="Whether the target is discrete (classification)"),
+    imbalance_threshold: float = Query(0.1, ge=0.0, le=1.0, description="Max allowed deviation from uniform distribution to consider balanced"),
+    timeout: Optional[float] = Query(None, gt=0, description=TIMEOUT_DESCRIPTION),
+) -> dict:
+    """
+    Parses the CSV once (or reuses a cached dataset) into a shared profile
+    and runs the selected analyses on it. Returns each analysis result plus
+    the seconds spent per stage.
+    """
+    try:
+        validate_analyses(analyses, target_col)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    start = time.perf_counter()
+    entry = await resolve_dataset(file, dataset_id, response, timeout, row_filter)
+    stats = await load_stats(entry)
+    profile = DatasetProfile(stats, timings={"parse": time.perf_counter() - start}, memo=entry.memo, store=entry)
+    if target_col and target_col not in stats.columns:
+        raise HTTPException(status_code=400, detail=f"Target column '{target_col}' not found in dataset")
+    try:
+        return await get_executor().run(
+            run_analyses,
+            profile,
+            analyses,
+            heavy=True,
+            timeout=step_timeout(timeout),
+            target_col=target_col,
+            corr_threshold=corr_threshold,
+            mi_threshold=mi_threshold,
+            mi_method=mi_method,
+            mi_max_error=mi_max_error,
+            discrete_target=discrete_target,
+            imbalance_threshold=imbalance_threshold,
+        )
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/report", response_class=StreamingResponse, summary="HTML report of the combined analyses, streamed section by section")
+async def report_endpoint(
+    response: Response,
+    file: Optional[UploadFile] = File(None, description=FILE_DESCRIPTION),
+    dataset_id: Optional[str] = Query(None, description=DATASET_ID_DESCRIPTION),
+    row_filter: Optional[str] = Query(None, description=ROW_FILTER_DESCRIPTION),
+    sections: Optional[List[str]] = Query(None, description="Sections to include (defaults to every analysis that can run): " + ", ".join(ANALYSES)),
+    target_col: Optional[str] = Query(None, description="Target column (required for leaks and class_balance)"),
+    corr_threshold: float = Query(0.95, ge=0.0, le=1.0, description="Threshold for Pearson correlation"),
+    mi_threshold: float = Query(0.5, ge=0.0, description="Threshold for mutual information score"),
+    mi_method: Literal["knn", "binned"] = Query("knn", description=MI_METHOD_DESCRIPTION),
+    mi_max_error: float = Query(0.02, gt=0.0, description=MI_MAX_ERROR_DESCRIPTION),
+    discrete_target: bool = Query(False, description="Whether the target is discrete (classification)"),
+    imbalance_threshold: float = Query(0.1, ge=0.0, le=1.0, description="Max allowed deviation from uniform distribution to consider balanced"),
+    timeout: Optional[float] = Query(None, gt=0, description=TIMEOUT_DESCRIPTION),
+):
+    """
+    Sections render concurrently and are sent in order as soon as they are
+    ready. Each rendered section is cached per dataset and the parameters
+    it uses, so changing one threshold only re-renders the sections that
+    depend on it. A failing section is replaced by an error note.
+    """
+    sections = sections or default_sections(target_col)
+    try:
+        validate_analyses(sections, target_col)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    entry = await resolve_dataset(file, dataset_id, response, timeout, row_filter)
+    if target_col and target_col not in entry.columns:
+        raise HTTPException(status_code=400, detail=f"Target column '{target_col}' not found in dataset")
+    profile = DatasetProfile(await load_stats(entry), memo=entry.memo, store=entry)
+    params = {
+        "target_col": target_col,
+        "corr_threshold": corr_threshold,
+        "mi_threshold": mi_threshold,
+        "mi_method": mi_method,
+        "mi_max_error": mi_max_error,
+        "discrete_target": discrete_target,
+        "imbalance_threshold": imbalance_threshold,
+    }
+    tasks = [
+        asyncio.ensure_future(get_executor().run(
+            render_section, profile, name, params, heavy=True, timeout=step_timeout(timeout)
+        ))
+        for name in sections
+    ]
+
+    async def stream():
+        try:
+            yield report_head(f"Dataset report {entry.dataset_id[:12]}", sections)
+            for name, task in zip(sections, tasks):
+                try:
+                    yield await task
+                except Exception as e:
+                    yield error_section(name, e)
+            yield REPORT_TAIL
+        finally:
+            # Client gone: the sections not yet rendered are not needed
+            for task in tasks:
+                task.cancel()
+
+    return with_headers(StreamingResponse(stream(), media_type="text/html"), response)
+
+@router.post("/jobs", status_code=202, summary="Queue the combined analysis as a background job")
+async def submit_analysis_job(
+    response: Response,
+    file: Optional[UploadFile] = File(None, description=FILE_DESCRIPTION),
+    dataset_id: Optional[str] = Query(None, description=DATASET_ID_DESCRIPTION),
+    row_filter: Optional[str] = Query(None, description=ROW_FILTER_DESCRIPTION),
+    analyses: List[str] = Query(list(ANALYSES), description="Analyses to run: " + ", ".join(ANALYSES)),
+    target_col: Optional[str] = Query(None, description="Target column (required for leaks and class_balance)"),
+    corr_threshold: float = Query(0.95, ge=0.0, le=1.0, description="Threshold for Pearson correlation"),
+    mi_threshold: float = Query(0.5, ge=0.0, description="Threshold for mutual information score"),
+    mi_method: Literal["knn", "binned"] = Query("knn", description=MI_METHOD_DESCRIPTION),
+    mi_max_error: float = Query(0.02, gt=0.0, description=MI_MAX_ERROR_DESCRIPTION),
+    discrete_target: bool = Query(False, description="Whether the target is discrete (classification)"),
+    imbalance_threshold: float = Query(0.1, ge=0.0, le=1.0, description="Max allowed deviation from uniform distribution to consider balanced"),
+):
+    """
+    Same analyses as /analysis, but returns a job id right away. Poll
+    GET /jobs/{job_id} for status and progress and fetch the output from
+    GET /jobs/{job_id}/result. Jobs are persisted and resumed after a
+    server restart.
+    """
+    try:
+        validate_analyses(analyses, target_col)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    entry = await resolve_dataset(file, dataset_id, response, row_filter=row_filter)
+    if target_col and target_col not in entry.columns:
+        raise HTTPException(status_code=400, detail=f"Target column '{target_col}' not found in dataset")
+    job_id = get_job_manager().submit(
+        "analysis",
+        {
+            "dataset_id": entry.dataset_id,
+            "analyses": analyses,
+            "target_col": target_col,
+            "corr_threshold": corr_threshold,
+            "mi_threshold": mi_threshold,
+            "mi_method": mi_method,
+            "mi_max_error": mi_max_error,
+            "discrete_target": discrete_target,
+            "imbalance_threshold": imbalance_threshold,
+        },
+    )
+    return get_job_manager().get(job_id)
+
+def get_job_or_404(job_id: str) -> dict:
+    try:
+        return get_job_manager().get(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+
+@router.get("/jobs/{job_id}", summary="Status and progress of a background job")
+async def get_job(job_id: str):
+    return get_job_or_404(job_id)
+
+@router.get("/jobs/{job_id}/result", summary="Result of a finished background job")
+async def get_job_result(job_id: str) -> dict:
+    job = get_job_or_404(job_id)
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job '{job_id}' is {job['status']}")
+    return get_job_manager().result(job_id)
+
+@router.delete("/jobs/{job_id}", summary="Cancel a background job")
+async def cancel_job(job_id: str):
+    get_job_or_404(job_id)
+    return get_job_manager().cancel(job_id)
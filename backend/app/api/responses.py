@@ -0,0 +1,176 @@
+"""
+Respuestas compactas para matrices grandes.
+
+``DataFrame.to_dict()`` convierte una matriz de 2.000 x 2.000 en 4M floats
+de Python anidados en diccionarios, y el ``json`` estándar falla con los
+NaN. Aquí:
+
+- ``FastJSONResponse`` serializa con orjson (arrays de numpy sin pasar por
+  listas de Python; NaN e infinito como ``null``), con ``json`` como
+  alternativa si orjson no está instalado;
+- ``encode_matrix`` da la forma compacta de una matriz: nombres de columna
+  y un array plano por filas, o solo el triángulo superior si es simétrica;
+- ``binary_matrix_response`` la devuelve como Arrow IPC o ``.npy`` según la
+  cabecera ``Accept``.
+"""
+import importlib.util
+import io
+import json
+import math
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import Response
+
+from app.core.metrics import TimedJSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+NPY_MEDIA_TYPE = "application/x-npy"
+BINARY_MEDIA_TYPES = (ARROW_MEDIA_TYPE, NPY_MEDIA_TYPE)
+
+LAYOUTS = ("full", "upper")
+PRECISIONS = {"float64": np.float64, "float32": np.float32}
+
+
+def _default(obj: Any) -> Any:
+    """Tipos que orjson no conoce (escalares de numpy/pandas, NA...)."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    return jsonable_encoder(obj)
+
+
+def _finite(obj: Any) -> Any:
+    """Copia de ``obj`` con NaN/infinito como None, para el ``json`` estándar."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, np.ndarray):
+        return _finite(obj.tolist())
+    if isinstance(obj, np.generic):
+        return _finite(obj.item())
+    if isinstance(obj, dict):
+        return {k if isinstance(k, str) else str(k): _finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(v) for v in obj]
+    return obj
+
+
+def dumps(content: Any) -> bytes:
+    """JSON de ``content`` (arrays de numpy incluidos) con NaN/infinito como null."""
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(
+        _finite(jsonable_encoder(content, custom_encoder={np.ndarray: lambda a: a.tolist()})),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(TimedJSONResponse):
+    """Respuesta JSON serializada con ``dumps`` (orjson si está disponible)."""
+
+    def encode(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def encode_matrix(
+    df: pd.DataFrame,
+    layout: str = "full",
+    precision: str = "float64",
+    decimals: Optional[int] = 3,
+) -> Dict[str, Any]:
+    """
+    Forma compacta de ``df``: ``columns`` (e ``index`` si las filas no son
+    las mismas columnas) y ``values``, un array plano por filas. Con
+    ``layout="upper"`` (solo matrices cuadradas simétricas) ``values`` es el
+    triángulo superior con la diagonal: la celda (i, j) con i <= j está en
+    la posición ``i * n - i * (i - 1) // 2 + (j - i)``.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout '{layout}'. Available: {list(LAYOUTS)}")
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}'. Available: {list(PRECISIONS)}")
+    values = df.to_numpy(dtype=np.float64, na_value=np.nan)
+    if decimals is not None:
+        values = values.round(decimals)
+    values = values.astype(PRECISIONS[precision])
+    encoded: Dict[str, Any] = {"columns": [str(c) for c in df.columns]}
+    square = list(df.index) == list(df.columns)
+    if not square:
+        encoded["index"] = [str(i) for i in df.index]
+    if layout == "upper":
+        if not square:
+            raise ValueError("The upper layout needs a square matrix with the same rows and columns")
+        encoded["layout"] = "upper"
+        encoded["values"] = values[np.triu_indices(len(df.columns))]
+    else:
+        encoded["layout"] = "full"
+        encoded["values"] = values.ravel()
+    encoded["dtype"] = precision
+    return encoded
+
+
+def decode_matrix(encoded: Dict[str, Any]) -> pd.DataFrame:
+    """Inversa de ``encode_matrix`` (con los valores ya leídos del JSON)."""
+    columns = encoded["columns"]
+    index = encoded.get("index", columns)
+    values = np.array([np.nan if v is None else v for v in encoded["values"]], dtype=np.float64)
+    if encoded.get("layout") == "upper":
+        n = len(columns)
+        matrix = np.full((n, n), np.nan)
+        rows, cols = np.triu_indices(n)
+        matrix[rows, cols] = values
+        matrix[cols, rows] = values
+    else:
+        matrix = values.reshape(len(index), len(columns))
+    return pd.DataFrame(matrix, index=index, columns=columns)
+
+
+def binary_media_type(accept: Optional[str]) -> Optional[str]:
+    """Formato binario pedido en la cabecera ``Accept`` (None si se quiere JSON)."""
+    for media_type in BINARY_MEDIA_TYPES:
+        if media_type in (accept or ""):
+            return media_type
+    return None
+
+
+def binary_matrix_response(df: pd.DataFrame, media_type: str, precision: str = "float64") -> Response:
+    """
+    Matriz completa en binario: Arrow IPC (una columna por columna de la
+    matriz, más ``index``) o ``.npy`` estructurado (un campo por columna,
+    una fila por fila). 406 si el formato necesita pyarrow y no está.
+    """
+    dtype = PRECISIONS[precision]
+    values = df.to_numpy(dtype=np.float64, na_value=np.nan).astype(dtype)
+    columns = [str(c) for c in df.columns]
+    buffer = io.BytesIO()
+    if media_type == ARROW_MEDIA_TYPE:
+        if importlib.util.find_spec("pyarrow") is None:
+            raise HTTPException(status_code=406, detail=f"{ARROW_MEDIA_TYPE} needs pyarrow; use {NPY_MEDIA_TYPE}")
+        import pyarrow as pa
+
+        table = pa.table({"index": [str(i) for i in df.index], **{c: values[:, j] for j, c in enumerate(columns)}})
+        with pa.ipc.new_stream(buffer, table.schema) as writer:
+            writer.write_table(table)
+    elif media_type == NPY_MEDIA_TYPE:
+        records = np.empty(len(df), dtype=[(c, dtype) for c in columns])
+        for j, c in enumerate(columns):
+            records[c] = values[:, j]
+        np.save(buffer, records, allow_pickle=False)
+    else:
+        raise HTTPException(status_code=406, detail=f"Unsupported media type '{media_type}'")
+    return Response(buffer.getvalue(), media_type=media_type)
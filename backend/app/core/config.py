@@ -1,2 +1,73 @@
 # Configuraciones generales del backend
+import os
+import tempfile
+
 APP_NAME = "AI Bias Detector"
+
+# Ingesta por bloques: memoria máxima (bytes) que puede ocupar el
+# procesamiento de un CSV subido, independiente del número de filas.
+INGEST_MEMORY_BUDGET_BYTES = int(os.getenv("INGEST_MEMORY_BUDGET_BYTES", 256 * 1024 * 1024))
+# Filas que se leen primero para estimar el tamaño de cada bloque
+INGEST_PROBE_ROWS = int(os.getenv("INGEST_PROBE_ROWS", 1000))
+# Categorías distintas por columna que se cuentan de forma exacta; por
+# encima solo queda el sketch HyperLogLog.
+INGEST_MAX_CATEGORIES = int(os.getenv("INGEST_MAX_CATEGORIES", 10_000))
+# Filas de la muestra (reservoir) para análisis que necesitan filas completas
+INGEST_SAMPLE_ROWS = int(os.getenv("INGEST_SAMPLE_ROWS", 100_000))
+# Bytes que puede ocupar esa muestra (se guarda como texto, p celdas por
+# fila): con muchas columnas se queda en menos de INGEST_SAMPLE_ROWS filas.
+INGEST_SAMPLE_MEMORY_BYTES = int(os.getenv("INGEST_SAMPLE_MEMORY_BYTES", INGEST_MEMORY_BUDGET_BYTES // 2))
+# Columnas a partir de las cuales la caché de datasets no acumula co-momentos
+# (son densos, p x p): las correlaciones se calculan por bloques desde el
+# almacén de columnas.
+INGEST_MAX_MOMENT_COLUMNS = int(os.getenv("INGEST_MAX_MOMENT_COLUMNS", 1000))
+# Motor de pd.read_csv para cargar datasets completos: "c" o "pyarrow"
+# (si pyarrow no está instalado se usa "c")
+INGEST_CSV_ENGINE = os.getenv("INGEST_CSV_ENGINE", "c")
+
+# Caché de datasets por hash de contenido (subir una vez, analizar muchas)
+DATASET_CACHE_DIR = os.getenv(
+    "DATASET_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ai-bias-datasets")
+)
+# Bytes en disco a partir de los cuales se expulsan datasets (LRU)
+DATASET_CACHE_MAX_BYTES = int(os.getenv("DATASET_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+# Datasets cuyas estadísticas se mantienen cargadas en memoria
+DATASET_CACHE_MEMORY_ENTRIES = int(os.getenv("DATASET_CACHE_MEMORY_ENTRIES", 8))
+
+# Ejecución de los análisis fuera del event loop: "inline", "thread" o "process"
+ANALYSIS_BACKEND = os.getenv("ANALYSIS_BACKEND", "thread")
+# Hilos/procesos del pool de análisis
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", 4))
+# Tiempo máximo (segundos) de un análisis por petición; 0 = sin límite
+ANALYSIS_TIMEOUT_SECONDS = float(os.getenv("ANALYSIS_TIMEOUT_SECONDS", 300))
+# Análisis pesados (parseo, MI, Cramér's V...) que pueden ejecutarse a la vez
+HEAVY_ANALYSIS_CONCURRENCY = int(os.getenv("HEAVY_ANALYSIS_CONCURRENCY", 2))
+# Procesos/hilos con los que se estima la información mutua de cada análisis
+# (-1 = todas las CPU); se multiplica por los análisis pesados simultáneos
+MI_N_JOBS = int(os.getenv("MI_N_JOBS", 1))
+# Calentamiento tras el arranque: importa scipy/sklearn, ejecuta los análisis
+# sobre un dataset mínimo y arranca los procesos del pool en segundo plano
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "0") != "0"
+
+# Outliers: memoria máxima (bytes) de los bloques de filas que se puntúan y
+# filas de la submuestra con la que se ajusta el Isolation Forest
+OUTLIER_MEMORY_BUDGET_BYTES = int(os.getenv("OUTLIER_MEMORY_BUDGET_BYTES", 256 * 1024 * 1024))
+OUTLIER_SAMPLE_ROWS = int(os.getenv("OUTLIER_SAMPLE_ROWS", 50_000))
+
+# Trabajos asíncronos: base de datos SQLite donde persisten estado y resultados
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(tempfile.gettempdir(), "ai-bias-jobs.sqlite3"))
+# Trabajos que se ejecutan a la vez
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+# Intervalo mínimo (segundos) entre escrituras de progreso de un trabajo
+JOB_PROGRESS_INTERVAL_SECONDS = float(os.getenv("JOB_PROGRESS_INTERVAL_SECONDS", 0.5))
+# Segundos que un proceso reserva sus trabajos sin renovarlos; pasado ese
+# tiempo (o si su proceso ya no existe) otro worker los retoma
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 30))
+
+# Instrumentación: métricas por etapa y por petición en GET /metrics ("0" las desactiva)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+# Añade la cabecera Server-Timing con la duración de cada etapa de la petición
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "0") != "0"
+# Permite pedir el perfil cProfile de una petición con ?debug_profile=1
+# (o la cabecera X-Debug-Profile); solo para depurar, la petición va más lenta
+DEBUG_PROFILING_ENABLED = os.getenv("DEBUG_PROFILING_ENABLED", "0") != "0"
@@ -0,0 +1,238 @@
+"""
+Ejecución de los servicios de análisis fuera del event loop.
+
+``AnalysisExecutor`` despacha cada llamada según ``ANALYSIS_BACKEND``:
+
+- ``inline``: en el propio event loop (útil para depurar; sin timeouts);
+- ``thread``: en un pool de hilos (pandas/numpy liberan el GIL en gran parte);
+- ``process``: en un pool de procesos (los argumentos deben ser picklables).
+
+Cada llamada tiene un timeout (el de la petición o ``ANALYSIS_TIMEOUT_SECONDS``)
+y las marcadas como ``heavy`` comparten un límite de concurrencia, de modo
+que los endpoints ligeros no esperan detrás de varios análisis largos. Al
+expirar, o si el cliente se desconecta, la petición deja de esperar: una
+tarea que ya corre termina en segundo plano y su resultado se descarta,
+sin afectar a las de otras peticiones.
+
+Con ``WARMUP_ENABLED`` cada proceso del pool importa scipy/sklearn al
+arrancar (``initializer``) y ``prestart`` los arranca antes de la primera
+petición (ver ``app.core.warmup``).
+"""
+import asyncio
+import contextvars
+import functools
+import weakref
+from contextlib import nullcontext
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Tuple, TypeVar
+
+from app.core.config import (
+    ANALYSIS_BACKEND,
+    ANALYSIS_TIMEOUT_SECONDS,
+    ANALYSIS_WORKERS,
+    HEAVY_ANALYSIS_CONCURRENCY,
+    WARMUP_ENABLED,
+)
+from app.core.metrics import call_name, profiling, span
+
+T = TypeVar("T")
+
+BACKENDS = ("inline", "thread", "process")
+
+_DEFAULT = object()
+
+
+class AnalysisTimeout(Exception):
+    """El análisis superó el tiempo máximo de la petición."""
+
+
+class AnalysisCancelled(Exception):
+    """El análisis se perdió: un proceso del pool terminó de forma anómala."""
+
+
+class AnalysisExecutor:
+    def __init__(
+        self,
+        backend: str = ANALYSIS_BACKEND,
+        max_workers: int = ANALYSIS_WORKERS,
+        heavy_limit: int = HEAVY_ANALYSIS_CONCURRENCY,
+        timeout: Optional[float] = ANALYSIS_TIMEOUT_SECONDS or None,
+        initializer: Optional[Callable[[], Any]] = None,
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown analysis backend '{backend}'. Available: {list(BACKENDS)}")
+        self.backend = backend
+        self.max_workers = max_workers
+        self.heavy_limit = heavy_limit
+        self.timeout = timeout
+        self.initializer = initializer
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        # Un semáforo por event loop (los de asyncio quedan ligados a su loop)
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _semaphore(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.heavy_limit)
+        return self._semaphores[loop]
+
+    def _pool(self, local_only: bool) -> Optional[Executor]:
+        # Una petición perfilada se ejecuta entera en el hilo del perfilador
+        if self.backend == "inline" or profiling():
+            return None
+        if self.backend == "process" and not local_only:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(max_workers=self.max_workers, initializer=self.initializer)
+            return self._processes
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="analysis")
+        return self._threads
+
+    def _submit(self, call: Callable[[], T], local_only: bool, name: str) -> Tuple[Future, Optional[Executor]]:
+        pool = self._pool(local_only)
+        if pool is not None and pool is self._processes:
+            return pool.submit(call), pool
+        # En hilos la etapa se mide dentro, con el contexto (la traza) de la petición
+        call = functools.partial(contextvars.copy_context().run, _timed, name, call)
+        if pool is not None:
+            return pool.submit(call), pool
+        future: Future = Future()
+        try:
+            future.set_result(call())
+        except BaseException as e:
+            future.set_exception(e)
+        return future, None
+
+    def _cancel(self, future: Future) -> None:
+        """
+        Cancela una tarea pendiente. Una en marcha, en hilo o en proceso,
+        termina en segundo plano (sigue ocupando su hueco) y su resultado
+        se descarta: terminar su proceso rompería el pool y con él las
+        tareas de las demás peticiones.
+        """
+        future.cancel()
+
+    async def run(
+        self,
+        fn: Callable[..., T],
+        *args: Any,
+        heavy: bool = False,
+        timeout: Any = _DEFAULT,
+        local_only: bool = False,
+        **kwargs: Any,
+    ) -> T:
+        """
+        Ejecuta ``fn(*args, **kwargs)`` en el backend configurado.
+
+        ``heavy`` espera un hueco del límite de análisis pesados (la espera
+        cuenta para el timeout); ``local_only`` fuerza el pool de hilos
+        cuando los argumentos no son picklables (p. ej. un fichero subido).
+        Lanza ``AnalysisTimeout`` si no termina a tiempo.
+        """
+        timeout = self.timeout if timeout is _DEFAULT else timeout
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        call = functools.partial(fn, *args, **kwargs)
+
+        semaphore = self._semaphore(loop) if heavy else None
+        if semaphore is not None:
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout)
+            except asyncio.TimeoutError:
+                raise AnalysisTimeout(f"No analysis slot became free within {timeout:g}s")
+
+        try:
+            future, pool = self._submit(call, local_only, call_name(fn))
+        except BaseException:
+            if semaphore is not None:
+                semaphore.release()
+            raise
+        if semaphore is not None:
+            # El hueco se libera cuando la tarea termina de verdad, no al expirar
+            future.add_done_callback(functools.partial(_release_threadsafe, loop, semaphore))
+
+        remaining = None if deadline is None else max(0.0, deadline - loop.time())
+        # Un proceso no comparte las métricas: se mide la espera desde aquí
+        stage = span(call_name(fn)) if pool is not None and pool is self._processes else nullcontext()
+        try:
+            with stage:
+                return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), remaining)
+        except asyncio.TimeoutError:
+            self._cancel(future)
+            raise AnalysisTimeout(f"Analysis did not finish within {timeout:g}s")
+        except asyncio.CancelledError:
+            # Cliente desconectado o petición cancelada
+            self._cancel(future)
+            raise
+        except BrokenProcessPool as e:
+            # Un pool roto no acepta más tareas: la siguiente petición crea otro
+            if pool is self._processes:
+                self._processes = None
+            raise AnalysisCancelled(f"Analysis worker was stopped: {e}")
+
+    def process_pool(self) -> Optional[ProcessPoolExecutor]:
+        """
+        Pool de procesos del backend ``process`` (None con los otros), para
+        que un análisis que corre en un hilo reparta trabajo en él sin
+        crear su propio pool en cada llamada.
+        """
+        if self.backend != "process" or profiling():
+            return None
+        return self._pool(local_only=False)
+
+    def prestart(self) -> None:
+        """
+        Arranca los procesos del pool (y su ``initializer``) sin esperar a
+        la primera petición. Los hilos no lo necesitan: comparten los
+        imports del proceso.
+        """
+        if self.backend != "process":
+            return
+        pool = self._pool(local_only=False)
+        if pool is None:
+            return
+        # Una tarea por worker: el pool crea los procesos al recibir trabajo
+        for future in [pool.submit(_noop) for _ in range(self.max_workers)]:
+            future.result()
+
+    def shutdown(self) -> None:
+        for pool in (self._threads, self._processes):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._threads = self._processes = None
+
+
+def _noop() -> None:
+    pass
+
+
+def _timed(name: str, call: Callable[[], T]) -> T:
+    with span(name):
+        return call()
+
+
+def _release_threadsafe(loop: asyncio.AbstractEventLoop, semaphore: asyncio.Semaphore, _: Future) -> None:
+    try:
+        loop.call_soon_threadsafe(semaphore.release)
+    except RuntimeError:
+        # El loop ya se cerró: su semáforo no se volverá a usar
+        pass
+
+
+_executor: Optional[AnalysisExecutor] = None
+
+
+def get_executor() -> AnalysisExecutor:
+    """Executor del proceso configurado desde ``app.core.config``."""
+    global _executor
+    if _executor is None:
+        initializer = None
+        if WARMUP_ENABLED:
+            from app.core.warmup import import_heavy_modules
+
+            initializer = import_heavy_modules
+        _executor = AnalysisExecutor(initializer=initializer)
+    return _executor
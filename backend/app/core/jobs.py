@@ -0,0 +1,322 @@
+"""
+Trabajos asíncronos persistidos en SQLite.
+
+Un análisis largo se encola con ``JobManager.submit`` y devuelve un id al
+momento; el cliente consulta su estado y progreso y recoge el resultado al
+terminar. Estado, progreso, parámetros y resultado viven en la base de
+datos (``JOBS_DB_PATH``), así que un reinicio no pierde los trabajos.
+
+Varios procesos (p. ej. workers de uvicorn) comparten la base de datos:
+cada trabajo guarda el proceso que lo tiene (``owner``) y hasta cuándo
+(``lease``), que ese proceso renueva mientras vive. ``recover`` solo vuelve
+a encolar los trabajos cuyo dueño ya no existe o dejó caducar la reserva,
+y los cambios de estado son condicionales, así que un trabajo nunca se
+ejecuta en dos procesos a la vez.
+
+Tras ``attach`` los trabajos se ejecutan con el ``AnalysisExecutor`` del
+servidor como análisis pesados: comparten su límite de concurrencia con
+las peticiones.
+
+Cada tipo de trabajo (``register``) es una función ``fn(progress=..., **params)``
+con parámetros serializables en JSON; ``progress`` es un
+``app.core.progress.ProgressCallback``.
+"""
+import asyncio
+import json
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import JOB_LEASE_SECONDS, JOB_PROGRESS_INTERVAL_SECONDS, JOB_WORKERS, JOBS_DB_PATH
+from app.core.executor import AnalysisExecutor, get_executor
+
+STATUSES = ("queued", "running", "done", "failed", "cancelled")
+FINISHED = ("done", "failed", "cancelled")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress_done INTEGER NOT NULL DEFAULT 0,
+    progress_total INTEGER NOT NULL DEFAULT 0,
+    message TEXT NOT NULL DEFAULT '',
+    params TEXT NOT NULL,
+    result BLOB,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    owner TEXT,
+    lease REAL
+)
+"""
+
+# Columnas añadidas después de la primera versión de la tabla
+_MIGRATIONS = {"owner": "ALTER TABLE jobs ADD COLUMN owner TEXT", "lease": "ALTER TABLE jobs ADD COLUMN lease REAL"}
+
+_FIELDS = ("id", "kind", "status", "progress_done", "progress_total", "message", "error", "created", "updated")
+
+
+class JobCancelled(Exception):
+    """Se lanza desde el callback de progreso de un trabajo cancelado."""
+
+
+def _owner_alive(owner: Optional[str]) -> bool:
+    """
+    Si el proceso ``host:pid:token`` puede seguir vivo. Solo se sabe que no
+    para los de esta máquina; el resto depende de que caduque su reserva.
+    """
+    if not owner:
+        return False
+    host, pid, _ = owner.rsplit(":", 2)
+    if host != socket.gethostname() or os.name != "posix":
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        pass
+    return True
+
+
+class JobManager:
+    def __init__(
+        self,
+        db_path: str = JOBS_DB_PATH,
+        workers: int = JOB_WORKERS,
+        progress_interval: float = JOB_PROGRESS_INTERVAL_SECONDS,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+        executor: Optional[AnalysisExecutor] = None,
+    ):
+        self.db_path = db_path
+        self.progress_interval = progress_interval
+        self.lease_seconds = lease_seconds
+        self.executor = executor
+        # Identifica a este gestor en la base de datos compartida
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._kinds: Dict[str, Callable[..., Any]] = {}
+        self._cancelled: set = set()
+        self._calls: set = set()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(_SCHEMA)
+            columns = {row[1] for row in db.execute("PRAGMA table_info(jobs)")}
+            for column, statement in _MIGRATIONS.items():
+                if column not in columns:
+                    db.execute(statement)
+        self._stopped = threading.Event()
+        self._heartbeat = threading.Thread(target=self._renew_leases, name="job-lease", daemon=True)
+        self._heartbeat.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _transition(self, job_id: str, statuses: Tuple[str, ...], owned: bool = False, **fields: Any) -> bool:
+        """
+        Actualiza el trabajo solo si su estado es uno de ``statuses`` (y, con
+        ``owned``, si sigue siendo de este gestor), en una única sentencia;
+        devuelve si lo hizo (otro hilo o proceso no puede colarse entre la
+        comprobación y la escritura).
+        """
+        fields["updated"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        placeholders = ", ".join("?" for _ in statuses)
+        owner = " AND owner = ?" if owned else ""
+        with self._connect() as db:
+            cursor = db.execute(
+                f"UPDATE jobs SET {columns} WHERE id = ? AND status IN ({placeholders}){owner}",
+                (*fields.values(), job_id, *statuses, *((self.owner,) if owned else ())),
+            )
+        return cursor.rowcount == 1
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Ejecuta los trabajos con el executor de análisis a través de ``loop``
+        (el event loop del servidor), como análisis pesados.
+        """
+        self._loop = loop
+
+    def register(self, kind: str, fn: Callable[..., Any]) -> None:
+        self._kinds[kind] = fn
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> str:
+        """Encola un trabajo y devuelve su id."""
+        if kind not in self._kinds:
+            raise ValueError(f"Unknown job kind '{kind}'. Available: {list(self._kinds)}")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO jobs (id, kind, status, params, created, updated, owner, lease) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(params), now, now, self.owner, now + self.lease_seconds),
+            )
+        self._pool.submit(self._run, job_id)
+        return job_id
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        """Estado y progreso del trabajo (KeyError si no existe)."""
+        with self._connect() as db:
+            row = db.execute(f"SELECT {', '.join(_FIELDS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise KeyError(job_id)
+        return dict(zip(_FIELDS, row))
+
+    def result(self, job_id: str) -> Any:
+        """Resultado de un trabajo terminado (None si aún no lo hay)."""
+        with self._connect() as db:
+            row = db.execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise KeyError(job_id)
+        return None if row[0] is None else pickle.loads(row[0])
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        """
+        Cancela un trabajo pendiente o en marcha. El que está en marcha se
+        detiene en su siguiente informe de progreso.
+        """
+        self.get(job_id)
+        with self._lock:
+            self._cancelled.add(job_id)
+        if not self._transition(job_id, ("queued", "running"), status="cancelled"):
+            # Ya había terminado
+            with self._lock:
+                self._cancelled.discard(job_id)
+        return self.get(job_id)
+
+    def recover(self) -> List[str]:
+        """
+        Vuelve a encolar, ya como propios, los trabajos sin terminar cuyo
+        dueño murió o no renovó su reserva (p. ej. tras un reinicio). Los de
+        otros procesos vivos no se tocan.
+        """
+        now = time.time()
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT id, owner, lease FROM jobs WHERE status IN ('queued', 'running') "
+                "AND (owner IS NULL OR owner != ?)",
+                (self.owner,),
+            ).fetchall()
+        ids = []
+        for job_id, owner, lease in rows:
+            if lease is not None and lease >= now and _owner_alive(owner):
+                continue
+            # Solo si nadie lo ha retomado entretanto
+            with self._connect() as db:
+                cursor = db.execute(
+                    "UPDATE jobs SET status = 'queued', owner = ?, lease = ?, updated = ? "
+                    "WHERE id = ? AND status IN ('queued', 'running') AND owner IS ? AND lease IS ?",
+                    (self.owner, now + self.lease_seconds, now, job_id, owner, lease),
+                )
+            if cursor.rowcount == 1:
+                ids.append(job_id)
+                self._pool.submit(self._run, job_id)
+        return ids
+
+    def _renew_leases(self) -> None:
+        """Hilo de fondo: renueva las reservas propias y retoma las huérfanas."""
+        while not self._stopped.wait(self.lease_seconds / 3):
+            try:
+                with self._connect() as db:
+                    db.execute(
+                        "UPDATE jobs SET lease = ? WHERE owner = ? AND status IN ('queued', 'running')",
+                        (time.time() + self.lease_seconds, self.owner),
+                    )
+                self.recover()
+            except (sqlite3.Error, RuntimeError):
+                # Base de datos ocupada o pool ya cerrado: se reintenta en la siguiente vuelta
+                pass
+
+    def _progress(self, job_id: str) -> Callable[[int, int, str], None]:
+        last = [0.0]
+
+        def progress(done: int, total: int, message: str) -> None:
+            if job_id in self._cancelled:
+                raise JobCancelled(job_id)
+            now = time.monotonic()
+            if now - last[0] >= self.progress_interval or done >= total:
+                last[0] = now
+                # Cancelado desde otro proceso (o retomado por otro): se detiene
+                if not self._transition(
+                    job_id, ("running",), owned=True, progress_done=done, progress_total=total, message=message
+                ):
+                    raise JobCancelled(job_id)
+
+        return progress
+
+    def _run(self, job_id: str) -> None:
+        with self._connect() as db:
+            row = db.execute("SELECT kind, params FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        fn = None if row is None else self._kinds.get(row[0])
+        if row is not None and fn is None:
+            self._transition(job_id, ("queued",), status="failed", error=f"Unknown job kind '{row[0]}'")
+        # Solo uno de los que intentan arrancarlo lo consigue; el resto (o uno
+        # cancelado mientras esperaba) no hace nada
+        if fn is None or not self._transition(job_id, ("queued",), owned=True, status="running"):
+            with self._lock:
+                self._cancelled.discard(job_id)
+            return
+        try:
+            result = self._call(fn, progress=self._progress(job_id), **json.loads(row[1]))
+        except (JobCancelled, CancelledError):
+            # Cancelado, o el servidor se está apagando: queda en marcha a
+            # nombre de este proceso y otro lo retoma cuando caduque la reserva
+            return
+        except Exception as e:
+            # Un cancel() durante el fallo se respeta
+            self._transition(job_id, ("running",), owned=True, status="failed", error=f"{type(e).__name__}: {e}")
+            return
+        finally:
+            with self._lock:
+                self._cancelled.discard(job_id)
+        # Un cancel() tardío no se pisa con el resultado
+        self._transition(job_id, ("running",), owned=True, status="done", result=pickle.dumps(result))
+
+    def _call(self, fn: Callable[..., Any], **kwargs: Any) -> Any:
+        """``fn(**kwargs)`` en el executor de análisis si hay loop; si no, en este hilo."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return fn(**kwargs)
+        executor = self.executor or get_executor()
+        # El callback de progreso no es picklable: siempre en el pool de hilos
+        call = executor.run(fn, heavy=True, timeout=None, local_only=True, **kwargs)
+        future: Future = asyncio.run_coroutine_threadsafe(call, loop)
+        with self._lock:
+            self._calls.add(future)
+        try:
+            return future.result()
+        finally:
+            with self._lock:
+                self._calls.discard(future)
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._stopped.set()
+        with self._lock:
+            calls = list(self._calls)
+        for future in calls:
+            future.cancel()
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_manager: Optional[JobManager] = None
+
+
+def get_job_manager() -> JobManager:
+    """Gestor de trabajos del proceso, con los tipos de trabajo de la API."""
+    global _manager
+    if _manager is None:
+        from app.services.dataset_profile import run_dataset_analyses
+
+        _manager = JobManager()
+        _manager.register("analysis", run_dataset_analyses)
+    return _manager
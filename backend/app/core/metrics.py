@@ -0,0 +1,351 @@
+"""
+Instrumentación de la API: duración de cada etapa, tamaño de los datasets
+procesados y memoria del proceso.
+
+Las etapas se miden con ``span(name)`` (subida, parseo, cada servicio,
+serialización...). Cada duración se acumula en el ``MetricsRegistry`` del
+proceso, que ``GET /metrics`` expone en formato de texto de Prometheus, y
+en la ``RequestTrace`` de la petición en curso (un ``ContextVar`` que
+instala ``MetricsMiddleware``), de donde sale la cabecera ``Server-Timing``
+y, con ``?debug_profile=1``, el perfil cProfile de esa petición.
+
+Con las métricas desactivadas y sin traza activa ``span`` devuelve un
+contexto vacío compartido: el coste es una consulta al ``ContextVar``.
+"""
+import cProfile
+import io
+import pstats
+import re
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from starlette.responses import JSONResponse
+
+from app.core.config import DEBUG_PROFILING_ENABLED, METRICS_ENABLED, SERVER_TIMING_ENABLED
+
+# Funciones que se muestran en el perfil de una petición
+PROFILE_TOP_FUNCTIONS = 40
+# Content-Type del formato de texto de Prometheus
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_TOKEN = re.compile(r"[^\w.-]+")
+_ATTRGETTER = re.compile(r"attrgetter\('([\w.]+)'\)")
+
+
+class RequestTrace:
+    """Etapas medidas durante una petición y tamaño del dataset que procesó."""
+
+    def __init__(self, profile: bool = False):
+        self.profile = profile
+        self.spans: List[Tuple[str, float]] = []
+        self.rows: Optional[int] = None
+        self.columns: Optional[int] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        # list.append es atómico: los hilos del executor pueden añadir etapas
+        self.spans.append((name, seconds))
+
+    def durations(self) -> Dict[str, float]:
+        """Segundos por etapa (sumados si se repite), en orden de aparición."""
+        totals: Dict[str, float] = {}
+        for name, seconds in self.spans:
+            totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+
+    def server_timing(self) -> str:
+        parts = [f"{_TOKEN.sub('_', name)};dur={seconds * 1000:.1f}" for name, seconds in self.durations().items()]
+        if self.rows is not None:
+            parts.append(f'dataset;desc="rows={self.rows} columns={self.columns}"')
+        return ", ".join(parts)
+
+
+_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _trace.get()
+
+
+def profiling() -> bool:
+    """La petición en curso pidió su perfil (el executor la ejecuta en el propio hilo)."""
+    trace = _trace.get()
+    return trace is not None and trace.profile
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Pico de memoria residente del proceso (None si la plataforma no lo da)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KiB y macOS en bytes
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+
+class MetricsRegistry:
+    """Contadores y sumas del proceso, en formato de texto de Prometheus."""
+
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stages: Dict[str, List[float]] = {}
+        self._requests: Dict[Tuple[str, str, int], List[float]] = {}
+        self._datasets = 0
+        self._rows = 0
+        self._columns = 0
+
+    def observe_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            entry = self._stages.setdefault(name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float) -> None:
+        with self._lock:
+            entry = self._requests.setdefault((method, route, status), [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def observe_dataset(self, rows: int, columns: int) -> None:
+        with self._lock:
+            self._datasets += 1
+            self._rows += rows
+            self._columns += columns
+
+    def render(self) -> str:
+        with self._lock:
+            stages = sorted(self._stages.items())
+            requests = sorted(self._requests.items())
+            datasets, rows, columns = self._datasets, self._rows, self._columns
+        lines = [
+            "# HELP ai_bias_stage_seconds Time spent in each instrumented stage.",
+            "# TYPE ai_bias_stage_seconds summary",
+        ]
+        for name, (count, total) in stages:
+            lines.append(f'ai_bias_stage_seconds_count{{stage="{_label(name)}"}} {count}')
+            lines.append(f'ai_bias_stage_seconds_sum{{stage="{_label(name)}"}} {total:.6f}')
+        lines += [
+            "# HELP ai_bias_request_seconds HTTP request duration by route and status.",
+            "# TYPE ai_bias_request_seconds summary",
+        ]
+        for (method, route, status), (count, total) in requests:
+            labels = f'method="{method}",route="{_label(route)}",status="{status}"'
+            lines.append(f"ai_bias_request_seconds_count{{{labels}}} {count}")
+            lines.append(f"ai_bias_request_seconds_sum{{{labels}}} {total:.6f}")
+        lines += [
+            "# HELP ai_bias_datasets_total Datasets resolved by the endpoints.",
+            "# TYPE ai_bias_datasets_total counter",
+            f"ai_bias_datasets_total {datasets}",
+            "# HELP ai_bias_dataset_rows_total Rows of the datasets resolved by the endpoints.",
+            "# TYPE ai_bias_dataset_rows_total counter",
+            f"ai_bias_dataset_rows_total {rows}",
+            "# HELP ai_bias_dataset_columns_total Columns of the datasets resolved by the endpoints.",
+            "# TYPE ai_bias_dataset_columns_total counter",
+            f"ai_bias_dataset_columns_total {columns}",
+        ]
+        peak = peak_rss_bytes()
+        if peak is not None:
+            lines += [
+                "# HELP process_peak_rss_bytes Peak resident set size of the process.",
+                "# TYPE process_peak_rss_bytes gauge",
+                f"process_peak_rss_bytes {peak}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Métricas del proceso."""
+    return _registry
+
+
+class _Span:
+    __slots__ = ("name", "trace", "start")
+
+    def __init__(self, name: str, trace: Optional[RequestTrace]):
+        self.name = name
+        self.trace = trace
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc: Any) -> None:
+        seconds = time.perf_counter() - self.start
+        if self.trace is not None:
+            self.trace.add(self.name, seconds)
+        if _registry.enabled:
+            _registry.observe_stage(self.name, seconds)
+
+
+_NO_SPAN = nullcontext()
+
+
+def span(name: str):
+    """Contexto que mide la etapa ``name`` (no hace nada si no hay dónde guardarla)."""
+    trace = _trace.get()
+    if trace is None and not _registry.enabled:
+        return _NO_SPAN
+    return _Span(name, trace)
+
+
+def record_dataset(rows: int, columns: int) -> None:
+    """Tamaño del dataset que procesa la petición en curso."""
+    trace = _trace.get()
+    if trace is not None:
+        trace.rows, trace.columns = rows, columns
+    if _registry.enabled:
+        _registry.observe_dataset(rows, columns)
+
+
+def call_name(fn: Callable[..., Any]) -> str:
+    """Nombre legible de una función, ``partial`` o ``attrgetter`` para las etapas."""
+    while hasattr(fn, "func"):
+        fn = fn.func
+    name = getattr(fn, "__name__", None)
+    if name:
+        return name
+    match = _ATTRGETTER.search(repr(fn))
+    return match.group(1) if match else type(fn).__name__
+
+
+class TimedJSONResponse(JSONResponse):
+    """``JSONResponse`` que mide la serialización como etapa ``serialize``."""
+
+    def render(self, content: Any) -> bytes:
+        with span("serialize"):
+            return self.encode(content)
+
+    def encode(self, content: Any) -> bytes:
+        return super().render(content)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que instala la ``RequestTrace`` de cada petición,
+    mide la lectura del cuerpo (``upload``) y la petición completa, añade
+    ``Server-Timing`` si está activado y, si se permite y se pide con
+    ``?debug_profile=1`` o la cabecera ``X-Debug-Profile``, devuelve el
+    perfil cProfile de la petición en lugar de su respuesta.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        server_timing: bool = SERVER_TIMING_ENABLED,
+        debug_profiling: bool = DEBUG_PROFILING_ENABLED,
+    ):
+        self.app = app
+        self.server_timing = server_timing
+        self.debug_profiling = debug_profiling
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        profile = self.debug_profiling and _wants_profile(scope)
+        if not (_registry.enabled or self.server_timing or profile):
+            return await self.app(scope, receive, send)
+
+        trace = RequestTrace(profile=profile)
+        token = _trace.set(trace)
+        start = time.perf_counter()
+        status = 500
+        upload_start: Optional[float] = None
+        upload_bytes = 0
+
+        async def timed_receive() -> Dict[str, Any]:
+            nonlocal upload_start, upload_bytes
+            if upload_start is None:
+                upload_start = time.perf_counter()
+            message = await receive()
+            if message["type"] == "http.request":
+                upload_bytes += len(message.get("body", b""))
+                if upload_bytes and not message.get("more_body", False):
+                    trace.add("upload", time.perf_counter() - upload_start)
+            return message
+
+        async def timed_send(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            if profile:
+                status = await self._profile(scope, timed_receive, send, trace)
+            else:
+                await self.app(scope, timed_receive, timed_send)
+        finally:
+            _trace.reset(token)
+            if _registry.enabled:
+                _registry.observe_request(scope["method"], _route_label(scope), status, time.perf_counter() - start)
+
+    async def _profile(self, scope: Dict[str, Any], receive: Callable, send: Callable, trace: RequestTrace) -> int:
+        status = 500
+
+        async def discard(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.disable()
+        out = io.StringIO()
+        out.write(f"{scope['method']} {scope['path']} -> {status}\n")
+        for name, seconds in trace.durations().items():
+            out.write(f"  {name}: {seconds * 1000:.1f} ms\n")
+        if trace.rows is not None:
+            out.write(f"  dataset: {trace.rows} rows x {trace.columns} columns\n")
+        peak = peak_rss_bytes()
+        if peak is not None:
+            out.write(f"  peak RSS: {peak / 2 ** 20:.1f} MiB\n")
+        out.write("\n")
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        body = out.getvalue().encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"server-timing", trace.server_timing().encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+        return status
+
+
+def _route_label(scope: Dict[str, Any]) -> str:
+    """Ruta con los parámetros sin sustituir (/api/jobs/{job_id}), para acotar las series."""
+    if "endpoint" not in scope:
+        return "unmatched"
+    path = scope.get("path", "")
+    for name, value in scope.get("path_params", {}).items():
+        path = path.replace(f"/{value}", f"/{{{name}}}", 1)
+    return path
+
+
+def _wants_profile(scope: Dict[str, Any]) -> bool:
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    if query.get("debug_profile", ["0"])[-1].lower() in ("1", "true", "yes"):
+        return True
+    return any(name == b"x-debug-profile" and value not in (b"", b"0") for name, value in scope["headers"])
@@ -0,0 +1,29 @@
+"""
+Informe de progreso de los servicios de análisis.
+
+Los servicios largos aceptan un ``progress`` opcional que se llama como
+``progress(done, total, message)``, p. ej. ``(340, 1200, "MI: 340/1200
+features")``. Quien lo pasa (el sistema de jobs) puede guardarlo o lanzar
+una excepción desde el callback para cancelar el análisis.
+"""
+from typing import Callable, Optional
+
+ProgressCallback = Callable[[int, int, str], None]
+
+
+def report(progress: Optional[ProgressCallback], done: int, total: int, what: str, unit: str = "") -> None:
+    """Llama a ``progress`` (si hay) con el mensaje "what: done/total unit"."""
+    if progress is not None:
+        message = f"{what}: {done}/{total}" + (f" {unit}" if unit else "")
+        progress(done, total, message)
+
+
+def prefixed(progress: Optional[ProgressCallback], prefix: str) -> Optional[ProgressCallback]:
+    """Callback que antepone ``prefix`` a los mensajes (p. ej. el análisis en curso)."""
+    if progress is None:
+        return None
+
+    def wrapped(done: int, total: int, message: str) -> None:
+        progress(done, total, f"{prefix}{message}")
+
+    return wrapped
@@ -0,0 +1,82 @@
+"""
+Calentamiento opcional del proceso tras el arranque.
+
+scipy y sklearn se importan al usarse por primera vez, así que la app
+arranca rápido pero la primera petición de cada análisis paga esos
+imports. Con ``WARMUP_ENABLED`` el lifespan lanza ``start_warmup``: un
+hilo en segundo plano que, mientras el servidor ya acepta peticiones,
+importa los módulos pesados, ejecuta todos los análisis sobre un dataset
+mínimo (primeras llamadas, cachés internas de pandas/sklearn) y, con el
+backend ``process``, arranca los procesos del pool, que se inicializan
+con ``import_heavy_modules``.
+"""
+import importlib
+import io
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Optional, Sequence
+
+from app.core.metrics import span
+
+if TYPE_CHECKING:
+    from app.core.executor import AnalysisExecutor
+
+# Módulos que los análisis importan al usarse por primera vez
+HEAVY_MODULES = (
+    "scipy.special",
+    "scipy.stats",
+    "scipy.sparse",
+    "sklearn.feature_selection",
+    "sklearn.ensemble",
+    "sklearn.neighbors",
+    "sklearn.cluster",
+)
+
+# Dataset mínimo con columnas numéricas, categóricas y un target binario
+_SAMPLE_CSV = "num_a,num_b,cat_a,cat_b,target\n" + "".join(
+    f"{i},{(i * 7) % 11 + 0.5},{'xyz'[i % 3]},{'uv'[i % 2]},{i % 2}\n" for i in range(40)
+)
+
+
+def import_heavy_modules(modules: Sequence[str] = HEAVY_MODULES) -> Dict[str, float]:
+    """Importa ``modules`` y devuelve los segundos de cada uno (0 si ya estaba cargado)."""
+    timings = {}
+    for name in modules:
+        start = time.perf_counter()
+        importlib.import_module(name)
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+def run_sample_analyses() -> None:
+    """Ejecuta todos los análisis sobre ``_SAMPLE_CSV`` (sin tocar la caché de datasets)."""
+    from app.services.dataset_profile import ANALYSES, build_profile, run_analyses
+
+    profile = build_profile(io.StringIO(_SAMPLE_CSV), ANALYSES)
+    run_analyses(profile, ANALYSES, target_col="target", discrete_target=True, mi_method="knn")
+
+
+def warm_up() -> Dict[str, float]:
+    """Imports pesados y análisis de muestra; devuelve los segundos de cada paso."""
+    with span("warmup"):
+        timings = import_heavy_modules()
+        start = time.perf_counter()
+        run_sample_analyses()
+        timings["sample_analyses"] = time.perf_counter() - start
+    return timings
+
+
+def start_warmup(executor: Optional["AnalysisExecutor"] = None) -> threading.Thread:
+    """
+    Lanza ``warm_up`` en un hilo daemon (no retrasa el arranque ni el
+    apagado) y, si se da ``executor``, arranca también sus workers.
+    """
+    def run() -> None:
+        warm_up()
+        if executor is not None:
+            executor.prestart()
+
+    thread = threading.Thread(target=run, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
@@ -1,7 +1,48 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.api.endpoints import router
+from app.core.executor import AnalysisCancelled, AnalysisTimeout, get_executor
+from app.core.jobs import get_job_manager
+from app.core.config import WARMUP_ENABLED
+from app.core.warmup import start_warmup
+from app.api.responses import FastJSONResponse
+from app.core.metrics import PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, get_metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    jobs = get_job_manager()
+    # Los trabajos comparten con las peticiones el límite de análisis pesados
+    jobs.attach(asyncio.get_running_loop())
+    # Trabajos que quedaron a medias en el arranque anterior (o en un worker caído)
+    jobs.recover()
+    if WARMUP_ENABLED:
+        # En segundo plano: el servidor ya atiende peticiones mientras tanto
+        start_warmup(get_executor())
+    yield
+    get_job_manager().shutdown()
+    get_executor().shutdown()
+
 
-app = FastAPI(title="AI Bias Detector")
+app = FastAPI(title="AI Bias Detector", lifespan=lifespan, default_response_class=FastJSONResponse)
+app.add_middleware(MetricsMiddleware)
 app.include_router(router, prefix="/api")
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas del proceso en formato de texto de Prometheus."""
+    return PlainTextResponse(get_metrics().render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@app.exception_handler(AnalysisTimeout)
+async def analysis_timeout_handler(request: Request, exc: AnalysisTimeout):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+
+@app.exception_handler(AnalysisCancelled)
+async def analysis_cancelled_handler(request: Request, exc: AnalysisCancelled):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
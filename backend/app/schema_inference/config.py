@@ -3,6 +3,8 @@ import re
 
 # Tokens considerados booleanos
 BOOLEAN_TOKENS: Set[str] = {"0", "1", "True", "False", "true", "false", "Sí", "No", "si", "no"}
+# Los que valen True al convertir a bool
+BOOLEAN_TRUE_TOKENS: Set[str] = {"1", "True", "true", "Sí", "si"}
 
 # Símbolos de moneda
 CURRENCY_SYMBOLS: Set[str] = {"$", "€", "£", "¥"}
@@ -18,5 +20,27 @@ DATE_PARSE_THRESHOLD: float = 0.8
 DATE_YMD_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
 DATE_DMY_PATTERN = re.compile(r"^\d{2}/\d{2}/\d{4}$")
 
+# Formatos de fecha que se prueban cuando pandas no adivina ninguno
+# ("ISO8601" acepta cualquier variante ISO, también mezcladas)
+DATE_FORMATS: tuple[str, ...] = (
+    "ISO8601",
+    "%d/%m/%Y",
+    "%m/%d/%Y",
+    "%d-%m-%Y",
+    "%d.%m.%Y",
+    "%Y/%m/%d",
+    "%d/%m/%y",
+    "%m/%d/%y",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y %H:%M:%S",
+    "%m/%d/%Y %H:%M:%S",
+    "%b %d %Y",
+    "%d %b %Y",
+    "%B %d, %Y",
+    "%d %B %Y",
+)
+# Valores distintos a partir de los que se adivina el formato
+DATE_GUESS_VALUES: int = 5
+
 # Tamaño de la muestra para inferencia
 SAMPLE_SIZE: int = 100
\ No newline at end of file
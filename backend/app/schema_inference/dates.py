@@ -0,0 +1,189 @@
+"""
+Detección de fechas por formato.
+
+En lugar de parsear cada valor con ``dateutil`` se adivinan formatos
+``strftime`` candidatos a partir de unos pocos valores y se validan todos a
+la vez con ``pd.to_datetime(format=...)``; dateutil solo se usa para los
+valores que no encajan en el mejor formato. El formato detectado se
+memoriza por nombre de columna y firma de los valores, así que las
+siguientes peticiones sobre columnas equivalentes no lo vuelven a adivinar.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Hashable, Optional
+import re
+import threading
+import warnings
+
+import numpy as np
+import pandas as pd
+from dateutil.parser import parse
+from pandas.tseries.api import guess_datetime_format
+
+from .config import DATE_FORMATS, DATE_GUESS_VALUES, DATE_PARSE_THRESHOLD
+
+# Formatos memorizados (nombre de columna, firma) -> formato
+FORMAT_CACHE_SIZE = 4096
+
+_DIGITS = re.compile(r"\d")
+_LETTERS = re.compile(r"[^\W\d_]+")
+
+
+@dataclass
+class DateDetection:
+    """Formato detectado (None si ninguno encaja) y valores parseados con y sin hora."""
+    format: Optional[str]
+    with_time: int
+    without_time: int
+
+
+def value_signature(values: np.ndarray, n: int = DATE_GUESS_VALUES) -> tuple:
+    """Forma de los primeros valores: dígitos -> 9 y palabras -> a ("9999-99-99")."""
+    shapes = {_LETTERS.sub("a", _DIGITS.sub("9", v)) for v in values[:n]}
+    return tuple(sorted(shapes))
+
+
+def guess_formats(value: str) -> list[str]:
+    """Formatos que pandas adivina para ``value`` (mes primero y luego día primero)."""
+    if not _DIGITS.search(value):
+        return []
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        guesses = [guess_datetime_format(value, dayfirst=dayfirst) for dayfirst in (False, True)]
+    return list(dict.fromkeys(g for g in guesses if g is not None))
+
+
+def fallback_formats(values: np.ndarray) -> list[str]:
+    """``DATE_FORMATS`` fijos que parsean alguno de ``values``."""
+    return [fmt for fmt in DATE_FORMATS if any(_matches(v, fmt) for v in values)]
+
+
+@lru_cache(maxsize=65536)
+def _dateutil_has_time(value: str) -> Optional[bool]:
+    """Si dateutil parsea ``value``, si tiene hora; None si no lo parsea."""
+    try:
+        dt = parse(value, fuzzy=False)
+    except Exception:
+        return None
+    return bool(dt.hour or dt.minute or dt.second)
+
+
+def _matches(value: str, fmt: str) -> bool:
+    """``value`` se parsea con ``fmt`` (comprobación rápida, sin pandas)."""
+    try:
+        if fmt == "ISO8601":
+            datetime.fromisoformat(value)
+        else:
+            datetime.strptime(value, fmt)
+        return True
+    except ValueError:
+        return False
+
+
+class DateFormatDetector:
+    """
+    Cuenta cuántos valores son fechas (con y sin hora) y con qué formato.
+    Es seguro compartirlo entre hilos; la memoria de formatos es LRU.
+    """
+
+    def __init__(self, cache_size: int = FORMAT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._formats: "OrderedDict[tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cached_format(self, key: tuple) -> Optional[str]:
+        """Formato memorizado ("" = se sabe que ninguno encaja, None = desconocido)."""
+        with self._lock:
+            if key in self._formats:
+                self._formats.move_to_end(key)
+                return self._formats[key]
+        return None
+
+    def _remember(self, key: tuple, fmt: str) -> None:
+        with self._lock:
+            self._formats[key] = fmt
+            while len(self._formats) > self.cache_size:
+                self._formats.popitem(last=False)
+
+    def detect(
+        self,
+        values: np.ndarray,
+        name: Hashable = None,
+        threshold: float = DATE_PARSE_THRESHOLD,
+    ) -> DateDetection:
+        """
+        ``values`` son textos no nulos. Se prueba el formato memorizado para
+        la columna y, si no lo hay o no parsea todos los valores, los
+        candidatos hasta que uno los parsea todos; los que quedan se intentan con dateutil, parando en
+        cuanto ninguna de las dos cuentas puede alcanzar ``threshold``.
+        """
+        n = len(values)
+        if n == 0:
+            return DateDetection(None, 0, 0)
+        strings = pd.Series(values, dtype=object)
+        key = (name, value_signature(values))
+        cached = self.cached_format(key)
+
+        best_format, best = None, pd.DatetimeIndex(np.full(n, np.datetime64("NaT", "ns")))
+        tried: set[str] = set()
+
+        def attempt(formats: list[str]) -> None:
+            nonlocal best_format, best
+            for fmt in formats:
+                if fmt in tried or best.notna().all():
+                    continue
+                tried.add(fmt)
+                try:
+                    parsed = pd.DatetimeIndex(pd.to_datetime(strings, format=fmt, errors="coerce"))
+                except (ValueError, TypeError):
+                    continue
+                if parsed.notna().sum() > best.notna().sum():
+                    best_format, best = fmt, parsed
+
+        if cached:
+            attempt([cached])
+        if cached != "" and not best.notna().all():
+            # Sin formato memorizado, o el memorizado ya no parsea todos los
+            # valores (la columna cambió de formato con la misma firma): se
+            # adivina a partir de los primeros valores que aún no se parsean
+            guessed = 0
+            for v in pd.unique(strings):
+                if guessed == DATE_GUESS_VALUES or best.notna().all():
+                    break
+                if v in set(strings[best.isna()]):
+                    attempt(guess_formats(v))
+                    guessed += 1
+            if best_format is None:
+                attempt(fallback_formats(pd.unique(values[: DATE_GUESS_VALUES * 4])[:DATE_GUESS_VALUES]))
+            self._remember(key, best_format or "")
+
+        valid = best.notna()
+        # Hora, minuto o segundo distintos de cero (como en dateutil, sin fracciones)
+        timed = valid & ((best.asi8 // 10 ** 9) % 86400 != 0)
+        with_time = int(timed.sum())
+        without_time = int(valid.sum()) - with_time
+
+        # Restos: dateutil, parando en cuanto no se puede llegar al umbral
+        max_failures = n - threshold * n
+        failures = 0
+        for v in strings[~valid]:
+            has_time = _dateutil_has_time(v)
+            if has_time is None:
+                failures += 1
+                if failures > max_failures:
+                    break
+            elif has_time:
+                with_time += 1
+            else:
+                without_time += 1
+        return DateDetection(best_format, with_time, without_time)
+
+
+_detector = DateFormatDetector()
+
+
+def get_date_detector() -> DateFormatDetector:
+    """Detector compartido del proceso (la memoria de formatos dura entre peticiones)."""
+    return _detector
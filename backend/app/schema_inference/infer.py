@@ -1,7 +1,8 @@
+from functools import lru_cache
 from typing import Any
+import re
 import pandas as pd
 import numpy as np
-from dateutil.parser import parse
 
 from .config import (
     BOOLEAN_TOKENS,
@@ -13,10 +14,26 @@ from .config import (
     DATE_DMY_PATTERN,
     SAMPLE_SIZE,
 )
+from .dates import DateFormatDetector, get_date_detector
 from .enums import ColumnType
 from .exceptions import InferenceError
 from .utils import default_logger as logger, is_high_cardinality
 
+
+@lru_cache(maxsize=1024)
+def _sample_positions(n_non_null: int, sample_size: int) -> np.ndarray:
+    """
+    Posiciones muestreadas sobre los no nulos, idénticas a
+    ``Series.sample(n=..., random_state=0)`` para la misma longitud.
+    """
+    positions = pd.Series(np.arange(n_non_null)).sample(
+        n=min(n_non_null, sample_size),
+        random_state=0
+    ).to_numpy()
+    positions.setflags(write=False)
+    return positions
+
+
 class ColumnTypeInferer:
     """
     Clase para inferir tipos de datos ampliados de una columna de pandas.
@@ -28,11 +45,19 @@ class ColumnTypeInferer:
         boolean_tokens: set[str] = BOOLEAN_TOKENS,
         currency_symbols: set[str] = CURRENCY_SYMBOLS,
         date_threshold: float = DATE_PARSE_THRESHOLD,
+        date_detector: DateFormatDetector | None = None,
     ):
         self.sample_size = sample_size
         self.boolean_tokens = boolean_tokens
         self.currency_symbols = currency_symbols
         self.date_threshold = date_threshold
+        self.date_detector = date_detector or get_date_detector()
+        # Formato de las columnas DATE/TIMESTAMP inferidas (para el cargador)
+        self.formats: dict[Any, str] = {}
+
+    def _remember_format(self, column: Any, fmt: str | None) -> None:
+        if fmt is not None:
+            self.formats[column] = fmt
 
     def infer(self, series: pd.Series) -> ColumnType:
         """
@@ -110,32 +135,19 @@ class ColumnTypeInferer:
         except Exception:
             pass
 
-        # 6) TIMESTAMP (datetime con hora)
-        parsed_count = 0
-        for v in values:
-            try:
-                dt = parse(v, fuzzy=False)
-                if dt.hour or dt.minute or dt.second:
-                    parsed_count += 1
-            except:
-                break
-        if parsed_count >= len(values) * self.date_threshold:
+        # 6-7) TIMESTAMP / DATE: formatos validados en bloque y dateutil
+        # solo para los valores que no encajan
+        detection = self.date_detector.detect(values, series.name, self.date_threshold)
+        if detection.with_time >= len(values) * self.date_threshold:
+            self._remember_format(series.name, detection.format)
             logger.info("%s -> TIMESTAMP", series.name)
             return ColumnType.TIMESTAMP
-
-        # 7) DATE (sin hora)
         if all(DATE_YMD_PATTERN.match(v) for v in values) or all(DATE_DMY_PATTERN.match(v) for v in values):
+            self._remember_format(series.name, detection.format)
             logger.info("%s -> DATE (formato específico)", series.name)
             return ColumnType.DATE
-        parsed=0
-        for v in values:
-            try:
-                dt = parse(v, fuzzy=False)
-                if dt.hour == 0 and dt.minute == 0 and dt.second == 0:
-                    parsed += 1
-            except:
-                break
-        if parsed >= len(values) * self.date_threshold:
+        if detection.without_time >= len(values) * self.date_threshold:
+            self._remember_format(series.name, detection.format)
             logger.info("%s -> DATE", series.name)
             return ColumnType.DATE
 
@@ -146,4 +158,170 @@ class ColumnTypeInferer:
 
         # 9) STRING
         logger.info("%s -> STRING", series.name)
-        return ColumnType.STRING
\ No newline at end of file
+        return ColumnType.STRING
+
+    def infer_frame(self, df: pd.DataFrame) -> dict[str, ColumnType]:
+        """
+        Infiere el tipo de todas las columnas de ``df`` a la vez.
+
+        Aplica el mismo orden y los mismos criterios que ``infer``, pero
+        con máscaras vectorizadas sobre las muestras concatenadas de todas
+        las columnas en lugar de un bucle por valor.
+        """
+        n_cols = df.shape[1]
+        samples = self._sample_frame(df)
+        lengths = np.array([len(v) for v in samples], dtype=np.int64)
+        col_ids = np.repeat(np.arange(n_cols), lengths)
+        values = (
+            np.concatenate(samples) if n_cols else np.empty(0, dtype=object)
+        )
+        result: list[ColumnType | None] = [None] * n_cols
+        pending = np.ones(n_cols, dtype=bool)
+
+        def resolve(mask: np.ndarray, col_type: ColumnType, label: str = "") -> None:
+            for j in np.flatnonzero(mask & pending):
+                result[j] = col_type
+                logger.info(
+                    "%s -> %s%s", df.columns[j], col_type.name, label
+                )
+            pending[mask] = False
+
+        def subset() -> tuple[np.ndarray, np.ndarray]:
+            keep = pending[col_ids]
+            return values[keep], col_ids[keep]
+
+        def all_true(mask: np.ndarray, ids: np.ndarray) -> np.ndarray:
+            hits = np.bincount(ids, weights=mask, minlength=n_cols)
+            return hits == lengths
+
+        # 1) BOOLEAN
+        vals, ids = subset()
+        codes, uniques = pd.factorize(vals)
+        pairs = np.unique(ids * (len(uniques) + 1) + codes)
+        n_distinct = np.bincount(pairs // (len(uniques) + 1), minlength=n_cols)
+        is_token = pd.Series(vals, dtype=object).isin(self.boolean_tokens).to_numpy()
+        resolve((n_distinct == 2) & all_true(is_token, ids), ColumnType.BOOLEAN)
+
+        # 2) PERCENTAGE
+        vals, ids = subset()
+        strings = pd.Series(vals, dtype=object)
+        ends = strings.str.endswith(PERCENTAGE_SYMBOL).to_numpy(dtype=bool)
+        candidates = all_true(ends, ids)
+        keep = candidates[ids]
+        ok, _ = self._numeric_mask(
+            strings[keep].str.strip(PERCENTAGE_SYMBOL).to_numpy(), ids[keep], n_cols
+        )
+        resolve(candidates & ok, ColumnType.PERCENTAGE)
+
+        # 3) CURRENCY
+        vals, ids = subset()
+        strings = pd.Series(vals, dtype=object)
+        symbols = "".join(self.currency_symbols)
+        currency_regex = "|".join(
+            [re.escape(sym) for sym in self.currency_symbols]
+            + [CURRENCY_CODE_PATTERN.pattern]
+        )
+        # ``str.count`` en vez de ``str.contains``: el patrón ISO tiene grupos
+        marked = strings.str.count(currency_regex).to_numpy() > 0
+        candidates = all_true(marked, ids)
+        keep = candidates[ids]
+        raw = strings[keep].str.strip().str.lstrip(symbols).str.strip()
+        ok, _ = self._numeric_mask(raw.to_numpy(), ids[keep], n_cols)
+        resolve(candidates & ok, ColumnType.CURRENCY)
+
+        # 4-5) INTEGER / FLOAT: un único parseo numérico para ambos
+        vals, ids = subset()
+        ok, numeric = self._numeric_mask(vals, ids, n_cols)
+        with np.errstate(invalid="ignore", over="ignore"):
+            # Fuera de 2**53 la distinción int/float depende del dtype que
+            # elija pandas por columna: se delega en ``infer``.
+            huge = np.isfinite(numeric) & (np.abs(numeric) >= 2.0 ** 53)
+            whole = np.isclose(numeric, numeric.astype(np.int64))
+        fallback = ok & (np.bincount(ids, weights=huge, minlength=n_cols) > 0)
+        for j in np.flatnonzero(fallback):
+            result[j] = self.infer(df.iloc[:, j])
+        pending[fallback] = False
+        resolve(ok & all_true(whole, ids), ColumnType.INTEGER)
+        resolve(ok, ColumnType.FLOAT)
+
+        # 6-7) TIMESTAMP / DATE
+        vals, ids = subset()
+        strings = pd.Series(vals, dtype=object)
+        date_cols = np.flatnonzero(pending)
+        # Los formatos exactos de fecha siempre se parsean a medianoche, así
+        # que nunca alcanzan el umbral de TIMESTAMP.
+        exact_date = all_true(
+            strings.str.match(DATE_YMD_PATTERN).to_numpy(dtype=bool), ids
+        ) | all_true(
+            strings.str.match(DATE_DMY_PATTERN).to_numpy(dtype=bool), ids
+        )
+        with_time = np.zeros(n_cols)
+        without_time = np.zeros(n_cols)
+        formats: dict[int, str | None] = {}
+        for j in date_cols:
+            detection = self.date_detector.detect(samples[j], df.columns[j], self.date_threshold)
+            with_time[j], without_time[j] = detection.with_time, detection.without_time
+            formats[j] = detection.format
+        threshold = lengths * self.date_threshold
+        timestamp = with_time >= threshold
+        for j in np.flatnonzero((timestamp | exact_date | (without_time >= threshold)) & pending):
+            self._remember_format(df.columns[j], formats[j])
+        resolve(timestamp, ColumnType.TIMESTAMP)
+        resolve(exact_date, ColumnType.DATE, " (formato específico)")
+        resolve(without_time >= threshold, ColumnType.DATE)
+
+        # 8) ID  9) STRING
+        remaining = np.flatnonzero(pending)
+        if len(remaining):
+            unique_counts = df.iloc[:, remaining].nunique(dropna=True).to_numpy()
+            high = np.zeros(n_cols, dtype=bool)
+            high[remaining] = [
+                is_high_cardinality(int(u), len(df)) for u in unique_counts
+            ]
+            resolve(high, ColumnType.ID)
+            resolve(pending.copy(), ColumnType.STRING)
+
+        return {col: col_type for col, col_type in zip(df.columns, result)}
+
+    def _sample_frame(self, df: pd.DataFrame) -> list[np.ndarray]:
+        """
+        Muestra de cada columna como array de str, la misma que usa ``infer``.
+        Las columnas con dtype de numpy se agrupan por dtype para convertir
+        a texto con una sola llamada por grupo.
+        """
+        not_null = df.notna().to_numpy()
+        rows = []
+        for j in range(df.shape[1]):
+            non_null_idx = np.flatnonzero(not_null[:, j])
+            rows.append(non_null_idx[_sample_positions(len(non_null_idx), self.sample_size)])
+
+        samples: list[np.ndarray] = [np.empty(0, dtype=object)] * df.shape[1]
+        groups: dict[np.dtype, list[int]] = {}
+        for j, dtype in enumerate(df.dtypes):
+            if isinstance(dtype, np.dtype):
+                groups.setdefault(dtype, []).append(j)
+            else:
+                samples[j] = df.iloc[rows[j], j].astype(str).to_numpy()
+        for dtype, cols in groups.items():
+            gathered = [df.iloc[:, j].to_numpy()[rows[j]] for j in cols]
+            as_str = pd.Series(np.concatenate(gathered), dtype=dtype).astype(str).to_numpy()
+            for j, part in zip(cols, np.split(as_str, np.cumsum([len(g) for g in gathered])[:-1])):
+                samples[j] = part
+        return samples
+
+    @staticmethod
+    def _numeric_mask(
+        values: np.ndarray, ids: np.ndarray, n_cols: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Equivalente vectorizado de ``pd.to_numeric(values, errors='raise')``
+        por columna: devuelve qué columnas parsean por completo y los valores
+        parseados (float64). La cadena vacía es el único texto que
+        ``to_numeric`` acepta como NaN.
+        """
+        if len(values) == 0:
+            return np.ones(n_cols, dtype=bool), np.empty(0, dtype=float)
+        numeric = np.asarray(pd.to_numeric(values, errors="coerce"), dtype=float)
+        failed = np.isnan(numeric) & (values != "")
+        ok = np.bincount(ids, weights=failed, minlength=n_cols) == 0
+        return ok, numeric
@@ -0,0 +1,298 @@
+"""
+Batch runner: the analyses of ``dataset_profile`` over many CSV files.
+
+``python -m app.services.batch_runner data/ --output results/`` profiles
+every CSV of the given directories or globs in a process pool and writes,
+as each file finishes, ``<name>-<hash>.json`` with its results, plus
+``index.json`` with one record per file (content hash, status, timings).
+
+Files are identified by the SHA-256 of their bytes. A rerun over the same
+output directory skips files whose hash and parameters match a successful
+record, so an interrupted sweep resumes where it stopped and a nightly
+sweep only recomputes what changed.
+
+``--memory-limit`` caps the address space of each worker process: a file
+that needs more fails with ``MemoryError`` (recorded in the index and
+retried on the next run) instead of taking the machine down.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Optional
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+from app.core.config import INGEST_MEMORY_BUDGET_BYTES
+from app.services.dataset_cache import hash_stream
+from app.services.dataset_profile import (
+    ANALYSES,
+    DatasetProfile,
+    run_analyses,
+    stats_options,
+    validate_analyses,
+)
+from app.services.streaming_stats import profile_csv
+
+INDEX_NAME = "index.json"
+# Bumped when the layout of the per-file results changes (reruns everything)
+BATCH_VERSION = 1
+
+
+def find_datasets(paths: Iterable[str], pattern: str = "*.csv", recursive: bool = False) -> List[str]:
+    """
+    Absolute paths of the files in ``paths`` (directories, searched for
+    ``pattern``, globs or files), sorted and without duplicates.
+    """
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found += glob.glob(os.path.join(path, "**", pattern) if recursive else os.path.join(path, pattern),
+                               recursive=recursive)
+        elif glob.has_magic(path):
+            found += glob.glob(path, recursive=recursive)
+        elif os.path.isfile(path):
+            found.append(path)
+        else:
+            raise FileNotFoundError(f"No such file or directory: '{path}'")
+    return sorted({os.path.abspath(p) for p in found if os.path.isfile(p)})
+
+
+def file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hash_stream(f)
+
+
+def params_key(analyses: List[str], params: Dict[str, Any]) -> str:
+    """What a stored result depends on besides the file content."""
+    return json.dumps([BATCH_VERSION, analyses, params], sort_keys=True, default=str)
+
+
+def output_name(path: str, digest: str) -> str:
+    return f"{os.path.splitext(os.path.basename(path))[0]}-{digest[:12]}.json"
+
+
+def _write_json(path: str, content: Any) -> None:
+    """Write ``content`` atomically (a crash never leaves a truncated file)."""
+    from app.api.responses import dumps
+
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(dumps(content))
+    os.replace(tmp, path)
+
+
+def limit_memory(max_bytes: Optional[int]) -> None:
+    """Cap the address space of this process (process pool initializer; no-op off Unix)."""
+    if not max_bytes:
+        return
+    try:
+        import resource
+    except ImportError:
+        return
+    resource.setrlimit(resource.RLIMIT_AS, (max_bytes, max_bytes))
+
+
+def analyze_file(
+    path: str,
+    digest: str,
+    output_dir: str,
+    analyses: List[str],
+    params: Dict[str, Any],
+    memory_budget: int = INGEST_MEMORY_BUDGET_BYTES,
+    mi_n_jobs: int = 1,
+) -> Dict[str, Any]:
+    """
+    Profile ``path`` once, run each analysis on it and write the results
+    next to the index. An analysis that fails is reported under ``errors``
+    without losing the others (e.g. a file without the target column).
+    ``mi_n_jobs`` workers estimate mutual information inside this process.
+    """
+    start = time.perf_counter()
+    options = {k: v for k, v in stats_options(analyses).items() if v is not None}
+    stats = profile_csv(path, memory_budget=memory_budget, **options)
+    profile = DatasetProfile(stats, timings={"parse": time.perf_counter() - start})
+    results: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    for name in analyses:
+        _, needs_target = ANALYSES[name]
+        target_col = params.get("target_col")
+        if needs_target and target_col not in stats.columns:
+            errors[name] = f"Target column '{target_col}' not found in dataset"
+            continue
+        try:
+            results.update(run_analyses(profile, [name], mi_n_jobs=mi_n_jobs, **params)["results"])
+        except (KeyError, ValueError, TypeError) as e:
+            errors[name] = str(e.args[0]) if isinstance(e, KeyError) else str(e)
+
+    output = output_name(path, digest)
+    _write_json(os.path.join(output_dir, output), {
+        "path": path,
+        "hash": digest,
+        "rows": stats.n_rows,
+        "columns": len(stats.columns),
+        "results": results,
+        "errors": errors,
+        "timings": dict(profile.timings),
+    })
+    return {
+        "status": "partial" if errors else "ok",
+        "output": output,
+        "rows": stats.n_rows,
+        "columns": len(stats.columns),
+        "errors": errors,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def load_index(output_dir: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(output_dir, INDEX_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"datasets": {}}
+
+
+def is_current(record: Optional[Dict[str, Any]], digest: str, key: str, output_dir: str) -> bool:
+    """Whether ``record`` already holds the results of this content and parameters."""
+    return (
+        record is not None
+        and record.get("hash") == digest
+        and record.get("params") == key
+        and record.get("status") in ("ok", "partial")
+        and os.path.exists(os.path.join(output_dir, record["output"]))
+    )
+
+
+def run_batch(
+    paths: List[str],
+    output_dir: str,
+    analyses: List[str],
+    params: Dict[str, Any],
+    workers: int = 1,
+    memory_limit: Optional[int] = None,
+    force: bool = False,
+    log: Optional[Any] = None,
+    mi_n_jobs: int = 1,
+) -> Dict[str, Any]:
+    """
+    Analyze ``paths`` in ``workers`` processes, writing each result as it
+    finishes and the index after every file. Returns the index with a
+    ``summary`` of this run (counts per status). ``mi_n_jobs`` does not
+    change the results, so it is not part of what makes a record current.
+    """
+    validate_analyses(analyses, params.get("target_col"))
+    os.makedirs(output_dir, exist_ok=True)
+    index = load_index(output_dir)
+    datasets: Dict[str, Dict[str, Any]] = index.setdefault("datasets", {})
+    key = params_key(analyses, params)
+    memory_budget = INGEST_MEMORY_BUDGET_BYTES
+    if memory_limit:
+        # The chunks being parsed must fit well inside the worker's limit
+        memory_budget = min(memory_budget, memory_limit // 4)
+
+    def save() -> None:
+        _write_json(os.path.join(output_dir, INDEX_NAME), index)
+
+    def record(path: str, digest: str, result: Dict[str, Any]) -> None:
+        datasets[path] = {"hash": digest, "params": key, "finished": time.time(), **result}
+        save()
+        if log is not None:
+            print(f"[{counts['done']}/{len(paths)}] {result['status']:<7} {path} "
+                  f"({result.get('seconds', 0.0):.1f}s)", file=log, flush=True)
+
+    counts = {"done": 0, "skipped": 0, "ok": 0, "partial": 0, "error": 0}
+    pending = []
+    for path in paths:
+        try:
+            digest = file_hash(path)
+        except OSError as e:
+            counts["done"] += 1
+            counts["error"] += 1
+            record(path, "", {"status": "error", "error": str(e)})
+            continue
+        if not force and is_current(datasets.get(path), digest, key, output_dir):
+            counts["done"] += 1
+            counts["skipped"] += 1
+            continue
+        pending.append((path, digest))
+
+    if pending:
+        with ProcessPoolExecutor(
+            max_workers=max(1, min(workers, len(pending))),
+            initializer=limit_memory,
+            initargs=(memory_limit,),
+        ) as pool:
+            futures = {
+                pool.submit(
+                    analyze_file, path, digest, output_dir, analyses, params, memory_budget, mi_n_jobs
+                ): (path, digest)
+                for path, digest in pending
+            }
+            for future in as_completed(futures):
+                path, digest = futures[future]
+                counts["done"] += 1
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # Parse errors, MemoryError or a worker that died
+                    result = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+                counts[result["status"]] += 1
+                record(path, digest, result)
+
+    index["summary"] = {"files": len(paths), **{k: v for k, v in counts.items() if k != "done"}}
+    save()
+    return index
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the dataset analyses over directories of CSV files")
+    parser.add_argument("paths", nargs="+", help="Directories, globs or files")
+    parser.add_argument("--output", required=True, help="Directory for the per-file results and index.json")
+    parser.add_argument("--pattern", default="*.csv", help="File pattern inside directories")
+    parser.add_argument("--recursive", action="store_true")
+    parser.add_argument("--analyses", nargs="+", choices=list(ANALYSES))
+    parser.add_argument("--target-col")
+    parser.add_argument("--discrete-target", action="store_true")
+    parser.add_argument("--corr-threshold", type=float, default=0.95)
+    parser.add_argument("--mi-threshold", type=float, default=0.5)
+    parser.add_argument("--mi-method", choices=["knn", "binned"], default="knn")
+    parser.add_argument("--imbalance-threshold", type=float, default=0.1)
+    parser.add_argument("--mi-n-jobs", type=int, default=1,
+                        help="Workers per file for mutual information (-1 = all CPUs)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--memory-limit", type=int, help="Address space limit per worker, in MiB")
+    parser.add_argument("--force", action="store_true", help="Recompute files whose results are current")
+    args = parser.parse_args(argv)
+
+    analyses = args.analyses or [
+        name for name, (_, needs_target) in ANALYSES.items() if args.target_col or not needs_target
+    ]
+    params = {
+        "target_col": args.target_col,
+        "discrete_target": args.discrete_target,
+        "corr_threshold": args.corr_threshold,
+        "mi_threshold": args.mi_threshold,
+        "mi_method": args.mi_method,
+        "imbalance_threshold": args.imbalance_threshold,
+    }
+    try:
+        paths = find_datasets(args.paths, args.pattern, args.recursive)
+        validate_analyses(analyses, args.target_col)
+    except (FileNotFoundError, ValueError) as e:
+        parser.error(str(e))
+    if not paths:
+        parser.error("no files matched")
+    index = run_batch(
+        paths, args.output, analyses, params, args.workers,
+        args.memory_limit * 2 ** 20 if args.memory_limit else None, args.force, log=sys.stderr,
+        mi_n_jobs=args.mi_n_jobs,
+    )
+    summary = index["summary"]
+    print(json.dumps(summary))
+    return 1 if summary["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,254 @@
-# Métricas de fairness y detección de sesgos
+"""
+Subgroup fairness metrics.
+
+The sensitive attributes, the target and the (optional) model predictions
+are factorized once. For every attribute and every intersection of up to
+``max_order`` attributes, one ``np.bincount`` builds the table
+group x target class x predicted positive, and every metric is read from
+it: per-group class balance, selection rate (demographic parity) and true
+positive rate (equal opportunity).
+
+Bootstrap intervals resample that table instead of the rows: drawing the
+cell counts from a multinomial with the observed proportions is the same
+as resampling the rows, and all resamples are evaluated as one array.
+"""
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import json
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from app.services.dataset_cache import DatasetEntry
+from app.services.evaluate_class_balance import class_balance_from_counts
+
+
+def factorize_groups(codes: Sequence[np.ndarray], sizes: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Group id of every row for the intersection of the attributes whose
+    ``codes`` (-1 = missing) are given, and the attribute codes of each
+    group. Rows missing any attribute get -1.
+    """
+    combined = np.zeros(len(codes[0]), dtype=np.int64)
+    missing = np.zeros(len(codes[0]), dtype=bool)
+    for c, size in zip(codes, sizes):
+        combined = combined * size + c
+        missing |= c < 0
+    combined[missing] = -1
+    group_ids, keys = pd.factorize(combined, sort=True)
+    if len(keys) and keys[0] == -1:
+        group_ids = group_ids - 1
+        keys = keys[1:]
+    # Mixed-radix decoding of the group keys back to per-attribute codes
+    decoded = []
+    for size in reversed(sizes):
+        decoded.append(keys % size)
+        keys = keys // size
+    return group_ids, np.column_stack(decoded[::-1]) if decoded else np.empty((0, 0), dtype=np.int64)
+
+
+def group_table(group_ids: np.ndarray, n_groups: int, y: np.ndarray, n_classes: int, predicted: np.ndarray) -> np.ndarray:
+    """Counts of shape (groups, target classes, 2) where the last axis is "predicted positive"."""
+    valid = group_ids >= 0
+    idx = (group_ids[valid] * n_classes + y[valid]) * 2 + predicted[valid]
+    return np.bincount(idx, minlength=n_groups * n_classes * 2).reshape(n_groups, n_classes, 2)
+
+
+def rates(table: np.ndarray, positive: int, has_predictions: bool) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Selection rate and true positive rate per group from tables of shape
+    (..., groups, classes, 2). Without predictions the selection rate is
+    the share of the positive class in the target.
+    """
+    table = table.astype(np.float64)
+    n = table.sum(axis=(-2, -1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if not has_predictions:
+            return table[..., positive, :].sum(axis=-1) / n, None
+        selection = table[..., 1].sum(axis=-1) / n
+        actual = table[..., positive, :].sum(axis=-1)
+        return selection, table[..., positive, 1] / actual
+
+
+def disparity(values: np.ndarray, eligible: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Difference (max - min) and ratio (min / max) across the eligible groups (last axis)."""
+    values = np.where(eligible, values, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+        # All-NaN slices (no eligible group) give NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        high = np.nanmax(values, axis=-1)
+        low = np.nanmin(values, axis=-1)
+        return high - low, np.where(high > 0, low / high, np.nan)
+
+
+def _interval(samples: np.ndarray, confidence: float) -> np.ndarray:
+    """Percentile interval along the first axis (NaN where no resample is defined)."""
+    alpha = (1 - confidence) / 2
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanquantile(samples, [alpha, 1 - alpha], axis=0)
+
+
+def _float(value: float) -> Optional[float]:
+    return None if not np.isfinite(value) else float(value)
+
+
+def _ci(bounds: Optional[np.ndarray], *index: int) -> Optional[List[Optional[float]]]:
+    if bounds is None:
+        return None
+    return [_float(bounds[(0, *index)]), _float(bounds[(1, *index)])]
+
+
+def _resolve_positive(labels: pd.Index, counts: np.ndarray, positive_class: Any) -> int:
+    """Index of ``positive_class`` among ``labels`` (also matched as text); minority class if None."""
+    if positive_class is None:
+        return int(np.argmin(counts))
+    for i, label in enumerate(labels):
+        if label == positive_class or str(label) == str(positive_class):
+            return i
+    raise ValueError(f"Positive class '{positive_class}' not found in the target")
+
+
+def fairness_metrics(
+    df: pd.DataFrame,
+    sensitive_cols: List[str],
+    target_col: str,
+    prediction_col: Optional[str] = None,
+    positive_class: Any = None,
+    max_order: int = 2,
+    min_group_size: int = 1,
+    imbalance_threshold: float = 0.1,
+    n_bootstrap: int = 0,
+    confidence: float = 0.95,
+    random_state: Optional[int] = 0,
+) -> Dict[str, Any]:
+    """
+    Fairness report of ``target_col`` (and of ``prediction_col`` if given)
+    across ``sensitive_cols`` and their intersections of up to
+    ``max_order`` attributes.
+
+    Each grouping reports its demographic parity (difference and ratio of
+    the positive rates, predicted if there are predictions), its equal
+    opportunity gap (difference of true positive rates, predictions only)
+    and per group the counts, rates and class balance. Groups smaller than
+    ``min_group_size`` are reported but left out of the gaps. With
+    ``n_bootstrap`` > 0 rates and gaps carry ``confidence`` intervals.
+    The positive class defaults to the minority class of the target.
+    """
+    missing = [col for col in [*sensitive_cols, target_col, prediction_col] if col is not None and col not in df.columns]
+    if missing:
+        raise KeyError(f"Columns not found in dataset: {missing}")
+    if not sensitive_cols:
+        raise ValueError("At least one sensitive column is required")
+
+    df = df[df[target_col].notna()]
+    y, labels = pd.factorize(df[target_col], sort=True)
+    if len(labels) < 2:
+        raise ValueError(f"Target column '{target_col}' needs at least two classes")
+    n_classes = len(labels)
+    class_counts = np.bincount(y, minlength=n_classes)
+    positive = _resolve_positive(labels, class_counts, positive_class)
+    has_predictions = prediction_col is not None
+    if has_predictions:
+        predicted = pd.Categorical(df[prediction_col], categories=labels).codes == positive
+    else:
+        predicted = np.zeros(len(df), dtype=bool)
+    predicted = predicted.astype(np.int64)
+
+    attributes = []
+    for col in sensitive_cols:
+        codes, uniques = pd.factorize(df[col], sort=True)
+        attributes.append((col, codes, max(len(uniques), 1), pd.Series(uniques).tolist()))
+
+    rng = np.random.default_rng(random_state)
+    label_list = pd.Series(labels).tolist()
+    overall_table = group_table(np.zeros(len(df), dtype=np.int64), 1, y, n_classes, predicted)
+    overall_selection, overall_tpr = rates(overall_table, positive, has_predictions)
+    report: Dict[str, Any] = {
+        "target": target_col,
+        "prediction": prediction_col,
+        "positive_class": label_list[positive],
+        "overall": {
+            "count": int(len(df)),
+            "positive_rate": _float(overall_selection[0]),
+            "true_positive_rate": _float(overall_tpr[0]) if has_predictions else None,
+            "class_balance": class_balance_from_counts(
+                dict(zip(label_list, class_counts.tolist())), len(df), imbalance_threshold
+            ),
+        },
+        "groupings": [],
+    }
+
+    for order in range(1, min(max_order, len(attributes)) + 1):
+        for subset in combinations(attributes, order):
+            names = [a[0] for a in subset]
+            group_ids, keys = factorize_groups([a[1] for a in subset], [a[2] for a in subset])
+            table = group_table(group_ids, len(keys), y, n_classes, predicted)
+            sizes = table.sum(axis=(1, 2))
+            eligible = sizes >= min_group_size
+            selection, tpr = rates(table, positive, has_predictions)
+            dp_diff, dp_ratio = disparity(selection, eligible)
+            eo_diff = disparity(tpr, eligible)[0] if has_predictions else None
+
+            sel_ci = tpr_ci = dp_ci = eo_ci = None
+            if n_bootstrap > 0 and sizes.sum() > 0:
+                total = int(sizes.sum())
+                boot = rng.multinomial(total, table.ravel() / total, size=n_bootstrap).reshape(n_bootstrap, *table.shape)
+                boot_sel, boot_tpr = rates(boot, positive, has_predictions)
+                sel_ci = _interval(boot_sel, confidence)
+                dp_ci = _interval(np.stack(disparity(boot_sel, eligible), axis=1), confidence)
+                if has_predictions:
+                    tpr_ci = _interval(boot_tpr, confidence)
+                    eo_ci = _interval(disparity(boot_tpr, eligible)[0][:, None], confidence)
+
+            groups = []
+            for g in range(len(keys)):
+                counts = dict(zip(label_list, table[g].sum(axis=1).tolist()))
+                groups.append({
+                    "group": {name: attr[3][keys[g, j]] for j, (name, attr) in enumerate(zip(names, subset))},
+                    "count": int(sizes[g]),
+                    "positive_rate": _float(selection[g]),
+                    "positive_rate_ci": _ci(sel_ci, g),
+                    "true_positive_rate": _float(tpr[g]) if has_predictions else None,
+                    "true_positive_rate_ci": _ci(tpr_ci, g),
+                    "class_balance": class_balance_from_counts(counts, int(sizes[g]), imbalance_threshold),
+                    "small_group": not eligible[g],
+                })
+            report["groupings"].append({
+                "attributes": names,
+                "demographic_parity": {
+                    "difference": _float(dp_diff),
+                    "ratio": _float(dp_ratio),
+                    "difference_ci": _ci(dp_ci, 0),
+                    "ratio_ci": _ci(dp_ci, 1),
+                },
+                "equal_opportunity": None if not has_predictions else {
+                    "difference": _float(eo_diff),
+                    "difference_ci": _ci(eo_ci, 0),
+                },
+                "groups": groups,
+            })
+    return report
+
+
+def fairness_metrics_from_entry(
+    entry: DatasetEntry,
+    sensitive_cols: List[str],
+    target_col: str,
+    prediction_col: Optional[str] = None,
+    **options: Any,
+) -> Dict[str, Any]:
+    """
+    ``fairness_metrics`` over every row of a cached dataset, loading only
+    the columns involved; the result is memoized per parameters.
+    """
+    columns = list(dict.fromkeys([*sensitive_cols, target_col] + ([prediction_col] if prediction_col else [])))
+    missing = [col for col in columns if col not in entry.columns]
+    if missing:
+        raise KeyError(f"Columns not found in dataset: {missing}")
+    key = "fairness|" + json.dumps([sensitive_cols, target_col, prediction_col, sorted(options.items())], default=str)
+    return entry.memo(
+        key,
+        lambda: fairness_metrics(entry.load_frame(columns), sensitive_cols, target_col, prediction_col, **options),
+    )
@@ -1,31 +1,308 @@
 import pandas as pd
 import numpy as np
-from scipy.stats import pearsonr, chi2_contingency
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
 import itertools
+import os
+
+from app.core.config import INGEST_MEMORY_BUDGET_BYTES
+from app.core.progress import ProgressCallback, report
+from app.services.streaming_stats import StreamingDatasetStats
 
 def compute_numeric_correlation(df: pd.DataFrame) -> pd.DataFrame:
     """Matriz de correlación de Pearson para todas las columnas numéricas."""
     numeric = df.select_dtypes(include=[np.number])
     return numeric.corr(method='pearson')
 
-def compute_pearson_with_target(df: pd.DataFrame, target_col: str) -> pd.DataFrame:
-    """Correlación de Pearson + p-value entre cada numérica y el target."""
+def compute_pearson_with_target(
+    df: pd.DataFrame,
+    target_col: str,
+    p_value: str = "beta",
+    progress: Optional[ProgressCallback] = None,
+) -> pd.DataFrame:
+    """
+    Correlación de Pearson + p-value entre cada numérica y el target.
+
+    Se calcula para todas las columnas a la vez con sumas enmascaradas
+    (cada par usa las filas donde la columna y el target tienen valor, sin
+    alinear por índice). ``p_value`` elige la distribución del test:
+    ``"beta"`` (la de ``pearsonr``) o ``"t"`` (t de Student, n-2 g.l.).
+    """
     if target_col not in df.columns:
         raise KeyError(f"Target column '{target_col}' not found")
-    results = {}
-    for col in df.select_dtypes(include=[np.number]).columns:
-        if col == target_col:
-            continue
-        x = df[col].dropna()
-        y = df[target_col].dropna()
-        joined = pd.concat([x, y], axis=1, join='inner')
-        corr, p = pearsonr(joined[col], joined[target_col])
-        results[col] = {'correlation': corr, 'p_value': p}
-    return pd.DataFrame.from_dict(results, orient='index')
+    y = df[target_col]
+    if not (pd.api.types.is_numeric_dtype(y) or pd.api.types.is_bool_dtype(y)):
+        raise KeyError(f"Target column '{target_col}' is not numeric")
+    features = df.select_dtypes(include=[np.number]).drop(columns=[target_col], errors='ignore')
+    r, n = masked_pearson_with_target(
+        features.to_numpy(dtype=np.float64), y.to_numpy(dtype=np.float64), progress
+    )
+    p = pearson_p_values(r, n, method=p_value)
+    return pd.DataFrame({'correlation': r, 'p_value': p}, index=features.columns)
+
+# Columnas que se procesan a la vez (acota la memoria de los temporales)
+_PEARSON_BLOCK_CELLS = 1 << 22
+
+def masked_pearson_with_target(
+    X: np.ndarray, y: np.ndarray, progress: Optional[ProgressCallback] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pearson pairwise-complete de cada columna de ``X`` (n x p, NaN = nulo)
+    con ``y``. Devuelve (r, n) por columna; r es NaN si hay menos de 2
+    filas completas o alguna de las dos series es constante.
+    """
+    n_rows, p = X.shape
+    r = np.full(p, np.nan)
+    counts = np.zeros(p, dtype=np.int64)
+    y_valid = ~np.isnan(y)
+    block = max(1, _PEARSON_BLOCK_CELLS // max(n_rows, 1))
+    for start in range(0, p, block):
+        x = X[:, start:start + block]
+        mask = ~np.isnan(x) & y_valid[:, None]
+        n = mask.sum(axis=0)
+        # Dos pasadas (centrar y luego multiplicar), como pearsonr
+        with np.errstate(divide='ignore', invalid='ignore'):
+            xm = np.where(mask, x, 0.0)
+            ym = np.where(mask, y[:, None], 0.0)
+            xm -= xm.sum(axis=0) / n
+            ym -= ym.sum(axis=0) / n
+            xm[~mask] = 0.0
+            ym[~mask] = 0.0
+            sxy = np.einsum('ij,ij->j', xm, ym)
+            sxx = np.einsum('ij,ij->j', xm, xm)
+            syy = np.einsum('ij,ij->j', ym, ym)
+            rb = sxy / np.sqrt(sxx * syy)
+        rb[n < 2] = np.nan
+        r[start:start + block] = np.clip(rb, -1.0, 1.0)
+        counts[start:start + block] = n
+        report(progress, min(start + block, p), p, "Pearson vs target", "features")
+    return r, counts
+
+def pearson_p_values(r, n, method: str = "beta") -> np.ndarray:
+    """
+    p-values bilaterales de correlaciones ``r`` con ``n`` pares completos,
+    calculados en bloque. ``"beta"`` usa la misma distribución que
+    ``pearsonr``; ``"t"`` la t de Student equivalente.
+    """
+    # scipy se importa al usarse (no en el arranque de la app)
+    from scipy.special import betainc
+    from scipy.stats import t as t_dist
+
+    r = np.asarray(r, dtype=np.float64)
+    n = np.asarray(n, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if method == "beta":
+            a = n / 2 - 1
+            p = 2 * betainc(a, a, (1 - np.abs(r)) / 2)
+        elif method == "t":
+            tstat = r * np.sqrt((n - 2) / (1 - r ** 2))
+            p = 2 * t_dist.sf(np.abs(tstat), n - 2)
+        else:
+            raise ValueError(f"Unknown p-value method '{method}': use 'beta' or 't'")
+    p = np.where(np.abs(r) == 1, 0.0, p)
+    # con dos puntos la correlación es siempre ±1 y no hay evidencia
+    p = np.where(n == 2, 1.0, p)
+    return np.where(np.isnan(r), np.nan, np.clip(p, 0.0, 1.0))
+
+# Celdas (pares) por bloque de la búsqueda de pares correlacionados
+_PAIR_BLOCK_CELLS = 1 << 22
+
+def threshold_correlation_pairs(
+    X: np.ndarray,
+    threshold: float,
+    query: Optional[np.ndarray] = None,
+    block_size: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pares de columnas de ``X`` (n x p, NaN = nulo) con |Pearson| >= ``threshold``,
+    sin construir la matriz p x p: la correlación se calcula por bloques de
+    columnas (bloque x p) y solo se guardan los pares que superan el umbral.
+
+    Sin ``query`` devuelve los pares i < j de todas las columnas, en el orden
+    del triángulo superior. Con ``query`` compara esas columnas contra todas
+    las demás. Devuelve tres arrays (i, j, r). Con nulos, cada par usa las
+    filas donde ambas columnas tienen valor (como ``DataFrame.corr``).
+    """
+    n, p = X.shape
+    all_pairs = query is None
+    query = np.arange(p) if all_pairs else np.asarray(query)
+    block = block_size or max(1, _PAIR_BLOCK_CELLS // max(p, 1))
+    mask = ~np.isnan(X)
+    complete = bool(mask.all())
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if complete:
+            # Datos estandarizados: corr = Z.T @ Z
+            Z = X - X.mean(axis=0)
+            Z /= np.sqrt((Z ** 2).sum(axis=0))
+        else:
+            M = mask.astype(np.float64)
+            # centrar con la media de la columna mejora la estabilidad (r no cambia)
+            X0 = np.where(mask, X, 0.0)
+            X0 = np.where(mask, X0 - X0.sum(axis=0) / mask.sum(axis=0), 0.0)
+            X2 = X0 ** 2
+
+    rows, cols, values = [], [], []
+    for start in range(0, len(query), block):
+        q = query[start:start + block]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if complete:
+                r = Z[:, q].T @ Z
+            else:
+                nobs = M[:, q].T @ M
+                sx = X0[:, q].T @ M
+                sy = M[:, q].T @ X0
+                sxx = X2[:, q].T @ M
+                syy = M[:, q].T @ X2
+                sxy = X0[:, q].T @ X0
+                r = (nobs * sxy - sx * sy) / np.sqrt((nobs * sxx - sx ** 2) * (nobs * syy - sy ** 2))
+                r[nobs < 2] = np.nan
+            r = np.clip(r, -1.0, 1.0)
+            if all_pairs:
+                keep = np.arange(p)[None, :] > q[:, None]
+            else:
+                keep = np.arange(p)[None, :] != q[:, None]
+            hit = (np.abs(r) >= threshold) & keep
+        bi, j = np.nonzero(hit)
+        rows.append(q[bi])
+        cols.append(j)
+        values.append(r[bi, j])
+        report(progress, start + len(q), len(query), "Correlated pairs", "columns")
+    if not rows:
+        return np.array([], dtype=np.intp), np.array([], dtype=np.intp), np.array([])
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(values)
+
+# Lee las columnas indicadas como matriz float64 (n x k, NaN = nulo)
+ColumnLoader = Callable[[List[str]], np.ndarray]
+
+def masked_pearson(X: np.ndarray, Y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pearson pairwise-complete de cada columna de ``X`` (n x a) con cada una
+    de ``Y`` (n x b), NaN = nulo. Devuelve (r, nobs), ambos a x b; r es NaN
+    con menos de 2 filas completas o si alguna serie es constante.
+    """
+    MX, MY = ~np.isnan(X), ~np.isnan(Y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # centrar con la media de la columna mejora la estabilidad (r no cambia)
+        X0 = np.where(MX, X, 0.0)
+        X0 = np.where(MX, X0 - X0.sum(axis=0) / MX.sum(axis=0), 0.0)
+        Y0 = np.where(MY, Y, 0.0)
+        Y0 = np.where(MY, Y0 - Y0.sum(axis=0) / MY.sum(axis=0), 0.0)
+        MX, MY = MX.astype(np.float64), MY.astype(np.float64)
+        nobs = MX.T @ MY
+        sx, sy = X0.T @ MY, MX.T @ Y0
+        sxx, syy = (X0 ** 2).T @ MY, MX.T @ (Y0 ** 2)
+        r = (nobs * (X0.T @ Y0) - sx * sy) / np.sqrt((nobs * sxx - sx ** 2) * (nobs * syy - sy ** 2))
+    r[nobs < 2] = np.nan
+    return np.clip(r, -1.0, 1.0), nobs
+
+def _load_block_size(n_rows: int, block_size: Optional[int]) -> int:
+    """Columnas por bloque: dos bloques y sus temporales caben en ``INGEST_MEMORY_BUDGET_BYTES``."""
+    return block_size or max(1, INGEST_MEMORY_BUDGET_BYTES // (16 * 8 * max(n_rows, 1)))
+
+def _block_pairs(
+    columns: List[str], load: ColumnLoader, block: int
+) -> Iterator[Tuple[int, int, np.ndarray, np.ndarray]]:
+    """
+    Pares de bloques de columnas (a, b, X, Y) del triángulo superior
+    (b >= a, posición de su primera columna): cada bloque ``X`` se lee una
+    vez y se compara consigo mismo y con los siguientes.
+    """
+    for a in range(0, len(columns), block):
+        X = load(columns[a:a + block])
+        for b in range(a, len(columns), block):
+            yield a, b, X, X if b == a else load(columns[b:b + block])
+
+def _n_block_pairs(p: int, block: int) -> int:
+    n = -(-p // block)
+    return n * (n + 1) // 2
+
+def pearson_matrix_by_blocks(
+    columns: Sequence[str],
+    load: ColumnLoader,
+    n_rows: int,
+    block_size: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> pd.DataFrame:
+    """
+    Matriz de Pearson (como ``DataFrame.corr``) leyendo las columnas por
+    bloques con ``load``: en memoria solo hay dos bloques de n x bloque.
+    """
+    columns = list(columns)
+    p = len(columns)
+    block = _load_block_size(n_rows, block_size)
+    mat = np.full((p, p), np.nan)
+    total = _n_block_pairs(p, block)
+    for k, (a, b, X, Y) in enumerate(_block_pairs(columns, load, block), 1):
+        r, _ = masked_pearson(X, Y)
+        mat[a:a + block, b:b + block] = r
+        mat[b:b + block, a:a + block] = r.T
+        report(progress, k, total, "Pearson", "blocks")
+    diag = np.diag_indices_from(mat)
+    mat[diag] = np.where(np.isnan(mat[diag]), np.nan, 1.0)
+    return pd.DataFrame(mat, index=columns, columns=columns)
+
+def threshold_correlation_pairs_by_blocks(
+    columns: Sequence[str],
+    load: ColumnLoader,
+    n_rows: int,
+    threshold: float,
+    block_size: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Como ``threshold_correlation_pairs`` sin cargar todas las columnas:
+    se leen con ``load`` de dos en dos bloques. Devuelve (i, j, r), con
+    i < j posiciones en ``columns``, en el orden del triángulo superior.
+    """
+    columns = list(columns)
+    p = len(columns)
+    block = _load_block_size(n_rows, block_size)
+    found = []
+    total = _n_block_pairs(p, block)
+    for k, (a, b, X, Y) in enumerate(_block_pairs(columns, load, block), 1):
+        r, _ = masked_pearson(X, Y)
+        upper = np.arange(b, b + r.shape[1])[None, :] > np.arange(a, a + r.shape[0])[:, None]
+        bi, bj = np.nonzero(upper & (np.abs(r) >= threshold))
+        found.append((bi + a, bj + b, r[bi, bj]))
+        report(progress, k, total, "Correlated pairs", "blocks")
+    if not found:
+        return np.array([], dtype=np.intp), np.array([], dtype=np.intp), np.array([])
+    i, j, r = (np.concatenate(parts) for parts in zip(*found))
+    order = np.lexsort((j, i))
+    return i[order], j[order], r[order]
+
+def pearson_with_target_by_blocks(
+    columns: Sequence[str],
+    target_col: str,
+    load: ColumnLoader,
+    n_rows: int,
+    block_size: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> Tuple[pd.Series, pd.Series]:
+    """
+    Pearson pairwise-complete (r, n) de cada columna de ``columns`` con el
+    target, leyendo las columnas por bloques con ``load``.
+    """
+    columns = list(columns)
+    block = _load_block_size(n_rows, block_size)
+    y = load([target_col])[:, 0]
+    r, n = np.full(len(columns), np.nan), np.zeros(len(columns), dtype=np.int64)
+    for start in range(0, len(columns), block):
+        r[start:start + block], n[start:start + block] = masked_pearson_with_target(
+            load(columns[start:start + block]), y
+        )
+        report(progress, min(start + block, len(columns)), len(columns), "Pearson vs target", "features")
+    return pd.Series(r, index=columns), pd.Series(n, index=columns)
 
 def cramers_v(x: pd.Series, y: pd.Series) -> float:
     """Cálculo de Cramér’s V para dos categóricas."""
-    cm = pd.crosstab(x, y)
+    return cramers_v_from_table(pd.crosstab(x, y))
+
+def cramers_v_from_table(cm) -> float:
+    """Cramér’s V (con corrección de sesgo) a partir de una tabla de contingencia."""
+    from scipy.stats import chi2_contingency
+
     chi2 = chi2_contingency(cm)[0]
     n = cm.sum().sum()
     phi2 = chi2 / n
@@ -36,12 +313,208 @@ def cramers_v(x: pd.Series, y: pd.Series) -> float:
     k_corr = k - ((k-1)**2)/(n-1)
     return np.sqrt(phi2_corr / min((k_corr-1), (r_corr-1)))
 
-def compute_categorical_correlation(df: pd.DataFrame) -> pd.DataFrame:
-    """Matriz de Cramér’s V para todas las columnas categóricas."""
+def compute_categorical_correlation(
+    df: pd.DataFrame,
+    n_jobs: int = 1,
+    progress: Optional[ProgressCallback] = None,
+) -> pd.DataFrame:
+    """
+    Matriz de Cramér’s V para todas las columnas categóricas.
+
+    Cada columna se factoriza una sola vez a códigos enteros y las tablas de
+    contingencia de todos los pares (i, j>=i) se cuentan con un único
+    ``np.bincount`` por columna i. El resultado es el mismo que aplicar
+    ``cramers_v`` par a par sobre las filas donde ambas columnas tienen valor.
+    Con ``n_jobs`` != 1 y muchas columnas se reparte entre procesos.
+    """
     cat = df.select_dtypes(include=['category', object])
     cols = cat.columns
-    mat = pd.DataFrame(np.zeros((len(cols), len(cols))), index=cols, columns=cols)
-    for a, b in itertools.combinations_with_replacement(cols, 2):
-        v = cramers_v(cat[a].dropna(), cat[b].dropna())
-        mat.loc[a, b] = mat.loc[b, a] = v
-    return mat
\ No newline at end of file
+    codes, sizes = _factorize_columns(cat)
+    return pd.DataFrame(
+        cramers_v_matrix(codes, sizes, n_jobs=n_jobs, progress=progress), index=cols, columns=cols
+    )
+
+# Columnas a partir de las cuales compensa lanzar procesos (n_jobs != 1)
+CRAMERS_V_PARALLEL_MIN_COLUMNS = 200
+# Celdas máximas de las tablas densas que se cuentan juntas con bincount
+_BINCOUNT_MAX_CELLS = 1 << 24
+# Celdas (filas x pares) por bloque de filas al construir las claves
+_BLOCK_CELLS = 1 << 22
+
+def _factorize_columns(cat: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Códigos int32 (n_filas x n_columnas, -1 = nulo) y número de categorías por columna."""
+    codes = np.empty((len(cat), cat.shape[1]), dtype=np.int32)
+    sizes = np.empty(cat.shape[1], dtype=np.int64)
+    for j, col in enumerate(cat.columns):
+        try:
+            # mismo orden de categorías que pd.crosstab
+            c, uniques = pd.factorize(cat[col], sort=True)
+        except TypeError:
+            c, uniques = pd.factorize(cat[col])
+        codes[:, j] = c
+        sizes[j] = len(uniques)
+    return codes, sizes
+
+def _chi2_statistic(table: np.ndarray, n) -> float:
+    """
+    Chi² de ``chi2_contingency`` en forma cerrada (incluida la corrección de
+    Yates cuando hay un grado de libertad). ``table`` no tiene filas ni
+    columnas vacías.
+    """
+    r, k = table.shape
+    if (r - 1) * (k - 1) == 0:
+        return 0.0
+    expected = np.outer(table.sum(axis=1), table.sum(axis=0)) / n
+    observed = table.astype(np.float64)
+    if r == 2 and k == 2:
+        diff = expected - observed
+        observed = observed + np.minimum(0.5, np.abs(diff)) * np.sign(diff)
+    return ((observed - expected) ** 2 / expected).sum()
+
+def cramers_v_from_counts(table: np.ndarray) -> float:
+    """
+    Igual que ``cramers_v_from_table`` sobre una tabla de conteos que puede
+    tener categorías sin observaciones (se descartan, como en ``pd.crosstab``).
+    Devuelve NaN si la tabla está vacía.
+    """
+    table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+    if table.size == 0:
+        return np.nan
+    n = table.sum()
+    r, k = table.shape
+    with np.errstate(divide='ignore', invalid='ignore'):
+        phi2 = _chi2_statistic(table, n) / n
+        phi2_corr = max(0, phi2 - ((k-1)*(r-1))/(n-1))
+        r_corr = r - ((r-1)**2)/(n-1)
+        k_corr = k - ((k-1)**2)/(n-1)
+        return np.sqrt(phi2_corr / min((k_corr-1), (r_corr-1)))
+
+def _pair_table(ci: np.ndarray, cj: np.ndarray) -> np.ndarray:
+    """Tabla densa de las categorías observadas de un par de alta cardinalidad."""
+    valid = (ci >= 0) & (cj >= 0)
+    _, rows = np.unique(ci[valid], return_inverse=True)
+    _, cols = np.unique(cj[valid], return_inverse=True)
+    table = np.zeros((rows.max(initial=-1) + 1, cols.max(initial=-1) + 1), dtype=np.int64)
+    np.add.at(table, (rows, cols), 1)
+    return table
+
+def _cell_batches(cells: np.ndarray, limit: int) -> List[slice]:
+    """Tramos consecutivos de ``cells`` cuya suma no pasa de ``limit`` (cada celda <= limit)."""
+    batches, start, total = [], 0, 0
+    for k, c in enumerate(cells):
+        if total + c > limit:
+            batches.append(slice(start, k))
+            start, total = k, 0
+        total += c
+    if start < len(cells):
+        batches.append(slice(start, len(cells)))
+    return batches
+
+def _cramers_v_rows(
+    codes: np.ndarray,
+    sizes: np.ndarray,
+    rows: List[int],
+    progress: Optional[ProgressCallback] = None,
+) -> List[Tuple[int, int, float]]:
+    """
+    Cramér’s V de los pares (i, j) con i en ``rows`` y j >= i. Las tablas
+    de los pares de una fila se cuentan con un bincount por tanda de
+    columnas, con a lo sumo ``_BINCOUNT_MAX_CELLS`` celdas en total.
+    """
+    n, p = codes.shape
+    # Nulo = categoría 0, así no hace falta máscara: se descarta al final
+    width = (sizes + 1).astype(np.int32)
+    out = []
+    for i in rows:
+        js = np.arange(i, p)
+        cells = width[i].astype(np.int64) * width[js]
+        dense = js[cells <= _BINCOUNT_MAX_CELLS]
+        for batch in _cell_batches(cells[cells <= _BINCOUNT_MAX_CELLS], _BINCOUNT_MAX_CELLS):
+            cols = dense[batch]
+            # las claves caben en int32: la tanda tiene menos de 2^31 celdas
+            offsets = np.concatenate([[0], np.cumsum(width[i] * width[cols])]).astype(np.int32)
+            counts = np.zeros(offsets[-1], dtype=np.int64)
+            block = max(1, _BLOCK_CELLS // len(cols))
+            for start in range(0, n, block):
+                ci = codes[start:start + block, i].astype(np.int32) + 1
+                keys = codes[start:start + block][:, cols].astype(np.int32) + 1
+                keys += ci[:, None] * width[cols]
+                keys += offsets[:-1]
+                counts += np.bincount(keys.ravel(), minlength=offsets[-1])
+            for m, j in enumerate(cols):
+                table = counts[offsets[m]:offsets[m + 1]].reshape(width[i], width[j])
+                out.append((i, int(j), cramers_v_from_counts(table[1:, 1:])))
+        for j in js[cells > _BINCOUNT_MAX_CELLS]:
+            out.append((i, int(j), cramers_v_from_counts(_pair_table(codes[:, i], codes[:, j]))))
+        report(progress, len(out), _n_pairs(p), "Cramér's V", "pairs")
+    return out
+
+def _n_pairs(p: int) -> int:
+    """Pares (i, j) con j >= i de ``p`` columnas."""
+    return p * (p + 1) // 2
+
+def cramers_v_matrix(
+    codes: np.ndarray,
+    sizes: np.ndarray,
+    n_jobs: int = 1,
+    progress: Optional[ProgressCallback] = None,
+) -> np.ndarray:
+    """Matriz simétrica de Cramér’s V a partir de columnas factorizadas."""
+    p = codes.shape[1]
+    mat = np.zeros((p, p))
+    if n_jobs < 0:
+        n_jobs = os.cpu_count() or 1
+    if n_jobs > 1 and p >= CRAMERS_V_PARALLEL_MIN_COLUMNS:
+        # filas intercaladas: la fila i tiene p - i pares
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            futures = [
+                pool.submit(_cramers_v_rows, codes, sizes, list(range(w, p, n_jobs)))
+                for w in range(n_jobs)
+            ]
+            results = []
+            for future in as_completed(futures):
+                results.extend(future.result())
+                report(progress, len(results), _n_pairs(p), "Cramér's V", "pairs")
+    else:
+        results = _cramers_v_rows(codes, sizes, list(range(p)), progress)
+    for i, j, v in results:
+        mat[i, j] = mat[j, i] = v
+    return mat
+
+def compute_numeric_correlation_from_stats(stats: StreamingDatasetStats) -> pd.DataFrame:
+    """Matriz de Pearson a partir de los co-momentos acumulados por bloques."""
+    return stats.pearson()[0]
+
+def compute_pearson_with_target_from_stats(
+    stats: StreamingDatasetStats, target_col: str
+) -> pd.DataFrame:
+    """
+    Como ``compute_pearson_with_target`` pero desde los co-momentos
+    acumulados: solo se usa la fila del target, sin construir la matriz.
+    """
+    if target_col not in stats.columns:
+        raise KeyError(f"Target column '{target_col}' not found")
+    try:
+        r, n = stats.pearson_target(target_col)
+    except KeyError:
+        raise KeyError(f"Target column '{target_col}' is not numeric")
+    # Como en compute_pearson_with_target, las bool solo cuentan como target
+    features = r.index.intersection(stats.numeric_columns, sort=False)
+    r, n = r[features], n[features]
+    return pd.DataFrame({'correlation': r, 'p_value': pearson_p_values(r, n, method="t")}, index=r.index)
+
+def compute_categorical_correlation_from_stats(
+    stats: StreamingDatasetStats,
+    progress: Optional[ProgressCallback] = None,
+) -> pd.DataFrame:
+    """Matriz de Cramér’s V a partir de las tablas de contingencia acumuladas."""
+    cols = stats.categorical_columns
+    mat = np.zeros((len(cols), len(cols)))
+    total = _n_pairs(len(cols))
+    for k, (i, j) in enumerate(itertools.combinations_with_replacement(range(len(cols)), 2), 1):
+        mat[i, j] = mat[j, i] = cramers_v_from_counts(
+            stats.contingency_table(cols[i], cols[j])
+        )
+        if j == len(cols) - 1:
+            report(progress, k, total, "Cramér's V", "pairs")
+    return pd.DataFrame(mat, index=cols, columns=cols)
\ No newline at end of file
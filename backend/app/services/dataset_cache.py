@@ -0,0 +1,459 @@
+"""
+Content-addressed registry of uploaded datasets.
+
+An upload is identified by the SHA-256 of its bytes. The first time a
+content hash is seen the CSV is streamed twice: once into
+``StreamingDatasetStats`` and once into a columnar ``.npy`` store
+(memory-mappable, one file per column). Both live in a directory named
+after the hash, next to a ``results/`` folder where analyses memoize
+intermediate results (schemas, MI scores, correlation matrices) keyed by
+their parameters. Re-uploading the same file, or passing its
+``dataset_id``, skips parsing; changing a threshold only re-filters the
+cached scores. Co-moments are accumulated while parsing unless the
+dataset is wider than ``INGEST_MAX_MOMENT_COLUMNS`` columns; contingency
+tables never are. Correlations they would have given are computed from
+the column store, a block of columns at a time.
+
+Uploads may be CSV (plain, gzip or zstd), Parquet or Feather/Arrow IPC.
+Registering only some columns or only the rows matching a filter reads
+just those from the file; the result is a dataset of its own, whose id
+also depends on the projection.
+
+A new partition of a cached dataset (``DatasetRegistry.append``) is
+registered on its own and its statistics are merged into those of the
+dataset, under a new id: the earlier rows are not parsed again and the
+column store reads the partitions one after another.
+
+Directories are evicted least-recently-used first once the cache exceeds
+``DATASET_CACHE_MAX_BYTES``.
+"""
+import hashlib
+import json
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import cached_property
+from typing import IO, Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import (
+    DATASET_CACHE_DIR,
+    DATASET_CACHE_MAX_BYTES,
+    DATASET_CACHE_MEMORY_ENTRIES,
+    INGEST_MAX_MOMENT_COLUMNS,
+)
+from app.core.metrics import span
+from app.services.streaming_stats import StreamingDatasetStats, profile_csv
+from app.utils.file_utils import RowFilter, detect_format, iter_chunks
+
+T = TypeVar("T")
+
+_DATASET_ID = re.compile(r"^[0-9a-f]{64}$")
+_HASH_BLOCK_BYTES = 1024 * 1024
+
+
+def hash_stream(source: IO) -> str:
+    """SHA-256 of a binary stream, read in blocks; the stream is rewound."""
+    digest = hashlib.sha256()
+    source.seek(0)
+    for block in iter(lambda: source.read(_HASH_BLOCK_BYTES), b""):
+        digest.update(block)
+    source.seek(0)
+    return digest.hexdigest()
+
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def write_columns(stats: StreamingDatasetStats, chunks: Iterable[pd.DataFrame], directory: str) -> Dict[str, str]:
+    """
+    Write every column of the dataset, typed as in ``stats``, to
+    ``directory/columns``. Returns the storage layout per column:
+
+    - ``values``: numeric/bool ``.npy`` of length ``n_rows``;
+    - ``codes``: int32 codes (-1 = missing) plus the raw categories;
+    - ``utf8``: concatenated UTF-8 bytes plus int64 offsets and a null mask.
+    """
+    col_dir = os.path.join(directory, "columns")
+    os.makedirs(col_dir, exist_ok=True)
+    n = stats.n_rows
+    layout: Dict[str, str] = {}
+    writers: List[Dict[str, Any]] = []
+    for i, col in enumerate(stats.columns):
+        acc = stats.accumulators[col]
+        base = os.path.join(col_dir, str(i))
+        if acc.kind in ("numeric", "bool"):
+            layout[col] = "values"
+            writers.append({"values": np.lib.format.open_memmap(
+                base + ".npy", mode="w+", dtype=acc.dtype, shape=(n,)
+            )})
+        elif acc.exact_counts:
+            layout[col] = "codes"
+            categories = acc.raw_categories
+            np.save(base + ".categories.npy", categories.to_numpy(dtype=object), allow_pickle=True)
+            writers.append({
+                "codes": np.lib.format.open_memmap(base + ".npy", mode="w+", dtype=np.int32, shape=(n,)),
+                "categories": categories,
+            })
+        else:
+            layout[col] = "utf8"
+            writers.append({
+                "bytes": open(base + ".bytes", "wb"),
+                "offsets": np.lib.format.open_memmap(
+                    base + ".offsets.npy", mode="w+", dtype=np.int64, shape=(n + 1,)
+                ),
+                "nulls": np.lib.format.open_memmap(base + ".nulls.npy", mode="w+", dtype=bool, shape=(n,)),
+                "position": 0,
+            })
+
+    start = 0
+    try:
+        for chunk in chunks:
+            stop = start + len(chunk)
+            for col, writer in zip(stats.columns, writers):
+                raw = chunk[col]
+                if "values" in writer:
+                    writer["values"][start:stop] = stats.accumulators[col].convert(raw).to_numpy()
+                elif "codes" in writer:
+                    writer["codes"][start:stop] = writer["categories"].get_indexer(raw)
+                else:
+                    nulls = raw.isna().to_numpy()
+                    encoded = [b"" if null else str(v).encode("utf-8") for v, null in zip(raw, nulls)]
+                    lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+                    writer["offsets"][start + 1:stop + 1] = writer["position"] + np.cumsum(lengths)
+                    writer["position"] += int(lengths.sum())
+                    writer["nulls"][start:stop] = nulls
+                    writer["bytes"].write(b"".join(encoded))
+            start = stop
+    finally:
+        for writer in writers:
+            if "bytes" in writer:
+                writer["bytes"].close()
+            for key in ("values", "codes", "offsets", "nulls"):
+                if key in writer:
+                    writer[key].flush()
+    return layout
+
+
+def _write_entry(directory: str, dataset_id: str, stats: StreamingDatasetStats, **meta: Any) -> None:
+    with open(os.path.join(directory, "stats.pkl"), "wb") as f:
+        pickle.dump(stats, f, protocol=pickle.HIGHEST_PROTOCOL)
+    with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "dataset_id": dataset_id,
+            "columns": stats.columns,
+            "n_rows": stats.n_rows,
+            "dtypes": stats.dtypes.to_dict(),
+            **meta,
+        }, f)
+
+
+class DatasetEntry:
+    """One cached dataset: its statistics, column store and memoized results."""
+
+    def __init__(self, registry: "DatasetRegistry", dataset_id: str):
+        self.registry = registry
+        self.dataset_id = dataset_id
+        self.path = os.path.join(registry.root, dataset_id)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Sent to worker processes: stats and meta are reloaded from disk there
+        return {"registry": self.registry, "dataset_id": self.dataset_id, "path": self.path}
+
+    @cached_property
+    def meta(self) -> Dict[str, Any]:
+        with open(os.path.join(self.path, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    @cached_property
+    def stats(self) -> StreamingDatasetStats:
+        with open(os.path.join(self.path, "stats.pkl"), "rb") as f:
+            return pickle.load(f)
+
+    @property
+    def columns(self) -> List[str]:
+        return self.meta["columns"]
+
+    @property
+    def partitions(self) -> List[str]:
+        """Ids of the datasets whose rows this one concatenates (itself if uploaded whole)."""
+        return self.meta.get("partitions", [self.dataset_id])
+
+    def load_column(self, col: str, n_rows: Optional[int] = None) -> pd.Series:
+        """
+        Column typed as ``pd.read_csv`` would type it (first ``n_rows`` only
+        if given); numeric data is memory-mapped.
+        """
+        if "partitions" in self.meta:
+            return self._load_partitioned_column(col, n_rows)
+        i = self.columns.index(col)
+        base = os.path.join(self.path, "columns", str(i))
+        layout = self.meta["layout"][col]
+        rows = slice(None, n_rows)
+        if layout == "values":
+            return pd.Series(np.load(base + ".npy", mmap_mode="r")[rows], name=col)
+        if layout == "codes":
+            codes = np.load(base + ".npy", mmap_mode="r")[rows]
+            raw = pd.Series(np.load(base + ".categories.npy", allow_pickle=True), dtype=object)
+            categories = self.stats.accumulators[col].convert(raw).to_numpy(dtype=object)
+            values = np.where(codes >= 0, categories[np.maximum(codes, 0)], np.nan)
+            return pd.Series(values, dtype=object, name=col)
+        offsets = np.load(base + ".offsets.npy", mmap_mode="r")[:None if n_rows is None else n_rows + 1]
+        nulls = np.load(base + ".nulls.npy", mmap_mode="r")[rows]
+        with open(base + ".bytes", "rb") as f:
+            buffer = f.read(int(offsets[-1]))
+        values = [
+            np.nan if null else buffer[a:b].decode("utf-8")
+            for a, b, null in zip(offsets[:-1], offsets[1:], nulls)
+        ]
+        return pd.Series(values, dtype=object, name=col)
+
+    def _load_partitioned_column(self, col: str, n_rows: Optional[int]) -> pd.Series:
+        # KeyError if a partition was evicted; the merged statistics remain usable
+        parts, remaining = [], n_rows
+        for dataset_id in self.meta["partitions"]:
+            if remaining is not None and remaining <= 0:
+                break
+            part = self.registry.get(dataset_id).load_column(col, remaining)
+            parts.append(part)
+            if remaining is not None:
+                remaining -= len(part)
+        values = pd.concat(parts, ignore_index=True)
+        kind = self.stats.accumulators[col].kind
+        if kind == "numeric":
+            return values.astype(self.stats.accumulators[col].dtype)
+        return values.astype(bool if kind == "bool" else object)
+
+    def load_frame(self, columns: Optional[List[str]] = None, n_rows: Optional[int] = None) -> pd.DataFrame:
+        columns = self.columns if columns is None else columns
+        return pd.DataFrame({col: self.load_column(col, n_rows) for col in columns}, columns=columns)
+
+    def load_matrix(self, columns: List[str]) -> np.ndarray:
+        """Numeric or bool ``columns`` as float64 (n_rows x len(columns), NaN = missing, bool as 0/1)."""
+        matrix = np.empty((self.meta["n_rows"], len(columns)))
+        for j, col in enumerate(columns):
+            matrix[:, j] = self.load_column(col).to_numpy(dtype=np.float64, na_value=np.nan)
+        return matrix
+
+    def load_codes(self, columns: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        int32 codes (n_rows x len(columns), -1 = missing) and number of
+        categories per column. ``codes`` columns are copied as stored, one
+        at a time; the rest (and partitioned datasets) are factorized.
+        """
+        codes = np.empty((self.meta["n_rows"], len(columns)), dtype=np.int32)
+        sizes = np.empty(len(columns), dtype=np.int64)
+        for j, col in enumerate(columns):
+            if "partitions" not in self.meta and self.meta["layout"][col] == "codes":
+                base = os.path.join(self.path, "columns", str(self.columns.index(col)))
+                codes[:, j] = np.load(base + ".npy", mmap_mode="r")
+                sizes[j] = len(np.load(base + ".categories.npy", allow_pickle=True))
+            else:
+                c, uniques = pd.factorize(self.load_column(col))
+                codes[:, j] = c
+                sizes[j] = len(uniques)
+        return codes, sizes
+
+    def memo(self, key: str, compute: Callable[[], T]) -> T:
+        """
+        Result of ``compute`` cached on disk under ``key`` (which should
+        encode every parameter the result depends on).
+        """
+        result_dir = os.path.join(self.path, "results")
+        path = os.path.join(result_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".pkl")
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            pass
+        value = compute()
+        os.makedirs(result_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=result_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self.registry.evict(keep=self.dataset_id)
+        return value
+
+
+class DatasetRegistry:
+    """
+    Datasets cached under ``root`` by content hash, with an in-memory LRU
+    of the most recently used entries and an on-disk LRU byte budget.
+    """
+
+    def __init__(
+        self,
+        root: str = DATASET_CACHE_DIR,
+        max_bytes: int = DATASET_CACHE_MAX_BYTES,
+        memory_entries: int = DATASET_CACHE_MEMORY_ENTRIES,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self._entries: "OrderedDict[str, DatasetEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"], state["_entries"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(
+        self,
+        source: IO,
+        columns: Optional[Sequence[str]] = None,
+        row_filter: Optional[RowFilter] = None,
+    ) -> Tuple[DatasetEntry, bool]:
+        """
+        Add an uploaded file (binary, seekable stream). Returns the entry and
+        whether it was newly created (False when the content was cached).
+        With ``columns`` / ``row_filter`` only that part of the file is read
+        and cached, under an id derived from the content and the projection.
+
+        Co-moments are accumulated up to ``INGEST_MAX_MOMENT_COLUMNS``
+        columns; contingency tables never are. Whatever is missing is
+        computed from the column store when an analysis needs it.
+        """
+        with span("hash"):
+            dataset_id = hash_stream(source)
+        projection = None
+        if columns is not None or row_filter:
+            projection = {"columns": list(columns) if columns is not None else None,
+                          "row_filter": [list(c) for c in row_filter or ()]}
+            spec = json.dumps(projection, sort_keys=True, default=str)
+            dataset_id = hashlib.sha256(f"{dataset_id}|{spec}".encode("utf-8")).hexdigest()
+        if os.path.isdir(os.path.join(self.root, dataset_id)):
+            return self.get(dataset_id), False
+
+        def build(directory: str) -> None:
+            fmt, compression = detect_format(source)
+            with span("parse"):
+                stats = profile_csv(
+                    source, columns=columns, row_filter=row_filter, contingency=False,
+                    max_moment_columns=INGEST_MAX_MOMENT_COLUMNS,
+                )
+            source.seek(0)
+            with span("column_store"):
+                layout = write_columns(stats, iter_chunks(source, columns=columns, row_filter=row_filter), directory)
+            meta = {"layout": layout, "format": fmt, "compression": compression}
+            if projection is not None:
+                meta["projection"] = projection
+            _write_entry(directory, dataset_id, stats, **meta)
+
+        return self._create(dataset_id, build), True
+
+    def append(self, dataset_id: str, source: IO) -> Tuple[DatasetEntry, bool]:
+        """
+        Dataset made of ``dataset_id`` followed by the rows of ``source``
+        (a CSV with the same columns). The partition is registered on its
+        own and only its statistics are merged, so the earlier rows are not
+        read again. The new id depends on both ids; returns the entry and
+        whether it was newly created.
+        """
+        base = self.get(dataset_id)
+        part, _ = self.register(source)
+        combined_id = hashlib.sha256(f"{base.dataset_id}+{part.dataset_id}".encode("ascii")).hexdigest()
+        if os.path.isdir(os.path.join(self.root, combined_id)):
+            return self.get(combined_id), False
+        if part.columns != base.columns:
+            raise ValueError(
+                f"Partition columns {part.columns} do not match the dataset columns {base.columns}"
+            )
+
+        def build(directory: str) -> None:
+            # Fresh copy: the cached stats of the base entry stay untouched
+            with open(os.path.join(base.path, "stats.pkl"), "rb") as f:
+                stats = pickle.load(f)
+            stats.merge(part.stats)
+            _write_entry(directory, combined_id, stats, partitions=base.partitions + part.partitions)
+
+        return self._create(combined_id, build), True
+
+    def _create(self, dataset_id: str, build: Callable[[str], None]) -> DatasetEntry:
+        """Entry written by ``build`` into a temporary directory, then published atomically."""
+        tmp = tempfile.mkdtemp(dir=self.root, prefix=".tmp-")
+        try:
+            build(tmp)
+            os.rename(tmp, os.path.join(self.root, dataset_id))
+        except OSError:
+            # Another request registered the same content first
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not os.path.isdir(os.path.join(self.root, dataset_id)):
+                raise
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        self.evict(keep=dataset_id)
+        return self.get(dataset_id)
+
+    def get(self, dataset_id: str) -> DatasetEntry:
+        """Cached dataset by id; KeyError if unknown or evicted."""
+        if not _DATASET_ID.match(dataset_id or ""):
+            raise KeyError(dataset_id)
+        path = os.path.join(self.root, dataset_id)
+        with self._lock:
+            if not os.path.isdir(path):
+                self._entries.pop(dataset_id, None)
+                raise KeyError(dataset_id)
+            entry = self._entries.pop(dataset_id, None) or DatasetEntry(self, dataset_id)
+            self._entries[dataset_id] = entry
+            while len(self._entries) > self.memory_entries:
+                self._entries.popitem(last=False)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def evict(self, keep: Optional[str] = None) -> List[str]:
+        """Remove least-recently-used datasets until the cache fits its budget."""
+        with self._lock:
+            dirs = []
+            for name in os.listdir(self.root):
+                path = os.path.join(self.root, name)
+                if _DATASET_ID.match(name) and os.path.isdir(path):
+                    dirs.append((os.path.getmtime(path), name, _directory_size(path)))
+            total = sum(size for _, _, size in dirs)
+            evicted = []
+            for _, name, size in sorted(dirs):
+                if total <= self.max_bytes:
+                    break
+                if name == keep:
+                    continue
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+                self._entries.pop(name, None)
+                total -= size
+                evicted.append(name)
+            return evicted
+
+
+_registry: Optional[DatasetRegistry] = None
+
+
+def get_registry() -> DatasetRegistry:
+    """Process-wide registry configured from ``app.core.config``."""
+    global _registry
+    if _registry is None:
+        _registry = DatasetRegistry()
+    return _registry
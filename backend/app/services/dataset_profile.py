@@ -0,0 +1,367 @@
+"""
+Shared per-dataset profile for running several analyses over a single parse.
+
+``DatasetProfile`` wraps the ``StreamingDatasetStats`` of one upload and
+memoizes what more than one analysis needs (dtypes, inferred schema, value
+and null counts, correlations), so schema, correlations, leaks, class
+balance and problem columns can all be answered from one pass over the CSV.
+
+Pearson correlations come from the co-moments when they were accumulated
+and otherwise from the dataset's column store (``store``), block by block.
+"""
+import time
+from contextlib import contextmanager
+from functools import cached_property
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
+
+import pandas as pd
+
+from app.core.config import MI_N_JOBS
+from app.core.metrics import span
+from app.core.progress import ProgressCallback, prefixed, report
+from app.schema_inference.infer import ColumnTypeInferer
+from app.services.dataset_cache import DatasetEntry, get_registry
+from app.services.streaming_stats import StreamingDatasetStats, profile_csv
+from app.services.correlation_service import (
+    compute_numeric_correlation_from_stats,
+    compute_pearson_with_target_from_stats,
+    compute_categorical_correlation_from_stats,
+    cramers_v_matrix,
+    pearson_matrix_by_blocks,
+    pearson_p_values,
+    pearson_with_target_by_blocks,
+)
+from app.services.leak_detection import (
+    compute_mi,
+    detect_data_leaks_from_stats,
+    target_correlations_from_stats,
+)
+from app.services.evaluate_class_balance import evaluate_class_balance_from_stats
+from app.services.detect_problematic_columns import (
+    detect_feature_pairs_high_corr_from_entry,
+    detect_feature_pairs_high_corr_from_stats,
+    detect_problem_columns_from_stats,
+)
+from app.services.shap_analysis import shap_importance
+
+T = TypeVar("T")
+
+# Correlated pairs read from the column store are memoized once from this
+# |r| and filtered for each requested threshold
+PAIR_CORR_MEMO_FLOOR = 0.5
+
+
+class DatasetProfile:
+    """
+    Lazily computed, shared view of one dataset. ``timings`` records the
+    seconds spent in each stage (the parse and each analysis). ``memo``
+    caches expensive intermediate results by key; pass a
+    ``DatasetEntry.memo`` to persist them across requests. ``store`` is the
+    cached dataset the statistics belong to, read when the statistics lack
+    the co-moments.
+    """
+
+    def __init__(
+        self,
+        stats: StreamingDatasetStats,
+        timings: Optional[Dict[str, float]] = None,
+        memo: Optional[Callable[[str, Callable[[], Any]], Any]] = None,
+        store: Optional[DatasetEntry] = None,
+    ):
+        self.stats = stats
+        self.store = store
+        self.timings: Dict[str, float] = dict(timings or {})
+        self._memo = memo
+        self._results: Dict[str, Any] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            with span(name):
+                yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def memo(self, key: str, compute: Callable[[], T]) -> T:
+        if self._memo is not None:
+            return self._memo(key, compute)
+        if key not in self._results:
+            self._results[key] = compute()
+        return self._results[key]
+
+    @cached_property
+    def dtypes(self) -> pd.Series:
+        return self.stats.dtypes
+
+    @cached_property
+    def inferred_schema(self) -> Dict[str, Dict[str, str]]:
+        """Column types and the ``strftime`` format of DATE/TIMESTAMP columns."""
+        def infer() -> Dict[str, Dict[str, str]]:
+            inferer = ColumnTypeInferer()
+            inferred = inferer.infer_frame(self.stats.sample_frame())
+            return {
+                "schema": {col: col_type.value for col, col_type in inferred.items()},
+                "date_formats": dict(inferer.formats),
+            }
+        return self.memo("schema|date_formats", infer)
+
+    @property
+    def schema(self) -> Dict[str, str]:
+        return self.inferred_schema["schema"]
+
+    @property
+    def date_formats(self) -> Dict[str, str]:
+        return self.inferred_schema["date_formats"]
+
+    @cached_property
+    def frame(self) -> pd.DataFrame:
+        """Row sample with compact dtypes from the inferred schema."""
+        return self.stats.sample_frame(self.schema, self.date_formats)
+
+    def mi_scores(
+        self,
+        target_col: str,
+        discrete_target: bool,
+        progress: Optional[ProgressCallback] = None,
+        method: str = "knn",
+        max_error: float = 0.02,
+        n_jobs: int = MI_N_JOBS,
+    ) -> Union[pd.Series, pd.DataFrame]:
+        # n_jobs only changes how fast the scores are computed, not the key
+        key = f"mi_scores|{target_col}|{discrete_target}"
+        if method != "knn":
+            key += f"|{method}|{max_error}"
+        return self.memo(
+            key,
+            lambda: compute_mi(
+                self.frame, target_col, discrete_target, method, max_error, progress, n_jobs
+            ),
+        )
+
+    def feature_importance(
+        self,
+        target_col: str,
+        discrete_target: bool,
+        group_cols: Optional[List[str]] = None,
+        **options: Any,
+    ) -> Dict[str, Any]:
+        """``shap_importance`` on the row sample; model and contributions are memoized."""
+        return shap_importance(self.frame, target_col, discrete_target, group_cols, memo=self.memo, **options)
+
+    def categorical_correlation(self, progress: Optional[ProgressCallback] = None) -> pd.DataFrame:
+        """
+        Cramér's V of the categorical columns: from the codes of the column
+        store in one pass per column when there is one, otherwise from the
+        accumulated contingency tables.
+        """
+        def compute() -> pd.DataFrame:
+            if self.store is None:
+                return compute_categorical_correlation_from_stats(self.stats, progress)
+            cols = [
+                c for c, acc in self.stats.accumulators.items()
+                if acc.kind == "object" and acc.exact_counts
+            ]
+            codes, sizes = self.store.load_codes(cols)
+            return pd.DataFrame(cramers_v_matrix(codes, sizes, progress=progress), index=cols, columns=cols)
+        return self.memo("categorical_corr", compute)
+
+    @cached_property
+    def null_counts(self) -> pd.Series:
+        return pd.Series(
+            {col: acc.null_count for col, acc in self.stats.accumulators.items()},
+            dtype="int64",
+        )
+
+    def value_counts(self, col: str) -> Optional[pd.Series]:
+        return self.stats.accumulators[col].value_counts()
+
+    def _from_store(self) -> bool:
+        return not self.stats.has_moments and self.store is not None
+
+    def _store_pearson_target(
+        self, target_col: str, progress: Optional[ProgressCallback] = None
+    ) -> Tuple[pd.Series, pd.Series]:
+        """(r, n) of each numeric and bool column with ``target_col``, from the column store."""
+        features = [col for col in self.stats.pearson_columns if col != target_col]
+        return self.memo(
+            f"target_pearson|{target_col}",
+            lambda: pearson_with_target_by_blocks(
+                features, target_col, self.store.load_matrix, self.stats.n_rows, progress=progress
+            ),
+        )
+
+    def numeric_correlation(self) -> pd.DataFrame:
+        """Pairwise-complete Pearson matrix of the numeric columns."""
+        if not self._from_store():
+            return compute_numeric_correlation_from_stats(self.stats)
+        return self.memo(
+            "numeric_corr",
+            lambda: pearson_matrix_by_blocks(self.stats.numeric_columns, self.store.load_matrix, self.stats.n_rows),
+        )
+
+    def pearson_target(self, target_col: str, progress: Optional[ProgressCallback] = None) -> pd.DataFrame:
+        """Pearson (and p-value) of each numeric column with ``target_col``."""
+        if not self._from_store():
+            return compute_pearson_with_target_from_stats(self.stats, target_col)
+        if target_col not in self.stats.columns:
+            raise KeyError(f"Target column '{target_col}' not found")
+        if target_col not in self.stats.pearson_columns:
+            raise KeyError(f"Target column '{target_col}' is not numeric")
+        r, n = self._store_pearson_target(target_col, progress)
+        # As with the co-moments, bool columns only count as the target
+        features = r.index.intersection(self.stats.numeric_columns, sort=False)
+        r, n = r[features], n[features]
+        return pd.DataFrame({"correlation": r, "p_value": pearson_p_values(r, n, method="t")}, index=features)
+
+    def target_correlations(self, target_col: str) -> pd.Series:
+        """Pearson of each numeric or bool feature with the target (empty if it is neither)."""
+        if not self._from_store():
+            return target_correlations_from_stats(self.stats, target_col)
+        if self.stats.accumulators[target_col].kind == "object":
+            return pd.Series(dtype=float)
+        return self._store_pearson_target(target_col)[0]
+
+    def feature_pair_correlations(
+        self, threshold: float, progress: Optional[ProgressCallback] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Pairs of numeric columns with |Pearson| >= ``threshold``. From the
+        column store the search runs once at ``PAIR_CORR_MEMO_FLOOR`` and
+        higher thresholds only filter its pairs.
+        """
+        if not self._from_store():
+            return detect_feature_pairs_high_corr_from_stats(self.stats, threshold)
+        floor = min(threshold, PAIR_CORR_MEMO_FLOOR)
+        key = "corr_pairs" if floor == PAIR_CORR_MEMO_FLOOR else f"corr_pairs|{floor}"
+        pairs = self.memo(key, lambda: detect_feature_pairs_high_corr_from_entry(self.store, floor, progress))
+        return [pair for pair in pairs if pair["corr_coeff"] >= threshold]
+
+
+def _schema(profile: DatasetProfile, params: Dict[str, Any]) -> Dict[str, Any]:
+    return dict(profile.inferred_schema)
+
+
+def _correlation(profile: DatasetProfile, params: Dict[str, Any]) -> Dict[str, Any]:
+    resp: Dict[str, Any] = {"numeric_corr": profile.numeric_correlation().round(3).to_dict()}
+    target = params.get("target_col")
+    if target:
+        pt = profile.pearson_target(target, params.get("progress"))
+        resp["pearson_target"] = pt.round(3).to_dict(orient="index")
+    resp["categorical_corr"] = profile.categorical_correlation(params.get("progress")).round(3).to_dict()
+    return resp
+
+
+def _leaks(profile: DatasetProfile, params: Dict[str, Any]) -> Dict[str, Any]:
+    target = params["target_col"]
+    discrete = params.get("discrete_target", False)
+    return detect_data_leaks_from_stats(
+        profile.stats,
+        target,
+        corr_threshold=params.get("corr_threshold", 0.95),
+        mi_threshold=params.get("mi_threshold", 0.5),
+        discrete_target=discrete,
+        mi_scores=profile.mi_scores(
+            target,
+            discrete,
+            params.get("progress"),
+            params.get("mi_method", "knn"),
+            params.get("mi_max_error", 0.02),
+            params.get("mi_n_jobs", MI_N_JOBS),
+        ),
+        target_correlations=profile.target_correlations(target),
+    )
+
+
+def _class_balance(profile: DatasetProfile, params: Dict[str, Any]) -> Dict[str, Any]:
+    return evaluate_class_balance_from_stats(
+        profile.stats, params["target_col"], params.get("imbalance_threshold", 0.1)
+    )
+
+
+def _problem_columns(profile: DatasetProfile, params: Dict[str, Any]) -> Dict[str, Any]:
+    threshold = params.get("corr_threshold", 0.95)
+    return detect_problem_columns_from_stats(
+        profile.stats,
+        threshold,
+        params.get("progress"),
+        pair_corr=profile.feature_pair_correlations(threshold, params.get("progress")),
+    )
+
+
+# name -> (function, needs target_col)
+ANALYSES: Dict[str, Any] = {
+    "schema": (_schema, False),
+    "correlation": (_correlation, False),
+    "leaks": (_leaks, True),
+    "class_balance": (_class_balance, True),
+    "problem_columns": (_problem_columns, False),
+}
+
+
+def stats_options(analyses: Iterable[str]) -> Dict[str, Any]:
+    """Accumulators that the selected analyses need from the single pass."""
+    selected = set(analyses)
+    return {
+        "moments": bool(selected & {"correlation", "leaks", "problem_columns"}),
+        "contingency": "correlation" in selected,
+        "sample_rows": None if selected & {"schema", "leaks"} else 0,
+    }
+
+
+def build_profile(source: Union[str, IO], analyses: Iterable[str]) -> DatasetProfile:
+    """Parse ``source`` once, accumulating only what ``analyses`` need."""
+    options = {k: v for k, v in stats_options(analyses).items() if v is not None}
+    start = time.perf_counter()
+    stats = profile_csv(source, **options)
+    return DatasetProfile(stats, timings={"parse": time.perf_counter() - start})
+
+
+def run_analyses(
+    profile: DatasetProfile,
+    analyses: Iterable[str],
+    progress: Optional[ProgressCallback] = None,
+    **params: Any,
+) -> Dict[str, Any]:
+    """
+    Run each selected analysis on the shared profile. Returns the results
+    keyed by analysis name plus the per-stage timings. ``progress`` gets
+    the services' progress prefixed with the running analysis.
+    """
+    analyses = list(analyses)
+    results: Dict[str, Any] = {}
+    for k, name in enumerate(analyses):
+        func, _ = ANALYSES[name]
+        report(progress, k, len(analyses), "Analyses")
+        with profile.stage(name):
+            results[name] = func(profile, {**params, "progress": prefixed(progress, f"{name}: ")})
+    report(progress, len(analyses), len(analyses), "Analyses")
+    return {"results": results, "timings": dict(profile.timings)}
+
+
+def run_dataset_analyses(
+    dataset_id: str,
+    analyses: Iterable[str],
+    progress: Optional[ProgressCallback] = None,
+    **params: Any,
+) -> Dict[str, Any]:
+    """``run_analyses`` over a dataset of the cache, memoizing on disk."""
+    start = time.perf_counter()
+    entry = get_registry().get(dataset_id)
+    profile = DatasetProfile(
+        entry.stats, timings={"load": time.perf_counter() - start}, memo=entry.memo, store=entry
+    )
+    target_col = params.get("target_col")
+    if target_col and target_col not in profile.stats.columns:
+        raise KeyError(f"Target column '{target_col}' not found in dataset")
+    return run_analyses(profile, analyses, progress, **params)
+
+
+def validate_analyses(analyses: List[str], target_col: Optional[str]) -> None:
+    """Raise ValueError for unknown analyses or a missing target column."""
+    unknown = [a for a in analyses if a not in ANALYSES]
+    if unknown:
+        raise ValueError(f"Unknown analyses: {unknown}. Available: {list(ANALYSES)}")
+    needs_target = [a for a in analyses if ANALYSES[a][1]]
+    if needs_target and not target_col:
+        raise ValueError(f"target_col is required for: {needs_target}")
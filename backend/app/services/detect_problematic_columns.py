@@ -1,6 +1,13 @@
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Dict, Any, Optional
+import numpy as np
 import pandas as pd
 
+from app.core.progress import ProgressCallback, report
+from app.services.correlation_service import threshold_correlation_pairs, threshold_correlation_pairs_by_blocks
+from app.services.dataset_cache import DatasetEntry
+from app.services.streaming_stats import StreamingDatasetStats
+
 def detect_constant_columns(df: pd.DataFrame) -> List[Dict[str, Any]]:
     """
     Detect columns with a single unique value.
@@ -35,33 +42,196 @@ def detect_id_columns(df: pd.DataFrame) -> List[Dict[str, Any]]:
     return results
 
 
+@lru_cache(maxsize=8)
+def _row_weights(n_rows: int) -> np.ndarray:
+    """Pseudo-random odd 64-bit weight per row (splitmix64 of the row number)."""
+    weights = np.arange(n_rows, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    weights ^= weights >> np.uint64(30)
+    weights *= np.uint64(0xBF58476D1CE4E5B9)
+    weights ^= weights >> np.uint64(27)
+    weights *= np.uint64(0x94D049BB133111EB)
+    weights ^= weights >> np.uint64(31)
+    return weights | np.uint64(1)
+
+
+def _value_bits(series: pd.Series) -> np.ndarray:
+    """
+    One uint64 per row such that equal values give equal bits. Numbers use
+    their own bits (-0.0 and NaN normalized); anything else is factorized so
+    each distinct value is hashed once.
+    """
+    values = series.to_numpy()
+    kind = values.dtype.kind
+    if kind == "f":
+        values = np.where(np.isnan(values), np.nan, values.astype(np.float64) + 0.0)
+        return values.view(np.uint64)
+    if kind in "biuMm":
+        return values.astype(np.int64, copy=False).view(np.uint64)
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    unique_hashes = pd.util.hash_array(np.asarray(uniques, dtype=object))
+    # Missing values (code -1) map to the last slot
+    return np.append(unique_hashes, np.uint64(0x9E3779B97F4A7C15))[codes]
+
+
+def column_hashes(df: pd.DataFrame) -> List[int]:
+    """
+    64-bit, order-aware hash of every column: the row-weighted sum (mod
+    2**64) of its value bits. Equal columns always get equal hashes; the
+    converse must be verified.
+    """
+    weights = _row_weights(len(df))
+    return [
+        int((_value_bits(df[col]) * weights).sum(dtype=np.uint64))
+        for col in df.columns
+    ]
+
+
+def identical_column_groups(df: pd.DataFrame) -> List[List[str]]:
+    """
+    Groups of two or more columns whose contents are identical
+    (``Series.equals``: same dtype, values and missing positions).
+    Columns are bucketed by dtype and hash, so only columns within a
+    bucket are compared: O(n·p) instead of O(n·p²).
+    """
+    buckets: Dict[Any, List[str]] = {}
+    for col, dtype, h in zip(df.columns, df.dtypes, column_hashes(df)):
+        buckets.setdefault((str(dtype), h), []).append(col)
+    groups = []
+    for candidates in buckets.values():
+        # Verify within the bucket to rule out hash collisions
+        while len(candidates) > 1:
+            first = df[candidates[0]]
+            same = [col for col in candidates if df[col].equals(first)]
+            if len(same) > 1:
+                groups.append(same)
+            candidates = [col for col in candidates if col not in same]
+    order = {col: i for i, col in enumerate(df.columns)}
+    return sorted(groups, key=lambda group: order[group[0]])
+
+
+def duplicate_problems(groups: List[List[str]]) -> List[Dict[str, Any]]:
+    """
+    Problem entries for every column that repeats an earlier one.
+    """
+    return [
+        {"feature": col, "type": "duplicate", "details": f"Identical to '{group[0]}'"}
+        for group in groups
+        for col in group[1:]
+    ]
+
+
+def detect_duplicate_columns(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Detect columns identical to an earlier column.
+    """
+    return duplicate_problems(identical_column_groups(df))
+
+
 def detect_feature_pairs_high_corr(
     df: pd.DataFrame,
-    threshold: float = 0.95
+    threshold: float = 0.95,
+    progress: Optional[ProgressCallback] = None
 ) -> List[Dict[str, Any]]:
     """
     Detect pairs of numeric features with Pearson correlation above threshold.
+    Correlations are computed in column blocks and only the pairs above
+    the threshold are kept, so memory does not grow with p².
     """
-    results = []
     nums = df.select_dtypes(include=["number"]).columns
-    corr_matrix = df[nums].corr().abs()
-    for i, col1 in enumerate(nums):
-        for col2 in nums[i+1:]:
-            if corr_matrix.loc[col1, col2] >= threshold:
-                results.append({"feature_pair": (col1, col2), "type": "high_feature_corr", "corr_coeff": corr_matrix.loc[col1, col2]})
-    return results
+    rows, cols, values = threshold_correlation_pairs(
+        df[nums].to_numpy(dtype=np.float64), threshold, progress=progress
+    )
+    return [
+        {"feature_pair": (nums[i], nums[j]), "type": "high_feature_corr", "corr_coeff": abs(r)}
+        for i, j, r in zip(rows, cols, values)
+    ]
 
 def detect_problem_columns(
     df: pd.DataFrame,
-    corr_threshold: float = 0.95
+    corr_threshold: float = 0.95,
+    progress: Optional[ProgressCallback] = None
 ) -> Dict[str, Any]:
     """
-    Identify problematic columns: constants, empty, ID-like, and highly correlated pairs.
+    Identify problematic columns: constants, empty, ID-like, duplicates and
+    highly correlated pairs.
     """
     problems = []
-    problems.extend(detect_constant_columns(df))
-    problems.extend(detect_empty_columns(df))
-    problems.extend(detect_id_columns(df))
-    pair_corr = detect_feature_pairs_high_corr(df, corr_threshold)
+    checks = [detect_constant_columns, detect_empty_columns, detect_id_columns, detect_duplicate_columns]
+    for done, check in enumerate(checks):
+        report(progress, done, len(checks) + 1, "Problem column checks")
+        problems.extend(check(df))
+    report(progress, len(checks), len(checks) + 1, "Problem column checks")
+    pair_corr = detect_feature_pairs_high_corr(df, corr_threshold, progress)
     problems.extend(pair_corr)
-    return {"problems": problems, "summary": {"n_problems": len(problems)}}
\ No newline at end of file
+    return {"problems": problems, "summary": {"n_problems": len(problems)}}
+
+
+def detect_feature_pairs_high_corr_from_stats(
+    stats: StreamingDatasetStats,
+    threshold: float = 0.95
+) -> List[Dict[str, Any]]:
+    """
+    Same pairs as ``detect_feature_pairs_high_corr`` from the co-moments,
+    evaluated block by block without building the Pearson matrix.
+    """
+    nums = stats.numeric_columns
+    return [
+        {"feature_pair": (nums[i], nums[j]), "type": "high_feature_corr", "corr_coeff": abs(r)}
+        for i, j, r in zip(*stats.correlated_pairs(threshold))
+    ]
+
+
+def detect_feature_pairs_high_corr_from_entry(
+    entry: DatasetEntry,
+    threshold: float = 0.95,
+    progress: Optional[ProgressCallback] = None
+) -> List[Dict[str, Any]]:
+    """
+    Same pairs as ``detect_feature_pairs_high_corr`` over every row of a
+    cached dataset, reading two blocks of numeric columns at a time.
+    """
+    nums = entry.stats.numeric_columns
+    rows, cols, values = threshold_correlation_pairs_by_blocks(
+        nums, entry.load_matrix, entry.meta["n_rows"], threshold, progress=progress
+    )
+    return [
+        {"feature_pair": (nums[i], nums[j]), "type": "high_feature_corr", "corr_coeff": abs(r)}
+        for i, j, r in zip(rows, cols, values)
+    ]
+
+
+def detect_problem_columns_from_stats(
+    stats: StreamingDatasetStats,
+    corr_threshold: float = 0.95,
+    progress: Optional[ProgressCallback] = None,
+    pair_corr: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Same checks as ``detect_problem_columns`` from streamed accumulators.
+    Distinct counts are exact up to ``INGEST_MAX_CATEGORIES`` values per
+    column and HyperLogLog estimates beyond, so ID detection on very
+    high-cardinality columns allows the sketch's relative error.
+    Correlated pairs come from the co-moments, block by block, unless
+    precomputed ``pair_corr`` (``detect_feature_pairs_high_corr``) are given.
+    """
+    n_rows = stats.n_rows
+    constant, empty, ids = [], [], []
+    for col in stats.columns:
+        acc = stats.accumulators[col]
+        n_unique = acc.n_unique + (1 if acc.null_count else 0)
+        if n_unique <= 1:
+            constant.append({"feature": col, "type": "constant", "details": "Only one unique value"})
+        if acc.null_count == n_rows:
+            empty.append({"feature": col, "type": "empty", "details": "All values missing"})
+        # Within three standard errors of the sketch (exact: equality)
+        if abs(n_unique - n_rows) <= 3 * acc.n_unique_error * n_rows:
+            ids.append({"feature": col, "type": "id", "details": f"Unique values equals row count ({n_rows})"})
+
+    report(progress, 1, 2, "Problem column checks")
+    if pair_corr is None:
+        pair_corr = detect_feature_pairs_high_corr_from_stats(stats, corr_threshold)
+
+    duplicates = duplicate_problems(stats.identical_column_groups())
+    report(progress, 2, 2, "Problem column checks")
+    problems = constant + empty + ids + duplicates + pair_corr
+    return {"problems": problems, "summary": {"n_problems": len(problems)}}
@@ -1,6 +1,8 @@
 import pandas as pd
 from typing import List, Dict, Any, Union
 
+from app.services.streaming_stats import StreamingDatasetStats
+
 def evaluate_class_balance(
     df: pd.DataFrame,
     target_col: str,
@@ -13,7 +15,34 @@ def evaluate_class_balance(
     imbalance_threshold: max allowed difference from uniform distribution.
     """
     counts = df[target_col].value_counts().to_dict()
-    total = len(df)
+    return class_balance_from_counts(counts, len(df), imbalance_threshold)
+
+
+def evaluate_class_balance_from_stats(
+    stats: StreamingDatasetStats,
+    target_col: str,
+    imbalance_threshold: float = 0.1
+) -> Dict[str, Union[Dict[str, Any], float, str]]:
+    """
+    Same as ``evaluate_class_balance`` using the value counts accumulated
+    while streaming the dataset.
+    """
+    counts = stats.accumulators[target_col].value_counts()
+    if counts is None:
+        raise ValueError(
+            f"Target column '{target_col}' has too many distinct values to evaluate class balance"
+        )
+    return class_balance_from_counts(counts.to_dict(), stats.n_rows, imbalance_threshold)
+
+
+def class_balance_from_counts(
+    counts: Dict[Any, int],
+    total: int,
+    imbalance_threshold: float = 0.1
+) -> Dict[str, Union[Dict[str, Any], float, str]]:
+    """
+    Proportions and imbalance status from per-class counts.
+    """
     proportions = {cls: cnt / total for cls, cnt in counts.items()}
     num_classes = len(counts)
     ideal = 1 / num_classes
@@ -1,72 +1,173 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Union
+import numpy as np
 import pandas as pd
-from sklearn.feature_selection import mutual_info_classif, mutual_info_regression
+
+from app.core.progress import ProgressCallback, report
+from app.services.correlation_service import threshold_correlation_pairs
+from app.services.detect_problematic_columns import identical_column_groups
+from app.services.mutual_information import estimate_mi
+from app.services.streaming_stats import StreamingDatasetStats
 
 
 def detect_identical(df: pd.DataFrame, target_col: str) -> List[Dict[str, Any]]:
     """
     Detect columns identical to the target.
     Returns a list of dicts with feature name and detail.
+    Columns are matched by hash buckets and verified with ``Series.equals``.
     """
-    results = []
-    target = df[target_col]
-    for col in df.columns:
-        if col == target_col:
-            continue
-        if df[col].equals(target):
-            results.append({
-                "feature": col,
-                "type": "identical",
-                "details": "100% equal to target"
-            })
-    return results
+    if target_col not in df.columns:
+        raise KeyError(target_col)
+    for group in identical_column_groups(df):
+        if target_col in group:
+            return identical_leaks([col for col in group if col != target_col])
+    return []
 
 
 def detect_high_corr(df: pd.DataFrame, target_col: str, threshold: float = 0.95) -> List[Dict[str, Any]]:
     """
     Detect numeric columns with Pearson correlation above threshold.
+    Uses the blockwise thresholded pair search with the target as the only
+    query column; bool columns count as 0/1 and a non-numeric target has
+    no correlations.
     """
-    results = []
-    target = df[target_col]
-    for col in df.select_dtypes(include=["number"]).columns:
-        if col == target_col:
-            continue
-        corr = df[col].corr(target)
-        if abs(corr) >= threshold:
-            results.append({
-                "feature": col,
-                "type": "high_corr",
-                "corr_coeff": corr
-            })
-    return results
+    nums = pd.Index([
+        col for col in df.columns
+        if pd.api.types.is_numeric_dtype(df[col]) or pd.api.types.is_bool_dtype(df[col])
+    ])
+    if target_col not in nums:
+        return []
+    target_idx = nums.get_loc(target_col)
+    _, cols, values = threshold_correlation_pairs(
+        df[nums].to_numpy(dtype=np.float64), threshold, query=np.array([target_idx])
+    )
+    return [
+        {"feature": nums[j], "type": "high_corr", "corr_coeff": r}
+        for j, r in zip(cols, values)
+    ]
 
 
-def detect_high_mi(
+# Features per mutual information call when reporting progress
+MI_PROGRESS_BATCH = 20
+# "knn": sklearn estimators on numeric features and all rows;
+# "binned": approximate histogram MI on a subsample, with confidence intervals
+MI_METHODS = ("knn", "binned")
+
+
+def compute_mi_scores(
     df: pd.DataFrame,
     target_col: str,
-    threshold: float = 0.5,
-    discrete_target: bool = False
-) -> List[Dict[str, Any]]:
+    discrete_target: bool = False,
+    progress: Optional[ProgressCallback] = None,
+    n_jobs: int = 1
+) -> pd.Series:
     """
-    Detect features with high mutual information with the target.
+    Mutual information of every numeric feature with the target.
     Use appropriate MI function depending on target type.
+    With ``progress``, features are scored in batches and reported as
+    "MI: done/total features". ``n_jobs`` is passed to sklearn (-1 = all CPUs).
     """
-    results = []
-    X = df.drop(columns=[target_col])
+    # sklearn is imported on first use: it dominates the import time of the app
+    from sklearn.feature_selection import mutual_info_classif, mutual_info_regression
+
+    X = df.drop(columns=[target_col]).select_dtypes(include=["number"])
     y = df[target_col]
     # Determine MI function based on target type
-    if discrete_target:
-        mi = mutual_info_classif(X.select_dtypes(include=["number"]), y)
+    mi_func = mutual_info_classif if discrete_target else mutual_info_regression
+    if progress is None:
+        mi = mi_func(X, y, n_jobs=n_jobs)
     else:
-        mi = mutual_info_regression(X.select_dtypes(include=["number"]), y)
-    for idx, col in enumerate(X.select_dtypes(include=["number"]).columns):
-        if mi[idx] >= threshold:
-            results.append({
-                "feature": col,
-                "type": "high_mi",
-                "mi_score": mi[idx]
-            })
-    return results
+        # MI is estimated independently per feature, so batching is equivalent
+        mi = np.empty(X.shape[1])
+        report(progress, 0, X.shape[1], "MI", "features")
+        for start in range(0, X.shape[1], MI_PROGRESS_BATCH):
+            stop = min(start + MI_PROGRESS_BATCH, X.shape[1])
+            mi[start:stop] = mi_func(X.iloc[:, start:stop], y, n_jobs=n_jobs)
+            report(progress, stop, X.shape[1], "MI", "features")
+    return pd.Series(mi, index=X.columns, dtype=float)
+
+
+def compute_mi(
+    df: pd.DataFrame,
+    target_col: str,
+    discrete_target: bool = False,
+    method: str = "knn",
+    max_error: float = 0.02,
+    progress: Optional[ProgressCallback] = None,
+    n_jobs: int = 1
+) -> Union[pd.Series, pd.DataFrame]:
+    """
+    MI scores with the chosen method: a Series for "knn", a frame with
+    ``mi``, ``ci_low`` and ``ci_high`` for "binned" (see ``estimate_mi``).
+    ``n_jobs`` spreads the features over that many workers (-1 = all CPUs).
+    """
+    if method == "knn":
+        return compute_mi_scores(df, target_col, discrete_target, progress, n_jobs)
+    if method == "binned":
+        return estimate_mi(df, target_col, discrete_target, max_error=max_error, n_jobs=n_jobs, progress=progress)
+    raise ValueError(f"Unknown MI method '{method}'. Available: {list(MI_METHODS)}")
+
+
+def detect_high_mi(
+    df: pd.DataFrame,
+    target_col: str,
+    threshold: float = 0.5,
+    discrete_target: bool = False,
+    method: str = "knn",
+    max_error: float = 0.02,
+    n_jobs: int = 1
+) -> List[Dict[str, Any]]:
+    """
+    Detect features with high mutual information with the target.
+    """
+    return filter_mi_scores(
+        compute_mi(df, target_col, discrete_target, method, max_error, n_jobs=n_jobs), threshold
+    )
+
+
+def filter_mi_scores(mi: Union[pd.Series, pd.DataFrame], threshold: float = 0.5) -> List[Dict[str, Any]]:
+    """
+    Leaks from precomputed MI scores, so a new threshold needs no recomputation.
+    Binned estimates also report their interval and whether the whole
+    interval is above the threshold.
+    """
+    if isinstance(mi, pd.Series):
+        return [
+            {"feature": col, "type": "high_mi", "mi_score": score}
+            for col, score in mi.items()
+            if score >= threshold
+        ]
+    return [
+        {
+            "feature": col,
+            "type": "high_mi",
+            "mi_score": row.mi,
+            "mi_ci": [row.ci_low, row.ci_high],
+            "certain": bool(row.ci_low >= threshold),
+        }
+        for col, row in mi.iterrows()
+        if row.mi >= threshold
+    ]
+
+
+def filter_target_correlations(corr: pd.Series, threshold: float = 0.95) -> List[Dict[str, Any]]:
+    """
+    Leaks from precomputed feature-target Pearson correlations.
+    """
+    return [
+        {"feature": col, "type": "high_corr", "corr_coeff": value}
+        for col, value in corr.items()
+        if abs(value) >= threshold
+    ]
+
+
+def identical_leaks(features: List[str]) -> List[Dict[str, Any]]:
+    """
+    Leak entries for features found identical to the target.
+    """
+    return [
+        {"feature": col, "type": "identical", "details": "100% equal to target"}
+        for col in features
+    ]
 
 
 def detect_data_leaks(
@@ -74,7 +175,11 @@ def detect_data_leaks(
     target_col: str,
     corr_threshold: float = 0.95,
     mi_threshold: float = 0.5,
-    discrete_target: bool = False
+    discrete_target: bool = False,
+    progress: Optional[ProgressCallback] = None,
+    mi_method: str = "knn",
+    mi_max_error: float = 0.02,
+    mi_n_jobs: int = 1
 ) -> Dict[str, Any]:
     """
     Run all leak detection methods and compile results.
@@ -82,6 +187,49 @@ def detect_data_leaks(
     leaks = []
     leaks.extend(detect_identical(df, target_col))
     leaks.extend(detect_high_corr(df, target_col, corr_threshold))
-    leaks.extend(detect_high_mi(df, target_col, mi_threshold, discrete_target))
+    mi = compute_mi(df, target_col, discrete_target, mi_method, mi_max_error, progress, mi_n_jobs)
+    leaks.extend(filter_mi_scores(mi, mi_threshold))
+    return {"leaks": leaks, "summary": {"n_leaks": len(leaks)}}
+
+
+def detect_data_leaks_from_stats(
+    stats: StreamingDatasetStats,
+    target_col: str,
+    corr_threshold: float = 0.95,
+    mi_threshold: float = 0.5,
+    discrete_target: bool = False,
+    mi_scores: Optional[Union[pd.Series, pd.DataFrame]] = None,
+    progress: Optional[ProgressCallback] = None,
+    mi_method: str = "knn",
+    mi_max_error: float = 0.02,
+    mi_n_jobs: int = 1,
+    target_correlations: Optional[pd.Series] = None
+) -> Dict[str, Any]:
+    """
+    Same checks as ``detect_data_leaks`` from streamed accumulators:
+    identity and correlation use every row, mutual information is
+    estimated on the row reservoir (all rows for small files) unless
+    precomputed ``mi_scores`` are given. ``target_correlations`` replaces
+    the co-moments (e.g. computed from the column store).
+    """
+    if mi_scores is None:
+        mi_scores = compute_mi(
+            stats.sample_frame(), target_col, discrete_target, mi_method, mi_max_error, progress, mi_n_jobs
+        )
+    leaks = []
+    leaks.extend(identical_leaks(stats.identical_to_target(target_col)))
+    if target_correlations is None:
+        target_correlations = target_correlations_from_stats(stats, target_col)
+    leaks.extend(filter_target_correlations(target_correlations, corr_threshold))
+    leaks.extend(filter_mi_scores(mi_scores, mi_threshold))
     return {"leaks": leaks, "summary": {"n_leaks": len(leaks)}}
 
+
+def target_correlations_from_stats(stats: StreamingDatasetStats, target_col: str) -> pd.Series:
+    """
+    Pearson correlation of each numeric or bool feature with the target
+    (empty if the target is neither numeric nor bool).
+    """
+    if stats.accumulators[target_col].kind == "object":
+        return pd.Series(dtype=float)
+    return stats.pearson_target(target_col)[0]
@@ -0,0 +1,221 @@
+"""
+Approximate mutual information with the target.
+
+The kNN estimators of ``mutual_info_classif``/``mutual_info_regression``
+scale badly with the number of rows and skip categorical features. Here
+every feature (numeric or categorical) is discretized and MI is the
+plug-in estimate of its contingency table with the target, counted with
+``np.bincount`` for a block of features at a time.
+
+The rows are a stratified subsample (by target class or target quantile
+bin) sized so that the confidence interval of every score is at most
+``max_error`` wide on each side.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from statistics import NormalDist
+from typing import Optional, Tuple
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.core.progress import ProgressCallback, report
+
+# Maximum bins per numeric feature (quantile bins) and per continuous target
+MI_MAX_BINS = 32
+# Categories kept per categorical feature; rarer ones are pooled together
+MI_MAX_CATEGORIES = 256
+# Rows of the pilot sample used to size the final sample
+MI_PILOT_ROWS = 5000
+# Features from which the blocks are spread across processes (n_jobs != 1)
+MI_PARALLEL_MIN_COLUMNS = 200
+# Contingency cells counted by a single bincount call
+_MI_BLOCK_CELLS = 1 << 22
+
+
+def n_bins(n_rows: int, max_bins: int = MI_MAX_BINS) -> int:
+    """Quantile bins for ``n_rows`` rows (cube-root rule)."""
+    return int(np.clip(np.cbrt(n_rows), 2, max_bins))
+
+
+def discretize(values: pd.Series, bins: int, max_categories: int = MI_MAX_CATEGORIES) -> Tuple[np.ndarray, int]:
+    """
+    Codes (-1 = missing) and number of levels of a feature. Numeric columns
+    with more than ``bins`` distinct values get quantile bins; categorical
+    ones keep their ``max_categories - 1`` most frequent levels.
+    """
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        x = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        finite = x[~np.isnan(x)]
+        if len(np.unique(finite)) > bins:
+            edges = np.unique(np.quantile(finite, np.linspace(0, 1, bins + 1)[1:-1]))
+            codes = np.searchsorted(edges, x, side="right")
+            codes[np.isnan(x)] = -1
+            return codes.astype(np.int64), len(edges) + 1
+    codes, uniques = pd.factorize(values)
+    size = len(uniques)
+    if size > max_categories:
+        # Pool the rare levels into one
+        counts = np.bincount(codes[codes >= 0], minlength=size)
+        keep = np.zeros(size, dtype=np.int64) + (max_categories - 1)
+        keep[np.argsort(-counts, kind="stable")[: max_categories - 1]] = np.arange(max_categories - 1)
+        codes = np.where(codes >= 0, keep[codes], -1)
+        size = max_categories
+    return codes.astype(np.int64), size
+
+
+def stratified_sample(strata: np.ndarray, n: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Sorted row indices of a sample of ``n`` rows with the same proportion of
+    each stratum as the data (every non-empty stratum keeps one row).
+    """
+    total = len(strata)
+    if n >= total:
+        return np.arange(total)
+    counts = np.bincount(strata)
+    alloc = np.maximum(np.floor(counts * n / total), np.minimum(counts, 1)).astype(np.int64)
+    order = np.lexsort((rng.random(total), strata))
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    sorted_strata = strata[order]
+    rank = np.arange(total) - starts[sorted_strata]
+    return np.sort(order[rank < alloc[sorted_strata]])
+
+
+def mi_from_codes(
+    codes: np.ndarray, sizes: np.ndarray, y: np.ndarray, y_size: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    MI (nats, Miller-Madow bias corrected) of each column of ``codes``
+    (n_rows x n_features, -1 = missing) with ``y`` (no missing values),
+    and its standard error. Rows missing a feature are left out of that
+    feature's table.
+
+    The standard error adds the delta-method variance of the plug-in
+    estimate to that of its null distribution (2n·MI ~ chi²(df)), so
+    independent features also get an interval.
+    """
+    n, p = codes.shape
+    mi = np.full(p, np.nan)
+    se = np.full(p, np.nan)
+    K = int(sizes.max()) if p else 0
+    cells = max(1, K * y_size)
+    step = max(1, _MI_BLOCK_CELLS // cells)
+    for start in range(0, p, step):
+        block = codes[:, start : start + step]
+        b = block.shape[1]
+        valid = block >= 0
+        col = np.broadcast_to(np.arange(b), block.shape)[valid]
+        idx = (col * K + block[valid]) * y_size + np.broadcast_to(y[:, None], block.shape)[valid]
+        table = np.bincount(idx, minlength=b * cells).reshape(b, K, y_size).astype(np.float64)
+
+        n_j = table.sum(axis=(1, 2))
+        px = table.sum(axis=2, keepdims=True)
+        py = table.sum(axis=1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_ratio = np.log(table * n_j[:, None, None] / (px * py))
+            log_ratio[table == 0] = 0.0
+            w = table / n_j[:, None, None]
+            plug_in = (w * log_ratio).sum(axis=(1, 2))
+            second = (w * log_ratio ** 2).sum(axis=(1, 2))
+            dof = ((px > 0).sum(axis=(1, 2)) - 1) * ((py > 0).sum(axis=(1, 2)) - 1)
+            var = np.maximum(second - plug_in ** 2, 0.0) / n_j + dof / (2 * n_j ** 2)
+            mi[start : start + b] = np.maximum(plug_in - dof / (2 * n_j), 0.0)
+            se[start : start + b] = np.sqrt(var)
+    return mi, se
+
+
+def _mi_blocks(
+    codes: np.ndarray,
+    sizes: np.ndarray,
+    y: np.ndarray,
+    y_size: int,
+    n_jobs: int = 1,
+    progress: Optional[ProgressCallback] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """``mi_from_codes`` in feature blocks, across processes if ``n_jobs`` != 1."""
+    p = codes.shape[1]
+    if n_jobs < 0:
+        n_jobs = os.cpu_count() or 1
+    if n_jobs > 1 and p >= MI_PARALLEL_MIN_COLUMNS:
+        bounds = np.linspace(0, p, n_jobs + 1).astype(int)
+    else:
+        bounds = np.unique(np.r_[np.arange(0, p, max(1, p // 10)), p])
+    mi = np.full(p, np.nan)
+    se = np.full(p, np.nan)
+    report(progress, 0, p, "MI", "features")
+    done = 0
+    if n_jobs > 1 and p >= MI_PARALLEL_MIN_COLUMNS:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            futures = {
+                pool.submit(mi_from_codes, codes[:, a:b], sizes[a:b], y, y_size): (a, b)
+                for a, b in zip(bounds[:-1], bounds[1:])
+            }
+            for future in as_completed(futures):
+                a, b = futures[future]
+                mi[a:b], se[a:b] = future.result()
+                done += b - a
+                report(progress, done, p, "MI", "features")
+    else:
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            mi[a:b], se[a:b] = mi_from_codes(codes[:, a:b], sizes[a:b], y, y_size)
+            report(progress, b, p, "MI", "features")
+    return mi, se
+
+
+def estimate_mi(
+    df: pd.DataFrame,
+    target_col: str,
+    discrete_target: bool = False,
+    max_error: float = 0.02,
+    confidence: float = 0.95,
+    max_bins: int = MI_MAX_BINS,
+    n_jobs: int = 1,
+    random_state: Optional[int] = 0,
+    progress: Optional[ProgressCallback] = None,
+) -> pd.DataFrame:
+    """
+    Binned MI of every other column (numeric and categorical) with the
+    target. Returns a frame indexed by feature with ``mi``, ``ci_low`` and
+    ``ci_high`` (``confidence`` interval); ``attrs["n_rows"]`` holds the
+    rows used.
+
+    A pilot stratified sample estimates the standard errors, which shrink
+    as 1/sqrt(n), and the final sample is sized so that every half-width is
+    at most ``max_error`` (all rows if that is not enough).
+    """
+    y_values = df[target_col]
+    rows = np.flatnonzero(y_values.notna().to_numpy())
+    if discrete_target:
+        y_all, y_uniques = pd.factorize(y_values.iloc[rows])
+        y_size = len(y_uniques)
+    else:
+        y_all, y_size = discretize(y_values.iloc[rows], n_bins(len(rows), max_bins))
+    features = df.columns.drop(target_col)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    rng = np.random.default_rng(random_state)
+
+    def estimate(sample: np.ndarray, progress: Optional[ProgressCallback] = None):
+        bins = n_bins(len(sample), max_bins)
+        codes = np.empty((len(sample), len(features)), dtype=np.int64)
+        sizes = np.ones(len(features), dtype=np.int64)
+        part = df.iloc[rows[sample]]
+        for j, col in enumerate(features):
+            codes[:, j], sizes[j] = discretize(part[col], bins)
+        sizes = np.maximum(sizes, 1)
+        y = y_all[sample]
+        return _mi_blocks(codes, sizes, y, max(int(y_size), 1), n_jobs, progress)
+
+    sample = stratified_sample(y_all, min(len(rows), MI_PILOT_ROWS), rng)
+    mi, se = estimate(sample, progress)
+    if len(sample) < len(rows) and len(features):
+        worst = np.nanmax(np.r_[se, 0.0]) * z
+        needed = int(np.ceil(len(sample) * (worst / max_error) ** 2))
+        if needed > len(sample):
+            sample = stratified_sample(y_all, needed, rng)
+            mi, se = estimate(sample, progress)
+    result = pd.DataFrame(
+        {"mi": mi, "ci_low": np.maximum(mi - z * se, 0.0), "ci_high": mi + z * se},
+        index=features,
+    )
+    result.attrs["n_rows"] = len(sample)
+    return result
@@ -1 +1,381 @@
-# Detección de outliers (DBSCAN, Isolation Forest)
+"""
+Outlier detection over numeric columns.
+
+- Univariate: per-column IQR or MAD fences, computed for a block of
+  columns at a time with ``np.nanquantile``/``np.nanmedian``.
+- Isolation Forest: fitted on a random subsample and used to score every
+  row in chunks, spread across processes when ``n_jobs`` != 1 (a ``pool``
+  of the caller, e.g. the analysis executor's, or one for the call). The
+  fitted model reaches each process once, through a shared file, instead
+  of being pickled with every chunk.
+- DBSCAN: clustered on a bounded sample; every row is then scored by its
+  distance to the nearest core sample through a KD-tree, instead of the
+  O(n²) neighbourhood search over all rows.
+
+Rows are read in chunks sized by ``memory_budget`` and only the ``top_k``
+most anomalous rows are kept, so memory does not grow with the row count.
+"""
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+import heapq
+import os
+import pickle
+import tempfile
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import OUTLIER_MEMORY_BUDGET_BYTES, OUTLIER_SAMPLE_ROWS
+from app.schema_inference.enums import ColumnType
+from app.services.dataset_cache import DatasetEntry
+
+METHODS = ("univariate", "isolation_forest", "dbscan")
+# Default fence multipliers: Tukey's 1.5 IQR and 3.5 MAD-based robust z
+DEFAULT_K = {"iqr": 1.5, "mad": 3.5}
+# Rows of the DBSCAN sample (its neighbourhood search is quadratic)
+DBSCAN_SAMPLE_ROWS = 10_000
+# MAD of a normal distribution is 0.6745 sigma
+_MAD_SCALE = 1.4826
+# Models each scoring process keeps loaded, by the path they were shared through
+_SHARED_MODELS: "OrderedDict[str, Any]" = OrderedDict()
+_SHARED_MODELS_SIZE = 4
+_NUMERIC_TYPES = (ColumnType.INTEGER.value, ColumnType.FLOAT.value)
+
+Columns = Mapping[str, Any]
+
+
+def numeric_columns(schema: Dict[str, str]) -> List[str]:
+    """Integer and float columns of an inferred schema (ids, dates and booleans are left out)."""
+    return [col for col, col_type in schema.items() if col_type in _NUMERIC_TYPES]
+
+
+def chunk_rows(n_columns: int, memory_budget: int) -> int:
+    """Rows per chunk so that a few float64 copies of the chunk fit in ``memory_budget``."""
+    return max(1, int(memory_budget // (4 * 8 * max(n_columns, 1))))
+
+
+def _as_float(values: Any) -> np.ndarray:
+    return pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _block(columns: Columns, names: Sequence[str], rows: Any) -> np.ndarray:
+    """Rows ``rows`` (slice or indices) of ``names`` as a float64 matrix (NaN if missing or non-numeric)."""
+    return np.column_stack([_as_float(np.asarray(columns[name])[rows]) for name in names])
+
+
+def _n_rows(columns: Columns, names: Sequence[str]) -> int:
+    return len(columns[names[0]]) if len(names) else 0
+
+
+def iter_chunks(columns: Columns, names: Sequence[str], memory_budget: int) -> Iterator[Tuple[int, np.ndarray]]:
+    """(first row, float64 block) over all rows, ``chunk_rows`` rows at a time."""
+    n = _n_rows(columns, names)
+    step = chunk_rows(len(names), memory_budget)
+    for start in range(0, n, step):
+        yield start, _block(columns, names, slice(start, start + step))
+
+
+def sample_rows(columns: Columns, names: Sequence[str], size: int, rng: np.random.Generator) -> np.ndarray:
+    """Uniform sample (without replacement) of ``size`` rows as a float64 matrix."""
+    n = _n_rows(columns, names)
+    if size >= n:
+        return _block(columns, names, slice(None))
+    return _block(columns, names, np.sort(rng.choice(n, size, replace=False)))
+
+
+def univariate_fences(
+    columns: Columns,
+    names: Sequence[str],
+    method: str = "iqr",
+    k: Optional[float] = None,
+    memory_budget: int = OUTLIER_MEMORY_BUDGET_BYTES,
+) -> pd.DataFrame:
+    """
+    Per column ``center``, ``scale`` (IQR, or MAD scaled to a standard
+    deviation) and the ``low``/``high`` fences ``k`` scales away (from the
+    quartiles for IQR, from the median for MAD). Columns are processed in
+    blocks that fit in ``memory_budget``.
+    """
+    if method not in DEFAULT_K:
+        raise ValueError(f"Unknown univariate method '{method}'. Available: {list(DEFAULT_K)}")
+    k = DEFAULT_K[method] if k is None else k
+    n = max(_n_rows(columns, names), 1)
+    width = max(1, int(memory_budget // (4 * 8 * n)))
+    parts = []
+    for start in range(0, len(names), width):
+        block_names = list(names[start : start + width])
+        X = _block(columns, block_names, slice(None))
+        with np.errstate(invalid="ignore"), warnings.catch_warnings():
+            # All-NaN columns get NaN fences
+            warnings.simplefilter("ignore", RuntimeWarning)
+            if method == "iqr":
+                q1, median, q3 = np.nanquantile(X, [0.25, 0.5, 0.75], axis=0)
+                scale = q3 - q1
+                low, high = q1 - k * scale, q3 + k * scale
+            else:
+                median = np.nanmedian(X, axis=0)
+                scale = np.nanmedian(np.abs(X - median), axis=0) * _MAD_SCALE
+                low, high = median - k * scale, median + k * scale
+        parts.append(pd.DataFrame(
+            {"center": median, "scale": scale, "low": low, "high": high}, index=block_names
+        ))
+    if not parts:
+        return pd.DataFrame(columns=["center", "scale", "low", "high"], dtype=np.float64)
+    return pd.concat(parts)
+
+
+def robust_scale(X: np.ndarray, fences: pd.DataFrame) -> np.ndarray:
+    """Columns centred on the median and divided by their robust scale; missing values become 0."""
+    scale = fences["scale"].to_numpy()
+    scale = np.where(np.isfinite(scale) & (scale > 0), scale, 1.0)
+    Z = (X - fences["center"].to_numpy()) / scale
+    return np.nan_to_num(Z, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def fit_isolation_forest(sample: np.ndarray, random_state: Optional[int] = 0, n_estimators: int = 100):
+    from sklearn.ensemble import IsolationForest
+
+    return IsolationForest(n_estimators=n_estimators, random_state=random_state).fit(sample)
+
+
+class DBSCANScorer:
+    """
+    DBSCAN fitted on a sample; ``score_samples`` is the distance to the
+    nearest core sample in units of ``eps`` (> 1 = noise), queried
+    through a KD-tree.
+    """
+
+    def __init__(self, sample: np.ndarray, eps: Optional[float] = None, min_samples: int = 5):
+        from sklearn.cluster import DBSCAN
+        from sklearn.neighbors import KDTree
+
+        min_samples = max(2, min(min_samples, len(sample)))
+        if eps is None:
+            # 95% of the sample has min_samples neighbours within eps
+            distances, _ = KDTree(sample).query(sample, k=min_samples)
+            eps = float(np.quantile(distances[:, -1], 0.95)) or 1.0
+        self.eps = eps
+        model = DBSCAN(eps=eps, min_samples=min_samples).fit(sample)
+        core = sample[model.core_sample_indices_] if len(model.core_sample_indices_) else sample
+        self._tree = KDTree(core)
+
+    def score_samples(self, X: np.ndarray) -> np.ndarray:
+        return self._tree.query(X, k=1)[0][:, 0] / self.eps
+
+
+def _score_chunk(model: Any, method: str, X: np.ndarray) -> np.ndarray:
+    """Anomaly score of each row (higher = more anomalous)."""
+    if method == "isolation_forest":
+        return -model.score_samples(X)
+    return model.score_samples(X)
+
+
+@contextmanager
+def _share_model(model: Any) -> Iterator[str]:
+    """Path of a temporary file holding ``model``, removed on exit."""
+    fd, path = tempfile.mkstemp(prefix="outlier-model-", suffix=".pkl")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+        yield path
+    finally:
+        os.remove(path)
+
+
+def _shared_model(path: str) -> Any:
+    """The model shared through ``path``, loaded once per process."""
+    model = _SHARED_MODELS.get(path)
+    if model is None:
+        with open(path, "rb") as f:
+            model = pickle.load(f)
+        _SHARED_MODELS[path] = model
+        while len(_SHARED_MODELS) > _SHARED_MODELS_SIZE:
+            _SHARED_MODELS.popitem(last=False)
+    return model
+
+
+def _score_shared(path: str, method: str, X: np.ndarray) -> np.ndarray:
+    return _score_chunk(_shared_model(path), method, X)
+
+
+def _windowed(
+    chunks: Iterator[Tuple[int, Tuple[np.ndarray, np.ndarray]]],
+    model: Any,
+    method: str,
+    n_jobs: int,
+    pool: Optional[Executor] = None,
+) -> Iterator[Tuple[int, Tuple[np.ndarray, np.ndarray], np.ndarray]]:
+    """
+    (first row, (raw, scaled) blocks, scores) in order, scoring the scaled
+    blocks in ``pool`` (or a pool of ``n_jobs`` processes for this call)
+    with at most ``n_jobs`` chunks in flight. Only the chunks travel with
+    each task; the model is read once per process from a shared file.
+    """
+    if pool is None and n_jobs <= 1:
+        for start, blocks in chunks:
+            yield start, blocks, _score_chunk(model, method, blocks[1])
+        return
+    with ExitStack() as stack:
+        if pool is None:
+            pool = stack.enter_context(ProcessPoolExecutor(max_workers=n_jobs))
+        path = stack.enter_context(_share_model(model))
+        pending: deque = deque()
+        try:
+            for start, blocks in chunks:
+                pending.append((start, blocks, pool.submit(_score_shared, path, method, blocks[1])))
+                if len(pending) >= max(n_jobs, 1):
+                    start, blocks, future = pending.popleft()
+                    yield start, blocks, future.result()
+            while pending:
+                start, blocks, future = pending.popleft()
+                yield start, blocks, future.result()
+        finally:
+            # Abandoned early (error or timeout): the model file is about to go away
+            for _, _, future in pending:
+                future.cancel()
+
+
+def detect_outliers(
+    columns: Columns,
+    names: Optional[Sequence[str]] = None,
+    method: str = "isolation_forest",
+    univariate: str = "iqr",
+    k: Optional[float] = None,
+    top_k: int = 20,
+    sample_size: int = OUTLIER_SAMPLE_ROWS,
+    eps: Optional[float] = None,
+    min_samples: int = 5,
+    n_jobs: int = 1,
+    memory_budget: int = OUTLIER_MEMORY_BUDGET_BYTES,
+    random_state: Optional[int] = 0,
+    pool: Optional[Executor] = None,
+) -> Dict[str, Any]:
+    """
+    Outliers of the numeric columns ``names`` of ``columns`` (a mapping of
+    equally long columns, e.g. a DataFrame or memory-mapped arrays).
+
+    Returns the univariate fences with each column's outlier count and
+    rate, the share of rows the multivariate ``method`` flags and the
+    ``top_k`` rows with the highest anomaly score (with their values and
+    the columns outside their fences). With ``method="univariate"`` a
+    row's score is its largest robust z-score and it is an outlier if any
+    of its values is outside the fences.
+
+    With a process ``pool`` (reused across calls) the model scores are
+    computed there, ``n_jobs`` chunks at a time.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown outlier method '{method}'. Available: {list(METHODS)}")
+    names = list(columns.keys() if names is None else names)
+    if not names:
+        raise ValueError("No numeric columns to analyse")
+    if n_jobs < 0:
+        n_jobs = os.cpu_count() or 1
+    n = _n_rows(columns, names)
+    rng = np.random.default_rng(random_state)
+    fences = univariate_fences(columns, names, univariate, k, memory_budget)
+    low, high = fences["low"].to_numpy(), fences["high"].to_numpy()
+
+    model, threshold, fitted_rows = None, None, 0
+    if method != "univariate":
+        size = min(sample_size, DBSCAN_SAMPLE_ROWS) if method == "dbscan" else sample_size
+        # The sample is capped by the memory budget too
+        size = min(size, chunk_rows(len(names), memory_budget))
+        sample = robust_scale(sample_rows(columns, names, size, rng), fences)
+        fitted_rows = len(sample)
+        if method == "isolation_forest":
+            model = fit_isolation_forest(sample, random_state)
+            threshold = -model.offset_
+        else:
+            model = DBSCANScorer(sample, eps, min_samples)
+            threshold = 1.0
+
+    flagged_counts = np.zeros(len(names), dtype=np.int64)
+    valid_counts = np.zeros(len(names), dtype=np.int64)
+    outlier_rows = 0
+    heap: List[Tuple[float, int, np.ndarray]] = []
+
+    # Scores are computed on robust-scaled blocks; raw blocks are kept for the report
+    def scaled_chunks() -> Iterator[Tuple[int, Tuple[np.ndarray, np.ndarray]]]:
+        for start, X in iter_chunks(columns, names, memory_budget):
+            yield start, (X, robust_scale(X, fences))
+
+    if method == "univariate":
+        scored = ((start, XZ, np.abs(XZ[1]).max(axis=1)) for start, XZ in scaled_chunks())
+    else:
+        scored = _windowed(scaled_chunks(), model, method, n_jobs, pool)
+
+    for start, (X, _), scores in scored:
+        with np.errstate(invalid="ignore"):
+            outside = (X < low) | (X > high)
+        flagged_counts += outside.sum(axis=0)
+        valid_counts += (~np.isnan(X)).sum(axis=0)
+        if threshold is None:
+            outlier_rows += int(outside.any(axis=1).sum())
+        else:
+            outlier_rows += int((scores > threshold).sum())
+        # Chunk-local top-k, then merged into the running top-k
+        best = np.argpartition(-scores, min(top_k, len(scores)) - 1)[:top_k] if top_k and len(scores) else []
+        for i in best:
+            item = (float(scores[i]), start + int(i), X[i].copy())
+            if len(heap) < top_k:
+                heapq.heappush(heap, item)
+            elif item[0] > heap[0][0]:
+                heapq.heapreplace(heap, item)
+
+    column_outliers = {
+        name: {
+            "low": _float(low[j]),
+            "high": _float(high[j]),
+            "count": int(flagged_counts[j]),
+            "rate": float(flagged_counts[j] / valid_counts[j]) if valid_counts[j] else 0.0,
+        }
+        for j, name in enumerate(names)
+    }
+    top = []
+    for score, row, values in sorted(heap, key=lambda item: (-item[0], item[1])):
+        with np.errstate(invalid="ignore"):
+            outside = (values < low) | (values > high)
+        top.append({
+            "row": row,
+            "score": score,
+            "values": {name: _float(v) for name, v in zip(names, values)},
+            "outlier_columns": [name for name, flag in zip(names, outside) if flag],
+        })
+    return {
+        "method": method,
+        "univariate_method": univariate,
+        "columns": names,
+        "n_rows": n,
+        "fitted_rows": fitted_rows,
+        "threshold": _float(threshold) if threshold is not None else None,
+        "outlier_rate": outlier_rows / n if n else 0.0,
+        "column_outliers": column_outliers,
+        "top_outliers": top,
+    }
+
+
+def _float(value: float) -> Optional[float]:
+    return float(value) if np.isfinite(value) else None
+
+
+def detect_outliers_from_entry(
+    entry: DatasetEntry,
+    schema: Dict[str, str],
+    columns: Optional[List[str]] = None,
+    **options: Any,
+) -> Dict[str, Any]:
+    """
+    ``detect_outliers`` over every row of a cached dataset. The columns
+    default to the numeric ones of the inferred ``schema``; numeric data
+    is read memory-mapped, chunk by chunk.
+    """
+    names = numeric_columns(schema) if columns is None else columns
+    missing = [col for col in names if col not in entry.columns]
+    if missing:
+        raise KeyError(f"Columns not found in dataset: {missing}")
+    data = {col: entry.load_column(col) for col in names}
+    return detect_outliers(data, names, **options)
@@ -1 +1,262 @@
-# Generación de reportes HTML y PDF
+"""
+HTML report built from the results of the existing analyses.
+
+Every section (schema, correlations, leaks, class balance, problem
+columns) is rendered to an HTML fragment from its analysis result and
+memoized under the parameters that section actually uses, so changing a
+threshold only re-renders the sections that read it. Sections render
+concurrently and ``iter_report`` yields them in document order as soon as
+each one (and those before it) is ready, so the page can be streamed while
+later sections are still computing.
+
+PDF export is an offline step: ``python -m app.services.report_generator``
+writes the HTML of a cached dataset and, with the optional ``weasyprint``
+package installed, the PDF.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from html import escape
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+import argparse
+import importlib.util
+import json
+import math
+
+from app.services.dataset_profile import ANALYSES, DatasetProfile
+
+# Bumped when the markup changes, so memoized fragments are not reused
+REPORT_VERSION = 1
+
+# section -> parameters its analysis reads (the rest do not invalidate it)
+SECTION_PARAMS: Dict[str, tuple] = {
+    "schema": (),
+    "correlation": ("target_col",),
+    "leaks": ("target_col", "discrete_target", "corr_threshold", "mi_threshold", "mi_method", "mi_max_error"),
+    "class_balance": ("target_col", "imbalance_threshold"),
+    "problem_columns": ("corr_threshold",),
+}
+
+TITLES = {
+    "schema": "Schema",
+    "correlation": "Correlations",
+    "leaks": "Data leaks",
+    "class_balance": "Class balance",
+    "problem_columns": "Problem columns",
+}
+
+_STYLE = """
+body { font-family: sans-serif; margin: 2em; color: #222; }
+table { border-collapse: collapse; margin: 0.5em 0 1.5em; font-size: 0.85em; }
+th, td { border: 1px solid #ccc; padding: 0.2em 0.5em; text-align: left; }
+.heatmap td { text-align: right; min-width: 3em; }
+.bar { background: #4a7ab5; height: 1em; display: inline-block; vertical-align: middle; }
+.error { color: #a00; }
+section { page-break-inside: avoid; }
+"""
+
+
+def default_sections(target_col: Optional[str]) -> List[str]:
+    """Every section, or only those that do not need a target."""
+    return [name for name, (_, needs_target) in ANALYSES.items() if target_col or not needs_target]
+
+
+def section_key(name: str, params: Dict[str, Any]) -> str:
+    """Memo key of a rendered section: its name and only the parameters it reads."""
+    used = {p: params.get(p) for p in SECTION_PARAMS[name]}
+    return f"report|{REPORT_VERSION}|{name}|{json.dumps(used, sort_keys=True, default=str)}"
+
+
+def _cell(value: Any) -> str:
+    if isinstance(value, float):
+        return "" if math.isnan(value) else f"{value:.3f}"
+    if isinstance(value, (list, tuple)):
+        return ", ".join(_cell(v) for v in value)
+    return escape(str(value))
+
+
+def _table(rows: List[Dict[str, Any]]) -> str:
+    """Table of a list of records (columns: union of their keys, in order of appearance)."""
+    if not rows:
+        return "<p>None found.</p>"
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    head = "".join(f"<th>{escape(str(c))}</th>" for c in columns)
+    body = "".join(
+        "<tr>" + "".join(f"<td>{_cell(row.get(c, ''))}</td>" for c in columns) + "</tr>" for row in rows
+    )
+    return f"<table><tr>{head}</tr>{body}</table>"
+
+
+def _heatmap(matrix: Dict[str, Dict[str, Any]]) -> str:
+    """Matrix ``{column: {row: value}}`` as a table coloured by value (blue > 0, red < 0)."""
+    columns = list(matrix)
+    if not columns:
+        return "<p>No columns.</p>"
+    rows = list(dict.fromkeys(r for col in columns for r in matrix[col]))
+    head = "".join(f"<th>{escape(str(c))}</th>" for c in columns)
+    body = []
+    for r in rows:
+        cells = []
+        for c in columns:
+            value = matrix[c].get(r)
+            if value is None or (isinstance(value, float) and math.isnan(value)):
+                cells.append("<td></td>")
+                continue
+            hue = 210 if value >= 0 else 0
+            lightness = 100 - 45 * min(abs(value), 1.0)
+            cells.append(f'<td style="background: hsl({hue}, 60%, {lightness:.0f}%)">{value:.2f}</td>')
+        body.append(f"<tr><th>{escape(str(r))}</th>{''.join(cells)}</tr>")
+    return f'<table class="heatmap"><tr><th></th>{head}</tr>{"".join(body)}</table>'
+
+
+def _render_schema(result: Dict[str, Any]) -> str:
+    formats = result.get("date_formats", {})
+    return _table([
+        {"column": col, "type": col_type, "date format": formats.get(col, "")}
+        for col, col_type in result["schema"].items()
+    ])
+
+
+def _render_correlation(result: Dict[str, Any]) -> str:
+    parts = ["<h3>Pearson</h3>", _heatmap(result["numeric_corr"])]
+    if "pearson_target" in result:
+        parts += ["<h3>Pearson with the target</h3>", _table([
+            {"feature": feature, **values} for feature, values in result["pearson_target"].items()
+        ])]
+    parts += ["<h3>Cramér's V</h3>", _heatmap(result["categorical_corr"])]
+    return "".join(parts)
+
+
+def _render_leaks(result: Dict[str, Any]) -> str:
+    return _table(result["leaks"])
+
+
+def _render_class_balance(result: Dict[str, Any]) -> str:
+    rows = "".join(
+        f"<tr><td>{escape(str(cls))}</td><td>{count}</td>"
+        f'<td><span class="bar" style="width: {200 * result["proportions"][cls]:.0f}px"></span> '
+        f'{result["proportions"][cls]:.1%}</td></tr>'
+        for cls, count in result["counts"].items()
+    )
+    return (
+        f"<p>Status: <b>{escape(result['status'])}</b> "
+        f"(max deviation from uniform {result['max_deviation']:.3f})</p>"
+        f"<table><tr><th>class</th><th>count</th><th>proportion</th></tr>{rows}</table>"
+    )
+
+
+def _render_problem_columns(result: Dict[str, Any]) -> str:
+    return _table(result["problems"])
+
+
+RENDERERS: Dict[str, Callable[[Dict[str, Any]], str]] = {
+    "schema": _render_schema,
+    "correlation": _render_correlation,
+    "leaks": _render_leaks,
+    "class_balance": _render_class_balance,
+    "problem_columns": _render_problem_columns,
+}
+
+
+def render_section(profile: DatasetProfile, name: str, params: Dict[str, Any]) -> str:
+    """HTML ``<section>`` of one analysis, memoized by ``section_key``."""
+    def render() -> str:
+        func, _ = ANALYSES[name]
+        with profile.stage(name):
+            result = func(profile, dict(params))
+        return (
+            f'<section id="{name}"><h2>{escape(TITLES[name])}</h2>'
+            f"{RENDERERS[name](result)}</section>\n"
+        )
+    return profile.memo(section_key(name, params), render)
+
+
+def error_section(name: str, error: BaseException) -> str:
+    """Placeholder for a section that failed (the rest of the report is still sent)."""
+    return (
+        f'<section id="{name}"><h2>{escape(TITLES[name])}</h2>'
+        f'<p class="error">Could not compute this section: {escape(str(error))}</p></section>\n'
+    )
+
+
+def report_head(title: str, sections: Iterable[str]) -> str:
+    toc = "".join(f'<li><a href="#{name}">{escape(TITLES[name])}</a></li>' for name in sections)
+    return (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{escape(title)}</title>'
+        f"<style>{_STYLE}</style></head><body><h1>{escape(title)}</h1><ul>{toc}</ul>\n"
+    )
+
+
+REPORT_TAIL = "</body></html>\n"
+
+
+def iter_report(
+    profile: DatasetProfile,
+    sections: List[str],
+    params: Dict[str, Any],
+    title: str = "Dataset report",
+    max_workers: int = 4,
+) -> Iterator[str]:
+    """
+    The report as HTML chunks: the head, then each section in order as
+    soon as it is rendered (sections render in ``max_workers`` threads).
+    """
+    yield report_head(title, sections)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = [pool.submit(render_section, profile, name, params) for name in sections]
+        for name, future in zip(sections, futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                yield error_section(name, e)
+    yield REPORT_TAIL
+
+
+def export_pdf(html: str, path: str) -> None:
+    """Write ``html`` as a PDF (needs the optional weasyprint package)."""
+    if importlib.util.find_spec("weasyprint") is None:
+        raise RuntimeError("PDF export needs the weasyprint package")
+    import weasyprint
+
+    weasyprint.HTML(string=html).write_pdf(path)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Write the HTML (and PDF) report of a cached dataset")
+    parser.add_argument("dataset_id")
+    parser.add_argument("--html", help="Output HTML path")
+    parser.add_argument("--pdf", help="Output PDF path (needs weasyprint)")
+    parser.add_argument("--target-col")
+    parser.add_argument("--discrete-target", action="store_true")
+    parser.add_argument("--corr-threshold", type=float, default=0.95)
+    parser.add_argument("--mi-threshold", type=float, default=0.5)
+    parser.add_argument("--mi-method", choices=["knn", "binned"], default="knn")
+    parser.add_argument("--imbalance-threshold", type=float, default=0.1)
+    parser.add_argument("--sections", nargs="+")
+    args = parser.parse_args(argv)
+    if not args.html and not args.pdf:
+        parser.error("give --html and/or --pdf")
+
+    from app.services.dataset_cache import get_registry
+
+    try:
+        entry = get_registry().get(args.dataset_id)
+    except KeyError:
+        parser.error(f"dataset '{args.dataset_id}' is not in the cache")
+    params = {
+        "target_col": args.target_col,
+        "discrete_target": args.discrete_target,
+        "corr_threshold": args.corr_threshold,
+        "mi_threshold": args.mi_threshold,
+        "mi_method": args.mi_method,
+        "imbalance_threshold": args.imbalance_threshold,
+    }
+    profile = DatasetProfile(entry.stats, memo=entry.memo, store=entry)
+    html = "".join(iter_report(profile, args.sections or default_sections(args.target_col), params))
+    if args.html:
+        with open(args.html, "w", encoding="utf-8") as f:
+            f.write(html)
+    if args.pdf:
+        export_pdf(html, args.pdf)
+
+
+if __name__ == "__main__":
+    main()
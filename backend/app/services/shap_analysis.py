@@ -1 +1,333 @@
-# Cálculo de SHAP y visualizaciones
+"""
+Budgeted feature importance from a tree baseline.
+
+A random forest is fitted on a stratified sample of the rows and explained
+on a separate evaluation subsample whose size comes from a time budget: a
+small pilot chunk measures the cost per row and the rest of the budget
+decides how many rows follow, explained in row chunks across processes.
+
+Contributions are exact TreeSHAP values when the optional ``shap`` package
+is installed. Otherwise they are Saabas path attributions, read for all
+trees at once from ``decision_path``: the change in the node value at each
+split, credited to the split feature. Both add up to the prediction minus
+the expected value.
+
+The fitted model and the contribution matrix are memoized (per dataset
+when given a ``DatasetEntry.memo``), so asking for other subgroups only
+re-aggregates them.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, TypeVar
+import importlib.util
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.services.mutual_information import stratified_sample, discretize, n_bins
+
+if TYPE_CHECKING:
+    from scipy import sparse
+
+# Rows the baseline is fitted on
+SHAP_TRAIN_ROWS = 20_000
+# Largest evaluation subsample, whatever the budget
+SHAP_MAX_EVAL_ROWS = 20_000
+# Rows explained first to measure the cost per row
+SHAP_PILOT_ROWS = 64
+# Categories kept per categorical feature (the rest share one code)
+SHAP_MAX_CATEGORIES = 64
+# Groups reported per subgroup column (the most frequent ones)
+SHAP_MAX_GROUPS = 20
+METHODS = ("auto", "tree_shap", "saabas")
+
+T = TypeVar("T")
+
+
+@dataclass
+class TreeBaseline:
+    """Fitted forest plus the encoding that turns frame columns into its features."""
+    model: Any
+    target: str
+    features: List[str]
+    discrete_target: bool
+    categories: Dict[str, pd.Index] = field(default_factory=dict)
+    fill: Dict[str, float] = field(default_factory=dict)
+    labels: Optional[pd.Index] = None
+    train_rows: int = 0
+    fit_seconds: float = 0.0
+
+    @property
+    def classes(self) -> Optional[list]:
+        return pd.Series(self.labels).tolist() if self.discrete_target else None
+
+    def encode(self, df: pd.DataFrame) -> np.ndarray:
+        """Float matrix of the features: category codes, numbers and datetimes, NaN filled."""
+        X = np.empty((len(df), len(self.features)))
+        for j, col in enumerate(self.features):
+            values = df[col]
+            if col in self.categories:
+                codes = pd.Categorical(values.astype(object), categories=self.categories[col]).codes
+                X[:, j] = np.where(codes < 0, len(self.categories[col]), codes)
+            else:
+                X[:, j] = _numeric(values)
+            X[np.isnan(X[:, j]), j] = self.fill[col]
+        return X
+
+    def target_values(self, df: pd.DataFrame) -> np.ndarray:
+        """Class codes (positions in ``labels``, -1 if unseen) or numeric target values."""
+        y = df[self.target]
+        if self.discrete_target:
+            return pd.Categorical(y.astype(object), categories=self.labels).codes.astype(np.int64)
+        return _numeric(y)
+
+
+def _numeric(values: pd.Series) -> np.ndarray:
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return np.where(values.isna(), np.nan, values.to_numpy(dtype="datetime64[ns]").astype(np.int64)).astype(np.float64)
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _is_numeric(values: pd.Series) -> bool:
+    return (
+        pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values)
+        or pd.api.types.is_datetime64_any_dtype(values)
+    )
+
+
+def _strata(df: pd.DataFrame, target_col: str, discrete_target: bool) -> np.ndarray:
+    """Target classes, or target quantile bins, as non-negative codes for stratified sampling."""
+    if discrete_target:
+        codes = pd.factorize(df[target_col])[0]
+    else:
+        codes = discretize(df[target_col], n_bins(len(df)))[0]
+    return codes - codes.min() if len(codes) else codes
+
+
+def fit_baseline(
+    df: pd.DataFrame,
+    target_col: str,
+    discrete_target: bool,
+    rows: np.ndarray,
+    n_estimators: int = 50,
+    max_depth: Optional[int] = 8,
+    n_jobs: int = 1,
+    random_state: Optional[int] = 0,
+) -> TreeBaseline:
+    """Random forest on ``rows`` of ``df`` predicting ``target_col`` from every other column."""
+    from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+    start = time.perf_counter()
+    train = df.iloc[rows]
+    baseline = TreeBaseline(None, target_col, [c for c in df.columns if c != target_col], discrete_target)
+    for col in baseline.features:
+        values = train[col]
+        if not _is_numeric(values):
+            counts = values.astype(object).value_counts()
+            baseline.categories[col] = pd.Index(counts.index[: SHAP_MAX_CATEGORIES - 1])
+            baseline.fill[col] = float(len(baseline.categories[col]))
+        else:
+            median = np.nanmedian(_numeric(values)) if values.notna().any() else 0.0
+            baseline.fill[col] = float(median)
+    if discrete_target:
+        baseline.labels = pd.Index(pd.unique(train[target_col].astype(object)))
+    forest = RandomForestClassifier if discrete_target else RandomForestRegressor
+    baseline.model = forest(
+        n_estimators=n_estimators, max_depth=max_depth, n_jobs=n_jobs, random_state=random_state
+    ).fit(baseline.encode(train), baseline.target_values(train))
+    baseline.train_rows = len(rows)
+    baseline.fit_seconds = time.perf_counter() - start
+    return baseline
+
+
+def node_deltas(model: Any) -> "sparse.csr_matrix":
+    """
+    (all nodes of all trees) x (features * outputs) matrix with the change
+    in node value from the parent, in the column of the parent's split
+    feature, divided by the number of trees.
+    """
+    from scipy import sparse
+
+    n_features = model.n_features_in_
+    blocks = []
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        value = tree.value[:, 0, :]
+        if value.shape[1] > 1:
+            value = value / value.sum(axis=1, keepdims=True)
+        k = value.shape[1]
+        parent = np.full(tree.node_count, -1)
+        internal = np.flatnonzero(tree.children_left >= 0)
+        parent[tree.children_left[internal]] = internal
+        parent[tree.children_right[internal]] = internal
+        nodes = np.flatnonzero(parent >= 0)
+        delta = value[nodes] - value[parent[nodes]]
+        cols = tree.feature[parent[nodes]][:, None] * k + np.arange(k)
+        blocks.append(sparse.csr_matrix(
+            (delta.ravel(), (np.repeat(nodes, k), cols.ravel())), shape=(tree.node_count, n_features * k)
+        ))
+    return sparse.vstack(blocks).tocsr() / len(model.estimators_)
+
+
+def saabas_contributions(model: Any, X: np.ndarray, deltas: Optional["sparse.csr_matrix"] = None) -> np.ndarray:
+    """
+    Path attributions of shape (rows, features, outputs) for all trees in
+    one sparse product (``deltas`` from ``node_deltas``, built if omitted).
+    """
+    indicator, _ = model.decision_path(X)
+    contributions = indicator @ (node_deltas(model) if deltas is None else deltas)
+    return np.asarray(contributions.todense()).reshape(len(X), model.n_features_in_, -1)
+
+
+def tree_shap_contributions(model: Any, X: np.ndarray) -> np.ndarray:
+    """TreeSHAP values of shape (rows, features, outputs) (needs ``shap``)."""
+    import shap
+
+    values = shap.TreeExplainer(model).shap_values(X, check_additivity=False)
+    if isinstance(values, list):
+        values = np.stack(values, axis=-1)
+    return values if values.ndim == 3 else values[:, :, None]
+
+
+def resolve_method(method: str) -> str:
+    if method not in METHODS:
+        raise ValueError(f"Unknown SHAP method '{method}'. Available: {list(METHODS)}")
+    has_shap = importlib.util.find_spec("shap") is not None
+    if method == "tree_shap" and not has_shap:
+        raise ValueError("method 'tree_shap' needs the shap package; use 'saabas'")
+    if method == "auto":
+        return "tree_shap" if has_shap else "saabas"
+    return method
+
+
+def contributions(model: Any, X: np.ndarray, method: str, deltas: Optional["sparse.csr_matrix"] = None) -> np.ndarray:
+    if method == "tree_shap":
+        return tree_shap_contributions(model, X)
+    return saabas_contributions(model, X, deltas)
+
+
+def explain_rows(
+    model: Any, X: np.ndarray, method: str, n_jobs: int = 1, deltas: Optional["sparse.csr_matrix"] = None
+) -> np.ndarray:
+    """``contributions`` of ``X``, split in row chunks across ``n_jobs`` processes if > 1."""
+    if n_jobs > 1 and len(X) >= 2 * SHAP_PILOT_ROWS:
+        bounds = np.linspace(0, len(X), n_jobs + 1).astype(int)
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            futures = [
+                pool.submit(contributions, model, X[a:b], method, deltas)
+                for a, b in zip(bounds[:-1], bounds[1:])
+            ]
+            return np.concatenate([future.result() for future in futures])
+    return contributions(model, X, method, deltas)
+
+
+def _mean_abs(values: np.ndarray) -> np.ndarray:
+    """Mean |contribution| per feature, averaged over the outputs."""
+    return np.abs(values).mean(axis=(0, 2)) if len(values) else np.zeros(values.shape[1])
+
+
+def shap_importance(
+    df: pd.DataFrame,
+    target_col: str,
+    discrete_target: bool = True,
+    group_cols: Optional[List[str]] = None,
+    time_budget: float = 10.0,
+    method: str = "auto",
+    train_rows: int = SHAP_TRAIN_ROWS,
+    max_eval_rows: int = SHAP_MAX_EVAL_ROWS,
+    n_jobs: int = 1,
+    random_state: Optional[int] = 0,
+    memo: Optional[Callable[[str, Callable[[], T]], T]] = None,
+) -> Dict[str, Any]:
+    """
+    Global and per-subgroup importance (mean |contribution|) of every
+    feature for a forest predicting ``target_col``.
+
+    The baseline is fitted on a stratified sample of ``train_rows`` rows
+    and explained on held-out rows (the training rows if none are left):
+    a pilot chunk, then as many rows as ``time_budget`` seconds allow,
+    counting the fit and spreading the work over ``n_jobs`` processes.
+    Each column of ``group_cols`` reports the importance within its most
+    frequent groups.
+    """
+    if target_col not in df.columns:
+        raise KeyError(f"Target column '{target_col}' not found in dataset")
+    missing = [col for col in group_cols or [] if col not in df.columns]
+    if missing:
+        raise KeyError(f"Columns not found in dataset: {missing}")
+    method = resolve_method(method)
+    if n_jobs < 0:
+        n_jobs = os.cpu_count() or 1
+    memo = memo or (lambda key, compute: compute())
+    started = time.perf_counter()
+
+    df = df[df[target_col].notna()].reset_index(drop=True)
+    if df[target_col].nunique() < 2:
+        raise ValueError(f"Target column '{target_col}' needs at least two distinct values")
+    rng = np.random.default_rng(random_state)
+    strata = _strata(df, target_col, discrete_target)
+    train = stratified_sample(strata, min(train_rows, len(df)), rng)
+    held_out = np.setdiff1d(np.arange(len(df)), train)
+    pool = rng.permutation(held_out if len(held_out) else train)[:max_eval_rows]
+
+    model_key = f"shap_model|{target_col}|{discrete_target}|{train_rows}|{random_state}"
+    baseline: TreeBaseline = memo(model_key, lambda: fit_baseline(
+        df, target_col, discrete_target, train, n_jobs=n_jobs, random_state=random_state
+    ))
+
+    def explain() -> Dict[str, Any]:
+        X = baseline.encode(df.iloc[pool])
+        deltas = node_deltas(baseline.model) if method == "saabas" else None
+        pilot = min(SHAP_PILOT_ROWS, len(pool))
+        tick = time.perf_counter()
+        values = [contributions(baseline.model, X[:pilot], method, deltas)]
+        per_row = (time.perf_counter() - tick) / max(pilot, 1)
+        remaining = time_budget - (time.perf_counter() - started)
+        extra = int(max(remaining, 0.0) / max(per_row, 1e-9) * max(n_jobs, 1))
+        n_rows = min(len(pool), pilot + extra)
+        if n_rows > pilot:
+            values.append(explain_rows(baseline.model, X[pilot:n_rows], method, n_jobs, deltas))
+        values = np.concatenate(values).astype(np.float32)
+        return {
+            "rows": pool[:n_rows],
+            "values": values,
+            "score": float(baseline.model.score(X[:n_rows], baseline.target_values(df.iloc[pool[:n_rows]]))),
+        }
+
+    explained = memo(f"shap_values|{model_key}|{method}|{time_budget}|{max_eval_rows}", explain)
+    values, rows = explained["values"], explained["rows"]
+    features = baseline.features
+
+    def ranked(importance: np.ndarray) -> Dict[str, float]:
+        order = np.argsort(-importance, kind="stable")
+        return {features[i]: float(importance[i]) for i in order}
+
+    group_importance: Dict[str, Any] = {}
+    for col in group_cols or []:
+        groups = df[col].iloc[rows].astype(object).reset_index(drop=True)
+        top = groups.value_counts().index[:SHAP_MAX_GROUPS]
+        group_importance[col] = {}
+        for value in top:
+            mask = (groups == value).to_numpy()
+            group_importance[col][str(value)] = {
+                "count": int(mask.sum()),
+                "importance": ranked(_mean_abs(values[mask])),
+            }
+
+    return {
+        "target": target_col,
+        "task": "classification" if discrete_target else "regression",
+        "method": method,
+        "model": {
+            "type": type(baseline.model).__name__,
+            "train_rows": baseline.train_rows,
+            "fit_seconds": baseline.fit_seconds,
+            "score": explained["score"],
+        },
+        "classes": baseline.classes,
+        "explained_rows": int(len(rows)),
+        "importance": ranked(_mean_abs(values)),
+        "group_importance": group_importance,
+    }
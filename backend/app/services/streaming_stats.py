@@ -0,0 +1,866 @@
+"""
+Per-column and per-dataset accumulators fed chunk by chunk.
+
+A CSV upload is read in bounded chunks (see ``app.utils.file_utils``) and
+each chunk updates a ``StreamingDatasetStats``: counts, null counts, value
+counts / distinct-count sketches, pairwise co-moments for Pearson,
+contingency tables for Cramér's V and a fixed-size row reservoir. The
+analysis services derive their results from these accumulators, so peak
+memory depends on the chunk size and the number of columns, not on the
+number of rows.
+
+Every accumulator can also be merged with another one built over a later
+part of the same dataset (``StreamingDatasetStats.merge``), so partitions
+can be profiled independently, in other processes or on other days, and
+combined without reading the earlier data again.
+
+Column types follow pandas' ``read_csv`` inference over the whole file:
+numeric when every non-null value parses as a number, ``bool`` when every
+value is a boolean token and there are no nulls, ``object`` otherwise.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import copy
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import (
+    INGEST_MAX_CATEGORIES,
+    INGEST_MEMORY_BUDGET_BYTES,
+    INGEST_SAMPLE_MEMORY_BYTES,
+    INGEST_SAMPLE_ROWS,
+)
+from app.schema_inference import ColumnType
+from app.utils.file_utils import RowFilter, compact_series, iter_chunks
+
+# Tokens that pandas' CSV parser turns into booleans
+BOOL_TOKENS: Dict[str, bool] = {
+    "True": True, "TRUE": True, "true": True,
+    "False": False, "FALSE": False, "false": False,
+}
+
+# Cells (pairs) per block of rows in ``correlated_pairs``
+_PAIR_BLOCK_CELLS = 1 << 22
+
+# Offset used to combine two category codes into a single int64 key
+_PAIR_SHIFT = np.int64(1 << 32)
+
+
+_UINT64_MASK = (1 << 64) - 1
+# Hashes of a missing value in a raw (object) and in a parsed (float) column
+_NULL_RAW_HASH = pd.util.hash_array(np.array([np.nan], dtype=object))[0]
+_NULL_NUMERIC_HASH = pd.util.hash_array(np.array([np.nan]))[0]
+
+
+def positional_fingerprint(hashes: np.ndarray, offset: int = 0) -> int:
+    """
+    Sum (mod 2**64) of each row hash mixed with its global row number, so
+    that chunk fingerprints add up to the fingerprint of the whole column.
+    """
+    rows = np.arange(offset, offset + len(hashes), dtype=np.uint64)
+    mixed = hashes ^ (rows * np.uint64(0x9E3779B97F4A7C15))
+    # splitmix64 finalizer
+    mixed ^= mixed >> np.uint64(30)
+    mixed *= np.uint64(0xBF58476D1CE4E5B9)
+    mixed ^= mixed >> np.uint64(27)
+    mixed *= np.uint64(0x94D049BB133111EB)
+    mixed ^= mixed >> np.uint64(31)
+    return int(mixed.sum(dtype=np.uint64))
+
+
+def _take_hashes(unique_hashes: np.ndarray, codes: np.ndarray, null_hash: np.uint64) -> np.ndarray:
+    """Per-row hashes from the hashes of the distinct values (-1 codes are missing)."""
+    return np.where(codes >= 0, unique_hashes[np.maximum(codes, 0)] if len(unique_hashes) else null_hash, null_hash)
+
+
+def _append_fingerprint(fingerprint: int, other: int, offset: int) -> int:
+    """
+    Fingerprint of a column followed by a part (starting at row ``offset``)
+    whose own fingerprint is ``other``. It differs from a single pass over
+    the rows, but every column of a merged dataset shares the partition
+    boundaries, so equal columns still get equal fingerprints.
+    """
+    shifted = positional_fingerprint(np.array([other], dtype=np.uint64), offset)
+    return (fingerprint + shifted) & _UINT64_MASK
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct-count sketch over 64-bit hashes
+    (``pd.util.hash_array``). Relative error is about 1.04 / sqrt(2**precision).
+    """
+
+    def __init__(self, precision: int = 14):
+        # With precision >= 11 the remaining hash bits fit exactly in a float64
+        if not 11 <= precision <= 18:
+            raise ValueError("precision must be between 11 and 18")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, hashes: np.ndarray) -> None:
+        if len(hashes) == 0:
+            return
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        width = 64 - self.precision
+        idx = (hashes >> np.uint64(width)).astype(np.intp)
+        rest = (hashes & np.uint64((1 << width) - 1)).astype(np.float64)
+        _, bit_length = np.frexp(rest)
+        rank = (width - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / np.sqrt(len(self.registers))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> float:
+        m = float(len(self.registers))
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting for small cardinalities
+            return m * np.log(m / zeros)
+        return float(estimate)
+
+
+class ColumnAccumulator:
+    """
+    Running statistics for one column: row and null counts, type flags,
+    exact value counts while the column has at most ``max_categories``
+    distinct values and HyperLogLog sketches beyond that.
+    """
+
+    def __init__(self, name: str, max_categories: int = INGEST_MAX_CATEGORIES):
+        self.name = name
+        self.max_categories = max_categories
+        self.n_rows = 0
+        self.null_count = 0
+        self.all_numeric = True
+        self.all_int = True
+        self.all_bool = True
+        self._counts: Optional[pd.Series] = pd.Series(dtype="int64")
+        self._raw_hll: Optional[HyperLogLog] = None
+        self._numeric_hll: Optional[HyperLogLog] = None
+        self._value_counts_cache: Optional[pd.Series] = None
+        self._fingerprint_numeric = 0
+        self._fingerprint_raw = 0
+
+    def update(self, raw: pd.Series) -> np.ndarray:
+        """
+        Add a chunk of raw text values (NaN for missing). Returns the chunk
+        parsed as float64 (booleans as 0/1), all-NaN once the column is known
+        to be neither numeric nor boolean.
+
+        The chunk is factorized once: parsing, type checks and hashing run
+        on its distinct values and the counts come from one ``bincount``.
+        """
+        self._value_counts_cache = None
+        codes, uniques = pd.factorize(raw.to_numpy(dtype=object))
+        uniques = np.asarray(uniques, dtype=object)
+        present = codes >= 0
+        offset = self.n_rows
+        self.n_rows += len(raw)
+        self.null_count += len(raw) - int(present.sum())
+
+        numeric = np.full(len(raw), np.nan)
+        unique_floats = None
+        if self.all_numeric and len(uniques):
+            parsed = pd.to_numeric(uniques, errors="coerce")
+            unique_floats = np.asarray(parsed, dtype=np.float64)
+            if np.isnan(unique_floats).any():
+                self.all_numeric = False
+                unique_floats = None
+            else:
+                self.all_int &= parsed.dtype.kind in "iu"
+                numeric[present] = unique_floats[codes[present]]
+        if self.all_bool and len(uniques):
+            self.all_bool = bool(pd.Series(uniques).isin(BOOL_TOKENS.keys()).all())
+            if self.all_bool and not self.all_numeric:
+                unique_bools = pd.Series(uniques).map(BOOL_TOKENS).to_numpy(dtype=np.float64)
+                numeric[present] = unique_bools[codes[present]]
+
+        unique_hashes = pd.util.hash_array(uniques)
+        self._fingerprint_raw = (self._fingerprint_raw + positional_fingerprint(
+            _take_hashes(unique_hashes, codes, _NULL_RAW_HASH), offset
+        )) & _UINT64_MASK
+        if self.all_numeric:
+            numeric_hashes = pd.util.hash_array(unique_floats if unique_floats is not None else np.empty(0))
+            self._fingerprint_numeric = (self._fingerprint_numeric + positional_fingerprint(
+                _take_hashes(numeric_hashes, codes, _NULL_NUMERIC_HASH), offset
+            )) & _UINT64_MASK
+
+        if self._counts is not None:
+            counts = np.bincount(codes[present], minlength=len(uniques)).astype(np.int64)
+            position = self._counts.index.get_indexer(uniques)
+            known = position >= 0
+            totals = self._counts.to_numpy(dtype=np.int64).copy()
+            totals[position[known]] += counts[known]
+            keys = np.concatenate([self._counts.index.to_numpy(dtype=object), uniques[~known]])
+            self._counts = pd.Series(
+                np.concatenate([totals, counts[~known]]), index=pd.Index(keys, dtype=object)
+            )
+            if len(self._counts) > self.max_categories:
+                self._switch_to_sketch()
+        else:
+            self._raw_hll.add(unique_hashes)
+            if self._numeric_hll is not None and unique_floats is not None:
+                self._numeric_hll.add(pd.util.hash_array(unique_floats))
+        if not self.all_numeric:
+            self._numeric_hll = None
+        return numeric
+
+    def _switch_to_sketch(self) -> None:
+        self._raw_hll, self._numeric_hll = self._sketches()
+        self._counts = None
+
+    def _sketches(self) -> Tuple[HyperLogLog, Optional[HyperLogLog]]:
+        """Copies of the raw and numeric sketches (built from the exact counts if needed)."""
+        if self._counts is None:
+            numeric = copy.deepcopy(self._numeric_hll) if self.all_numeric else None
+            return copy.deepcopy(self._raw_hll), numeric
+        keys = self._counts.index.to_numpy(dtype=object)
+        raw = HyperLogLog()
+        raw.add(pd.util.hash_array(keys))
+        numeric = None
+        if self.all_numeric:
+            numeric = HyperLogLog()
+            numeric.add(pd.util.hash_array(pd.to_numeric(keys).astype(np.float64)))
+        return raw, numeric
+
+    def merge(self, other: "ColumnAccumulator") -> None:
+        """Add the statistics of ``other``, accumulated over the rows that follow these."""
+        self._value_counts_cache = None
+        self._fingerprint_raw = _append_fingerprint(
+            self._fingerprint_raw, other._fingerprint_raw, self.n_rows
+        )
+        self._fingerprint_numeric = _append_fingerprint(
+            self._fingerprint_numeric, other._fingerprint_numeric, self.n_rows
+        )
+        self.n_rows += other.n_rows
+        self.null_count += other.null_count
+        self.all_numeric &= other.all_numeric
+        self.all_int &= other.all_int
+        self.all_bool &= other.all_bool
+
+        if self._counts is not None and other._counts is not None:
+            merged = pd.concat([self._counts, other._counts])
+            self._counts = merged.groupby(level=0, sort=False).sum()
+            if len(self._counts) > self.max_categories:
+                self._switch_to_sketch()
+        else:
+            self._raw_hll, self._numeric_hll = self._sketches()
+            other_raw, other_numeric = other._sketches()
+            self._counts = None
+            self._raw_hll.merge(other_raw)
+            if self._numeric_hll is not None and other_numeric is not None:
+                self._numeric_hll.merge(other_numeric)
+        if not self.all_numeric:
+            self._numeric_hll = None
+
+    @property
+    def kind(self) -> str:
+        """'numeric', 'bool' or 'object', as pandas would type the full column."""
+        if self.all_numeric:
+            return "numeric"
+        if self.all_bool and self.null_count == 0:
+            return "bool"
+        return "object"
+
+    @property
+    def dtype(self) -> str:
+        kind = self.kind
+        if kind == "numeric":
+            has_values = self.null_count < self.n_rows
+            return "int64" if self.all_int and has_values and self.null_count == 0 else "float64"
+        return kind
+
+    @property
+    def fingerprint(self) -> int:
+        """
+        Order-sensitive 64-bit hash of the column: parsed values for numeric
+        columns, raw text otherwise.
+        """
+        if self.kind == "numeric":
+            return self._fingerprint_numeric
+        return self._fingerprint_raw
+
+    @property
+    def exact_counts(self) -> bool:
+        return self._counts is not None
+
+    @property
+    def raw_categories(self) -> Optional[pd.Index]:
+        """Distinct raw text values, in first-seen order (None past ``max_categories``)."""
+        return None if self._counts is None else self._counts.index
+
+    def value_counts(self) -> Optional[pd.Series]:
+        """
+        Counts per value (typed like pandas would parse them), descending,
+        or None if the column exceeded ``max_categories``.
+        """
+        if self._counts is None:
+            return None
+        if self._value_counts_cache is None:
+            counts = self._counts
+            if len(counts) and (self.kind in ("numeric", "bool") or self.all_bool):
+                keys = self.convert(pd.Series(counts.index, dtype=object)).to_numpy()
+                counts = pd.Series(counts.to_numpy(), index=keys)
+                counts = counts.groupby(level=0, sort=False).sum()
+            self._value_counts_cache = counts.sort_values(ascending=False, kind="stable")
+        return self._value_counts_cache
+
+    @property
+    def n_unique(self) -> int:
+        """Distinct non-null values (exact below ``max_categories``)."""
+        counts = self.value_counts()
+        if counts is not None:
+            return len(counts)
+        sketch = self._numeric_hll if self.all_numeric else self._raw_hll
+        return int(round(sketch.count()))
+
+    @property
+    def n_unique_error(self) -> float:
+        """Relative standard error of ``n_unique`` (0 when exact)."""
+        if self._counts is not None:
+            return 0.0
+        sketch = self._numeric_hll if self.all_numeric else self._raw_hll
+        return sketch.relative_error
+
+    def convert(self, raw: pd.Series) -> pd.Series:
+        """Type raw text values the way ``pd.read_csv`` types the full column."""
+        kind = self.kind
+        if kind == "numeric":
+            return pd.to_numeric(raw).astype(self.dtype)
+        if kind == "bool" or self.all_bool:
+            return raw.map(BOOL_TOKENS).astype(object if kind == "object" else bool)
+        return raw
+
+
+class StreamingDatasetStats:
+    """
+    Dataset-level accumulators built from chunks of raw text values.
+
+    - one ``ColumnAccumulator`` per column;
+    - pairwise-complete co-moments of every numeric and bool (0/1) column
+      (shifted sums, as in ``DataFrame.corr``'s pairwise deletion), unless
+      there are more than ``max_moment_columns`` columns;
+    - contingency tables between non-numeric columns, for Cramér's V;
+    - an order-sensitive 64-bit fingerprint per column, to find columns
+      identical to any other (e.g. the target) without keeping the data;
+    - a uniform row reservoir of ``sample_rows`` rows (the full data, in
+      order, when the file has at most that many rows), fewer if the raw
+      rows of the first chunk show they would take over ``sample_memory``
+      bytes.
+    """
+
+    def __init__(
+        self,
+        columns: Iterable[str],
+        max_categories: int = INGEST_MAX_CATEGORIES,
+        sample_rows: int = INGEST_SAMPLE_ROWS,
+        moments: bool = True,
+        contingency: bool = True,
+        seed: int = 0,
+        max_moment_columns: Optional[int] = None,
+        sample_memory: Optional[int] = INGEST_SAMPLE_MEMORY_BYTES,
+    ):
+        self.columns: List[str] = list(columns)
+        self.n_rows = 0
+        self.n_chunks = 0
+        self.accumulators = {
+            col: ColumnAccumulator(col, max_categories) for col in self.columns
+        }
+        p = len(self.columns)
+        # The co-moments are p x p: past ``max_moment_columns`` they are skipped
+        self._moments = moments and (max_moment_columns is None or p <= max_moment_columns)
+        if self._moments:
+            self._shift = np.full(p, np.nan)
+            self._n = np.zeros((p, p))
+            self._sx = np.zeros((p, p))
+            self._sxx = np.zeros((p, p))
+            self._sxy = np.zeros((p, p))
+        self._contingency = contingency
+        self._categories: Dict[str, pd.Index] = {}
+        self._tracked_since: Dict[str, int] = {}
+        self._tables: Dict[Tuple[str, str], pd.Series] = {}
+        self.sample_rows = sample_rows
+        self._sample_memory = sample_memory
+        self._sample = np.empty((0, p), dtype=object)
+        self._pearson_cache: Optional[Tuple[pd.DataFrame, pd.DataFrame]] = None
+        self._rng = np.random.default_rng(seed)
+
+    # ------------------------------------------------------------------ update
+    def update(self, chunk: pd.DataFrame) -> None:
+        """Feed one chunk of raw text values (as yielded by ``iter_csv_chunks``)."""
+        if list(chunk.columns) != self.columns:
+            raise ValueError("Chunk columns do not match the dataset columns")
+        parsed = [self.accumulators[col].update(chunk[col]) for col in self.columns]
+        if self._moments and self.columns:
+            self._update_moments(np.column_stack(parsed))
+        if self._contingency:
+            self._update_contingency(chunk)
+        self._update_sample(chunk)
+        self.n_rows += len(chunk)
+        self.n_chunks += 1
+        self._pearson_cache = None
+
+    def _update_moments(self, numeric: np.ndarray) -> None:
+        active = np.array(
+            [self.accumulators[c].all_numeric or self.accumulators[c].all_bool for c in self.columns],
+            dtype=bool,
+        )
+        if not active.any() or len(numeric) == 0:
+            return
+        X = numeric[:, active]
+        present = ~np.isnan(X)
+        shift = self._shift[active]
+        unset = np.isnan(shift) & present.any(axis=0)
+        if unset.any():
+            shift[unset] = np.nanmean(X[:, unset], axis=0)
+            self._shift[active] = shift
+        X0 = np.where(present, X - np.nan_to_num(shift), 0.0)
+        M = present.astype(np.float64)
+        block = np.ix_(active, active)
+        self._n[block] += M.T @ M
+        self._sx[block] += X0.T @ M
+        self._sxx[block] += (X0 * X0).T @ M
+        self._sxy[block] += X0.T @ X0
+
+    def _categorical_candidates(self) -> List[str]:
+        return [
+            c for c in self.columns
+            if not self.accumulators[c].all_numeric and self.accumulators[c].exact_counts
+        ]
+
+    def _codes(self, col: str, raw: pd.Series) -> np.ndarray:
+        """Stable integer codes per category for ``col`` (-1 for missing)."""
+        categories = self._categories.get(col, pd.Index([], dtype=object))
+        present = raw.dropna().unique()
+        new = pd.Index(present).difference(categories, sort=False)
+        if len(new):
+            categories = categories.append(new)
+        self._categories[col] = categories
+        return categories.get_indexer(raw)
+
+    def _update_contingency(self, chunk: pd.DataFrame, only: Optional[set] = None) -> None:
+        tracked = self._categorical_candidates()
+        for col in list(self._tracked_since):
+            if col not in tracked:
+                # Too many categories: the column is left out of Cramér's V
+                self._forget_column(col)
+        for col in tracked:
+            self._tracked_since.setdefault(col, self.n_chunks)
+        codes = {col: self._codes(col, chunk[col]) for col in tracked}
+        for i, a in enumerate(tracked):
+            for b in tracked[i:]:
+                if only is not None and a not in only and b not in only:
+                    continue
+                both = (codes[a] >= 0) & (codes[b] >= 0)
+                keys = codes[a][both].astype(np.int64) * _PAIR_SHIFT + codes[b][both]
+                uniq, counts = np.unique(keys, return_counts=True)
+                chunk_table = pd.Series(counts, index=uniq)
+                table = self._tables.get((a, b))
+                self._tables[(a, b)] = (
+                    chunk_table if table is None
+                    else table.add(chunk_table, fill_value=0).astype(np.int64)
+                )
+
+    def _forget_column(self, col: str) -> None:
+        self._tracked_since.pop(col, None)
+        self._categories.pop(col, None)
+        for pair in [p for p in self._tables if col in p]:
+            del self._tables[pair]
+
+    def _update_sample(self, chunk: pd.DataFrame) -> None:
+        if self._sample_memory is not None and self.n_rows == 0 and len(chunk):
+            # Object cells: the pointer plus the string, as memory_usage(deep=True) counts them
+            bytes_per_row = chunk.memory_usage(index=False, deep=True).sum() / len(chunk)
+            self.sample_rows = min(self.sample_rows, int(self._sample_memory // max(bytes_per_row, 1.0)))
+        k = self.sample_rows
+        if k == 0:
+            return
+        values = chunk.to_numpy(dtype=object)
+        free = max(0, k - len(self._sample))
+        if free:
+            self._sample = np.vstack([self._sample, values[:free]])
+        rest = values[free:]
+        if len(rest) == 0:
+            return
+        # Algorithm R: row with global index g replaces slot j ~ U[0, g]
+        seen = self.n_rows + free
+        slots = self._rng.integers(0, seen + np.arange(len(rest)) + 1)
+        accepted = np.flatnonzero(slots < k)
+        # For repeated slots the later row wins, as in the sequential algorithm
+        last = len(accepted) - 1 - np.unique(slots[accepted][::-1], return_index=True)[1]
+        rows = accepted[last]
+        self._sample[slots[rows]] = rest[rows]
+
+    def rescan_contingency(self, chunks: Iterable[pd.DataFrame]) -> None:
+        """
+        Recompute contingency tables of columns that only became
+        non-numeric after the first chunk, from a second pass over the data.
+        """
+        late = set(self.late_categorical_columns)
+        if not late:
+            return
+        for pair in [p for p in self._tables if p[0] in late or p[1] in late]:
+            del self._tables[pair]
+        seen = self.n_chunks
+        self.n_chunks = 0
+        for chunk in chunks:
+            self._update_contingency(chunk, only=late)
+        self.n_chunks = seen
+        for col in late:
+            self._tracked_since[col] = 0
+
+    # ------------------------------------------------------------------- merge
+    def merge(self, other: "StreamingDatasetStats") -> "StreamingDatasetStats":
+        """
+        Add the statistics of ``other``, built over rows that follow these
+        (e.g. the next partition of the same dataset), as if both had been
+        fed to one object: counts and sketches, co-moments (re-centred on
+        this object's shifts), contingency tables (category codes remapped)
+        and a reservoir drawn from both samples. ``other`` is left intact.
+
+        A column whose contingency tables only one side tracked (numeric or
+        past ``max_categories`` in the other part) is left out of Cramér's V;
+        if only one side has co-moments the result has none.
+        """
+        if other.columns != self.columns:
+            raise ValueError("Cannot merge statistics of datasets with different columns")
+        if other.n_rows == 0:
+            return self
+        if self.n_rows == 0:
+            sample_rows, rng = self.sample_rows, self._rng
+            self.__dict__.update(copy.deepcopy(other.__dict__))
+            self.sample_rows, self._rng = sample_rows, rng
+            self._sample = self._sample[:sample_rows]
+            return self
+
+        tracked = set(self._tracked_since)
+        other_tracked = set(other._tracked_since)
+        for col in self.columns:
+            self.accumulators[col].merge(other.accumulators[col])
+        self._moments &= other._moments
+        if self._moments:
+            self._merge_moments(other)
+        else:
+            for name in ("_shift", "_n", "_sx", "_sxx", "_sxy"):
+                self.__dict__.pop(name, None)
+        self._contingency &= other._contingency
+        if self._contingency:
+            self._merge_contingency(other, tracked & other_tracked)
+        else:
+            for col in list(self._tracked_since):
+                self._forget_column(col)
+        self._merge_sample(other)
+        self.n_rows += other.n_rows
+        self.n_chunks += other.n_chunks
+        self._pearson_cache = None
+        return self
+
+    def _merge_moments(self, other: "StreamingDatasetStats") -> None:
+        unset = np.isnan(self._shift)
+        self._shift[unset] = other._shift[unset]
+        # Sums of x - s_other re-centred on x - s: each value moves by d = s_other - s
+        d = np.nan_to_num(other._shift - self._shift)
+        n, sx, sxx, sxy = other._n, other._sx, other._sxx, other._sxy
+        rows, cols = d[:, None], d[None, :]
+        self._n += n
+        self._sx += sx + rows * n
+        self._sxx += sxx + 2 * rows * sx + rows * rows * n
+        self._sxy += sxy + rows * sx.T + cols * sx + rows * cols * n
+
+    def _merge_contingency(self, other: "StreamingDatasetStats", common: set) -> None:
+        candidates = set(self._categorical_candidates())
+        for col in list(self._tracked_since):
+            if col not in common or col not in candidates:
+                self._forget_column(col)
+        remap: Dict[str, np.ndarray] = {}
+        for col in self._tracked_since:
+            categories = self._categories.get(col, pd.Index([], dtype=object))
+            theirs = other._categories.get(col, pd.Index([], dtype=object))
+            new = theirs.difference(categories, sort=False)
+            if len(new):
+                categories = categories.append(new)
+            self._categories[col] = categories
+            remap[col] = categories.get_indexer(theirs).astype(np.int64)
+            if other._tracked_since[col] > 0:
+                self._tracked_since[col] = max(self._tracked_since[col], 1)
+        for (a, b), table in other._tables.items():
+            if a not in remap or b not in remap:
+                continue
+            keys = table.index.to_numpy()
+            keys = remap[a][keys // _PAIR_SHIFT] * _PAIR_SHIFT + remap[b][keys % _PAIR_SHIFT]
+            theirs = pd.Series(table.to_numpy(), index=keys)
+            mine = self._tables.get((a, b))
+            self._tables[(a, b)] = (
+                theirs if mine is None else mine.add(theirs, fill_value=0).astype(np.int64)
+            )
+
+    def _merge_sample(self, other: "StreamingDatasetStats") -> None:
+        k = self.sample_rows
+        if k == 0:
+            return
+        if self.n_rows + other.n_rows <= k:
+            self._sample = np.vstack([self._sample, other._sample])
+            return
+        # Rows taken from each reservoir in proportion to the rows each one saw
+        mine = self._rng.hypergeometric(self.n_rows, other.n_rows, k)
+        a = np.sort(self._rng.choice(len(self._sample), mine, replace=False))
+        b = np.sort(self._rng.choice(len(other._sample), k - mine, replace=False))
+        self._sample = np.vstack([self._sample[a], other._sample[b]])
+
+    def to_bytes(self) -> bytes:
+        """Serialized statistics, to store a partition's profile or send it between processes."""
+        return pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "StreamingDatasetStats":
+        stats = pickle.loads(data)
+        if not isinstance(stats, cls):
+            raise TypeError(f"Expected serialized {cls.__name__}, got {type(stats).__name__}")
+        return stats
+
+    # ----------------------------------------------------------------- results
+    @property
+    def late_categorical_columns(self) -> List[str]:
+        return [c for c, since in self._tracked_since.items() if since > 0]
+
+    @property
+    def dtypes(self) -> pd.Series:
+        return pd.Series({c: self.accumulators[c].dtype for c in self.columns}, dtype=object)
+
+    @property
+    def numeric_columns(self) -> List[str]:
+        return [c for c in self.columns if self.accumulators[c].kind == "numeric"]
+
+    @property
+    def pearson_columns(self) -> List[str]:
+        """Numeric and bool columns (as 0/1): the ones with co-moments."""
+        return [c for c in self.columns if self.accumulators[c].kind in ("numeric", "bool")]
+
+    @property
+    def categorical_columns(self) -> List[str]:
+        """Object columns with exact contingency tables available."""
+        return [
+            c for c in self.columns
+            if self.accumulators[c].kind == "object" and c in self._tracked_since
+        ]
+
+    @property
+    def has_moments(self) -> bool:
+        return self._moments
+
+    def pearson(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Pairwise-complete Pearson matrix of numeric columns and its pair counts."""
+        if not self._moments:
+            raise RuntimeError("Co-moments were not accumulated")
+        if self._pearson_cache is None:
+            self._pearson_cache = self._compute_pearson()
+        return self._pearson_cache
+
+    def pearson_target(self, target_col: str) -> Tuple[pd.Series, pd.Series]:
+        """
+        Pearson correlation and pair count of every other column of
+        ``pearson_columns`` with ``target_col``, from the target's row of the
+        co-moments (O(p), the full matrix is not built). Raises KeyError if
+        the target is neither numeric nor bool.
+        """
+        if not self._moments:
+            raise RuntimeError("Co-moments were not accumulated")
+        cols = self.pearson_columns
+        if target_col not in cols:
+            raise KeyError(target_col)
+        others = [c for c in cols if c != target_col]
+        corr, n = self._pearson_block(
+            [self.columns.index(c) for c in others], [self.columns.index(target_col)]
+        )
+        return pd.Series(corr[:, 0], index=others), pd.Series(n[:, 0], index=others)
+
+    def correlated_pairs(
+        self, threshold: float, block_size: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Pairs i < j of ``numeric_columns`` with |Pearson| >= ``threshold``,
+        as three arrays (i, j, r). The co-moments are evaluated in blocks
+        of rows (block x p), so the full matrix is never built.
+        """
+        if not self._moments:
+            raise RuntimeError("Co-moments were not accumulated")
+        idx = [self.columns.index(c) for c in self.numeric_columns]
+        p = len(idx)
+        block = block_size or max(1, _PAIR_BLOCK_CELLS // max(p, 1))
+        rows, cols, values = [np.array([], dtype=np.intp)], [np.array([], dtype=np.intp)], [np.array([])]
+        for start in range(0, p, block):
+            corr, _ = self._pearson_block(idx[start:start + block], idx)
+            upper = np.arange(p)[None, :] > np.arange(start, start + len(corr))[:, None]
+            bi, j = np.nonzero(upper & (np.abs(corr) >= threshold))
+            rows.append(bi + start)
+            cols.append(j)
+            values.append(corr[bi, j])
+        return np.concatenate(rows), np.concatenate(cols), np.concatenate(values)
+
+    def _compute_pearson(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        cols = self.numeric_columns
+        idx = [self.columns.index(c) for c in cols]
+        corr, n = self._pearson_block(idx, idx)
+        diag = np.diag_indices_from(corr)
+        corr[diag] = np.where(np.isnan(corr[diag]), np.nan, 1.0)
+        return (
+            pd.DataFrame(corr, index=cols, columns=cols),
+            pd.DataFrame(n, index=cols, columns=cols),
+        )
+
+    def _pearson_block(self, rows: Sequence[int], cols: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Correlations and pair counts of columns ``rows`` x ``cols`` (positions)."""
+        block, flipped = np.ix_(rows, cols), np.ix_(cols, rows)
+        n, sx, sxx, sxy = self._n[block], self._sx[block], self._sxx[block], self._sxy[block]
+        sy, syy = self._sx[flipped].T, self._sxx[flipped].T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = sxy - sx * sy / n
+            var_x = sxx - sx * sx / n
+            var_y = syy - sy * sy / n
+            denom = np.sqrt(var_x * var_y)
+            corr = np.where((n >= 1) & (denom > 0), cov / denom, np.nan)
+        return np.clip(corr, -1.0, 1.0), n
+
+    def contingency_table(self, a: str, b: str) -> np.ndarray:
+        """
+        Crosstab of ``a`` vs ``b`` over rows where both are present, with
+        only the categories that occur in those rows (like ``pd.crosstab``).
+        """
+        key, transpose = ((a, b), False) if (a, b) in self._tables else ((b, a), True)
+        table = self._tables[key]
+        rows = (table.index.to_numpy() // _PAIR_SHIFT).astype(np.intp)
+        cols = (table.index.to_numpy() % _PAIR_SHIFT).astype(np.intp)
+        # Categories in sorted order, as pd.crosstab lays them out
+        r = self._sorted_positions(key[0], rows)
+        c = self._sorted_positions(key[1], cols)
+        dense = np.zeros((r.max(initial=-1) + 1, c.max(initial=-1) + 1), dtype=np.int64)
+        dense[r, c] = table.to_numpy()
+        return dense.T if transpose else dense
+
+    def _sorted_positions(self, col: str, codes: np.ndarray) -> np.ndarray:
+        present = np.unique(codes)
+        order = np.argsort(self._categories[col][present].to_numpy(), kind="stable")
+        position = np.empty(len(present), dtype=np.intp)
+        position[order] = np.arange(len(present))
+        return position[np.searchsorted(present, codes)]
+
+    def identical_column_groups(self) -> List[List[str]]:
+        """
+        Groups (two or more columns, in file order) with ``Series.equals``
+        semantics: same dtype, same values and missing values in the same
+        rows, compared through their 64-bit fingerprints.
+        """
+        buckets: Dict[Tuple[str, int], List[str]] = {}
+        for col, acc in self.accumulators.items():
+            buckets.setdefault((acc.dtype, acc.fingerprint), []).append(col)
+        return [group for group in buckets.values() if len(group) > 1]
+
+    def identical_to_target(self, target_col: str) -> List[str]:
+        """Columns identical to ``target_col`` (see ``identical_column_groups``)."""
+        if target_col not in self.accumulators:
+            raise KeyError(f"Target column '{target_col}' not found")
+        for group in self.identical_column_groups():
+            if target_col in group:
+                return [col for col in group if col != target_col]
+        return []
+
+    def sample_frame(
+        self, schema: Optional[Dict[str, str]] = None, date_formats: Optional[Dict[str, str]] = None
+    ) -> pd.DataFrame:
+        """
+        Reservoir rows typed like ``pd.read_csv`` would type the full file,
+        or with compact dtypes (see ``compact_series``) when given the
+        inferred ``schema`` and ``date_formats``.
+        """
+        raw = pd.DataFrame(self._sample, columns=self.columns)
+        columns = {}
+        for col in self.columns:
+            values = self.accumulators[col].convert(raw[col])
+            if schema is not None:
+                values = compact_series(
+                    values, schema.get(col, ColumnType.STRING.value), (date_formats or {}).get(col)
+                )
+            columns[col] = values
+        return pd.DataFrame(columns, columns=self.columns)
+
+    @property
+    def sample_is_complete(self) -> bool:
+        return self.n_rows <= self.sample_rows
+
+
+def profile_csv(
+    source: Union[str, IO],
+    memory_budget: int = INGEST_MEMORY_BUDGET_BYTES,
+    columns: Optional[Sequence[str]] = None,
+    row_filter: Optional[RowFilter] = None,
+    **stats_kwargs: Any,
+) -> StreamingDatasetStats:
+    """
+    Read ``source`` chunk by chunk and return its accumulated statistics.
+    If some column turns out non-numeric only after the first chunk and the
+    source can be rewound, its contingency tables are rebuilt with a second
+    pass.
+
+    Despite the name ``source`` can be any input format of ``iter_chunks``
+    (Parquet, Feather/Arrow IPC, gzip/zstd CSV); ``columns`` and
+    ``row_filter`` are pushed down to the reader.
+    """
+    def chunks():
+        return iter_chunks(source, memory_budget=memory_budget, columns=columns, row_filter=row_filter)
+
+    stats: Optional[StreamingDatasetStats] = None
+    for chunk in chunks():
+        if stats is None:
+            stats = StreamingDatasetStats(chunk.columns, **stats_kwargs)
+        stats.update(chunk)
+    if stats is None:
+        raise pd.errors.EmptyDataError("No columns to parse from file")
+    if stats.late_categorical_columns and (isinstance(source, str) or hasattr(source, "seek")):
+        if hasattr(source, "seek"):
+            source.seek(0)
+        stats.rescan_contingency(chunks())
+    return stats
+
+
+def merge_stats(parts: Iterable[StreamingDatasetStats]) -> StreamingDatasetStats:
+    """Statistics of the concatenation of ``parts`` (in order); the first part is updated."""
+    merged: Optional[StreamingDatasetStats] = None
+    for part in parts:
+        merged = part if merged is None else merged.merge(part)
+    if merged is None:
+        raise ValueError("No partitions to merge")
+    return merged
+
+
+def profile_partitions(
+    sources: Sequence[str],
+    n_jobs: int = 1,
+    memory_budget: int = INGEST_MEMORY_BUDGET_BYTES,
+    **stats_kwargs: Any,
+) -> StreamingDatasetStats:
+    """
+    ``profile_csv`` of each CSV path in ``sources`` (in ``n_jobs``
+    processes when > 1, -1 for one per CPU) merged into the statistics of
+    their concatenation. Every partition must have the same columns.
+    """
+    if n_jobs < 0:
+        n_jobs = os.cpu_count() or 1
+    if n_jobs > 1 and len(sources) > 1:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(sources))) as pool:
+            futures = [
+                pool.submit(profile_csv, source, memory_budget, **stats_kwargs) for source in sources
+            ]
+            return merge_stats(future.result() for future in futures)
+    return merge_stats(profile_csv(source, memory_budget, **stats_kwargs) for source in sources)
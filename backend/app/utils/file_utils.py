@@ -1 +1,424 @@
 # Funciones auxiliares para gestión de archivos
+import importlib.util
+import json
+import os
+from typing import IO, Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import INGEST_CSV_ENGINE, INGEST_MEMORY_BUDGET_BYTES, INGEST_PROBE_ROWS
+from app.schema_inference import ColumnType, ColumnTypeInferer
+from app.schema_inference.config import BOOLEAN_TOKENS, BOOLEAN_TRUE_TOKENS
+from app.schema_inference.utils import is_high_cardinality
+
+CsvSource = Union[str, IO]
+# Condiciones (columna, operador, valor) que deben cumplir todas las filas
+RowFilter = Sequence[Tuple[str, str, Any]]
+
+# Copias que hace el análisis de cada bloque (texto, valores numéricos,
+# máscaras): el bloque en texto ocupa como mucho 1/CHUNK_OVERHEAD del presupuesto.
+CHUNK_OVERHEAD = 4
+
+
+# Formatos de entrada y sus "magic bytes" (Feather v2 es Arrow IPC en fichero)
+INPUT_FORMATS = ("csv", "parquet", "feather", "arrow")
+_MAGIC = (
+    (b"PAR1", ("parquet", None)),
+    (b"ARROW1", ("feather", None)),
+    (b"\xff\xff\xff\xff", ("arrow", None)),
+    (b"\x1f\x8b", ("csv", "gzip")),
+    (b"\x28\xb5\x2f\xfd", ("csv", "zstd")),
+)
+# Paquete opcional que necesita cada formato o compresión
+_FORMAT_PACKAGES = {"parquet": "pyarrow", "feather": "pyarrow", "arrow": "pyarrow", "zstd": "zstandard"}
+
+FILTER_OPS = ("==", "!=", "<", "<=", ">", ">=", "in", "not in")
+
+
+class UnsupportedFormatError(ValueError):
+    """El fichero tiene un formato que este servidor no puede leer (falta una dependencia opcional)."""
+
+
+def detect_format(source: CsvSource) -> Tuple[str, Optional[str]]:
+    """
+    Formato (``INPUT_FORMATS``) y compresión de un fichero o stream binario
+    según sus primeros bytes; CSV sin comprimir si no coincide ninguno.
+    Un stream se deja en su posición inicial.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            head = f.read(8)
+    elif hasattr(source, "seek"):
+        position = source.tell()
+        head = source.read(8)
+        source.seek(position)
+    else:
+        return "csv", None
+    if isinstance(head, str):
+        return "csv", None
+    for magic, detected in _MAGIC:
+        if head.startswith(magic):
+            return detected
+    return "csv", None
+
+
+def require_format(fmt: str, compression: Optional[str] = None) -> None:
+    """``UnsupportedFormatError`` si falta el paquete opcional del formato o la compresión."""
+    for name in (fmt, compression):
+        package = _FORMAT_PACKAGES.get(name)
+        if package is not None and importlib.util.find_spec(package) is None:
+            raise UnsupportedFormatError(f"Reading {name} files needs the {package} package")
+
+
+def parse_row_filter(text: Optional[str]) -> Optional[List[Tuple[str, str, Any]]]:
+    """
+    Filtro de filas desde JSON: lista de ``[columna, operador, valor]``
+    (``FILTER_OPS``; ``in``/``not in`` con una lista de valores).
+    """
+    if not text:
+        return None
+    try:
+        conditions = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"row_filter is not valid JSON: {e}")
+    if not isinstance(conditions, list) or not all(
+        isinstance(c, list) and len(c) == 3 and isinstance(c[0], str) for c in conditions
+    ):
+        raise ValueError("row_filter must be a list of [column, operator, value] conditions")
+    for col, op, value in conditions:
+        if op not in FILTER_OPS:
+            raise ValueError(f"Unknown row_filter operator '{op}'. Available: {list(FILTER_OPS)}")
+        if op in ("in", "not in") and not isinstance(value, list):
+            raise ValueError(f"row_filter operator '{op}' needs a list of values")
+    return [tuple(c) for c in conditions]
+
+
+def _comparable(values: pd.Series, value: Any) -> Tuple[pd.Series, Any]:
+    """Columna y valor en un tipo comparable (las celdas de un CSV llegan como texto)."""
+    sample = value[0] if isinstance(value, list) and value else value
+    if isinstance(sample, (int, float)) and not isinstance(sample, bool):
+        return pd.to_numeric(values, errors="coerce"), value
+    if values.dtype == object:
+        return values, [str(v) for v in value] if isinstance(value, list) else str(value)
+    return values, value
+
+
+def filter_mask(df: pd.DataFrame, row_filter: RowFilter) -> np.ndarray:
+    """Filas de ``df`` que cumplen todas las condiciones (los nulos no cumplen ninguna)."""
+    mask = np.ones(len(df), dtype=bool)
+    for col, op, value in row_filter:
+        values, value = _comparable(df[col], value)
+        if op == "in":
+            hit = values.isin(value)
+        elif op == "not in":
+            hit = ~values.isin(value) & values.notna()
+        else:
+            hit = {
+                "==": values.__eq__, "!=": values.__ne__, "<": values.__lt__,
+                "<=": values.__le__, ">": values.__gt__, ">=": values.__ge__,
+            }[op](value)
+            hit &= values.notna()
+        mask &= hit.to_numpy(dtype=bool)
+    return mask
+
+
+def _filter_columns(row_filter: Optional[RowFilter]) -> List[str]:
+    return list(dict.fromkeys(col for col, _, _ in row_filter or ()))
+
+
+def read_head(source: CsvSource, n_rows: int) -> pd.DataFrame:
+    """Primeras ``n_rows`` filas de un fichero en cualquiera de los ``INPUT_FORMATS``."""
+    fmt, compression = detect_format(source)
+    if fmt == "csv":
+        return pd.read_csv(source, nrows=n_rows, compression=compression)
+    chunk = next(iter_chunks(source, probe_rows=n_rows), None)
+    return pd.DataFrame() if chunk is None else chunk.head(n_rows)
+
+
+def rows_per_chunk(sample: pd.DataFrame, memory_budget: int) -> int:
+    """
+    Número de filas por bloque para que un bloque como ``sample`` respete
+    el presupuesto de memoria.
+    """
+    if len(sample) == 0:
+        return INGEST_PROBE_ROWS
+    bytes_per_row = sample.memory_usage(index=False, deep=True).sum() / len(sample)
+    return max(1, int(memory_budget // (CHUNK_OVERHEAD * max(bytes_per_row, 1.0))))
+
+
+def iter_csv_chunks(
+    source: CsvSource,
+    memory_budget: int = INGEST_MEMORY_BUDGET_BYTES,
+    probe_rows: int = INGEST_PROBE_ROWS,
+    columns: Optional[Sequence[str]] = None,
+    row_filter: Optional[RowFilter] = None,
+    compression: Optional[str] = "infer",
+) -> Iterator[pd.DataFrame]:
+    """
+    Recorre un CSV en bloques acotados por ``memory_budget``.
+
+    Todas las celdas se leen como texto (``dtype=object``, NaN para los
+    vacíos) para que la inferencia de tipos se haga sobre el fichero completo
+    y no bloque a bloque. El tamaño del bloque se estima a partir de las
+    primeras ``probe_rows`` filas.
+
+    Con ``columns`` el parser solo materializa esas columnas (más las del
+    filtro) y con ``row_filter`` cada bloque se filtra nada más leerse.
+    """
+    usecols = None
+    if columns is not None or row_filter:
+        header = pd.read_csv(source, nrows=0, compression=compression).columns
+        if hasattr(source, "seek"):
+            source.seek(0)
+        wanted = list(dict.fromkeys([*(columns if columns is not None else header), *_filter_columns(row_filter)]))
+        missing = [col for col in wanted if col not in header]
+        if missing:
+            raise KeyError(f"Columns not found in dataset: {missing}")
+        usecols = wanted if columns is not None else None
+
+    def select(chunk: pd.DataFrame) -> pd.DataFrame:
+        if row_filter:
+            chunk = chunk[filter_mask(chunk, row_filter)]
+        return chunk if columns is None else chunk[list(columns)]
+
+    with pd.read_csv(source, dtype=object, iterator=True, usecols=usecols, compression=compression) as reader:
+        try:
+            chunk = reader.get_chunk(probe_rows)
+        except StopIteration:
+            return
+        chunk_rows = rows_per_chunk(chunk, memory_budget)
+        yield select(chunk)
+        while True:
+            try:
+                yield select(reader.get_chunk(chunk_rows))
+            except StopIteration:
+                return
+
+
+def raw_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Bloque de un formato columnar con los valores que tendría leído como
+    texto de un CSV: los numéricos se conservan (el acumulador los tipa
+    igual), el resto pasa a texto (booleanos como "True"/"False") y los
+    nulos a NaN.
+    """
+    raw = {}
+    for col in df.columns:
+        values = df[col]
+        present = values.notna().to_numpy()
+        if pd.api.types.is_bool_dtype(values):
+            text = np.where(values.fillna(False).to_numpy(dtype=bool), "True", "False")
+        elif pd.api.types.is_numeric_dtype(values):
+            raw[col] = values.to_numpy(dtype=np.float64, na_value=np.nan) if not present.all() else values.to_numpy()
+            continue
+        else:
+            text = [v if isinstance(v, str) else str(v) for v in values.to_numpy(dtype=object)]
+        out = np.full(len(values), np.nan, dtype=object)
+        out[present] = np.asarray(text, dtype=object)[present]
+        raw[col] = out
+    return pd.DataFrame(raw, columns=df.columns, index=df.index)
+
+
+def _arrow_batches(
+    source: CsvSource,
+    fmt: str,
+    columns: Optional[Sequence[str]],
+    row_filter: Optional[RowFilter],
+    batch_rows: int,
+) -> Iterator[pd.DataFrame]:
+    """
+    Lotes de un Parquet/Feather/Arrow IPC como DataFrames, leyendo solo
+    ``columns``. Con una ruta los ficheros se mapean en memoria y el
+    filtro se evalúa en el escáner de pyarrow (Parquet descarta los row
+    groups cuyas estadísticas no lo cumplen); con un stream se filtra cada
+    lote.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+
+    is_path = isinstance(source, (str, os.PathLike))
+    if fmt == "parquet":
+        reader = pq.ParquetFile(source, memory_map=is_path)
+        schema = reader.schema_arrow
+    elif fmt == "feather":
+        reader = pa.ipc.open_file(pa.memory_map(os.fspath(source)) if is_path else source)
+        schema = reader.schema
+    else:
+        reader = pa.ipc.open_stream(source)
+        schema = reader.schema
+    wanted = list(columns) if columns is not None else list(schema.names)
+    missing = [col for col in [*wanted, *_filter_columns(row_filter)] if col not in schema.names]
+    if missing:
+        raise KeyError(f"Columns not found in dataset: {missing}")
+    expression = pq.filters_to_expression([tuple(c) for c in row_filter]) if row_filter else None
+
+    if is_path and fmt != "arrow":
+        dataset = ds.dataset(os.fspath(source), format="parquet" if fmt == "parquet" else "ipc")
+        batches = dataset.to_batches(columns=wanted, filter=expression, batch_size=batch_rows)
+        for batch in batches:
+            yield batch.to_pandas()
+        return
+
+    read = wanted if not row_filter else list(dict.fromkeys([*wanted, *_filter_columns(row_filter)]))
+    if fmt == "parquet":
+        batches = reader.iter_batches(batch_size=batch_rows, columns=read)
+    elif fmt == "feather":
+        batches = (reader.get_batch(i).select(read) for i in range(reader.num_record_batches))
+    else:
+        batches = (batch.select(read) for batch in reader)
+    for batch in batches:
+        table = pa.Table.from_batches([batch])
+        if expression is not None:
+            table = table.filter(expression)
+        yield table.select(wanted).to_pandas()
+
+
+def iter_chunks(
+    source: CsvSource,
+    memory_budget: int = INGEST_MEMORY_BUDGET_BYTES,
+    probe_rows: int = INGEST_PROBE_ROWS,
+    columns: Optional[Sequence[str]] = None,
+    row_filter: Optional[RowFilter] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    ``iter_csv_chunks`` para cualquiera de los ``INPUT_FORMATS`` (CSV
+    también comprimido con gzip o zstd), detectado por sus primeros bytes.
+
+    Los formatos columnares leen solo ``columns`` y aplican ``row_filter``
+    en el lector; sus bloques se reagrupan según ``memory_budget`` y se
+    convierten con ``raw_frame``.
+    """
+    fmt, compression = detect_format(source)
+    require_format(fmt, compression)
+    if fmt == "csv":
+        yield from iter_csv_chunks(source, memory_budget, probe_rows, columns, row_filter, compression or "infer")
+        return
+
+    pending: List[pd.DataFrame] = []
+    pending_rows = 0
+    chunk_rows = None
+    for batch in _arrow_batches(source, fmt, columns, row_filter, probe_rows):
+        if chunk_rows is None:
+            # El primer lote hace de muestra, como en el CSV
+            chunk_rows = rows_per_chunk(raw_frame(batch), memory_budget)
+            yield raw_frame(batch)
+            continue
+        pending.append(batch)
+        pending_rows += len(batch)
+        if pending_rows >= chunk_rows:
+            yield raw_frame(pd.concat(pending, ignore_index=True))
+            pending, pending_rows = [], 0
+    if pending:
+        yield raw_frame(pd.concat(pending, ignore_index=True))
+
+
+# Proporción máxima de valores distintos para guardar un texto como ``category``
+COMPACT_CATEGORY_RATIO = 0.5
+
+
+def csv_engine(engine: Optional[str] = None) -> str:
+    """Motor de ``pd.read_csv`` (el pedido o INGEST_CSV_ENGINE); "pyarrow" solo si está instalado."""
+    engine = engine or INGEST_CSV_ENGINE
+    if engine == "pyarrow" and importlib.util.find_spec("pyarrow") is None:
+        return "c"
+    return engine
+
+
+def downcast_numeric(values: pd.Series) -> pd.Series:
+    """
+    Enteros al tipo con signo más pequeño en que caben; floats a float32
+    solo si todos los valores se representan exactamente.
+    """
+    if pd.api.types.is_bool_dtype(values):
+        return values
+    if pd.api.types.is_integer_dtype(values):
+        return pd.to_numeric(values, downcast="integer")
+    if pd.api.types.is_float_dtype(values) and values.dtype != np.float32:
+        small = values.astype(np.float32)
+        if np.array_equal(small.to_numpy(dtype=np.float64), values.to_numpy(), equal_nan=True):
+            return small
+    return values
+
+
+def compact_series(values: pd.Series, col_type: str, date_format: Optional[str] = None) -> pd.Series:
+    """
+    Columna con el dtype más compacto que no pierde información según su
+    tipo inferido (``ColumnType.value``):
+
+    - numéricas: ``downcast_numeric`` (un 0/1 BOOLEAN queda como int8);
+    - BOOLEAN de texto: ``bool`` (``boolean`` si hay nulos);
+    - DATE/TIMESTAMP: ``datetime64`` si todos los valores se parsean (con
+      ``date_format``, el detectado en la inferencia, o si no formato mixto);
+    - texto con pocos valores distintos: ``category``.
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return downcast_numeric(values)
+    if values.dtype != object:
+        return values
+    non_null = values.dropna().astype(str)
+    if col_type == ColumnType.BOOLEAN.value and non_null.isin(BOOLEAN_TOKENS).all():
+        flags = non_null.isin(BOOLEAN_TRUE_TOKENS)
+        if len(non_null) == len(values):
+            return flags.astype(bool)
+        return flags.reindex(values.index).astype("boolean")
+    if col_type in (ColumnType.DATE.value, ColumnType.TIMESTAMP.value):
+        for fmt in dict.fromkeys([date_format or "mixed", "mixed"]):
+            parsed = pd.to_datetime(values, errors="coerce", format=fmt)
+            if parsed.notna().sum() == len(non_null):
+                return parsed
+    if not is_high_cardinality(values.nunique(dropna=True), len(values), COMPACT_CATEGORY_RATIO):
+        return values.astype("category")
+    return values
+
+
+def compact_frame(
+    df: pd.DataFrame, schema: Dict[str, str], date_formats: Optional[Dict[str, str]] = None
+) -> pd.DataFrame:
+    """
+    ``compact_series`` columna a columna según ``schema`` ({columna: tipo})
+    y los formatos de fecha detectados ({columna: formato}).
+    """
+    date_formats = date_formats or {}
+    return pd.DataFrame(
+        {
+            col: compact_series(df[col], schema.get(col, ColumnType.STRING.value), date_formats.get(col))
+            for col in df.columns
+        },
+        columns=df.columns,
+    )
+
+
+def read_csv_compact(
+    source: CsvSource,
+    schema: Optional[Dict[str, str]] = None,
+    date_formats: Optional[Dict[str, str]] = None,
+    engine: Optional[str] = None,
+    probe_rows: int = INGEST_PROBE_ROWS,
+) -> pd.DataFrame:
+    """
+    Lee un CSV completo con dtypes compactos (ver ``compact_series``).
+
+    Sin ``schema`` se infiere con ``ColumnTypeInferer`` sobre las primeras
+    ``probe_rows`` filas (incluidos los formatos de fecha); los textos de
+    baja cardinalidad en esa muestra se leen directamente como ``category``
+    para no materializar los objetos.
+    """
+    probe = pd.read_csv(source, dtype=object, nrows=probe_rows)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    if schema is None:
+        inferer = ColumnTypeInferer()
+        inferred = inferer.infer_frame(probe)
+        schema = {col: col_type.value for col, col_type in inferred.items()}
+        date_formats = {**inferer.formats, **(date_formats or {})}
+    dtype = {
+        col: "category"
+        for col in probe.columns
+        if schema.get(col) in (ColumnType.STRING.value, ColumnType.ID.value)
+        and not is_high_cardinality(probe[col].nunique(), len(probe), COMPACT_CATEGORY_RATIO)
+    }
+    df = pd.read_csv(source, dtype=dtype or None, engine=csv_engine(engine))
+    return compact_frame(df, schema, date_formats)
@@ -0,0 +1,64 @@
+"""
+Benchmark: bytes por fila de un CSV cargado con los dtypes por defecto de
+``pd.read_csv`` frente a ``read_csv_compact`` (dtypes elegidos a partir del
+esquema inferido: category, enteros/floats pequeños, bool y datetime64).
+
+Uso:
+    python benchmarks/bench_compact_loader.py --rows 200000 [--engine pyarrow]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from app.utils.file_utils import csv_engine, read_csv_compact  # noqa: E402
+
+
+def make_census_csv(n_rows: int, seed: int = 0) -> str:
+    """Columnas típicas de un dataset tabular: textos repetidos, enteros pequeños, fechas..."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "id": np.arange(n_rows),
+        "gender": rng.choice(["Female", "Male", "Non-binary"], n_rows),
+        "country": rng.choice(["Spain", "France", "Germany", "Italy", "Portugal", "Mexico"], n_rows),
+        "age": rng.integers(18, 90, n_rows),
+        "children": rng.integers(0, 6, n_rows),
+        "income": rng.integers(0, 200_000, n_rows) / 4,
+        "member": rng.choice(["Sí", "No"], n_rows),
+        "signup": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1500, n_rows), unit="D"),
+        "label": rng.integers(0, 2, n_rows),
+    })
+    return df.to_csv(index=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--engine", default=None, help='"c" o "pyarrow" (por defecto INGEST_CSV_ENGINE)')
+    args = parser.parse_args()
+
+    text = make_census_csv(args.rows)
+    results = {}
+    for name, load in [
+        ("pd.read_csv", lambda: pd.read_csv(io.StringIO(text))),
+        (f"read_csv_compact ({csv_engine(args.engine)})", lambda: read_csv_compact(io.StringIO(text), engine=args.engine)),
+    ]:
+        start = time.perf_counter()
+        df = load()
+        elapsed = time.perf_counter() - start
+        per_row = df.memory_usage(index=False, deep=True).sum() / len(df)
+        results[name] = per_row
+        print(f"{name:<28} {per_row:8.1f} bytes/fila  {elapsed * 1000:8.1f} ms")
+        print("    " + ", ".join(f"{col}: {dtype}" for col, dtype in df.dtypes.items()))
+    before, after = results.values()
+    print(f"{'reducción':<28} {before / after:8.1f}x  ({args.rows} filas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark: ``ColumnTypeInferer.infer`` columna a columna frente a
+``ColumnTypeInferer.infer_frame`` sobre un DataFrame ancho.
+
+Uso:
+    python benchmarks/bench_infer_frame.py --rows 5000 --cols 400
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from schema_inference import ColumnTypeInferer
+from schema_inference.utils import default_logger
+
+
+def make_wide_frame(n_rows: int, n_cols: int, seed: int = 0) -> pd.DataFrame:
+    """DataFrame con una mezcla de los tipos que reconoce el inferidor."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2020-01-01", periods=n_rows, freq="h")
+    makers = [
+        lambda: rng.choice(["True", "False"], n_rows),
+        lambda: [f"{v}%" for v in rng.integers(0, 100, n_rows)],
+        lambda: [f"${v:.2f}" for v in rng.random(n_rows) * 100],
+        lambda: rng.integers(0, 1000, n_rows),
+        lambda: rng.random(n_rows) * 1000,
+        lambda: dates.strftime("%Y-%m-%dT%H:%M:%S"),
+        lambda: dates.strftime("%Y-%m-%d"),
+        lambda: dates.strftime("%b %d %Y"),
+        lambda: [f"id_{i}" for i in range(n_rows)],
+        lambda: rng.choice(["red", "green", "blue"], n_rows),
+    ]
+    data = {f"col_{j}": makers[j % len(makers)]() for j in range(n_cols)}
+    return pd.DataFrame(data)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--cols", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    default_logger.setLevel(logging.WARNING)
+    df = make_wide_frame(args.rows, args.cols)
+    inferer = ColumnTypeInferer()
+
+    def per_column():
+        return {col: inferer.infer(df[col]) for col in df.columns}
+
+    def batch():
+        return inferer.infer_frame(df)
+
+    assert per_column() == batch(), "infer_frame no coincide con infer"
+
+    timings = {}
+    for name, fn in [("infer (por columna)", per_column), ("infer_frame", batch)]:
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best
+        print(f"{name:<22} {best * 1000:9.1f} ms")
+    speedup = timings["infer (por columna)"] / timings["infer_frame"]
+    print(f"{'speedup':<22} {speedup:9.1f}x  ({args.rows} filas x {args.cols} columnas)")
+
+
+if __name__ == "__main__":
+    main()
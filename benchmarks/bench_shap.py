@@ -0,0 +1,51 @@
+"""
+Benchmark: latencia de ``shap_importance`` (ajuste del bosque sobre una
+muestra estratificada más contribuciones con presupuesto de tiempo) según
+el número de filas y de columnas.
+
+Con presupuesto la latencia se mantiene cerca de ``--budget`` aunque
+crezcan las filas: lo que cambia es cuántas filas se explican.
+
+Uso:
+    python benchmarks/bench_shap.py --rows 10000 50000 200000 --cols 10 50 --budget 5
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services.shap_analysis import resolve_method, shap_importance  # noqa: E402
+from synthetic import make_dataset  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 50_000, 200_000])
+    parser.add_argument("--cols", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--budget", type=float, default=5.0)
+    parser.add_argument("--method", default="auto")
+    parser.add_argument("--n-jobs", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"método: {resolve_method(args.method)}, presupuesto: {args.budget:.1f} s")
+    print(f"{'filas':>9} {'columnas':>9} {'total (s)':>10} {'ajuste (s)':>11} {'explicadas':>11} {'filas/s':>10}")
+    for cols in args.cols:
+        for rows in args.rows:
+            data = make_dataset(rows=rows, cols=cols, leaks=1, correlated_pairs=1)
+            start = time.perf_counter()
+            result = shap_importance(
+                data.df, data.target, discrete_target=True, time_budget=args.budget,
+                method=args.method, n_jobs=args.n_jobs,
+            )
+            total = time.perf_counter() - start
+            fit = result["model"]["fit_seconds"]
+            explained = result["explained_rows"]
+            rate = explained / max(total - fit, 1e-9)
+            print(f"{rows:>9} {cols:>9} {total:>10.2f} {fit:>11.2f} {explained:>11} {rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
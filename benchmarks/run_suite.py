@@ -0,0 +1,349 @@
+"""
+Suite de benchmarks: tiempo y pico de memoria de cada servicio y de los
+endpoints HTTP sobre un dataset sintético (ver ``synthetic.py``).
+
+Cada caso se ejecuta ``--repeat`` veces (se guarda la mediana y el mínimo)
+y una vez más bajo ``tracemalloc`` para medir el pico de memoria. El caso
+``startup.import_app`` mide el arranque en frío: el tiempo de importar
+``app.main`` en un intérprete nuevo según ``python -X importtime``. Los
+resultados se escriben en JSON; con ``--baseline`` se comparan con una
+ejecución anterior y se marcan como regresión los casos que empeoran más
+de ``--tolerance``.
+
+Uso:
+    python benchmarks/run_suite.py --rows 20000 --cols 40 --output bench.json
+    python benchmarks/run_suite.py --baseline bench.json --only correlation --fail-on-regression
+"""
+import argparse
+import datetime
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from app.schema_inference.infer import ColumnTypeInferer  # noqa: E402
+from app.schema_inference.utils import default_logger  # noqa: E402
+from app.services import correlation_service, dataset_cache, leak_detection  # noqa: E402
+from app.services.detect_problematic_columns import (  # noqa: E402
+    detect_constant_columns,
+    detect_duplicate_columns,
+    detect_empty_columns,
+    detect_feature_pairs_high_corr,
+    detect_id_columns,
+    detect_problem_columns,
+    detect_problem_columns_from_stats,
+)
+from app.services.evaluate_class_balance import (  # noqa: E402
+    evaluate_class_balance,
+    evaluate_class_balance_from_stats,
+)
+from app.services.streaming_stats import profile_csv  # noqa: E402
+from synthetic import SyntheticDataset, make_dataset  # noqa: E402
+
+# Diferencia mínima (segundos) para considerar regresión un caso lento
+MIN_REGRESSION_SECONDS = 0.005
+# Diferencia mínima (bytes) para considerar regresión el pico de memoria
+MIN_REGRESSION_BYTES = 1 << 20
+
+Case = Tuple[Optional[Callable[[], Any]], Callable[[Any], Any]]
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+
+def service_cases(data: SyntheticDataset) -> Dict[str, Case]:
+    """Casos ``nombre -> (preparación, función)`` de los servicios sobre el DataFrame."""
+    df, target = data.df, data.target
+    csv = data.to_csv()
+    stats = profile_csv(io.BytesIO(csv))
+    inferer = ColumnTypeInferer()
+    numeric = df.select_dtypes("number").drop(columns=target).to_numpy(dtype=float)
+    # Los estimadores kNN de sklearn no aceptan nulos
+    complete = df.dropna().reset_index(drop=True)
+
+    def run(fn: Callable[[], Any]) -> Case:
+        return None, lambda _: fn()
+
+    return {
+        "schema.infer": run(lambda: {col: inferer.infer(df[col]) for col in df.columns}),
+        "schema.infer_frame": run(lambda: inferer.infer_frame(df)),
+        "streaming.profile_csv": run(lambda: profile_csv(io.BytesIO(csv))),
+        "correlation.numeric": run(lambda: correlation_service.compute_numeric_correlation(df)),
+        "correlation.numeric_from_stats": run(
+            lambda: correlation_service.compute_numeric_correlation_from_stats(stats)
+        ),
+        "correlation.pearson_with_target": run(
+            lambda: correlation_service.compute_pearson_with_target(df, target)
+        ),
+        "correlation.pearson_with_target_from_stats": run(
+            lambda: correlation_service.compute_pearson_with_target_from_stats(stats, target)
+        ),
+        "correlation.threshold_pairs": run(
+            lambda: correlation_service.threshold_correlation_pairs(numeric, 0.95)
+        ),
+        "correlation.categorical": run(lambda: correlation_service.compute_categorical_correlation(df)),
+        "correlation.categorical_from_stats": run(
+            lambda: correlation_service.compute_categorical_correlation_from_stats(stats)
+        ),
+        "leaks.identical": run(lambda: leak_detection.detect_identical(df, target)),
+        "leaks.high_corr": run(lambda: leak_detection.detect_high_corr(df, target)),
+        "leaks.mi_knn": run(lambda: leak_detection.compute_mi(complete, target, True)),
+        "leaks.mi_binned": run(lambda: leak_detection.compute_mi(df, target, True, method="binned")),
+        "leaks.detect": run(lambda: leak_detection.detect_data_leaks(complete, target, discrete_target=True)),
+        "leaks.detect_binned": run(
+            lambda: leak_detection.detect_data_leaks(df, target, discrete_target=True, mi_method="binned")
+        ),
+        "leaks.detect_from_stats": run(lambda: leak_detection.detect_data_leaks_from_stats(
+            stats, target, discrete_target=True, mi_method="binned"
+        )),
+        "problems.constant": run(lambda: detect_constant_columns(df)),
+        "problems.empty": run(lambda: detect_empty_columns(df)),
+        "problems.id": run(lambda: detect_id_columns(df)),
+        "problems.duplicate": run(lambda: detect_duplicate_columns(df)),
+        "problems.feature_pairs": run(lambda: detect_feature_pairs_high_corr(df)),
+        "problems.detect": run(lambda: detect_problem_columns(df)),
+        "problems.detect_from_stats": run(lambda: detect_problem_columns_from_stats(stats)),
+        "class_balance.evaluate": run(lambda: evaluate_class_balance(df, target)),
+        "class_balance.evaluate_from_stats": run(lambda: evaluate_class_balance_from_stats(stats, target)),
+    }
+
+
+@contextmanager
+def isolated_registry() -> Iterator[str]:
+    """Caché de datasets temporal para los endpoints (se restaura la anterior al salir)."""
+    previous = dataset_cache._registry
+    with tempfile.TemporaryDirectory(prefix="bench-cache-") as root:
+        try:
+            yield root
+        finally:
+            dataset_cache._registry = previous
+
+
+def http_cases(data: SyntheticDataset, root: str) -> Dict[str, Case]:
+    """
+    Casos de los endpoints con el cliente de pruebas de FastAPI. Cada
+    repetición empieza con la caché vacía, así que incluye subida, parseo
+    y análisis (la primera petición de un fichero nuevo).
+    """
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    client = TestClient(app)
+    csv = data.to_csv()
+    target = data.target
+
+    def fresh_cache() -> None:
+        dataset_cache._registry = dataset_cache.DatasetRegistry(tempfile.mkdtemp(dir=root))
+
+    def post(path: str, **params: Any) -> Case:
+        def request(_: Any) -> Any:
+            response = client.post(f"/api{path}", params=params, files={"file": ("data.csv", csv)})
+            if response.status_code != 200:
+                raise RuntimeError(f"POST {path}: {response.status_code} {response.text[:200]}")
+            return response
+
+        return fresh_cache, request
+
+    return {
+        "http.datasets": post("/datasets"),
+        "http.schema_infer": post("/schema/infer"),
+        "http.correlation": post("/correlation"),
+        "http.detect_data_leaks": post(
+            "/detect-data-leaks", target_col=target, discrete_target=True, mi_method="binned"
+        ),
+        "http.evaluate_class_balance": post("/evaluate-class-balance", target_col=target),
+        "http.detect_problem_columns": post("/detect-problem-columns"),
+        "http.analysis": post("/analysis", target_col=target, discrete_target=True, mi_method="binned"),
+    }
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(módulo, µs propios, µs acumulados) de cada línea de ``-X importtime``."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # cabecera
+        rows.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+    return rows
+
+
+def import_time(module: str = "app.main") -> Tuple[float, List[Tuple[str, int, int]]]:
+    """Segundos de importar ``module`` en un intérprete nuevo y el detalle por módulo."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    rows = parse_importtime(proc.stderr)
+    total = next(cumulative for name, _, cumulative in rows if name == module)
+    return total / 1e6, rows
+
+
+def measure_import(module: str = "app.main", repeat: int = 3, top: int = 10) -> Dict[str, Any]:
+    """
+    Mediana y mínimo de ``repeat`` importaciones en frío de ``module`` y los
+    ``top`` módulos con más tiempo acumulado de la última (quién lo arrastra).
+    """
+    times = []
+    for _ in range(repeat):
+        seconds, rows = import_time(module)
+        times.append(seconds)
+    heaviest = sorted(rows, key=lambda row: row[2], reverse=True)[:top]
+    return {
+        "seconds": statistics.median(times), "min_seconds": min(times), "repeat": repeat,
+        "heaviest": [{"module": name, "cumulative_seconds": cumulative / 1e6} for name, _, cumulative in heaviest],
+    }
+
+
+def measure(case: Case, repeat: int = 3, memory: bool = True) -> Dict[str, Any]:
+    """Mediana y mínimo de ``repeat`` ejecuciones y pico de memoria de una más."""
+    setup, fn = case
+    times = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        fn(state)
+        times.append(time.perf_counter() - start)
+    result: Dict[str, Any] = {"seconds": statistics.median(times), "min_seconds": min(times), "repeat": repeat}
+    if memory:
+        state = setup() if setup else None
+        tracemalloc.start()
+        try:
+            fn(state)
+            result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float = 0.25,
+) -> List[Dict[str, Any]]:
+    """
+    Casos que empeoran más de ``tolerance`` (relativo) frente a ``baseline``
+    en tiempo (mediana) o pico de memoria, ignorando diferencias absolutas
+    menores que ``MIN_REGRESSION_SECONDS`` / ``MIN_REGRESSION_BYTES``.
+    """
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric, floor in (("seconds", MIN_REGRESSION_SECONDS), ("peak_bytes", MIN_REGRESSION_BYTES)):
+            if metric not in current or metric not in before:
+                continue
+            old, new = before[metric], current[metric]
+            if new - old > floor and new > old * (1 + tolerance):
+                regressions.append({
+                    "case": name, "metric": metric, "baseline": old, "current": new,
+                    "ratio": new / old if old else float("inf"),
+                })
+    return regressions
+
+
+def run_suite(
+    data: SyntheticDataset,
+    repeat: int = 3,
+    memory: bool = True,
+    only: Optional[List[str]] = None,
+    http: bool = True,
+    startup: bool = True,
+) -> Dict[str, Dict[str, Any]]:
+    """Resultados por caso; ``only`` filtra por subcadenas del nombre."""
+
+    def selected(cases: Dict[str, Any]) -> Dict[str, Any]:
+        return {name: case for name, case in cases.items() if not only or any(s in name for s in only)}
+
+    results = {}
+    if startup:
+        for name, module in selected({"startup.import_app": "app.main"}).items():
+            results[name] = measure_import(module, repeat)
+            print(format_result(name, results[name]), flush=True)
+    for name, case in selected(service_cases(data)).items():
+        results[name] = measure(case, repeat, memory)
+        print(format_result(name, results[name]), flush=True)
+    if http:
+        with isolated_registry() as root:
+            for name, case in selected(http_cases(data, root)).items():
+                results[name] = measure(case, repeat, memory)
+                print(format_result(name, results[name]), flush=True)
+    return results
+
+
+def format_result(name: str, result: Dict[str, Any]) -> str:
+    peak = result.get("peak_bytes")
+    memory = f"{peak / 2 ** 20:9.1f} MiB" if peak is not None else ""
+    return f"{name:<48} {result['seconds'] * 1000:10.1f} ms {memory}"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--cols", type=int, default=40)
+    parser.add_argument("--cardinality", type=int, default=20)
+    parser.add_argument("--null-rate", type=float, default=0.05)
+    parser.add_argument("--leaks", type=int, default=3)
+    parser.add_argument("--correlated-pairs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="*", help="Run only the cases whose name contains one of these")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc run")
+    parser.add_argument("--no-http", action="store_true", help="Skip the HTTP endpoint cases")
+    parser.add_argument("--no-startup", action="store_true", help="Skip the cold import time case")
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    parser.add_argument("--baseline", help="JSON of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+    default_logger.setLevel(logging.WARNING)
+
+    params = {
+        "rows": args.rows, "cols": args.cols, "cardinality": args.cardinality, "null_rate": args.null_rate,
+        "leaks": args.leaks, "correlated_pairs": args.correlated_pairs, "seed": args.seed,
+    }
+    data = make_dataset(**params)
+    results = run_suite(data, args.repeat, not args.no_memory, args.only, not args.no_http, not args.no_startup)
+
+    regressions: List[Dict[str, Any]] = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("params") != params:
+            print("Warning: the baseline was run with different dataset parameters", file=sys.stderr)
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['case']} {r['metric']}: {r['baseline']:.4g} -> {r['current']:.4g} "
+                  f"({r['ratio']:.2f}x)")
+
+    if args.output:
+        report = {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": params,
+            "planted": data.planted,
+            "results": results,
+            "regressions": regressions,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Generador de datasets sintéticos para los benchmarks.
+
+Las columnas se controlan por parámetros (filas, columnas, cardinalidad de
+las categóricas, proporción de nulos) y se plantan a propósito los casos
+que buscan los servicios: fugas del target, pares de columnas muy
+correladas, una columna identificadora y una constante. ``SyntheticDataset``
+guarda qué se plantó para poder comprobar los resultados.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+TARGET = "target"
+
+
+@dataclass
+class SyntheticDataset:
+    df: pd.DataFrame
+    target: str = TARGET
+    leaks: List[str] = field(default_factory=list)
+    correlated_pairs: List[tuple] = field(default_factory=list)
+    id_columns: List[str] = field(default_factory=list)
+    constant_columns: List[str] = field(default_factory=list)
+
+    def to_csv(self) -> bytes:
+        return self.df.to_csv(index=False).encode("utf-8")
+
+    @property
+    def planted(self) -> Dict[str, list]:
+        return {
+            "leaks": self.leaks,
+            "correlated_pairs": [list(pair) for pair in self.correlated_pairs],
+            "id_columns": self.id_columns,
+            "constant_columns": self.constant_columns,
+        }
+
+
+def _with_nulls(values: pd.Series, null_rate: float, rng: np.random.Generator) -> pd.Series:
+    if null_rate <= 0:
+        return values
+    return values.mask(rng.random(len(values)) < null_rate)
+
+
+def make_dataset(
+    rows: int = 10_000,
+    cols: int = 20,
+    cardinality: int = 10,
+    null_rate: float = 0.05,
+    leaks: int = 2,
+    correlated_pairs: int = 2,
+    categorical_fraction: float = 0.3,
+    n_classes: int = 3,
+    seed: int = 0,
+) -> SyntheticDataset:
+    """
+    ``cols`` columnas de ruido (numéricas y, en ``categorical_fraction``,
+    categóricas de ``cardinality`` niveles con frecuencias desiguales) más
+    un target discreto de ``n_classes`` clases desequilibradas, ``leaks``
+    columnas derivadas del target, ``correlated_pairs`` pares de columnas
+    numéricas casi colineales, un id y una constante.
+    """
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, n_classes + 1)
+    target = rng.choice(n_classes, rows, p=weights / weights.sum())
+    columns: Dict[str, pd.Series] = {"row_id": pd.Series(np.arange(rows)), "constant": pd.Series(["k"] * rows)}
+    data = SyntheticDataset(pd.DataFrame(), id_columns=["row_id"], constant_columns=["constant"])
+
+    n_categorical = int(round(cols * categorical_fraction))
+    n_numeric = cols - n_categorical
+    levels = np.array([f"c{k}" for k in range(max(cardinality, 1))], dtype=object)
+    zipf = 1.0 / np.arange(1, len(levels) + 1)
+    for j in range(n_numeric):
+        columns[f"num_{j}"] = _with_nulls(pd.Series(rng.normal(size=rows)), null_rate, rng)
+    for j in range(n_categorical):
+        values = pd.Series(rng.choice(levels, rows, p=zipf / zipf.sum()))
+        columns[f"cat_{j}"] = _with_nulls(values, null_rate, rng)
+
+    for i in range(correlated_pairs):
+        base = pd.Series(rng.normal(size=rows))
+        a, b = f"pair_{i}_a", f"pair_{i}_b"
+        columns[a] = base
+        columns[b] = base * (i + 2) + rng.normal(scale=0.01, size=rows)
+        data.correlated_pairs.append((a, b))
+
+    # Fugas: copia exacta, función casi lineal y recodificación categórica
+    makers = [
+        lambda: pd.Series(target),
+        lambda: pd.Series(target * 3.0 + rng.normal(scale=0.01, size=rows)),
+        lambda: pd.Series(np.array([f"class_{t}" for t in range(n_classes)], dtype=object)[target]),
+    ]
+    for i in range(leaks):
+        name = f"leak_{i}"
+        columns[name] = makers[i % len(makers)]()
+        data.leaks.append(name)
+
+    columns[TARGET] = pd.Series(target)
+    data.df = pd.DataFrame(columns)
+    return data
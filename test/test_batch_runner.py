@@ -0,0 +1,78 @@
+import json
+import os
+
+import pytest
+
+from app.services.batch_runner import INDEX_NAME, find_datasets, main, run_batch
+
+PARAMS = {"target_col": "label", "discrete_target": True, "mi_method": "binned"}
+
+
+def write_csv(path, n=60, with_target=True, offset=0):
+    lines = ["a,b,city" + (",label" if with_target else "")]
+    for i in range(n):
+        row = f"{i + offset},{(i * 3) % 7},{'xyz'[i % 3]}"
+        lines.append(row + (f",{i % 2}" if with_target else ""))
+    path.write_text("\n".join(lines) + "\n")
+
+
+@pytest.fixture
+def datasets(tmp_path):
+    data = tmp_path / "data"
+    (data / "nested").mkdir(parents=True)
+    write_csv(data / "one.csv")
+    write_csv(data / "two.csv", offset=5)
+    write_csv(data / "no_target.csv", with_target=False)
+    write_csv(data / "nested" / "deep.csv")
+    (data / "notes.txt").write_text("not a dataset")
+    return data
+
+
+def test_find_datasets_expands_directories_and_globs(datasets):
+    assert [os.path.basename(p) for p in find_datasets([str(datasets)])] == ["no_target.csv", "one.csv", "two.csv"]
+    assert len(find_datasets([str(datasets)], recursive=True)) == 4
+    assert find_datasets([str(datasets / "o*.csv"), str(datasets / "one.csv")]) == [str(datasets / "one.csv")]
+    with pytest.raises(FileNotFoundError):
+        find_datasets([str(datasets / "missing")])
+
+
+def test_run_batch_writes_results_and_resumes_by_hash(datasets, tmp_path):
+    out = tmp_path / "out"
+    paths = find_datasets([str(datasets)])
+    analyses = ["schema", "leaks", "class_balance", "problem_columns"]
+    index = run_batch(paths, str(out), analyses, PARAMS, workers=2)
+    assert index["summary"] == {"files": 3, "skipped": 0, "ok": 2, "partial": 1, "error": 0}
+
+    records = json.loads((out / INDEX_NAME).read_text())["datasets"]
+    one = records[str(datasets / "one.csv")]
+    result = json.loads((out / one["output"]).read_text())
+    assert result["rows"] == 60 and set(result["results"]) == set(analyses)
+    assert result["results"]["class_balance"]["counts"] == {"0": 30, "1": 30}
+    partial = records[str(datasets / "no_target.csv")]
+    assert set(partial["errors"]) == {"leaks", "class_balance"}
+
+    # Unchanged files are skipped; a changed one is recomputed
+    write_csv(datasets / "two.csv", offset=50)
+    index = run_batch(paths, str(out), analyses, PARAMS, workers=2)
+    assert index["summary"] == {"files": 3, "skipped": 2, "ok": 1, "partial": 0, "error": 0}
+    # Other parameters are other results
+    index = run_batch(paths, str(out), ["schema"], PARAMS)
+    assert index["summary"]["skipped"] == 0
+
+
+def test_run_batch_records_failures_and_retries_them(datasets, tmp_path):
+    (datasets / "empty.csv").write_text("")
+    out = tmp_path / "out"
+    paths = [str(datasets / "empty.csv"), str(datasets / "one.csv")]
+    index = run_batch(paths, str(out), ["schema"], {}, memory_limit=8 * 2 ** 30)
+    assert index["summary"]["error"] == 1 and index["summary"]["ok"] == 1
+    assert index["datasets"][paths[0]]["status"] == "error"
+    assert run_batch(paths, str(out), ["schema"], {})["summary"]["skipped"] == 1
+
+
+def test_cli(datasets, tmp_path, capsys):
+    out = tmp_path / "out"
+    assert main([str(datasets / "*.csv"), "--output", str(out), "--analyses", "schema", "--workers", "1"]) == 0
+    assert json.loads(capsys.readouterr().out)["ok"] == 3
+    with pytest.raises(SystemExit):
+        main([str(datasets), "--output", str(out), "--analyses", "leaks"])
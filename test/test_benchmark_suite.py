@@ -0,0 +1,44 @@
+from run_suite import compare, measure, parse_importtime, run_suite
+from synthetic import make_dataset
+
+from app.services.detect_problematic_columns import detect_problem_columns
+from app.services.leak_detection import detect_data_leaks
+
+
+def test_synthetic_dataset_plants_what_the_services_detect():
+    data = make_dataset(rows=2000, cols=6, cardinality=5, null_rate=0.1, leaks=2, correlated_pairs=1)
+    df = data.df
+    assert len(df) == 2000
+    assert df["num_0"].isna().mean() > 0.05
+    assert df["cat_0"].nunique() == 5
+
+    leaks = detect_data_leaks(df.dropna(), data.target, discrete_target=True, mi_method="binned")
+    assert {leak["feature"] for leak in leaks["leaks"]} >= set(data.leaks)
+    problems = detect_problem_columns(df)["problems"]
+    flagged = {(p["feature"], p["type"]) for p in problems if "feature" in p}
+    assert ("row_id", "id") in flagged and ("constant", "constant") in flagged
+    pairs = {p["feature_pair"] for p in problems if p["type"] == "high_feature_corr"}
+    assert data.correlated_pairs[0] in pairs
+
+
+def test_suite_reports_every_case_and_flags_regressions():
+    data = make_dataset(rows=300, cols=4, leaks=1, correlated_pairs=1)
+    results = run_suite(data, repeat=1, memory=False, only=["class_balance", "http.evaluate"])
+    assert set(results) == {
+        "class_balance.evaluate", "class_balance.evaluate_from_stats", "http.evaluate_class_balance"
+    }
+    assert measure((None, lambda _: sum(range(1000))), repeat=2)["peak_bytes"] >= 0
+
+    baseline = {"a": {"seconds": 0.1, "peak_bytes": 10 << 20}, "b": {"seconds": 0.001}}
+    current = {"a": {"seconds": 0.2, "peak_bytes": 10 << 20}, "b": {"seconds": 0.002}, "c": {"seconds": 1.0}}
+    assert [(r["case"], r["metric"]) for r in compare(current, baseline)] == [("a", "seconds")]
+
+
+def test_parse_importtime_reads_self_and_cumulative_times():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   numpy.core\n"
+        "import time:        30 |        150 | numpy\n"
+        "some other warning\n"
+    )
+    assert parse_importtime(stderr) == [("numpy.core", 120, 120), ("numpy", 30, 150)]
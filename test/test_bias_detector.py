@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.bias_detector import factorize_groups, fairness_metrics
+
+
+@pytest.fixture
+def df() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    n = 4000
+    frame = pd.DataFrame({
+        "gender": rng.choice(["F", "M"], n),
+        "age": rng.choice(["<30", "30-50", ">50", None], n),
+        "country": rng.choice(["ES", "FR"], n),
+    })
+    frame["y"] = (rng.random(n) < np.where(frame["gender"] == "F", 0.2, 0.4)).astype(int)
+    frame["pred"] = np.where(rng.random(n) < 0.8, frame["y"], 1 - frame["y"])
+    return frame
+
+
+def grouping(report, *attributes):
+    return next(g for g in report["groupings"] if g["attributes"] == list(attributes))
+
+
+def test_groups_match_a_filtered_groupby(df):
+    report = fairness_metrics(df, ["gender", "age", "country"], "y", "pred", positive_class=1)
+    assert [g["attributes"] for g in report["groupings"]] == [
+        ["gender"], ["age"], ["country"], ["gender", "age"], ["gender", "country"], ["age", "country"]
+    ]
+    for attributes in (["gender"], ["gender", "age"]):
+        expected = df.dropna(subset=attributes).groupby(attributes)
+        selection = expected["pred"].mean()
+        tpr = df[df["y"] == 1].dropna(subset=attributes).groupby(attributes)["pred"].mean()
+        groups = grouping(report, *attributes)["groups"]
+        assert len(groups) == len(selection)
+        for group in groups:
+            key = tuple(group["group"][a] for a in attributes)
+            key = key[0] if len(key) == 1 else key
+            assert group["count"] == expected.size()[key]
+            assert group["positive_rate"] == pytest.approx(selection[key])
+            assert group["true_positive_rate"] == pytest.approx(tpr[key])
+            assert group["class_balance"]["counts"][1] == expected["y"].sum()[key]
+
+    parity = grouping(report, "gender")["demographic_parity"]
+    rates = df.groupby("gender")["pred"].mean()
+    assert parity["difference"] == pytest.approx(rates.max() - rates.min())
+    assert parity["ratio"] == pytest.approx(rates.min() / rates.max())
+
+
+def test_target_only_report_and_small_groups(df):
+    report = fairness_metrics(df, ["gender", "age"], "y", max_order=1, min_group_size=10_000)
+    assert report["positive_class"] == 1  # minority class
+    assert [g["attributes"] for g in report["groupings"]] == [["gender"], ["age"]]
+    gender = grouping(report, "gender")
+    assert gender["equal_opportunity"] is None
+    assert all(g["small_group"] for g in gender["groups"])
+    assert gender["demographic_parity"]["difference"] is None
+
+
+def test_bootstrap_intervals_cover_the_estimates(df):
+    report = fairness_metrics(df, ["gender"], "y", "pred", n_bootstrap=300)
+    gender = grouping(report, "gender")
+    low, high = gender["demographic_parity"]["difference_ci"]
+    assert low < gender["demographic_parity"]["difference"] < high
+    assert low > 0  # the planted gap is significant
+    for group in gender["groups"]:
+        low, high = group["positive_rate_ci"]
+        assert low < group["positive_rate"] < high
+
+
+def test_factorize_groups_decodes_intersections():
+    a = np.array([0, 1, 1, -1, 0])
+    b = np.array([2, 0, 0, 1, 2])
+    ids, keys = factorize_groups([a, b], [2, 3])
+    assert ids.tolist() == [0, 1, 1, -1, 0]
+    assert keys.tolist() == [[0, 2], [1, 0]]
+
+
+def test_unknown_columns_and_classes(df):
+    with pytest.raises(KeyError):
+        fairness_metrics(df, ["missing"], "y")
+    with pytest.raises(ValueError):
+        fairness_metrics(df, ["gender"], "y", positive_class="nope")
@@ -0,0 +1,42 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from app.utils.file_utils import compact_frame, read_csv_compact
+
+CSV = """id,gender,country,age,score,ratio,member,signup,active
+1,F,ES,34,0.5,0.1,Sí,2023-01-05,1
+2,M,FR,41,1.25,0.2,No,2023-02-11,0
+3,F,ES,29,,0.3,Sí,2023-03-20,1
+4,M,ES,52,2.0,0.4,,2023-04-02,0
+5,F,FR,38,3.5,0.5,No,2023-05-30,1
+6,F,ES,45,0.75,0.6,Sí,2023-06-14,0
+"""
+
+
+def test_compact_dtypes_follow_the_schema():
+    df = read_csv_compact(io.StringIO(CSV))
+    assert df["gender"].dtype == "category" and df["country"].dtype == "category"
+    assert df["age"].dtype == np.int8 and df["active"].dtype == np.int8
+    # 0.1 no es representable en float32: se mantiene float64
+    assert df["score"].dtype == np.float32 and df["ratio"].dtype == np.float64
+    assert df["member"].dtype == "boolean"
+    assert df["member"].tolist()[:4] == [True, False, True, pd.NA]
+    assert pd.api.types.is_datetime64_any_dtype(df["signup"])
+
+
+def test_compaction_keeps_the_values():
+    plain = pd.read_csv(io.StringIO(CSV))
+    df = read_csv_compact(io.StringIO(CSV))
+    for col in ["id", "age", "score", "ratio", "active"]:
+        assert np.array_equal(df[col].to_numpy(np.float64), plain[col].to_numpy(np.float64), equal_nan=True)
+    for col in ["gender", "country"]:
+        assert df[col].astype(object).tolist() == plain[col].tolist()
+    assert df.memory_usage(deep=True).sum() < plain.memory_usage(deep=True).sum()
+
+
+def test_unparseable_dates_and_unique_text_stay_as_objects():
+    df = pd.DataFrame({"when": ["2023-01-01", "soon", "2023-01-03"], "name": ["ana", "luis", "eva"]})
+    compact = compact_frame(df, {"when": "date", "name": "string"})
+    assert compact["when"].dtype == object and compact["name"].dtype == object
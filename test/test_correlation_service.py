@@ -0,0 +1,116 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import pearsonr
+
+from app.services import correlation_service
+from app.services.correlation_service import (
+    compute_categorical_correlation,
+    compute_pearson_with_target,
+    cramers_v,
+    threshold_correlation_pairs,
+)
+
+
+def pairwise_cramers_v(df: pd.DataFrame) -> np.ndarray:
+    cat = df.select_dtypes(include=["category", object])
+    mat = np.zeros((cat.shape[1], cat.shape[1]))
+    for (i, a), (j, b) in itertools.combinations_with_replacement(enumerate(cat.columns), 2):
+        mat[i, j] = mat[j, i] = cramers_v(cat[a].dropna(), cat[b].dropna())
+    return mat
+
+
+def random_categorical_frame(seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(20, 300))
+    data = {}
+    for j in range(5):
+        values = rng.choice([f"c{k}" for k in range(int(rng.integers(1, 6)))], n).astype(object)
+        values[rng.random(n) < 0.2] = None
+        data[f"x{j}"] = values
+    data["num"] = rng.random(n)
+    df = pd.DataFrame(data)
+    df["x0"] = df["x0"].astype("category")
+    return df
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+@pytest.mark.parametrize("seed", range(5))
+def test_bincount_cramers_v_matches_pairwise(seed):
+    df = random_categorical_frame(seed)
+    expected = pairwise_cramers_v(df)
+    assert np.array_equal(compute_categorical_correlation(df).to_numpy(), expected, equal_nan=True)
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+def test_high_cardinality_pairs_and_process_pool(monkeypatch):
+    df = random_categorical_frame(7)
+    expected = pairwise_cramers_v(df)
+    monkeypatch.setattr(correlation_service, "_BINCOUNT_MAX_CELLS", 4)
+    monkeypatch.setattr(correlation_service, "CRAMERS_V_PARALLEL_MIN_COLUMNS", 2)
+    result = compute_categorical_correlation(df, n_jobs=2)
+    assert np.array_equal(result.to_numpy(), expected, equal_nan=True)
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+@pytest.mark.parametrize("seed", range(3))
+def test_dense_tables_are_counted_in_batches_under_the_cell_cap(monkeypatch, seed):
+    df = random_categorical_frame(seed)
+    expected = pairwise_cramers_v(df)
+    # Cada fila reparte sus pares en varias tandas de como mucho 40 celdas
+    monkeypatch.setattr(correlation_service, "_BINCOUNT_MAX_CELLS", 40)
+    assert np.array_equal(compute_categorical_correlation(df).to_numpy(), expected, equal_nan=True)
+    assert correlation_service._cell_batches(np.array([30, 10, 20, 40, 5]), 40) == [
+        slice(0, 2), slice(2, 3), slice(3, 4), slice(4, 5)
+    ]
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+@pytest.mark.parametrize("p_value", ["beta", "t"])
+def test_vectorized_pearson_matches_pearsonr(p_value):
+    rng = np.random.default_rng(1)
+    n = 300
+    df = pd.DataFrame(rng.normal(size=(n, 4)), columns=list("abcd"))
+    df["y"] = 2 * df["a"] + rng.normal(size=n)
+    for col in "ab":
+        df.loc[rng.random(n) < 0.2, col] = np.nan
+    df.loc[rng.random(n) < 0.1, "y"] = np.nan
+    df["constant"] = 5.0
+    # Índice duplicado: el emparejado es por fila, no por etiqueta
+    df.index = np.arange(n) // 2
+
+    result = compute_pearson_with_target(df, "y", p_value=p_value)
+    for col in "abcd":
+        rows = df[[col, "y"]].dropna()
+        expected = pearsonr(rows[col], rows["y"])
+        assert result.loc[col, "correlation"] == pytest.approx(expected[0], rel=1e-12)
+        assert result.loc[col, "p_value"] == pytest.approx(expected[1], rel=1e-9)
+    assert result.loc["constant"].isna().all()
+
+
+def test_pearson_with_non_numeric_target():
+    df = pd.DataFrame({"x": [1.0, 2.0, 3.0], "y": ["a", "b", "c"]})
+    with pytest.raises(KeyError):
+        compute_pearson_with_target(df, "y")
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+@pytest.mark.parametrize("with_nulls", [False, True])
+def test_blockwise_pairs_match_dense_matrix(with_nulls):
+    rng = np.random.default_rng(3)
+    base = rng.normal(size=(400, 6))
+    X = np.hstack([base, base + 0.1 * rng.normal(size=base.shape), rng.normal(size=(400, 8))])
+    X[:, -1] = 1.0
+    if with_nulls:
+        X[rng.random(X.shape) < 0.1] = np.nan
+    dense = pd.DataFrame(X).corr().to_numpy()
+    expected = [(i, j) for i in range(X.shape[1]) for j in range(i + 1, X.shape[1]) if abs(dense[i, j]) >= 0.8]
+
+    rows, cols, values = threshold_correlation_pairs(X, 0.8, block_size=3)
+    assert list(zip(rows, cols)) == expected
+    assert np.allclose(values, dense[rows, cols])
+
+    _, cols, values = threshold_correlation_pairs(X, 0.8, query=np.array([2]))
+    assert list(cols) == [j for j in range(X.shape[1]) if j != 2 and abs(dense[2, j]) >= 0.8]
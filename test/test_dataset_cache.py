@@ -0,0 +1,150 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.correlation_service import (
+    compute_categorical_correlation,
+    compute_numeric_correlation,
+    compute_pearson_with_target,
+)
+from app.services.dataset_cache import DatasetRegistry, write_columns
+from app.services.dataset_profile import DatasetProfile
+from app.services.detect_problematic_columns import detect_feature_pairs_high_corr
+from app.services.streaming_stats import profile_csv
+from app.utils.file_utils import iter_csv_chunks
+
+DATASET_PATH = "test/datasets/AER_credit_card_data.csv"
+
+
+def upload(text: str) -> io.BytesIO:
+    return io.BytesIO(text.encode("utf-8"))
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return DatasetRegistry(str(tmp_path), max_bytes=10 ** 9)
+
+
+def test_same_content_is_parsed_once(registry):
+    with open(DATASET_PATH, "rb") as f:
+        data = f.read()
+    entry, created = registry.register(io.BytesIO(data))
+    again, created_again = registry.register(io.BytesIO(data))
+    assert created and not created_again
+    assert again.dataset_id == entry.dataset_id
+    assert registry.get(entry.dataset_id) is entry
+
+
+def test_column_store_round_trips(registry):
+    df = pd.read_csv(DATASET_PATH)
+    with open(DATASET_PATH, "rb") as f:
+        entry, _ = registry.register(f)
+    loaded = entry.load_frame()
+    pd.testing.assert_frame_equal(loaded, df)
+    pd.testing.assert_frame_equal(entry.load_frame(["card", "age"], n_rows=3), df[["card", "age"]].head(3))
+
+
+def test_missing_values_and_raw_text_columns(registry, tmp_path):
+    text = "name,flag,x\nana,yes,1\n,no,\nñandú,,2.5\nluis,yes,3\n"
+    entry, _ = registry.register(upload(text))
+    pd.testing.assert_frame_equal(entry.load_frame(), pd.read_csv(io.StringIO(text)))
+
+    # Past max_categories the text column is stored as raw UTF-8
+    stats = profile_csv(upload(text), max_categories=1)
+    layout = write_columns(stats, iter_csv_chunks(upload(text)), str(tmp_path / "raw"))
+    assert layout["name"] == "utf8"
+
+
+def test_appended_partition_reuses_history(registry):
+    first, second = "a,b,c\n1,x,2\n2,y,3\n", "a,b,c\n3,x,4.5\n,z,5\n"
+    base, _ = registry.register(upload(first))
+    combined, created = registry.append(base.dataset_id, upload(second))
+    assert created and combined.partitions == [base.dataset_id, registry.register(upload(second))[0].dataset_id]
+    expected = pd.read_csv(io.StringIO(first + second.split("\n", 1)[1]))
+    pd.testing.assert_frame_equal(combined.load_frame(), expected)
+    assert combined.meta["n_rows"] == 4 and combined.stats.dtypes.to_dict() == expected.dtypes.astype(str).to_dict()
+    assert registry.append(base.dataset_id, upload(second))[0].dataset_id == combined.dataset_id
+    with pytest.raises(ValueError):
+        registry.append(base.dataset_id, upload("other\n1\n"))
+
+
+def test_cramers_v_from_stored_codes(registry):
+    df = pd.read_csv(DATASET_PATH)
+    with open(DATASET_PATH, "rb") as f:
+        entry, _ = registry.register(f)
+    profile = DatasetProfile(entry.stats, memo=entry.memo, store=entry)
+    pd.testing.assert_frame_equal(profile.categorical_correlation(), compute_categorical_correlation(df))
+
+    base, _ = registry.register(upload("a,b\nx,u\ny,v\n"))
+    combined, _ = registry.append(base.dataset_id, upload("a,b\nz,u\n,v\n"))
+    codes, sizes = combined.load_codes(["a", "b"])
+    assert codes.tolist() == [[0, 0], [1, 1], [2, 0], [-1, 1]] and sizes.tolist() == [3, 2]
+
+
+def test_moments_are_built_below_the_column_limit(registry, monkeypatch):
+    narrow, _ = registry.register(upload("a,b,c\n1,x,2\n2,y,3\n"))
+    assert narrow.stats.has_moments and narrow.stats.categorical_columns == []
+    assert narrow.stats.sample_is_complete
+
+    monkeypatch.setattr("app.services.dataset_cache.INGEST_MAX_MOMENT_COLUMNS", 1)
+    wide, _ = registry.register(upload("a,b,c\n1,x,2\n2,y,4\n"))
+    assert not wide.stats.has_moments
+    # A partition cached without co-moments leaves the combined dataset without them
+    combined, _ = registry.append(narrow.dataset_id, upload("a,b,c\n3,z,1\n"))
+    assert not combined.stats.has_moments and combined.stats.n_rows == 3
+
+
+def test_correlations_from_the_column_store_match_the_frame(registry, monkeypatch):
+    monkeypatch.setattr("app.services.dataset_cache.INGEST_MAX_MOMENT_COLUMNS", 1)
+    # One column per block
+    monkeypatch.setattr("app.services.correlation_service.INGEST_MEMORY_BUDGET_BYTES", 1)
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=300)
+    df = pd.DataFrame({
+        "x": np.where(rng.random(300) < 0.1, np.nan, x),
+        "y": 2 * x + rng.normal(scale=0.1, size=300),
+        "z": rng.normal(size=300),
+        "flag": x > 0,
+        "label": rng.choice(["a", "b"], size=300),
+    })
+    entry, _ = registry.register(upload(df.to_csv(index=False)))
+    profile = DatasetProfile(entry.stats, store=entry)
+    assert not entry.stats.has_moments
+
+    pd.testing.assert_frame_equal(profile.numeric_correlation(), compute_numeric_correlation(df))
+    pd.testing.assert_frame_equal(profile.pearson_target("y"), compute_pearson_with_target(df, "y", "t"))
+    flag = profile.target_correlations("flag")
+    expected = df[["x", "y", "z"]].corrwith(df["flag"].astype(float))
+    pd.testing.assert_series_equal(flag, expected, check_names=False)
+    assert profile.target_correlations("label").empty
+    pairs = profile.feature_pair_correlations(0.5)
+    expected_pairs = detect_feature_pairs_high_corr(df, 0.5)
+    assert [p["feature_pair"] for p in pairs] == [p["feature_pair"] for p in expected_pairs] == [("x", "y")]
+    assert pairs[0]["corr_coeff"] == pytest.approx(expected_pairs[0]["corr_coeff"])
+
+
+def test_memoized_results_survive_new_entries(registry):
+    entry, _ = registry.register(upload("a,b\n1,2\n3,4\n"))
+    calls = []
+    compute = lambda: calls.append(1) or {"value": 42}
+    assert entry.memo("key|1", compute) == {"value": 42}
+    assert registry.get(entry.dataset_id).memo("key|1", compute) == {"value": 42}
+    assert len(calls) == 1
+
+
+def test_least_recently_used_dataset_is_evicted(tmp_path):
+    registry = DatasetRegistry(str(tmp_path), max_bytes=1, memory_entries=1)
+    first, _ = registry.register(upload("a,b\n1,2\n"))
+    second, _ = registry.register(upload("a,b\n3,4\n"))
+    with pytest.raises(KeyError):
+        registry.get(first.dataset_id)
+    assert registry.get(second.dataset_id).meta["n_rows"] == 1
+
+
+def test_unknown_or_malformed_ids(registry):
+    with pytest.raises(KeyError):
+        registry.get("0" * 64)
+    with pytest.raises(KeyError):
+        registry.get("../etc")
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from app.services import dataset_cache
+from app.services.dataset_cache import DatasetRegistry
+from app.services.dataset_profile import (
+    ANALYSES,
+    DatasetProfile,
+    build_profile,
+    run_analyses,
+    stats_options,
+)
+from app.services.evaluate_class_balance import evaluate_class_balance
+from app.services.detect_problematic_columns import detect_problem_columns
+
+DATASET_PATH = "test/datasets/AER_credit_card_data.csv"
+
+
+def test_all_analyses_from_one_parse():
+    profile = build_profile(DATASET_PATH, list(ANALYSES))
+    out = run_analyses(profile, ["class_balance", "problem_columns", "schema"], target_col="card")
+
+    df = pd.read_csv(DATASET_PATH)
+    assert out["results"]["class_balance"] == evaluate_class_balance(df, "card")
+    assert out["results"]["problem_columns"] == detect_problem_columns(df)
+    assert out["results"]["schema"]["schema"]["majorcards"] == "boolean"
+    assert set(out["timings"]) == {"parse", "class_balance", "problem_columns", "schema"}
+
+
+def test_only_needed_accumulators_are_built():
+    options = stats_options(["class_balance"])
+    assert options == {"moments": False, "contingency": False, "sample_rows": 0}
+
+
+def test_wide_dataset_correlations_come_from_the_column_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_cache, "INGEST_MAX_MOMENT_COLUMNS", 3)
+    with open(DATASET_PATH, "rb") as f:
+        entry, _ = DatasetRegistry(str(tmp_path), max_bytes=10 ** 9).register(f)
+    assert not entry.stats.has_moments
+    from_store = DatasetProfile(entry.stats, memo=entry.memo, store=entry)
+    from_moments = build_profile(DATASET_PATH, list(ANALYSES))
+
+    params = {"target_col": "expenditure", "corr_threshold": 0.6}
+    analyses = ["correlation", "problem_columns"]
+    got = run_analyses(from_store, analyses, **params)["results"]
+    expected = run_analyses(from_moments, analyses, **params)["results"]
+    assert got["problem_columns"]["summary"] == expected["problem_columns"]["summary"]
+    assert [p.get("feature_pair") for p in got["problem_columns"]["problems"]] == [
+        p.get("feature_pair") for p in expected["problem_columns"]["problems"]
+    ]
+    pd.testing.assert_frame_equal(
+        pd.DataFrame(got["correlation"]["numeric_corr"]), pd.DataFrame(expected["correlation"]["numeric_corr"])
+    )
+    np.testing.assert_allclose(
+        from_store.target_correlations("expenditure"), from_moments.target_correlations("expenditure")
+    )
+
+
+def test_correlated_pairs_are_searched_once_for_every_threshold(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_cache, "INGEST_MAX_MOMENT_COLUMNS", 3)
+    with open(DATASET_PATH, "rb") as f:
+        entry, _ = DatasetRegistry(str(tmp_path), max_bytes=10 ** 9).register(f)
+    keys = []
+
+    def memo(key, compute):
+        keys.append(key)
+        return entry.memo(key, compute)
+
+    profile = DatasetProfile(entry.stats, memo=memo, store=entry)
+    from_moments = build_profile(DATASET_PATH, ["problem_columns"])
+    for threshold in (0.6, 0.9, 0.95):
+        pairs = profile.feature_pair_correlations(threshold)
+        expected = from_moments.feature_pair_correlations(threshold)
+        assert [p["feature_pair"] for p in pairs] == [p["feature_pair"] for p in expected]
+    assert keys == ["corr_pairs"] * 3
+    profile.feature_pair_correlations(0.3)
+    assert keys[-1] == "corr_pairs|0.3"
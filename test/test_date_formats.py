@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from schema_inference import ColumnTypeInferer
+from schema_inference import dates
+from schema_inference.dates import DateFormatDetector
+
+from app.utils.file_utils import compact_series
+
+
+def as_strings(index: pd.DatetimeIndex, fmt: str) -> np.ndarray:
+    return index.strftime(fmt).to_numpy(dtype=object)
+
+
+def test_formats_are_detected_and_validated_in_bulk():
+    detector = DateFormatDetector()
+    days = pd.date_range("2021-01-01", periods=60, freq="D")
+    detection = detector.detect(as_strings(days, "%d/%m/%Y"), "day_first")
+    assert (detection.format, detection.with_time, detection.without_time) == ("%d/%m/%Y", 0, 60)
+
+    stamps = pd.date_range("2021-01-01", periods=60, freq="37min")
+    detection = detector.detect(as_strings(stamps, "%Y-%m-%d %H:%M:%S"), "stamp")
+    assert detection.format == "%Y-%m-%d %H:%M:%S" and detection.with_time == 59
+
+    assert detector.detect(np.array(["red", "green", "blue"] * 10, dtype=object), "color").format is None
+
+
+def test_leftovers_fall_back_to_dateutil():
+    values = np.array(["2021-03-0%d" % d for d in range(1, 9)] + ["March 5, 2021", "not a date"], dtype=object)
+    detection = DateFormatDetector().detect(values, "mixed", threshold=0.8)
+    assert detection.format == "%Y-%m-%d"
+    assert detection.without_time == 9
+
+
+def test_formats_are_memoized_per_column_and_signature(monkeypatch):
+    detector = DateFormatDetector()
+    days = pd.date_range("2021-01-01", periods=30, freq="D")
+    detector.detect(as_strings(days, "%b %d %Y"), "signup")
+
+    calls = []
+    monkeypatch.setattr(dates, "guess_formats", lambda v: calls.append(v) or [])
+    later = pd.date_range("2022-06-01", periods=30, freq="D")
+    assert detector.detect(as_strings(later, "%b %d %Y"), "signup").format == "%b %d %Y"
+    assert calls == []
+    # Otra columna u otra forma de los valores: se vuelve a adivinar
+    detector.detect(as_strings(later, "%Y/%m/%d"), "signup")
+    assert calls
+
+
+
+def test_stale_memoized_format_is_guessed_again():
+    detector = DateFormatDetector()
+    days = pd.date_range("2021-01-01", periods=30, freq="D")
+    detector.detect(as_strings(days, "%Y-%m-%d"), "when")
+    key = ("when", dates.value_signature(as_strings(days, "%Y-%d-%m")))
+    assert detector.cached_format(key) == "%Y-%m-%d"
+
+    # Misma firma (9999-99-99) pero ahora con el día antes que el mes
+    later = pd.date_range("2022-06-13", periods=30, freq="D")
+    detection = detector.detect(as_strings(later, "%Y-%d-%m"), "when")
+    assert (detection.format, detection.without_time) == ("%Y-%d-%m", 30)
+    assert detector.cached_format(key) == "%Y-%d-%m"
+
+def test_schema_formats_are_reused_by_the_loader():
+    days = pd.date_range("2021-01-01", periods=50, freq="D")
+    df = pd.DataFrame({"when": as_strings(days, "%d.%m.%Y"), "x": np.arange(50)})
+    inferer = ColumnTypeInferer(date_detector=DateFormatDetector())
+    assert inferer.infer_frame(df)["when"].value == "date"
+    assert inferer.formats == {"when": "%d.%m.%Y"}
+    parsed = compact_series(df["when"], "date", inferer.formats["when"])
+    assert (parsed == days).all()
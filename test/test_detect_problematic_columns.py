@@ -0,0 +1,50 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from app.services import detect_problematic_columns as problems_module
+from app.services.detect_problematic_columns import (
+    detect_problem_columns,
+    detect_problem_columns_from_stats,
+    identical_column_groups,
+)
+from app.services.leak_detection import detect_identical
+from app.services.streaming_stats import profile_csv
+
+CSV = "y,a,b,c,d,e,f\n1,1,1.0,x,x,,1\n2,2,2.0,y,y,,2\n3,3,3.0,,,,3\n4,4,4.0,x,x,,5\n"
+
+
+def test_identical_groups_follow_series_equals():
+    df = pd.read_csv(io.StringIO(CSV))
+    df["zero"] = 0.0
+    df["negative_zero"] = -0.0
+    # Same values but a different dtype is not identical (int64 vs float64)
+    assert identical_column_groups(df) == [["y", "a"], ["c", "d"], ["zero", "negative_zero"]]
+    assert detect_identical(df, "y") == [
+        {"feature": "a", "type": "identical", "details": "100% equal to target"}
+    ]
+
+
+def test_hash_collisions_are_verified(monkeypatch):
+    df = pd.DataFrame({"a": [1, 2], "b": [2, 1], "c": [1, 2]})
+    monkeypatch.setattr(problems_module, "column_hashes", lambda frame: [0] * frame.shape[1])
+    assert identical_column_groups(df) == [["a", "c"]]
+
+
+def test_duplicates_in_problem_report_match_streamed():
+    df = pd.read_csv(io.StringIO(CSV))
+    problems = detect_problem_columns(df)["problems"]
+    duplicates = [p for p in problems if p["type"] == "duplicate"]
+    assert duplicates == [
+        {"feature": "a", "type": "duplicate", "details": "Identical to 'y'"},
+        {"feature": "d", "type": "duplicate", "details": "Identical to 'c'"},
+    ]
+    assert detect_problem_columns_from_stats(profile_csv(io.StringIO(CSV)))["problems"] == problems
+
+
+def test_many_columns_with_one_duplicate():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.integers(0, 3, size=(1000, 200)))
+    df["copy"] = df[17]
+    assert identical_column_groups(df) == [[17, "copy"]]
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from app.core.executor import AnalysisCancelled, AnalysisExecutor, AnalysisTimeout
+
+
+def slow_square(x: float, seconds: float = 0.2) -> float:
+    time.sleep(seconds)
+    return x * x
+
+
+def crash() -> None:
+    os._exit(1)
+
+
+@pytest.mark.parametrize("backend", ["inline", "thread", "process"])
+def test_backends_return_results(backend):
+    executor = AnalysisExecutor(backend=backend, max_workers=2)
+    try:
+        assert asyncio.run(executor.run(slow_square, 3, seconds=0)) == 9
+    finally:
+        executor.shutdown()
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        AnalysisExecutor(backend="gpu")
+
+
+def test_timeout_releases_the_caller():
+    executor = AnalysisExecutor(backend="thread", max_workers=1)
+    try:
+        start = time.perf_counter()
+        with pytest.raises(AnalysisTimeout):
+            asyncio.run(executor.run(slow_square, 2, seconds=0.5, timeout=0.1))
+        assert time.perf_counter() - start < 0.4
+    finally:
+        executor.shutdown()
+
+
+def test_process_timeout_leaves_other_requests_running():
+    executor = AnalysisExecutor(backend="process", max_workers=2)
+
+    async def scenario():
+        sibling = asyncio.create_task(executor.run(slow_square, 3, seconds=1, timeout=10))
+        await asyncio.sleep(0.1)
+        with pytest.raises(AnalysisTimeout):
+            await executor.run(slow_square, 2, seconds=1, timeout=0.2)
+        # The timed-out task finishes in the background: the pool is not torn down
+        disconnected = asyncio.create_task(executor.run(slow_square, 4, seconds=1))
+        await asyncio.sleep(0.1)
+        disconnected.cancel()
+        return await sibling, await executor.run(slow_square, 5, seconds=0, timeout=10)
+
+    try:
+        assert asyncio.run(scenario()) == (9, 25)
+    finally:
+        executor.shutdown()
+
+
+def test_broken_process_pool_is_replaced():
+    executor = AnalysisExecutor(backend="process", max_workers=1)
+
+    async def scenario():
+        with pytest.raises(AnalysisCancelled):
+            await executor.run(crash)
+        return await executor.run(slow_square, 2, seconds=0, timeout=10)
+
+    try:
+        assert asyncio.run(scenario()) == 4
+    finally:
+        executor.shutdown()
+
+
+def test_heavy_limit_leaves_light_calls_unblocked():
+    executor = AnalysisExecutor(backend="thread", max_workers=4, heavy_limit=1)
+
+    async def scenario():
+        start = time.perf_counter()
+        heavy = [asyncio.create_task(executor.run(slow_square, i, heavy=True)) for i in range(2)]
+        await asyncio.sleep(0.05)
+        await executor.run(slow_square, 1, seconds=0)
+        light_done = time.perf_counter() - start
+        await asyncio.gather(*heavy)
+        return light_done, time.perf_counter() - start
+
+    try:
+        light_done, total = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    assert light_done < 0.15
+    # The two heavy calls ran one after the other
+    assert total >= 0.4
@@ -1,4 +1,7 @@
+from functools import lru_cache
+
 import pytest
+import numpy as np
 import pandas as pd
 from schema_inference.infer import ColumnTypeInferer
 from schema_inference.enums import ColumnType
@@ -7,6 +10,11 @@ from schema_inference.enums import ColumnType
 MANIFEST_PATH = "test/data/test_csvs/manifest.csv"
 DATA_DIR = "test/data/test_csvs/"
 
+@lru_cache(maxsize=None)
+def read_test_csv(filename: str) -> pd.DataFrame:
+    # Cada CSV se lee una sola vez para todas sus filas del manifest
+    return pd.read_csv(f"{DATA_DIR}{filename}")
+
 @pytest.fixture(scope="module")
 def inferer():
     return ColumnTypeInferer()
@@ -27,10 +35,38 @@ def test_infer_column_type(inferer, manifest, row):
     column = row['column_name']
     expected_type = row['expected_type']
 
-    df = pd.read_csv(f"{DATA_DIR}{filename}")
+    df = read_test_csv(filename)
     assert column in df.columns, f"Columna '{column}' no encontrada en {filename}"
 
     inferred = inferer.infer(df[column]).value
     assert inferred == expected_type, (
         f"Para {filename}/{column}: se esperaba '{expected_type}', pero se obtuvo '{inferred}'"
     )
+
+
+@pytest.mark.parametrize("filename", sorted(pd.read_csv(MANIFEST_PATH)["filename"].unique()))
+def test_infer_frame_matches_infer(inferer, filename):
+    df = read_test_csv(filename)
+    expected = {col: inferer.infer(df[col]) for col in df.columns}
+    assert inferer.infer_frame(df) == expected
+
+
+def test_infer_frame_mixed_columns(inferer):
+    n = 300
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "empty": [np.nan] * n,
+        "flag": rng.choice(["si", "no"], n),
+        "pct": [f"{i}%" for i in range(n)],
+        "whole_float": rng.integers(0, 9, n) * 1.0,
+        "huge": [2**60 + i for i in range(n)],
+        "inf": ["inf"] * n,
+        "timestamp": pd.date_range("2020", periods=n, freq="37min").astype(str),
+        "dmy": pd.date_range("2020", periods=n).strftime("%d/%m/%Y"),
+        "month_name": pd.date_range("2020", periods=n).strftime("%b %d %Y"),
+        "mostly_int": ["1"] * (n - 1) + ["x"],
+        "category": pd.Series(rng.choice(["a", "b"], n)).astype("category"),
+        "nullable_int": pd.array(rng.integers(0, 5, n), dtype="Int64"),
+    })
+    expected = {col: inferer.infer(df[col]) for col in df.columns}
+    assert inferer.infer_frame(df) == expected
@@ -0,0 +1,119 @@
+import gzip
+import importlib.util
+import io
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services import dataset_cache
+from app.services.dataset_cache import DatasetRegistry
+from app.services.streaming_stats import profile_csv
+from app.utils.file_utils import (
+    UnsupportedFormatError,
+    detect_format,
+    iter_chunks,
+    parse_row_filter,
+    require_format,
+)
+
+CSV = "age,city,income,label\n" + "".join(
+    f"{18 + i % 50},{'ABC'[i % 3]},{1000 + 37 * i},{i % 2}\n" for i in range(300)
+)
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+def frame(chunks) -> pd.DataFrame:
+    return pd.concat(list(chunks), ignore_index=True)
+
+
+def test_formats_are_detected_by_their_first_bytes():
+    assert detect_format(io.BytesIO(CSV.encode())) == ("csv", None)
+    assert detect_format(io.BytesIO(gzip.compress(CSV.encode()))) == ("csv", "gzip")
+    assert detect_format(io.BytesIO(b"\x28\xb5\x2f\xfd...")) == ("csv", "zstd")
+    assert detect_format(io.BytesIO(b"PAR1....")) == ("parquet", None)
+    assert detect_format(io.BytesIO(b"ARROW1\x00\x00")) == ("feather", None)
+    stream = io.BytesIO(b"PAR1....")
+    stream.seek(0)
+    detect_format(stream)
+    assert stream.tell() == 0
+
+
+def test_gzip_csv_reads_like_the_plain_file():
+    plain = frame(iter_chunks(io.BytesIO(CSV.encode()), probe_rows=50))
+    packed = frame(iter_chunks(io.BytesIO(gzip.compress(CSV.encode())), probe_rows=50))
+    pd.testing.assert_frame_equal(plain, packed)
+    assert plain.shape == (300, 4)
+
+
+def test_projection_and_row_filter():
+    conditions = parse_row_filter('[["age", ">=", 60], ["city", "in", ["A", "B"]]]')
+    df = frame(iter_chunks(io.BytesIO(CSV.encode()), probe_rows=40, columns=["label"], row_filter=conditions))
+    expected = pd.read_csv(io.StringIO(CSV), dtype=object)
+    expected = expected[(expected["age"].astype(int) >= 60) & expected["city"].isin(["A", "B"])]
+    assert list(df.columns) == ["label"]
+    assert df["label"].tolist() == expected["label"].tolist()
+
+    with pytest.raises(KeyError, match="missing"):
+        list(iter_chunks(io.BytesIO(CSV.encode()), columns=["missing"]))
+    for bad in ('{"age": 3}', '[["age", "~", 3]]', '[["age", "in", 3]]', "[["):
+        with pytest.raises(ValueError):
+            parse_row_filter(bad)
+
+
+@pytest.mark.skipif(HAS_PYARROW, reason="pyarrow is installed")
+def test_columnar_formats_need_pyarrow():
+    with pytest.raises(UnsupportedFormatError, match="pyarrow"):
+        require_format("parquet")
+    with pytest.raises(UnsupportedFormatError):
+        list(iter_chunks(io.BytesIO(b"PAR1....")))
+
+
+@pytest.mark.skipif(not HAS_PYARROW, reason="needs pyarrow")
+@pytest.mark.parametrize("fmt", ["parquet", "feather"])
+def test_columnar_files_profile_like_the_csv(tmp_path, fmt):
+    df = pd.read_csv(io.StringIO(CSV))
+    path = tmp_path / f"data.{fmt}"
+    getattr(df, f"to_{fmt}")(path)
+    from_csv = profile_csv(io.StringIO(CSV))
+    for source in (str(path), open(path, "rb")):
+        stats = profile_csv(source)
+        assert stats.dtypes.to_dict() == from_csv.dtypes.to_dict()
+        assert stats.accumulators["city"].value_counts().to_dict() == from_csv.accumulators["city"].value_counts().to_dict()
+    filtered = frame(iter_chunks(str(path), columns=["income"], row_filter=[("age", "<", 20)]))
+    assert filtered["income"].tolist() == df.loc[df["age"] < 20, "income"].tolist()
+
+
+def test_registered_projection_is_a_dataset_of_its_own(tmp_path):
+    registry = DatasetRegistry(str(tmp_path), max_bytes=10 ** 9)
+    full, _ = registry.register(io.BytesIO(CSV.encode()))
+    part, created = registry.register(io.BytesIO(CSV.encode()), ["label"], [("city", "==", "A")])
+    assert created and part.dataset_id != full.dataset_id
+    assert part.columns == ["label"] and part.meta["n_rows"] == 100
+    assert part.meta["projection"]["columns"] == ["label"]
+    packed, _ = registry.register(io.BytesIO(gzip.compress(CSV.encode())))
+    assert packed.meta["compression"] == "gzip"
+    pd.testing.assert_frame_equal(packed.load_frame(), full.load_frame())
+
+
+def test_endpoints_accept_compressed_uploads_and_row_filters(tmp_path, monkeypatch):
+    from app.main import app
+
+    monkeypatch.setattr(dataset_cache, "_registry", DatasetRegistry(str(tmp_path), max_bytes=10 ** 9))
+    client = TestClient(app)
+    upload = {"file": ("data.csv.gz", gzip.compress(CSV.encode()))}
+    response = client.post(
+        "/api/evaluate-class-balance", params={"target_col": "label", "row_filter": '[["age", "<", 20]]'}, files=upload
+    )
+    assert response.status_code == 200
+    assert response.json()["counts"] == {"0": 6, "1": 6}
+    dataset_id = response.headers["X-Dataset-Id"]
+    assert client.get(f"/api/datasets/{dataset_id}").json()["columns"] == ["label"]
+
+    response = client.post("/api/evaluate-class-balance", params={"target_col": "nope"}, files=upload)
+    assert response.status_code == 400 and "nope" in response.json()["detail"]
+    response = client.post("/api/datasets", params={"row_filter": "[1]"}, files=upload)
+    assert response.status_code == 400
+    if not HAS_PYARROW:
+        response = client.post("/api/datasets", files={"file": ("data.parquet", b"PAR1....")})
+        assert response.status_code == 415
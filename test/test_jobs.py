@@ -0,0 +1,195 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core import jobs
+from app.core.executor import AnalysisExecutor
+from app.core.jobs import JobManager
+from app.services.leak_detection import compute_mi_scores
+
+
+def wait_for(manager: JobManager, job_id: str, statuses=("done", "failed", "cancelled")) -> dict:
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job stuck in {job['status']}")
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "jobs.sqlite3")
+
+
+def test_job_reports_progress_and_result(db_path):
+    manager = JobManager(db_path, progress_interval=0)
+
+    def count(progress, n):
+        for i in range(n + 1):
+            progress(i, n, f"Steps: {i}/{n}")
+        return {"total": n}
+
+    manager.register("count", count)
+    job_id = manager.submit("count", {"n": 5})
+    job = wait_for(manager, job_id)
+    assert job["status"] == "done"
+    assert (job["progress_done"], job["progress_total"], job["message"]) == (5, 5, "Steps: 5/5")
+    assert manager.result(job_id) == {"total": 5}
+
+    manager.register("broken", lambda progress: 1 / 0)
+    failed = wait_for(manager, manager.submit("broken", {}))
+    assert failed["status"] == "failed" and "ZeroDivisionError" in failed["error"]
+    with pytest.raises(KeyError):
+        manager.get("missing")
+
+
+def test_running_job_is_cancelled_at_next_progress(db_path):
+    manager = JobManager(db_path, progress_interval=0)
+    started, release = threading.Event(), threading.Event()
+
+    def slow(progress):
+        progress(0, 2, "waiting")
+        started.set()
+        release.wait(5)
+        progress(1, 2, "never stored")
+        return "finished"
+
+    manager.register("slow", slow)
+    job_id = manager.submit("slow", {})
+    started.wait(5)
+    assert manager.cancel(job_id)["status"] == "cancelled"
+    release.set()
+    manager.shutdown(wait=True)
+    job = manager.get(job_id)
+    assert job["status"] == "cancelled" and job["message"] == "waiting"
+    assert manager.result(job_id) is None
+
+
+def test_queued_job_is_claimed_once_and_cancel_is_not_leaked(db_path):
+    manager = JobManager(db_path, workers=4)
+    runs, release = [], threading.Event()
+
+    def count(progress):
+        runs.append(1)
+        release.wait(5)
+        return len(runs)
+
+    manager.register("count", count)
+    job_id = manager.submit("count", {})
+    # Varios intentos de arrancar el mismo trabajo: solo uno lo reclama
+    for _ in range(3):
+        manager._pool.submit(manager._run, job_id)
+    release.set()
+    assert wait_for(manager, job_id)["status"] == "done"
+    manager.shutdown(wait=True)
+    assert runs == [1]
+
+    # Cancelado mientras esperaba en la cola: no llega a ejecutarse
+    queued = JobManager(db_path, workers=1)
+    blocker, release = threading.Event(), threading.Event()
+    queued.register("block", lambda progress: blocker.set() or release.wait(5))
+    queued.register("count", count)
+    queued.submit("block", {})
+    blocker.wait(5)
+    job_id = queued.submit("count", {})
+    assert queued.cancel(job_id)["status"] == "cancelled"
+    release.set()
+    # Un solo worker: cuando termina el siguiente ya pasó por el cancelado
+    assert wait_for(queued, queued.submit("count", {}))["status"] == "done"
+    queued.shutdown(wait=True)
+    assert queued.get(job_id)["status"] == "cancelled"
+    assert runs == [1, 1] and queued._cancelled == set()
+
+def test_unfinished_jobs_are_resumed_by_a_new_manager(db_path):
+    first = JobManager(db_path, lease_seconds=0.3)
+    started, release = threading.Event(), threading.Event()
+
+    def stuck(progress, value):
+        started.set()
+        release.wait(5)
+        return -1
+
+    first.register("square", stuck)
+    job_id = first.submit("square", {"value": 3})
+    started.wait(5)
+
+    # Otro proceso sobre la misma base de datos: el dueño sigue vivo y
+    # renueva su reserva, así que no se lo quita
+    second = JobManager(db_path, lease_seconds=0.3)
+    second.register("square", lambda progress, value: value ** 2)
+    time.sleep(0.5)
+    assert second.recover() == []
+
+    # Simula una caída: el primero deja de renovar, su reserva caduca y el
+    # hilo de reservas del segundo lo retoma
+    first._stopped.set()
+    assert wait_for(second, job_id)["status"] == "done"
+    release.set()
+    first.shutdown(wait=True)
+    # El resultado tardío del primero no pisa el del nuevo dueño
+    assert second.result(job_id) == 9
+    second.shutdown(wait=True)
+
+
+def test_orphaned_rows_are_recovered_by_owner_process(db_path, monkeypatch):
+    manager = JobManager(db_path)
+    manager.register("square", lambda progress, value: value ** 2)
+    # Filas de un proceso de esta máquina que ya no existe y de la versión
+    # anterior de la tabla (sin dueño)
+    with manager._connect() as db:
+        for job_id, owner in (("dead", f"{jobs.socket.gethostname()}:999999999:x"), ("legacy", None)):
+            db.execute(
+                "INSERT INTO jobs (id, kind, status, params, created, updated, owner, lease) "
+                "VALUES (?, 'square', 'running', ?, 0, 0, ?, ?)",
+                (job_id, '{"value": 4}', owner, time.time() + 60 if owner else None),
+            )
+    assert sorted(manager.recover()) == ["dead", "legacy"]
+    assert manager.result(wait_for(manager, "dead")["id"]) == 16
+    manager.shutdown(wait=True)
+
+
+def test_jobs_share_the_heavy_analysis_limit(db_path):
+    executor = AnalysisExecutor(backend="thread", max_workers=4, heavy_limit=1, timeout=None)
+    manager = JobManager(db_path, workers=2, executor=executor)
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def work(progress):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.1)
+        with lock:
+            running[0] -= 1
+        return threading.current_thread().name
+
+    async def main():
+        manager.attach(asyncio.get_running_loop())
+        ids = [manager.submit("work", {}) for _ in range(2)]
+        while any(manager.get(i)["status"] != "done" for i in ids):
+            await asyncio.sleep(0.01)
+        return ids
+
+    manager.register("work", work)
+    ids = asyncio.run(main())
+    assert peak[0] == 1
+    assert all(manager.result(i).startswith("analysis") for i in ids)
+    manager.shutdown(wait=True)
+    executor.shutdown()
+
+
+def test_mi_scores_report_feature_progress():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(200, 45)), columns=[f"f{i}" for i in range(45)])
+    df["y"] = df["f0"] + rng.normal(size=200)
+    calls = []
+    scores = compute_mi_scores(df, "y", False, progress=lambda *args: calls.append(args))
+    assert calls[-1] == (45, 45, "MI: 45/45 features")
+    assert [done for done, _, _ in calls] == sorted(done for done, _, _ in calls)
+    assert len(scores) == 45
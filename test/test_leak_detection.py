@@ -0,0 +1,43 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.leak_detection import (
+    detect_high_corr,
+    filter_target_correlations,
+    target_correlations_from_stats,
+)
+from app.services.streaming_stats import profile_csv
+
+
+def bool_target_frame():
+    rng = np.random.default_rng(0)
+    y = rng.random(500) < 0.4
+    return pd.DataFrame({
+        "x": y + rng.normal(scale=0.01, size=500),
+        "noise": rng.normal(size=500),
+        "label": np.where(y, "yes", "no"),
+        "y": y,
+    })
+
+
+def test_bool_target_correlations_are_detected():
+    df = bool_target_frame()
+    leaks = detect_high_corr(df, "y", 0.95)
+    assert [leak["feature"] for leak in leaks] == ["x"]
+    assert leaks[0]["corr_coeff"] == pytest.approx(df["x"].corr(df["y"].astype(float)))
+    assert detect_high_corr(df, "label", 0.95) == []
+
+
+def test_bool_target_correlations_from_stats():
+    df = bool_target_frame()
+    stats = profile_csv(io.StringIO(df.to_csv(index=False)), memory_budget=5_000)
+    assert stats.accumulators["y"].kind == "bool"
+    correlations = target_correlations_from_stats(stats, "y")
+    assert correlations["x"] == pytest.approx(df["x"].corr(df["y"].astype(float)))
+    assert filter_target_correlations(correlations, 0.95)[0]["feature"] == "x"
+    assert target_correlations_from_stats(stats, "label").empty
+    with pytest.raises(KeyError):
+        target_correlations_from_stats(stats, "missing")
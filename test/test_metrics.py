@@ -0,0 +1,75 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core.executor import AnalysisExecutor
+from app.core.metrics import (
+    MetricsMiddleware,
+    MetricsRegistry,
+    TimedJSONResponse,
+    current_trace,
+    record_dataset,
+    span,
+)
+import app.core.metrics as metrics
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = MetricsRegistry(enabled=True)
+    monkeypatch.setattr(metrics, "_registry", registry)
+    return registry
+
+
+def make_app(**options) -> FastAPI:
+    app = FastAPI(default_response_class=TimedJSONResponse)
+    app.add_middleware(MetricsMiddleware, **options)
+    executor = AnalysisExecutor("thread", max_workers=1)
+
+    def service(n: int) -> int:
+        with span("inner"):
+            return sum(range(n))
+
+    @app.post("/items/{item_id}")
+    async def compute(request: Request, item_id: str, n: int = 1000):
+        body = await request.body()
+        record_dataset(n, 3)
+        return {"item": item_id, "bytes": len(body), "total": await executor.run(service, n)}
+
+    return app
+
+
+def test_stages_reach_server_timing_and_prometheus_text(registry):
+    client = TestClient(make_app(server_timing=True))
+    response = client.post("/items/abc", params={"n": 10}, content=b"x" * 100)
+    assert response.json() == {"item": "abc", "bytes": 100, "total": 45}
+    timing = response.headers["server-timing"]
+    for stage in ("upload", "service", "inner"):
+        assert f"{stage};dur=" in timing
+    assert 'dataset;desc="rows=10 columns=3"' in timing
+
+    text = registry.render()
+    assert 'ai_bias_stage_seconds_count{stage="service"} 1' in text
+    assert 'ai_bias_stage_seconds_count{stage="serialize"} 1' in text
+    assert 'route="/items/{item_id}",status="200"' in text
+    assert "ai_bias_dataset_rows_total 10" in text
+
+
+def test_debug_profile_returns_a_cprofile_summary(registry):
+    client = TestClient(make_app(debug_profiling=True))
+    response = client.post("/items/abc", params={"debug_profile": 1})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "POST /items/abc -> 200" in response.text and "cumulative" in response.text
+    # Sin permiso en la configuración se ignora el parámetro
+    plain = TestClient(make_app()).post("/items/abc", params={"debug_profile": 1})
+    assert plain.json()["total"] == sum(range(1000))
+
+
+def test_spans_are_free_when_disabled(monkeypatch):
+    monkeypatch.setattr(metrics, "_registry", MetricsRegistry(enabled=False))
+    assert current_trace() is None
+    assert span("a") is span("b")
+    with span("a"):
+        record_dataset(1, 1)
+    assert "stage=" not in metrics.get_metrics().render()
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.metrics import mutual_info_score
+
+from app.services import mutual_information
+from app.services.leak_detection import detect_high_mi
+from app.services.mutual_information import estimate_mi, mi_from_codes, stratified_sample
+
+
+def leak_frame(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    y = rng.choice(3, n, p=[0.7, 0.2, 0.1])
+    return pd.DataFrame({
+        "y": y,
+        "copy": y * 2.5,
+        "noisy": y + rng.normal(size=n),
+        "independent": rng.normal(size=n),
+        "category": np.array(["a", "b", "c"], dtype=object)[y],
+        "random_category": rng.choice(["x", "z"], n).astype(object),
+    })
+
+
+def test_counts_match_plug_in_mi():
+    rng = np.random.default_rng(1)
+    n = 500
+    y = rng.integers(0, 4, n)
+    codes = np.column_stack([rng.integers(0, 5, n), (y + rng.integers(0, 2, n)) % 4, rng.integers(-1, 3, n)])
+    sizes = np.array([5, 4, 3])
+    mi, se = mi_from_codes(codes, sizes, y, 4)
+    for j in range(3):
+        rows = codes[:, j] >= 0
+        x, yy = codes[rows, j], y[rows]
+        dof = (len(np.unique(x)) - 1) * (len(np.unique(yy)) - 1)
+        expected = max(mutual_info_score(x, yy) - dof / (2 * rows.sum()), 0.0)
+        assert mi[j] == pytest.approx(expected, abs=1e-12)
+    assert np.all(se > 0)
+
+
+def test_stratified_sample_keeps_class_proportions():
+    strata = np.repeat([0, 1, 2], [700, 290, 10])
+    sample = stratified_sample(strata, 100, np.random.default_rng(0))
+    assert np.bincount(strata[sample]).tolist() == [70, 29, 1]
+    assert np.all(np.diff(sample) > 0)
+
+
+def test_binned_estimates_rank_leaks_with_intervals(monkeypatch):
+    monkeypatch.setattr(mutual_information, "MI_PILOT_ROWS", 2000)
+    df = leak_frame(50_000)
+    result = estimate_mi(df, "y", discrete_target=True, max_error=0.02)
+    assert 2000 <= result.attrs["n_rows"] < len(df)
+    entropy = -(df["y"].value_counts(normalize=True) * np.log(df["y"].value_counts(normalize=True))).sum()
+    for col in ("copy", "category"):
+        assert result.loc[col, "ci_low"] <= entropy <= result.loc[col, "ci_high"] + 1e-3
+    for col in ("independent", "random_category"):
+        assert result.loc[col, "ci_low"] == 0 and result.loc[col, "ci_high"] < 0.02
+    assert (result["ci_high"] - result["mi"]).max() <= 0.02 + 1e-9
+
+    leaks = detect_high_mi(df, "y", threshold=0.5, discrete_target=True, method="binned")
+    assert {leak["feature"] for leak in leaks} == {"copy", "category"}
+    assert all(leak["certain"] for leak in leaks)
+
+
+def test_continuous_target_is_binned():
+    rng = np.random.default_rng(2)
+    x = rng.normal(size=3000)
+    df = pd.DataFrame({"x": x, "noise": rng.normal(size=3000), "y": x + 0.1 * rng.normal(size=3000)})
+    result = estimate_mi(df, "y")
+    assert result.loc["x", "mi"] > 1.0 > result.loc["noise", "ci_high"]
+
+
+def test_n_jobs_reaches_the_estimators(monkeypatch):
+    from app.services import leak_detection
+    from app.services.dataset_profile import DatasetProfile, run_analyses
+    from app.services.streaming_stats import StreamingDatasetStats
+
+    seen = []
+    monkeypatch.setattr(leak_detection, "estimate_mi", lambda *args, n_jobs, **kwargs: seen.append(n_jobs) or
+                        pd.DataFrame({"mi": [0.0], "ci_low": [0.0], "ci_high": [0.0]}, index=["copy"]))
+    df = leak_frame(200)
+    assert leak_detection.compute_mi(df, "y", True, "binned", n_jobs=3).index.tolist() == ["copy"]
+
+    stats = StreamingDatasetStats(list(df.columns))
+    stats.update(df.astype(str).astype(object))
+    run_analyses(DatasetProfile(stats), ["leaks"], target_col="y", discrete_target=True,
+                 mi_method="binned", mi_n_jobs=2)
+    assert seen == [3, 2]
@@ -0,0 +1,79 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.outlier_analysis import (
+    chunk_rows,
+    detect_outliers,
+    numeric_columns,
+    univariate_fences,
+)
+
+
+@pytest.fixture
+def df() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame(rng.normal(size=(20_000, 4)), columns=["a", "b", "c", "d"])
+    frame.loc[[10, 5000], "c"] = 40.0  # univariate outliers
+    frame.loc[[123, 7777, 15000], ["a", "b", "c", "d"]] = 9.0  # far from the cloud in every column
+    frame.loc[rng.choice(len(frame), 200, replace=False), "d"] = np.nan
+    return frame
+
+
+def test_fences_match_pandas_quantiles(df):
+    fences = univariate_fences(df, ["a", "c"], "iqr", memory_budget=1)
+    q1, q3 = df["c"].quantile(0.25), df["c"].quantile(0.75)
+    assert fences.loc["c", "low"] == pytest.approx(q1 - 1.5 * (q3 - q1))
+    assert fences.loc["c", "high"] == pytest.approx(q3 + 1.5 * (q3 - q1))
+    mad = univariate_fences(df, ["d"], "mad")
+    median = df["d"].median()
+    assert mad.loc["d", "center"] == pytest.approx(median)
+    assert mad.loc["d", "scale"] == pytest.approx((df["d"] - median).abs().median() * 1.4826)
+
+
+@pytest.mark.parametrize("method", ["univariate", "isolation_forest", "dbscan"])
+def test_planted_rows_rank_first(df, method):
+    # A small budget forces many chunks
+    result = detect_outliers(df, method=method, top_k=5, memory_budget=64 * 1024, sample_size=5000)
+    top = {row["row"] for row in result["top_outliers"]}
+    # Isolation Forest splits on one random column at a time: a single extreme value barely counts
+    assert {123, 7777, 15000} <= top
+    if method != "isolation_forest":
+        assert top == {10, 5000, 123, 7777, 15000}
+    assert result["n_rows"] == len(df)
+    assert 0 < result["outlier_rate"] < 0.2
+    column = result["column_outliers"]["c"]
+    expected = ((df["c"] < column["low"]) | (df["c"] > column["high"])).sum()
+    assert column["count"] == expected
+    assert column["rate"] == pytest.approx(expected / len(df))
+
+
+def test_parallel_scoring_matches_serial(df):
+    serial = detect_outliers(df, top_k=5, memory_budget=256 * 1024)
+    parallel = detect_outliers(df, top_k=5, memory_budget=256 * 1024, n_jobs=2)
+    assert serial["top_outliers"] == parallel["top_outliers"]
+    assert serial["outlier_rate"] == parallel["outlier_rate"]
+
+    # A caller's pool is reused across calls; tasks carry the chunk, not the model
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        submitted = []
+        submit = pool.submit
+        pool.submit = lambda fn, *args: submitted.append(args) or submit(fn, *args)
+        for method in ("isolation_forest", "dbscan"):
+            shared = detect_outliers(df, method=method, top_k=5, memory_budget=256 * 1024, n_jobs=2, pool=pool)
+            expected = serial if method == "isolation_forest" else detect_outliers(
+                df, method=method, top_k=5, memory_budget=256 * 1024
+            )
+            assert shared["top_outliers"] == expected["top_outliers"]
+    assert len(submitted) > 2
+    assert all(isinstance(path, str) and isinstance(X, np.ndarray) for path, _, X in submitted)
+
+
+def test_numeric_columns_and_budget():
+    schema = {"id": "id", "age": "integer", "income": "float", "when": "date", "flag": "boolean"}
+    assert numeric_columns(schema) == ["age", "income"]
+    assert chunk_rows(4, 1) == 1
+    with pytest.raises(ValueError):
+        detect_outliers(pd.DataFrame({"a": [1.0]}), method="lof")
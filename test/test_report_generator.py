@@ -0,0 +1,74 @@
+import io
+
+import pytest
+
+from app.services import report_generator
+from app.services.dataset_profile import DatasetProfile
+from app.services.report_generator import default_sections, export_pdf, iter_report, section_key
+from app.services.streaming_stats import profile_csv
+
+CSV = "y,a,b,c,leak\n" + "".join(
+    f"{i % 2},{i},{(i * 7) % 5},{'xyz'[i % 3]},{i % 2}\n" for i in range(60)
+)
+PARAMS = {"target_col": "y", "discrete_target": True, "mi_method": "binned", "corr_threshold": 0.95}
+
+
+@pytest.fixture
+def memo_store():
+    store, rendered = {}, []
+
+    def memo(key, compute):
+        if key not in store:
+            rendered.append(key)
+            store[key] = compute()
+        return store[key]
+
+    return memo, rendered
+
+
+def make_profile(memo) -> DatasetProfile:
+    return DatasetProfile(profile_csv(io.BytesIO(CSV.encode())), memo=memo)
+
+
+def test_report_has_every_section_in_order(memo_store):
+    memo, _ = memo_store
+    chunks = list(iter_report(make_profile(memo), default_sections("y"), PARAMS))
+    html = "".join(chunks)
+    assert chunks[0].startswith("<!DOCTYPE html>") and chunks[-1].strip() == "</body></html>"
+    positions = [html.index(f'<section id="{name}">') for name in default_sections("y")]
+    assert positions == sorted(positions)
+    assert 'class="error"' not in html
+    assert "<td>leak</td><td>identical</td>" in html
+    assert "Status: <b>balanced</b>" in html
+
+
+def test_changing_a_threshold_rerenders_only_its_sections(memo_store):
+    memo, rendered = memo_store
+    list(iter_report(make_profile(memo), default_sections("y"), PARAMS))
+    rendered.clear()
+    list(iter_report(make_profile(memo), default_sections("y"), {**PARAMS, "corr_threshold": 0.5}))
+    sections = sorted(key.split("|")[2] for key in rendered if key.startswith("report|"))
+    assert sections == ["leaks", "problem_columns"]
+    assert section_key("schema", PARAMS) == section_key("schema", {"target_col": "other"})
+
+
+def test_failing_section_does_not_break_the_report(memo_store, monkeypatch):
+    memo, _ = memo_store
+
+    def broken(result):
+        raise ValueError("boom")
+
+    monkeypatch.setitem(report_generator.RENDERERS, "class_balance", broken)
+    html = "".join(iter_report(make_profile(memo), default_sections("y"), PARAMS))
+    assert html.count("<section") == 5
+    assert 'class="error">Could not compute this section: boom' in html
+
+
+def test_default_sections_without_target():
+    assert default_sections(None) == ["schema", "correlation", "problem_columns"]
+
+
+def test_pdf_needs_weasyprint(monkeypatch, tmp_path):
+    monkeypatch.setattr(report_generator.importlib.util, "find_spec", lambda name: None)
+    with pytest.raises(RuntimeError):
+        export_pdf("<html></html>", str(tmp_path / "report.pdf"))
@@ -0,0 +1,60 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.api.responses import (
+    NPY_MEDIA_TYPE,
+    FastJSONResponse,
+    binary_matrix_response,
+    binary_media_type,
+    decode_matrix,
+    dumps,
+    encode_matrix,
+)
+
+
+@pytest.fixture
+def corr() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(50, 5)), columns=list("abcde"))
+    matrix = df.corr()
+    matrix.loc["a", "b"] = matrix.loc["b", "a"] = np.nan
+    return matrix
+
+
+def test_dumps_writes_nan_and_numpy_values_as_json():
+    content = {"x": np.float64("nan"), "y": np.arange(3, dtype=np.int32), "z": np.array([np.inf, 1.5], dtype=np.float32)}
+    assert json.loads(dumps(content)) == {"x": None, "y": [0, 1, 2], "z": [None, 1.5]}
+    response = FastJSONResponse({"v": [float("nan")]})
+    assert json.loads(response.body) == {"v": [None]}
+
+
+@pytest.mark.parametrize("layout", ["full", "upper"])
+def test_compact_matrix_round_trips(corr, layout):
+    encoded = json.loads(dumps(encode_matrix(corr, layout=layout)))
+    n = len(corr)
+    assert encoded["columns"] == list("abcde")
+    assert len(encoded["values"]) == (n * n if layout == "full" else n * (n + 1) // 2)
+    decoded = decode_matrix(encoded)
+    pd.testing.assert_frame_equal(decoded, corr.round(3), check_names=False)
+
+
+def test_float32_and_non_square_matrices(corr):
+    encoded = encode_matrix(corr.iloc[:2], precision="float32")
+    assert encoded["values"].dtype == np.float32
+    assert encoded["index"] == ["a", "b"]
+    with pytest.raises(ValueError):
+        encode_matrix(corr.iloc[:2], layout="upper")
+
+
+def test_npy_response_is_a_structured_array(corr):
+    assert binary_media_type("application/x-npy, */*") == NPY_MEDIA_TYPE
+    assert binary_media_type("application/json") is None
+    response = binary_matrix_response(corr, NPY_MEDIA_TYPE, "float32")
+    records = np.load(io.BytesIO(response.body), allow_pickle=False)
+    assert records.dtype.names == tuple("abcde")
+    assert records["c"].dtype == np.float32
+    np.testing.assert_allclose(records["c"], corr["c"].to_numpy(), rtol=1e-6)
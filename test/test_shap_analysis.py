@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.shap_analysis import fit_baseline, resolve_method, saabas_contributions, shap_importance
+
+
+@pytest.fixture
+def df() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    n = 6000
+    frame = pd.DataFrame({
+        "signal": rng.normal(size=n),
+        "noise": rng.normal(size=n),
+        "group": rng.choice(["a", "b"], n),
+    })
+    # The label depends on "signal" only within group "a"
+    frame["label"] = np.where(frame["group"] == "a", frame["signal"] > 0, rng.random(n) > 0.5)
+    frame.loc[rng.choice(n, 100, replace=False), "signal"] = np.nan
+    return frame
+
+
+def test_saabas_contributions_add_up_to_the_prediction(df):
+    baseline = fit_baseline(df, "label", True, np.arange(2000), n_estimators=10)
+    X = baseline.encode(df.iloc[2000:2100])
+    contributions = saabas_contributions(baseline.model, X)
+    assert contributions.shape == (100, 3, 2)
+    root = np.mean([tree.tree_.value[0, 0] / tree.tree_.value[0, 0].sum() for tree in baseline.model.estimators_], axis=0)
+    np.testing.assert_allclose(contributions.sum(axis=1) + root, baseline.model.predict_proba(X), atol=1e-9)
+
+
+def test_importance_globally_and_per_group(df):
+    result = shap_importance(df, "label", True, group_cols=["group"], time_budget=30, method="saabas", train_rows=3000)
+    assert result["method"] == "saabas"
+    assert sorted(result["classes"]) == [False, True]
+    assert result["explained_rows"] == len(df) - result["model"]["train_rows"]
+    assert list(result["importance"])[0] == "signal"
+    per_group = result["group_importance"]["group"]
+    assert per_group["a"]["importance"]["signal"] > 2 * per_group["b"]["importance"]["signal"]
+    assert per_group["a"]["count"] + per_group["b"]["count"] == result["explained_rows"]
+
+
+def test_budget_limits_the_explained_rows(df):
+    result = shap_importance(df, "label", True, time_budget=1e-6, method="saabas", train_rows=3000)
+    assert result["explained_rows"] == 64  # only the pilot chunk
+
+
+def test_model_and_contributions_are_memoized(df):
+    store, computed = {}, []
+
+    def memo(key, compute):
+        if key not in store:
+            computed.append(key.split("|")[0])
+            store[key] = compute()
+        return store[key]
+
+    first = shap_importance(df, "label", True, method="saabas", memo=memo)
+    second = shap_importance(df, "label", True, group_cols=["group"], method="saabas", memo=memo)
+    assert computed == ["shap_model", "shap_values"]
+    assert first["importance"] == second["importance"]
+
+
+def test_errors(df):
+    with pytest.raises(KeyError):
+        shap_importance(df, "missing")
+    with pytest.raises(ValueError):
+        resolve_method("kernel")
+    with pytest.raises(ValueError):
+        shap_importance(df.assign(label=1), "label")
@@ -0,0 +1,209 @@
+import io
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.streaming_stats import (
+    ColumnAccumulator,
+    HyperLogLog,
+    StreamingDatasetStats,
+    merge_stats,
+    positional_fingerprint,
+    profile_csv,
+    profile_partitions,
+)
+from app.services.correlation_service import (
+    compute_numeric_correlation,
+    compute_numeric_correlation_from_stats,
+    compute_categorical_correlation,
+    compute_categorical_correlation_from_stats,
+    compute_pearson_with_target,
+    compute_pearson_with_target_from_stats,
+)
+from app.services.detect_problematic_columns import (
+    detect_problem_columns,
+    detect_problem_columns_from_stats,
+)
+from app.services.evaluate_class_balance import (
+    evaluate_class_balance,
+    evaluate_class_balance_from_stats,
+)
+
+DATASET_PATH = "test/datasets/AER_credit_card_data.csv"
+
+
+@pytest.fixture(scope="module")
+def df():
+    return pd.read_csv(DATASET_PATH)
+
+
+@pytest.fixture(scope="module")
+def stats():
+    # Presupuesto mínimo para forzar decenas de bloques
+    return profile_csv(DATASET_PATH, memory_budget=20_000)
+
+
+def test_streams_in_many_chunks(stats, df):
+    assert stats.n_chunks > 10
+    assert stats.n_rows == len(df)
+    assert dict(stats.dtypes) == dict(df.dtypes.astype(str))
+    pd.testing.assert_frame_equal(stats.sample_frame(), df)
+
+
+def test_correlations_match_dataframe_services(stats, df):
+    pd.testing.assert_frame_equal(
+        compute_numeric_correlation_from_stats(stats), compute_numeric_correlation(df)
+    )
+    pd.testing.assert_frame_equal(
+        compute_categorical_correlation_from_stats(stats), compute_categorical_correlation(df)
+    )
+    pd.testing.assert_frame_equal(
+        compute_pearson_with_target_from_stats(stats, "expenditure"),
+        compute_pearson_with_target(df, "expenditure"),
+    )
+
+
+def test_target_row_and_pairs_match_full_matrix_with_missing_values():
+    rng = np.random.default_rng(3)
+    data = pd.DataFrame(rng.normal(size=(300, 4)), columns=list("abcd"))
+    data["b"] += data["a"]
+    data = data.mask(rng.random(data.shape) < 0.2)
+    stats = profile_csv(io.StringIO(data.to_csv(index=False)), memory_budget=2_000)
+    r, n = stats.pearson_target("b")
+    assert stats._pearson_cache is None
+    corr, counts = stats.pearson()
+    pd.testing.assert_series_equal(r, corr["b"].drop("b"), check_names=False)
+    pd.testing.assert_series_equal(n, counts["b"].drop("b"), check_names=False)
+    with pytest.raises(KeyError):
+        stats.pearson_target("missing")
+
+    i, j, r = stats.correlated_pairs(0.05, block_size=1)
+    upper = np.triu(np.abs(corr.to_numpy()) >= 0.05, k=1)
+    assert list(zip(i, j)) == list(zip(*np.nonzero(upper)))
+    np.testing.assert_array_equal(r, corr.to_numpy()[upper])
+
+
+def test_problem_columns_and_class_balance_match(stats, df):
+    streamed = detect_problem_columns_from_stats(stats, 0.8)
+    expected = detect_problem_columns(df, 0.8)
+    assert [p["type"] for p in streamed["problems"]] == [p["type"] for p in expected["problems"]]
+    assert evaluate_class_balance_from_stats(stats, "card") == evaluate_class_balance(df, "card")
+
+
+def split_csv(path, parts):
+    with open(path, encoding="utf-8") as f:
+        header, *lines = f.readlines()
+    bounds = np.linspace(0, len(lines), parts + 1).astype(int)
+    return [header + "".join(lines[a:b]) for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def test_merged_partitions_match_single_pass(df, tmp_path):
+    parts = [profile_csv(io.StringIO(text)) for text in split_csv(DATASET_PATH, 3)]
+    # Ida y vuelta serializada, como si cada partición viniera de otro proceso
+    merged = merge_stats(StreamingDatasetStats.from_bytes(part.to_bytes()) for part in parts)
+    assert merged.n_rows == len(df)
+    assert dict(merged.dtypes) == dict(df.dtypes.astype(str))
+    pd.testing.assert_frame_equal(merged.sample_frame(), df)
+    pd.testing.assert_frame_equal(
+        compute_numeric_correlation_from_stats(merged), compute_numeric_correlation(df)
+    )
+    pd.testing.assert_frame_equal(
+        compute_categorical_correlation_from_stats(merged), compute_categorical_correlation(df)
+    )
+    assert evaluate_class_balance_from_stats(merged, "card") == evaluate_class_balance(df, "card")
+
+    paths = []
+    for i, text in enumerate(split_csv(DATASET_PATH, 2)):
+        paths.append(str(tmp_path / f"part{i}.csv"))
+        with open(paths[-1], "w", encoding="utf-8") as f:
+            f.write(text)
+    in_processes = profile_partitions(paths, n_jobs=2)
+    pd.testing.assert_frame_equal(in_processes.pearson()[0], merged.pearson()[0])
+
+
+def test_merge_switches_to_sketches_and_reservoir_stays_bounded():
+    n = 6000
+    df = pd.DataFrame({"id": np.arange(n), "y": np.arange(n) % 2, "t": ["x"] * (n - 1) + ["z"]})
+    first, second = (
+        profile_csv(io.StringIO(part.to_csv(index=False)), max_categories=4000, sample_rows=1000)
+        for part in (df.iloc[:3000], df.iloc[3000:])
+    )
+    merged = first.merge(second)
+    assert not merged.accumulators["id"].exact_counts
+    assert abs(merged.accumulators["id"].n_unique - n) / n < 3 * merged.accumulators["id"].n_unique_error
+    assert merged.accumulators["y"].value_counts().to_dict() == {0: 3000, 1: 3000}
+    assert merged.accumulators["t"].n_unique == 2
+    assert len(merged.sample_frame()) == 1000 and not merged.sample_is_complete
+    assert merged.identical_to_target("y") == []
+    with pytest.raises(ValueError):
+        merged.merge(profile_csv(io.StringIO("other\n1\n")))
+
+
+def test_reservoir_is_sized_from_its_memory_budget():
+    df = pd.DataFrame(np.arange(2000 * 50).reshape(2000, 50), columns=[f"c{j}" for j in range(50)])
+    text = df.to_csv(index=False)
+    stats = profile_csv(io.StringIO(text), sample_memory=200_000)
+    sample = stats._sample
+    assert 0 < stats.sample_rows < 2000 and len(sample) == stats.sample_rows
+    assert sum(sys.getsizeof(v) + 8 for v in sample.ravel()) <= 200_000
+    assert not stats.sample_is_complete
+    assert profile_csv(io.StringIO(text), sample_memory=None).sample_is_complete
+
+
+def test_column_turning_categorical_after_first_chunk():
+    n = 3000
+    df = pd.DataFrame({
+        "late": [str(i % 4) for i in range(n - 10)] + ["q"] * 10,
+        "other": np.random.default_rng(0).choice(["a", "b"], n),
+    })
+    source = io.StringIO(df.to_csv(index=False))
+    stats = profile_csv(source, memory_budget=20_000)
+    assert stats.n_chunks > 1
+    pd.testing.assert_frame_equal(
+        compute_categorical_correlation_from_stats(stats),
+        compute_categorical_correlation(pd.read_csv(io.StringIO(df.to_csv(index=False)))),
+    )
+
+
+def test_hyperloglog_relative_error():
+    sketch = HyperLogLog()
+    sketch.add(pd.util.hash_array(np.arange(200_000)))
+    assert abs(sketch.count() - 200_000) / 200_000 < 3 * sketch.relative_error
+
+
+def test_distinct_counts_fall_back_to_sketch():
+    n = 20_000
+    df = pd.DataFrame({"id": np.arange(n), "y": np.arange(n) % 2})
+    stats = profile_csv(io.StringIO(df.to_csv(index=False)), max_categories=100)
+    assert not stats.accumulators["id"].exact_counts
+    problems = detect_problem_columns_from_stats(stats)["problems"]
+    assert {"feature": "id", "type": "id", "details": f"Unique values equals row count ({n})"} in problems
+
+
+def test_identical_columns_by_fingerprint():
+    text = "y,copy,shifted,label,label_copy\n1,1,2,a,a\n2,2,1,b,b\n3,3,3,a,a\n"
+    stats = profile_csv(io.StringIO(text), memory_budget=1)
+    assert stats.identical_to_target("y") == ["copy"]
+    assert stats.identical_to_target("label") == ["label_copy"]
+    with pytest.raises(KeyError):
+        stats.identical_to_target("missing")
+
+
+def test_factorized_chunks_keep_counts_and_fingerprints():
+    raw = pd.Series(["b", None, "a", "b", "10", None, "a", "c"], dtype=object)
+    acc = ColumnAccumulator("x")
+    for start in range(0, len(raw), 3):
+        acc.update(raw[start:start + 3])
+    assert acc.null_count == 2
+    assert acc.raw_categories.tolist() == ["b", "a", "10", "c"]
+    assert acc.value_counts().to_dict() == {"b": 2, "a": 2, "10": 1, "c": 1}
+    assert acc.fingerprint == positional_fingerprint(pd.util.hash_array(raw.to_numpy(dtype=object)))
+
+    numeric = pd.Series(["1", None, "2.5", "1"], dtype=object)
+    acc = ColumnAccumulator("y")
+    parsed = np.concatenate([acc.update(numeric[:2]), acc.update(numeric[2:])])
+    np.testing.assert_array_equal(parsed, [1.0, np.nan, 2.5, 1.0])
+    assert acc.dtype == "float64"
+    assert acc.fingerprint == positional_fingerprint(pd.util.hash_array(parsed))
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+from app.core.executor import AnalysisExecutor
+from app.core.warmup import HEAVY_MODULES, import_heavy_modules, start_warmup, warm_up
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..", "backend")
+
+
+def test_importing_the_app_does_not_load_scipy_or_sklearn():
+    code = "import sys, app.main; print(sorted(m for m in ('scipy', 'sklearn') if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_warm_up_imports_the_heavy_modules_and_runs_the_analyses():
+    timings = warm_up()
+    assert set(timings) == {*HEAVY_MODULES, "sample_analyses"}
+    assert all(name in sys.modules for name in HEAVY_MODULES)
+    # Already loaded: a second import costs nothing measurable
+    assert sum(import_heavy_modules().values()) < 0.05
+
+
+def loaded_modules():
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+def test_start_warmup_prestarts_process_workers():
+    executor = AnalysisExecutor(backend="process", max_workers=2, initializer=import_heavy_modules)
+    try:
+        start_warmup(executor).join(timeout=60)
+        pool = executor._processes
+        assert pool is not None and len(pool._processes) == 2
+        assert pool.submit(loaded_modules).result() == list(HEAVY_MODULES)
+    finally:
+        executor.shutdown()